@@ -1,15 +1,34 @@
 from fastapi import FastAPI, Request, Form, HTTPException, Body
-from fastapi.responses import HTMLResponse, JSONResponse
+from fastapi.responses import HTMLResponse, JSONResponse, Response, StreamingResponse
 from fastapi.templating import Jinja2Templates
 from fastapi.staticfiles import StaticFiles
 from src.graph import Grafo
-from src.dijkstra import dijkstra_k_rutas
-from src.utils import es_fuertemente_conexo, tiene_ciclos
+from src.cargador import cargar_red
+from src.snapshot import cargar_snapshot, guardar_snapshot, ruta_snapshot
+from src.dijkstra import calcular_ruta_mas_corta, k_rutas_mas_cortas, matriz_od, METODOS_RUTA
+from src.analitica import AnalisisRed
+from src.vistas import VistasRed, elegir_codificacion, etag_coincide
+from src.landmarks import obtener_landmarks, ruta_tablas
+from src.contraccion import obtener_jerarquia, ruta_contraccion, ruta_jerarquia
+from src.espacial import obtener_indice_espacial
+from src.matriz import MatrizTiempos
+from src.cache import CacheLRU, actualizar_cache_isocronas, actualizar_cache_rutas, clave_k_rutas, isocronas_en_cache
+from src.concurrencia import EjecutorRutas, EjecutorSaturado
+from src.paralelo import EjecutorParalelo
+from src.dependiente_tiempo import minutos_del_dia, ruta_dependiente_tiempo, perfil_llegada, obtener_perfiles
+from src.lineas import obtener_grafo_lineas, ruta_con_transbordos
+from src.raptor import obtener_red_raptor, viajes_pareto, MAX_TRANSBORDOS
+from src.horarios import formatear_hora
 import logging
+import json
+import math
+import sys
+from array import array
 from datetime import datetime
 from dotenv import load_dotenv
 import os
 import copy
+import hmac
 
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
@@ -21,89 +40,238 @@ templates = Jinja2Templates(directory="templates")
 # Montar los archivos estáticos
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
-# Inicializar la red de transporte
+load_dotenv()
+
+# Inicializar la red de transporte. Los archivos se aplican en orden: red.json,
+# el último, prevalece sobre las paradas que también definen las alimentadoras
+ARCHIVO_RED = "src/data/red.json"
+ARCHIVOS_RED = ["src/data/rutas_alimentadoras.json", ARCHIVO_RED]
+# Snapshot binario de la red compilada, regenerado cuando cambian los archivos
+ARCHIVO_SNAPSHOT = ruta_snapshot(ARCHIVO_RED)
+
 red = Grafo()
+
+# Procesos para los cálculos por lotes (matrices, landmarks, /api/matriz); 1 = secuencial
+PROCESOS_CALCULO = int(os.getenv("PROCESOS_CALCULO", "1"))
+ejecutor = EjecutorParalelo(red, PROCESOS_CALCULO) if PROCESOS_CALCULO > 1 else None
+
 try:
-    red.cargar_desde_json("src/data/red.json")
+    # El snapshot se mapea en memoria: los workers comparten sus páginas y no
+    # vuelven a compilar la red ni a calcular landmarks, matrices y analítica
+    snapshot = cargar_snapshot(red, ARCHIVO_SNAPSHOT, ARCHIVOS_RED)
+    if snapshot is None:
+        cargar_red(red, ARCHIVOS_RED)
     logger.info("Red de transporte cargada exitosamente")
+    compilado = red.compilar()
+    logger.info(f"Red compilada: {len(compilado)} estaciones, {compilado.num_aristas} rutas")
+    
+    # Tablas ALT para acelerar las búsquedas A*
+    landmarks = obtener_landmarks(red, ruta_tablas(ARCHIVO_RED), ejecutor=ejecutor)
+    logger.info(f"Landmarks ALT: {', '.join(landmarks.landmarks)}")
+    
+    # Jerarquía de contracción para las consultas punto a punto sin matriz
+    jerarquia = obtener_jerarquia(red, ruta_jerarquia(ARCHIVO_RED))
+    logger.info(f"Jerarquía de contracción: {jerarquia.num_atajos} atajos en {len(jerarquia.atajos)} bandas")
+    
+    # Matrices de tiempos entre todos los pares, por banda de congestión
+    matriz = MatrizTiempos(red, ejecutor)
+    matriz.matrices(red.banda_actual())
+    
+    # Perfiles dependientes del tiempo (congestión por tramo y esperas por frecuencia)
+    perfiles = obtener_perfiles(red)
+    logger.info(f"Perfiles horarios: {len(perfiles.inicios)} intervalos, modos {', '.join(perfiles.nombres_modos)}")
+    
+    # Grafo expandido por (estación, línea) para las rutas con transbordos
+    PENALIZACION_TRANSBORDO = float(os.getenv("PENALIZACION_TRANSBORDO", "3"))
+    expandido = obtener_grafo_lineas(red, PENALIZACION_TRANSBORDO)
+    logger.info(f"Grafo por líneas: {len(expandido.lineas)} líneas, {len(expandido)} nodos, {expandido.num_aristas} aristas")
+    
+    # Secuencias de paradas por línea para los viajes Pareto (tiempo x transbordos)
+    red_raptor = obtener_red_raptor(red)
+    logger.info(f"RAPTOR: {red_raptor.num_patrones} patrones, {len(red_raptor.paradas)} paradas")
+    
+    # Árbol KD de las coordenadas para buscar las estaciones cercanas a un punto
+    espacial = obtener_indice_espacial(red)
+    logger.info(f"Índice espacial: {len(espacial)} estaciones con coordenadas")
+    
+    # Propiedades estructurales, calculadas una vez por versión de la red
+    analisis = AnalisisRed(red, snapshot["analitica"] if snapshot else None)
     
     # Verificar conectividad fuerte
-    if es_fuertemente_conexo(red):
+    reporte = analisis.reporte
+    if reporte["es_fuertemente_conexo"]:
         logger.info("La red es fuertemente conexa")
     else:
-        logger.warning("La red NO es fuertemente conexa - algunas rutas pueden no ser posibles")
+        logger.warning(
+            f"La red NO es fuertemente conexa - {reporte['num_componentes']} componentes, "
+            f"la principal con {len(reporte['principal'])} estaciones; algunas rutas pueden no ser posibles"
+        )
+        for componente in reporte["sin_entrada"]:
+            logger.warning(f"Estaciones inalcanzables desde la red principal: {', '.join(componente)}")
+        for componente in reporte["sin_salida"]:
+            logger.warning(f"Estaciones sin salida hacia la red principal: {', '.join(componente)}")
     
     # Verificar ciclos
-    if tiene_ciclos(red):
+    if analisis.tiene_ciclos:
         logger.info("La red contiene ciclos - existen rutas circulares")
     else:
         logger.info("La red no contiene ciclos - todas las rutas son lineales")
+    
+    if snapshot is None:
+        try:
+            guardar_snapshot(ARCHIVO_SNAPSHOT, red, ARCHIVOS_RED, matriz, analisis)
+            logger.info(f"Snapshot de la red guardado en {ARCHIVO_SNAPSHOT}")
+        except OSError:
+            logger.warning(f"No se pudo guardar el snapshot de la red en {ARCHIVO_SNAPSHOT}")
 except Exception as e:
     logger.error(f"Error al cargar la red de transporte: {str(e)}")
     raise
 
-load_dotenv()
 ORS_API_KEY = os.getenv("ORS_API_KEY")
 
-def nombre_completo_estacion(estacion):
-    tipo = estacion.tipo.capitalize()
-    linea = estacion.linea
-    return f"{estacion.nombre} ({tipo} {linea})"
-
-def agrupar_estaciones_por_tipo_y_linea(red):
-    grupos = {}
-    for est in red.vertices.values():
-        if est.tipo == "metro":
-            grupo = f"Metro Línea {est.linea}"
-        elif est.tipo == "cable":
-            grupo = f"Cable Línea {est.linea}"
-        elif est.tipo == "tranvia":
-            grupo = "Tranvía"
-        else:
-            grupo = est.tipo.capitalize()
-        if grupo not in grupos:
-            grupos[grupo] = []
-        grupos[grupo].append((est.id, nombre_completo_estacion(est)))
-    return grupos
+# Caché de rutas por (origen, destino, K, banda, versión del grafo)
+ttl_cache = os.getenv("CACHE_RUTAS_TTL")
+cache_rutas = CacheLRU(
+    capacidad=int(os.getenv("CACHE_RUTAS_CAPACIDAD", "2048")),
+    ttl=float(ttl_cache) if ttl_cache else None
+)
+
+# Caché de isocronas por (origen, cubeta de minutos, banda, versión del grafo)
+cache_isocronas = CacheLRU(capacidad=int(os.getenv("CACHE_ISOCRONAS_CAPACIDAD", "512")))
+
+# Datos de presentación de la red, serializados una vez por versión del grafo
+vistas = VistasRed(red)
+
+# Los cambios incrementales (cierres, tiempos) solo invalidan lo que afectan
+red.suscribir(matriz.aplicar_cambio)
+red.suscribir(analisis.aplicar_cambio)
+red.suscribir(lambda cambio: actualizar_cache_rutas(cache_rutas, cambio))
+red.suscribir(lambda cambio: actualizar_cache_isocronas(cache_isocronas, cambio))
+
+# Token para los endpoints que modifican la red; sin él están desactivados
+TOKEN_OPERACION = os.getenv("TOKEN_OPERACION")
+
+# Distancia máxima a la estación más cercana cuando el origen o el destino son coordenadas
+DISTANCIA_ACCESO_KM = float(os.getenv("DISTANCIA_ACCESO_KM", "2"))
+
+# Tiempo máximo que admite una isocrona; por encima sería una búsqueda a toda la red
+MAX_MINUTOS_ISOCRONA = float(os.getenv("MAX_MINUTOS_ISOCRONA", "240"))
+
+# Las búsquedas se ejecutan fuera del bucle de eventos, en un grupo de hilos
+# acotado; si la cola se llena se responde 503 en lugar de esperar
+ejecutor_rutas = EjecutorRutas(
+    hilos=int(os.getenv("HILOS_RUTAS", "4")),
+    max_pendientes=int(os.getenv("MAX_BUSQUEDAS_PENDIENTES", "64"))
+)
+
+
+MENSAJE_SATURADO = "El servicio de rutas está saturado, inténtalo de nuevo en unos segundos"
+
+def respuesta_saturado():
+    logger.warning("Ejecutor de rutas saturado: se rechaza la búsqueda")
+    return JSONResponse(status_code=503, content={"error": MENSAJE_SATURADO}, headers={"Retry-After": "1"})
+
+
+def resolver_estacion(valor):
+    """
+    Obtiene el ID de estación de un origen o destino de una petición: el propio
+    ID o, si se dan coordenadas {"lat", "lon"}, la estación abierta más cercana
+    a menos de DISTANCIA_ACCESO_KM. Devuelve None si no hay ninguna.
+    """
+    if isinstance(valor, str):
+        return valor if valor in red.vertices else None
+    try:
+        lat, lon = float(valor["lat"]), float(valor["lon"])
+    except (KeyError, TypeError, ValueError):
+        return None
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        return None
+    cercanas = obtener_indice_espacial(red).cercanas([lon, lat], 1, excluir=red.cerradas)
+    if not cercanas or cercanas[0][1] > DISTANCIA_ACCESO_KM:
+        return None
+    return cercanas[0][0]
+
+
+def ruta_de_matriz(origen_id, destino_id, banda):
+    """
+    Obtiene la ruta mínima de la matriz de tiempos si ya está calculada para la
+    banda, o None si habría que buscarla.
+    """
+    if matriz.calculada(banda):
+        return matriz.ruta(origen_id, destino_id, banda)
+    return None
+
+
+def ruta_principal(origen_id, destino_id, banda):
+    """
+    Calcula la ruta mínima con la matriz de tiempos si ya está calculada para la
+    banda y, si no, con la jerarquía de contracción (que se reconstruye si un
+    cambio de la red la descartó).
+    """
+    if matriz.calculada(banda):
+        return matriz.ruta(origen_id, destino_id, banda)
+    return ruta_contraccion(red, origen_id, destino_id, banda)
+
+
+def calcular_k_rutas(origen_id, destino_id, banda, clave):
+    """
+    Calcula la ruta principal y su alternativa y las guarda en la caché de rutas.
+    
+    El algoritmo de Yen parte de la ruta principal para obtener la alternativa
+    sin ciclos.
+    """
+    principal = ruta_principal(origen_id, destino_id, banda)
+    resultado = k_rutas_mas_cortas(red, origen_id, destino_id, 2, banda, principal)
+    cache_rutas.guardar(clave, resultado)
+    return resultado
+
+
+def operacion_autorizada(request):
+    token = request.headers.get("x-token-operacion")
+    return bool(TOKEN_OPERACION) and token is not None and hmac.compare_digest(token, TOKEN_OPERACION)
+
+
+def respuesta_cambio(cambio):
+    if cambio is None:
+        return JSONResponse(content={"cambio": False, "version": red.version})
+    logger.info(f"Red modificada ({cambio.tipo}): {len(cambio.rutas)} rutas, versión {cambio.version}")
+    return JSONResponse(content={"cambio": True, "version": cambio.version, "rutas": [list(ruta) for ruta in cambio.rutas]})
+
+
+@app.on_event("shutdown")
+def cerrar_ejecutor():
+    ejecutor_rutas.cerrar()
+    if ejecutor is not None:
+        ejecutor.cerrar()
 
 @app.get("/", response_class=HTMLResponse)
 async def home(request: Request):
-    estaciones_agrupadas = agrupar_estaciones_por_tipo_y_linea(red)
-    print(f"Total de estaciones: {len(red.vertices)}")
-    print(f"Total de rutas: {sum(len(destinos) for destinos in red.rutas.values())}")
-    estaciones_mapa = [
-        {
-            "id": est.id,
-            "nombre": est.nombre,
-            "linea": est.linea,
-            "tipo": est.tipo,
-            "coordenadas": est.coordenadas
-        }
-        for est in red.vertices.values()
-        if hasattr(est, "coordenadas") and est.coordenadas
-    ]
+    vista = vistas.vista()
     now = datetime.now()
     current_time = now.strftime("%H:%M:%S")
-    hora = now.hour
 
-    # Determinar el estado de congestión
-    if 7 <= hora < 9:
+    # Determinar el estado de congestión según los horarios de la red
+    banda = red.banda_actual(now)
+    if banda == "hora_pico_manana":
         estado_congestion = "Alta congestión (Hora pico mañana)"
         clase_congestion = "congestion-high"
-    elif 17 <= hora < 19:
+    elif banda == "hora_pico_tarde":
         estado_congestion = "Alta congestión (Hora pico tarde)"
         clase_congestion = "congestion-high"
+    elif banda != "normal":
+        estado_congestion = "Alta congestión"
+        clase_congestion = "congestion-high"
     else:
         estado_congestion = "Tráfico fluido"
         clase_congestion = "congestion-low"
 
     return templates.TemplateResponse(
         "index.html",
-        {"request": request, "estaciones_agrupadas": estaciones_agrupadas, "estaciones_mapa": estaciones_mapa, "ors_api_key": ORS_API_KEY, "current_time": current_time, "estado_congestion": estado_congestion, "clase_congestion": clase_congestion}
+        {"request": request, "estaciones_agrupadas": vista["estaciones_agrupadas"], "ors_api_key": ORS_API_KEY, "current_time": current_time, "estado_congestion": estado_congestion, "clase_congestion": clase_congestion}
     )
 
 @app.post("/ruta", response_class=HTMLResponse)
-def calcular_ruta(request: Request, origen: str = Form(...), destino: str = Form(...)):
+async def calcular_ruta(request: Request, origen: str = Form(...), destino: str = Form(...)):
     """
     Calcula la ruta óptima entre dos estaciones y sus alternativas.
     
@@ -131,16 +299,26 @@ def calcular_ruta(request: Request, origen: str = Form(...), destino: str = Form
         logger.error(f"Estación de destino no encontrada: {destino_id}")
         raise HTTPException(status_code=400, detail=f"Estación de destino '{destino_id}' no encontrada")
     
-    # Verificar conectividad fuerte y ciclos antes de calcular la ruta
-    es_conexa = es_fuertemente_conexo(red)
-    tiene_ciclos_red = tiene_ciclos(red)
+    # Conectividad fuerte y ciclos ya calculados para la versión actual de la red
+    propiedades = analisis.propiedades()
+    es_conexa = propiedades["es_fuertemente_conexo"]
+    tiene_ciclos_red = propiedades["tiene_ciclos"]
+    
+    # Fijar la banda de congestión para toda la consulta
+    now = datetime.now()
+    banda = red.banda_actual(now)
     
     try:
-        # Usar dijkstra_k_rutas para obtener las 2 rutas más cortas
-        distancias, caminos = dijkstra_k_rutas(red, origen_id, K=2)
+        # Los pares más consultados se resuelven desde la caché sin salir del
+        # bucle de eventos; el resto se calcula en el ejecutor de rutas
+        clave = clave_k_rutas(red, origen_id, destino_id, 2, banda)
+        resultado = cache_rutas.obtener(clave)
+        if resultado is None:
+            resultado = await ejecutor_rutas.ejecutar(calcular_k_rutas, origen_id, destino_id, banda, clave)
+        distancias, caminos = resultado
         
         # Verificar si hay rutas disponibles
-        if not distancias[destino_id] or not caminos[destino_id]:
+        if not distancias or not caminos:
             logger.error(f"No se encontró ruta entre {origen_id} y {destino_id}")
             raise HTTPException(
                 status_code=404,
@@ -148,80 +326,43 @@ def calcular_ruta(request: Request, origen: str = Form(...), destino: str = Form
             )
         
         # Obtener la ruta principal (la más corta)
-        tiempo = distancias[destino_id][0]
-        camino_principal = caminos[destino_id][0]
-        camino_principal_nombres = [nombre_completo_estacion(red.vertices[estacion_id]) for estacion_id in camino_principal]
+        tiempo = distancias[0]
+        camino_principal = caminos[0]
+        vista = vistas.vista()
+        nombres = vista["nombres"]
+        camino_principal_nombres = [nombres[estacion_id] for estacion_id in camino_principal]
         
-        # Obtener rutas alternativas usando dijkstra_k_rutas
+        # Obtener rutas alternativas
         rutas_alternativas = []
         rutas_alternativas_ids = []
         tiempos_alternativos = []
         
-        # Usar las rutas K más cortas del algoritmo dijkstra_k_rutas
-        for i in range(1, len(caminos[destino_id])):
-            ruta_alt = caminos[destino_id][i]
-            tiempo_alt = distancias[destino_id][i]
+        # Usar las rutas K más cortas del algoritmo de Yen
+        for i in range(1, len(caminos)):
+            ruta_alt = caminos[i]
+            tiempo_alt = distancias[i]
             if tiempo_alt < tiempo * 2:  # Solo incluir si no es más del 50% más larga
-                rutas_alternativas.append([nombre_completo_estacion(red.vertices[est_id]) for est_id in ruta_alt])
+                rutas_alternativas.append([nombres[est_id] for est_id in ruta_alt])
                 rutas_alternativas_ids.append(ruta_alt)
                 tiempos_alternativos.append(tiempo_alt)
 
-        # Obtener la hora actual
-        now = datetime.now()
-        
         # Calcular hora estimada de llegada para la ruta principal
-        minutos_totales = now.hour * 60 + now.minute + int(tiempo)
-        hora_llegada = f"{minutos_totales // 60:02d}:{minutos_totales % 60:02d}"
+        hora_llegada = formatear_hora(now.hour * 60 + now.minute + int(tiempo))
         
         # Calcular hora estimada de llegada para las rutas alternativas
         hora_llegada_alt = []
         for tiempo_alt in tiempos_alternativos:
-            minutos_alt = now.hour * 60 + now.minute + int(tiempo_alt)
-            hora_llegada_alt.append(f"{minutos_alt // 60:02d}:{minutos_alt % 60:02d}")
-
-        # Preparar datos para la visualización
-        todas_estaciones = []
-        for id, estacion in red.vertices.items():
-            todas_estaciones.append({
-                'id': id,
-                'nombre': estacion.nombre,
-                'tipo': estacion.tipo,
-                'linea': estacion.linea,
-                'coordenadas': estacion.coordenadas
-            })
+            hora_llegada_alt.append(formatear_hora(now.hour * 60 + now.minute + int(tiempo_alt)))
 
-        todas_rutas = []
-        rutas_camino = []
-        for i in range(len(camino_principal) - 1):
-            rutas_camino.append((camino_principal[i], camino_principal[i + 1]))
-
-        for origen_est, rutas_dest in red.rutas.items():
-            for destino_est, ruta in rutas_dest.items():
-                todas_rutas.append({
-                    'origen': origen_est,
-                    'destino': destino_est,
-                    'tipo': ruta.tipo,
-                    'tiempo': ruta.tiempo_base
-                })
-
-        # Preparar datos para el mapa
-        estaciones_mapa = []
-        for id, estacion in red.vertices.items():
-            if estacion.coordenadas:
-                estaciones_mapa.append({
-                    'id': id,
-                    'nombre': estacion.nombre,
-                    'tipo': estacion.tipo,
-                    'linea': estacion.linea,
-                    'coordenadas': estacion.coordenadas
-                })
+        # Tramos de la ruta principal; la página descarga la red de /api/red
+        rutas_camino = [(camino_principal[i], camino_principal[i + 1]) for i in range(len(camino_principal) - 1)]
 
         return templates.TemplateResponse(
             "resultado.html",
             {
                 "request": request,
-                "origen": nombre_completo_estacion(red.vertices[origen_id]),
-                "destino": nombre_completo_estacion(red.vertices[destino_id]),
+                "origen": nombres[origen_id],
+                "destino": nombres[destino_id],
                 "tiempo": int(tiempo),
                 "camino": camino_principal_nombres,
                 "camino_ids": camino_principal,
@@ -232,14 +373,16 @@ def calcular_ruta(request: Request, origen: str = Form(...), destino: str = Form
                 "horas_llegada_alt": hora_llegada_alt,
                 "es_conexa": es_conexa,
                 "tiene_ciclos": tiene_ciclos_red,
-                "estado_congestion": "Hora pico" if (7 <= now.hour < 9) or (17 <= now.hour < 19) else "Normal",
-                "clase_congestion": "congestion-warning" if (7 <= now.hour < 9) or (17 <= now.hour < 19) else "congestion-ok",
-                "todas_estaciones": todas_estaciones,
-                "todas_rutas": todas_rutas,
-                "rutas_camino": rutas_camino,
-                "estaciones_mapa": estaciones_mapa
+                "estado_congestion": "Hora pico" if banda != "normal" else "Normal",
+                "clase_congestion": "congestion-warning" if banda != "normal" else "congestion-ok",
+                "rutas_camino": rutas_camino
             }
         )
+    except HTTPException:
+        raise
+    except EjecutorSaturado:
+        logger.warning("Ejecutor de rutas saturado: se rechaza la búsqueda")
+        raise HTTPException(status_code=503, detail=MENSAJE_SATURADO, headers={"Retry-After": "1"})
     except Exception as e:
         logger.error(f"Error al calcular la ruta: {str(e)}")
         raise HTTPException(
@@ -248,32 +391,439 @@ def calcular_ruta(request: Request, origen: str = Form(...), destino: str = Form
         )
 
 @app.post("/api/ruta-corta")
-def api_ruta_corta(origen: str = Body(...), destino: str = Body(...)):
+async def api_ruta_corta(
+    origen: str | dict = Body(...),
+    destino: str | dict = Body(...),
+    metodo: str = Body(None),
+    salida: str = Body(None),
+    transbordos: bool = Body(False)
+):
     """
-    Devuelve el camino más corto entre dos estaciones como lista de estaciones (con coordenadas).
+    Devuelve el camino más corto entre dos estaciones como lista de IDs de estación.
+    
+    El origen y el destino son IDs de estación o coordenadas {"lat", "lon"}; en
+    ese caso se usa la estación abierta más cercana. Los datos de cada estación
+    (nombre, coordenadas...) se obtienen de /api/red.
+    Por defecto la ruta se obtiene de la matriz de tiempos precalculada o, si la
+    banda no la tiene, de la jerarquía de contracción. El parámetro metodo permite
+    forzar una búsqueda: "bidireccional", "dijkstra", "a_estrella" o "contraccion".
+    Con salida ("HH:MM") la ruta se calcula con el motor dependiente del tiempo,
+    que evalúa la congestión al llegar a cada tramo y suma las esperas por
+    frecuencia; la respuesta incluye entonces la hora de llegada.
+    Con transbordos=true la ruta se calcula sobre el grafo expandido por línea:
+    cada cambio de línea suma la espera del vehículo y una penalización, y la
+    respuesta incluye los tramos por línea y el número de transbordos.
+    Solo las consultas a la matriz ya calculada se resuelven en el bucle de eventos;
+    las búsquedas, incluidas las de la jerarquía, se hacen en el ejecutor de rutas.
     """
-    if origen not in red.vertices or destino not in red.vertices:
+    origen, destino = resolver_estacion(origen), resolver_estacion(destino)
+    if origen is None or destino is None:
         return JSONResponse(status_code=400, content={"error": "Estación no encontrada"})
+    if metodo is not None and metodo not in METODOS_RUTA:
+        return JSONResponse(status_code=400, content={"error": f"Método desconocido: {metodo}"})
+    if transbordos and (metodo is not None or salida is not None):
+        return JSONResponse(status_code=400, content={"error": "transbordos no se puede combinar con metodo ni salida"})
+    if salida is not None:
+        if metodo is not None:
+            return JSONResponse(status_code=400, content={"error": "No se pueden combinar metodo y salida"})
+        try:
+            inicio = minutos_del_dia(salida)
+        except ValueError:
+            return JSONResponse(status_code=400, content={"error": f"Hora de salida inválida: {salida}"})
     try:
-        distancias, caminos = dijkstra_k_rutas(red, origen, K=1)
-        if destino not in caminos:
+        if salida is not None:
+            llegada, camino_ids = await ejecutor_rutas.ejecutar(ruta_dependiente_tiempo, red, origen, destino, inicio)
+            if not camino_ids:
+                return JSONResponse(status_code=404, content={"error": "No existe ruta"})
+            return JSONResponse(content={
+                "camino": camino_ids,
+                "tiempo": llegada - inicio,
+                "salida": formatear_hora(inicio),
+                "llegada": formatear_hora(llegada)
+            })
+        banda = red.banda_actual()
+        if transbordos:
+            ruta = await ejecutor_rutas.ejecutar(ruta_con_transbordos, red, origen, destino, banda, PENALIZACION_TRANSBORDO)
+            if not ruta["camino"]:
+                return JSONResponse(status_code=404, content={"error": "No existe ruta"})
+            return JSONResponse(content=ruta)
+        ruta = None
+        if metodo is None:
+            # Solo la consulta a la matriz ya calculada se resuelve en el bucle de eventos
+            ruta = ejecutor_rutas.consultar(ruta_de_matriz, origen, destino, banda)
+        if ruta is None and metodo is None:
+            ruta = await ejecutor_rutas.ejecutar(ruta_principal, origen, destino, banda)
+        elif ruta is None:
+            ruta = await ejecutor_rutas.ejecutar(calcular_ruta_mas_corta, red, origen, destino, banda, metodo)
+        tiempo, camino_ids = ruta
+        if not camino_ids:
             return JSONResponse(status_code=404, content={"error": "No existe ruta"})
+        return JSONResponse(content={"camino": camino_ids, "tiempo": tiempo})
+    except EjecutorSaturado:
+        return respuesta_saturado()
+    except Exception as e:
+        logger.error(f"Error al calcular ruta corta: {str(e)}")
+        return JSONResponse(status_code=500, content={"error": str(e)})
+
+FORMATOS_MATRIZ = {"jsonl", "binario"}
+
+@app.post("/api/matriz")
+async def api_matriz(
+    origenes: list[str] = Body(...),
+    destinos: list[str] = Body(...),
+    banda: str = Body(None),
+    formato: str = Body("jsonl")
+):
+    """
+    Devuelve la matriz de tiempos mínimos entre listas de orígenes y destinos.
+    
+    Cada origen distinto ejecuta una sola búsqueda y las filas se envían a medida
+    que se calculan. Con formato "jsonl" cada línea es {"origen", "tiempos"} (null
+    si no hay ruta); con formato "binario" el cuerpo son float64 little-endian
+    por filas, un origen distinto por fila en el orden de la petición (inf si no
+    hay ruta). Las filas se calculan en el ejecutor de rutas.
+    """
+    if not origenes or not destinos:
+        return JSONResponse(status_code=400, content={"error": "Se requieren orígenes y destinos"})
+    if formato not in FORMATOS_MATRIZ:
+        return JSONResponse(status_code=400, content={"error": f"Formato desconocido: {formato}"})
+    
+    # Fijar la banda una vez para toda la matriz
+    banda = red.compilar().resolver_banda(banda)
+    if ejecutor is not None:
+        filas = ejecutor.matriz_od(origenes, destinos, banda)
+    else:
+        filas = matriz_od(red, origenes, destinos, banda)
+    try:
+        filas = ejecutor_rutas.admitir_iterador(filas)
+    except EjecutorSaturado:
+        return respuesta_saturado()
+    cabeceras = {"X-Banda": banda}
+    
+    if formato == "binario":
+        cabeceras["X-Matriz-Forma"] = f"{len(dict.fromkeys(origenes))},{len(destinos)}"
         
-        camino_ids = caminos[destino][0]
-        camino_estaciones = []
-        
-        for est_id in camino_ids:
-            estacion = red.vertices[est_id]
-            if estacion.coordenadas:
-                camino_estaciones.append({
-                    'id': est_id,
-                    'nombre': estacion.nombre,
-                    'tipo': estacion.tipo,
-                    'linea': estacion.linea,
-                    'coordenadas': estacion.coordenadas
-                })
+        async def generar_binario():
+            async for _, tiempos in filas:
+                fila = array('d', tiempos)
+                if sys.byteorder == "big":
+                    fila.byteswap()
+                yield fila.tobytes()
         
-        return JSONResponse(content={"camino": camino_estaciones})
+        return StreamingResponse(generar_binario(), media_type="application/octet-stream", headers=cabeceras)
+    
+    async def generar_lineas():
+        async for origen, tiempos in filas:
+            tiempos = [None if tiempo == float('inf') else tiempo for tiempo in tiempos]
+            yield json.dumps({"origen": origen, "tiempos": tiempos}, ensure_ascii=False) + "\n"
+    
+    return StreamingResponse(generar_lineas(), media_type="application/x-ndjson", headers=cabeceras)
+
+@app.post("/api/perfil")
+async def api_perfil(
+    origen: str | dict = Body(...),
+    destino: str | dict = Body(...),
+    desde: str = Body(...),
+    hasta: str = Body(...)
+):
+    """
+    Devuelve la hora de llegada en función de la hora de salida dentro de una ventana.
+    
+    El perfil se calcula en una sola búsqueda en el ejecutor de rutas. La respuesta
+    incluye los puntos [salida, llegada] en minutos desde la medianoche, dos por
+    tramo lineal; un salto aparece como dos puntos con la misma salida. El origen
+    y el destino pueden ser coordenadas, como en /api/ruta-corta.
+    """
+    origen, destino = resolver_estacion(origen), resolver_estacion(destino)
+    if origen is None or destino is None:
+        return JSONResponse(status_code=400, content={"error": "Estación no encontrada"})
+    try:
+        inicio, fin = minutos_del_dia(desde), minutos_del_dia(hasta)
+    except ValueError:
+        return JSONResponse(status_code=400, content={"error": f"Ventana de salida inválida: {desde} - {hasta}"})
+    try:
+        perfil = await ejecutor_rutas.ejecutar(perfil_llegada, red, origen, destino, inicio, fin)
+    except EjecutorSaturado:
+        return respuesta_saturado()
     except Exception as e:
-        logger.error(f"Error al calcular ruta corta: {str(e)}")
+        logger.error(f"Error al calcular perfil: {str(e)}")
+        return JSONResponse(status_code=500, content={"error": str(e)})
+    if perfil is None:
+        return JSONResponse(status_code=404, content={"error": "No existe ruta"})
+    return JSONResponse(content={
+        "origen": origen,
+        "destino": destino,
+        "desde": formatear_hora(inicio),
+        "hasta": formatear_hora(fin),
+        "puntos": [[round(salida, 3), round(llegada, 3)] for salida, llegada in perfil.puntos()]
+    })
+
+@app.post("/api/viajes")
+async def api_viajes(
+    origen: str | dict = Body(...),
+    destino: str | dict = Body(...),
+    max_transbordos: int = Body(MAX_TRANSBORDOS)
+):
+    """
+    Devuelve los viajes Pareto-óptimos en tiempo y número de transbordos.
+    
+    Todos los viajes se obtienen en una sola pasada RAPTOR en el ejecutor de
+    rutas, ordenados de menos a más transbordos: el primero es el de menos
+    transbordos y el último el más rápido. Cada viaje incluye el tiempo (con
+    las esperas medias al subir a cada vehículo), el camino y los tramos por línea.
+    El origen y el destino pueden ser coordenadas, como en /api/ruta-corta.
+    """
+    origen, destino = resolver_estacion(origen), resolver_estacion(destino)
+    if origen is None or destino is None:
+        return JSONResponse(status_code=400, content={"error": "Estación no encontrada"})
+    if max_transbordos < 0:
+        return JSONResponse(status_code=400, content={"error": "max_transbordos no puede ser negativo"})
+    banda = red.banda_actual()
+    try:
+        viajes = await ejecutor_rutas.ejecutar(viajes_pareto, red, origen, destino, banda, max_transbordos)
+    except EjecutorSaturado:
+        return respuesta_saturado()
+    except Exception as e:
+        logger.error(f"Error al calcular viajes: {str(e)}")
+        return JSONResponse(status_code=500, content={"error": str(e)})
+    if not viajes:
+        return JSONResponse(status_code=404, content={"error": "No existe ruta"})
+    return JSONResponse(content={"origen": origen, "destino": destino, "banda": banda, "viajes": viajes})
+
+def banda_de_salida(salida):
+    """
+    Obtiene la banda de congestión de una hora de salida 'HH:MM', o la vigente
+    si no se indica. Lanza ValueError si la hora no es válida.
+    """
+    if salida is None:
+        return red.banda_actual()
+    datetime.strptime(salida, "%H:%M")
+    return red.banda_actual(salida)
+
+
+def error_minutos(minutos):
+    """
+    Comprueba el tiempo máximo de una isocrona.
+
+    Returns:
+        str: Mensaje de error, o None si es un número finito entre 0 y MAX_MINUTOS_ISOCRONA
+    """
+    if not math.isfinite(minutos) or minutos < 0:
+        return f"minutos inválido: {minutos}"
+    if minutos > MAX_MINUTOS_ISOCRONA:
+        return f"minutos no puede superar {MAX_MINUTOS_ISOCRONA:g}"
+    return None
+
+
+def formatear_isocrona(isocrona):
+    return [{"id": id, "tiempo": round(tiempo, 3)} for id, tiempo in isocrona.items()]
+
+@app.post("/api/isocrona")
+async def api_isocrona(
+    origen: str | dict = Body(...),
+    minutos: float = Body(...),
+    salida: str = Body(None)
+):
+    """
+    Devuelve las estaciones alcanzables desde un origen en un tiempo máximo.
+    
+    Usa la banda de congestión de la hora de salida ('HH:MM', por defecto la
+    actual). Las estaciones se ordenan por tiempo de llegada. La búsqueda se
+    detiene al superar el tiempo máximo y pasa por la caché de isocronas. El
+    origen puede ser coordenadas, como en /api/ruta-corta.
+    """
+    origen = resolver_estacion(origen)
+    if origen is None:
+        return JSONResponse(status_code=400, content={"error": "Estación no encontrada"})
+    error = error_minutos(minutos)
+    if error is not None:
+        return JSONResponse(status_code=400, content={"error": error})
+    try:
+        banda = banda_de_salida(salida)
+    except ValueError:
+        return JSONResponse(status_code=400, content={"error": f"Hora de salida inválida: {salida}"})
+    try:
+        isocronas = await ejecutor_rutas.ejecutar(isocronas_en_cache, cache_isocronas, red, [origen], minutos, banda)
+    except EjecutorSaturado:
+        return respuesta_saturado()
+    except Exception as e:
+        logger.error(f"Error al calcular isocrona: {str(e)}")
         return JSONResponse(status_code=500, content={"error": str(e)})
+    return JSONResponse(content={
+        "origen": origen,
+        "banda": banda,
+        "minutos": minutos,
+        "estaciones": formatear_isocrona(isocronas[origen])
+    })
+
+@app.post("/api/isocronas")
+async def api_isocronas(
+    origenes: list[str] = Body(...),
+    minutos: float = Body(...),
+    salida: str = Body(None)
+):
+    """
+    Devuelve las isocronas de varios orígenes con la misma banda y tiempo máximo.
+    
+    Como /api/isocrona, con una sola tarea en el ejecutor de rutas para todos
+    los orígenes; los que no están en la caché se calculan juntos. Un origen
+    que no existe tiene una isocrona vacía.
+    """
+    if not origenes:
+        return JSONResponse(status_code=400, content={"error": "Se requieren orígenes"})
+    error = error_minutos(minutos)
+    if error is not None:
+        return JSONResponse(status_code=400, content={"error": error})
+    try:
+        banda = banda_de_salida(salida)
+    except ValueError:
+        return JSONResponse(status_code=400, content={"error": f"Hora de salida inválida: {salida}"})
+    try:
+        isocronas = await ejecutor_rutas.ejecutar(isocronas_en_cache, cache_isocronas, red, origenes, minutos, banda)
+    except EjecutorSaturado:
+        return respuesta_saturado()
+    except Exception as e:
+        logger.error(f"Error al calcular isocronas: {str(e)}")
+        return JSONResponse(status_code=500, content={"error": str(e)})
+    return JSONResponse(content={
+        "banda": banda,
+        "minutos": minutos,
+        "isocronas": [
+            {"origen": origen, "estaciones": formatear_isocrona(isocrona)}
+            for origen, isocrona in isocronas.items()
+        ]
+    })
+
+@app.get("/api/cercanas")
+async def api_cercanas(lat: float, lon: float, k: int = 5, radio: float = None):
+    """
+    Devuelve las k estaciones más cercanas a un punto, de la más cercana a la más lejana.
+    
+    Con radio (en km) solo se incluyen las estaciones que están dentro de él.
+    Las búsquedas usan el árbol KD de las coordenadas de las estaciones.
+    """
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        return JSONResponse(status_code=400, content={"error": "Coordenadas inválidas"})
+    if k < 1 or (radio is not None and radio < 0):
+        return JSONResponse(status_code=400, content={"error": "k debe ser positivo y radio no negativo"})
+    espacial = obtener_indice_espacial(red)
+    if radio is None:
+        cercanas = espacial.cercanas([lon, lat], k)
+    else:
+        cercanas = espacial.en_radio([lon, lat], radio)[:k]
+    return JSONResponse(content={"estaciones": [
+        {
+            "id": id,
+            "nombre": red.vertices[id].nombre,
+            "distancia_km": round(distancia, 4),
+            "cerrada": id in red.cerradas
+        }
+        for id, distancia in cercanas
+    ]})
+
+@app.get("/api/red")
+async def api_red(request: Request):
+    """
+    Devuelve las estaciones y rutas de la red.
+    
+    El cuerpo se serializa y comprime una vez por versión del grafo. La respuesta
+    lleva un ETag fuerte, de modo que los clientes revalidan con If-None-Match
+    y reciben 304 mientras la red no cambie.
+    """
+    serializada = vistas.vista()["red"]
+    cabeceras = {
+        "ETag": serializada["etag"],
+        "Cache-Control": "no-cache",
+        "Vary": "Accept-Encoding"
+    }
+    if etag_coincide(request.headers.get("if-none-match"), serializada["etag"]):
+        return Response(status_code=304, headers=cabeceras)
+    codificacion = elegir_codificacion(request.headers.get("accept-encoding"), serializada["cuerpos"])
+    if codificacion != "identity":
+        cabeceras["Content-Encoding"] = codificacion
+    return Response(
+        content=serializada["cuerpos"][codificacion],
+        media_type="application/json",
+        headers=cabeceras
+    )
+
+@app.post("/api/estacion/cerrar")
+async def api_cerrar_estacion(request: Request, estacion: str = Body(..., embed=True)):
+    """
+    Cierra temporalmente una estación. Requiere la cabecera X-Token-Operacion.
+    
+    Solo se actualizan los tiempos de sus rutas en la red compilada y los datos
+    derivados que dependen de ellas (filas de la matriz, rutas en caché). Como
+    todas las modificaciones, espera a que terminen las búsquedas en curso.
+    """
+    if not operacion_autorizada(request):
+        return JSONResponse(status_code=403, content={"error": "Operación no autorizada"})
+    try:
+        return respuesta_cambio(await ejecutor_rutas.modificar(red.cerrar_estacion, estacion))
+    except KeyError:
+        return JSONResponse(status_code=404, content={"error": "Estación no encontrada"})
+
+@app.post("/api/estacion/reabrir")
+async def api_reabrir_estacion(request: Request, estacion: str = Body(..., embed=True)):
+    """
+    Vuelve a poner en servicio una estación cerrada. Requiere la cabecera X-Token-Operacion.
+    """
+    if not operacion_autorizada(request):
+        return JSONResponse(status_code=403, content={"error": "Operación no autorizada"})
+    try:
+        return respuesta_cambio(await ejecutor_rutas.modificar(red.reabrir_estacion, estacion))
+    except KeyError:
+        return JSONResponse(status_code=404, content={"error": "Estación no encontrada"})
+
+@app.post("/api/ruta/tiempo")
+async def api_tiempo_ruta(
+    request: Request,
+    origen: str = Body(...),
+    destino: str = Body(...),
+    tiempo: float = Body(...)
+):
+    """
+    Cambia el tiempo base de una ruta. Requiere la cabecera X-Token-Operacion.
+    El tiempo debe ser positivo y finito (para cerrar una ruta, ciérrese la estación).
+    """
+    if not operacion_autorizada(request):
+        return JSONResponse(status_code=403, content={"error": "Operación no autorizada"})
+    try:
+        return respuesta_cambio(await ejecutor_rutas.modificar(red.cambiar_tiempo_ruta, origen, destino, tiempo))
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"error": str(e)})
+    except KeyError:
+        return JSONResponse(status_code=404, content={"error": "Ruta no encontrada"})
+
+@app.post("/api/ruta/congestion")
+async def api_congestion_ruta(
+    request: Request,
+    origen: str = Body(...),
+    destino: str = Body(...),
+    banda: str = Body(...),
+    factor: float = Body(...)
+):
+    """
+    Cambia el factor de congestión de una ruta en una banda. Requiere la cabecera X-Token-Operacion.
+    El factor debe ser positivo y finito.
+    """
+    if not operacion_autorizada(request):
+        return JSONResponse(status_code=403, content={"error": "Operación no autorizada"})
+    try:
+        return respuesta_cambio(await ejecutor_rutas.modificar(red.cambiar_congestion_ruta, origen, destino, banda, factor))
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"error": str(e)})
+    except KeyError:
+        return JSONResponse(status_code=404, content={"error": "Ruta no encontrada"})
+
+@app.get("/api/cache")
+async def api_cache():
+    """
+    Devuelve los contadores de las cachés de rutas e isocronas (aciertos, fallos,
+    desalojos...) y el estado del ejecutor de rutas.
+    """
+    return JSONResponse(content={
+        "rutas": cache_rutas.estadisticas(),
+        "isocronas": cache_isocronas.estadisticas(),
+        "ejecutor": ejecutor_rutas.estadisticas()
+    })
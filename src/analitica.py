@@ -0,0 +1,89 @@
+import threading
+
+from src.utils import grafo_condensado, reporte_conectividad, tiene_ciclos
+
+
+class AnalisisRed:
+    """
+    Propiedades estructurales de la red calculadas una sola vez por versión del grafo.
+
+    Las consultas leen los valores guardados; solo se recalculan cuando la
+    versión del grafo cambia. Las propiedades de la versión actual pueden
+    recibirse ya calculadas, como las guardadas en un snapshot. Los cambios
+    de tiempos que no cierran ni abren rutas (aplicar_cambio) las conservan.
+
+    Attributes:
+        grafo (Grafo): Grafo de la red
+    """
+    def __init__(self, grafo, propiedades=None):
+        self.grafo = grafo
+        self._version = None
+        self._propiedades = None
+        self._candado = threading.Lock()
+        if propiedades is not None:
+            self._propiedades = dict(propiedades, version=grafo.version)
+            self._version = grafo.version
+
+    def propiedades(self):
+        """
+        Obtiene las propiedades de la versión actual del grafo.
+
+        Returns:
+            dict: {
+                "version": int,
+                "es_fuertemente_conexo": bool,
+                "tiene_ciclos": bool,
+                "componentes": list (listas de IDs por componente fuertemente conexa),
+                "condensado": dict (resultado de grafo_condensado),
+                "reporte": dict (resultado de reporte_conectividad)
+            }
+        """
+        version = self.grafo.version
+        with self._candado:
+            if self._propiedades is None or self._version != version:
+                condensado = grafo_condensado(self.grafo)
+                reporte = reporte_conectividad(self.grafo, condensado)
+                self._propiedades = {
+                    "version": version,
+                    "es_fuertemente_conexo": reporte["es_fuertemente_conexo"],
+                    "tiene_ciclos": tiene_ciclos(self.grafo),
+                    "componentes": condensado["componentes"],
+                    "condensado": condensado,
+                    "reporte": reporte
+                }
+                self._version = version
+            return self._propiedades
+
+    def aplicar_cambio(self, cambio):
+        """
+        Conserva las propiedades tras un cambio incremental que no altera qué
+        rutas están en servicio, ya que no dependen de los tiempos.
+
+        Args:
+            cambio (CambioRed): Cambio enviado por Grafo.suscribir
+        """
+        with self._candado:
+            if cambio.topologia or self._propiedades is None or self._version != cambio.version_anterior:
+                return
+            self._propiedades = dict(self._propiedades, version=cambio.version)
+            self._version = cambio.version
+
+    @property
+    def es_fuertemente_conexo(self):
+        """bool: Si desde cualquier estación se puede llegar a cualquier otra."""
+        return self.propiedades()["es_fuertemente_conexo"]
+
+    @property
+    def tiene_ciclos(self):
+        """bool: Si la red contiene algún ciclo."""
+        return self.propiedades()["tiene_ciclos"]
+
+    @property
+    def componentes(self):
+        """list: Componentes fuertemente conexas como listas de IDs de estación."""
+        return self.propiedades()["componentes"]
+
+    @property
+    def reporte(self):
+        """dict: Resumen de las componentes que no se alcanzan entre sí."""
+        return self.propiedades()["reporte"]
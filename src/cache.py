@@ -0,0 +1,340 @@
+import math
+import threading
+import time
+from collections import OrderedDict
+
+from src.dijkstra import isocronas, k_rutas_mas_cortas
+
+# Minutos de cada cubeta de tiempo máximo en la caché de isocronas
+CUBETA_ISOCRONA = 5
+
+
+class CacheLRU:
+    """
+    Caché acotada con política LRU y caducidad opcional por tiempo (TTL).
+
+    Es segura para usarse desde varios hilos y lleva contadores de aciertos,
+    fallos, desalojos y entradas caducadas para poder dimensionarla.
+
+    Attributes:
+        capacidad (int): Número máximo de entradas
+        ttl (float): Segundos de vida de cada entrada, o None si no caducan
+        aciertos (int): Consultas resueltas desde la caché
+        fallos (int): Consultas que no estaban en la caché
+        desalojos (int): Entradas descartadas por falta de capacidad
+        expirados (int): Entradas descartadas por caducidad
+    """
+    def __init__(self, capacidad=1024, ttl=None, reloj=time.monotonic):
+        self.capacidad = capacidad
+        self.ttl = ttl
+        self._reloj = reloj
+        self._entradas = OrderedDict()  # clave -> (instante, valor)
+        self._candado = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+        self.desalojos = 0
+        self.expirados = 0
+
+    def __len__(self):
+        return len(self._entradas)
+
+    def obtener(self, clave, defecto=None):
+        """
+        Obtiene el valor asociado a una clave y la marca como usada recientemente.
+
+        Args:
+            clave: Clave a buscar
+            defecto: Valor devuelto si la clave no está o ha caducado
+
+        Returns:
+            El valor guardado o el valor por defecto
+        """
+        with self._candado:
+            entrada = self._entradas.get(clave)
+            if entrada is not None and self.ttl is not None and self._reloj() - entrada[0] > self.ttl:
+                del self._entradas[clave]
+                self.expirados += 1
+                entrada = None
+            if entrada is None:
+                self.fallos += 1
+                return defecto
+            self._entradas.move_to_end(clave)
+            self.aciertos += 1
+            return entrada[1]
+
+    def guardar(self, clave, valor):
+        """
+        Guarda un valor, desalojando la entrada usada hace más tiempo si la caché está llena.
+
+        Args:
+            clave: Clave de la entrada
+            valor: Valor a guardar
+        """
+        with self._candado:
+            self._entradas[clave] = (self._reloj(), valor)
+            self._entradas.move_to_end(clave)
+            while len(self._entradas) > self.capacidad:
+                self._entradas.popitem(last=False)
+                self.desalojos += 1
+
+    def obtener_o_calcular(self, clave, calcular):
+        """
+        Obtiene el valor de una clave o lo calcula y guarda si no está.
+
+        Args:
+            clave: Clave de la entrada
+            calcular (function): Función sin argumentos que produce el valor
+
+        Returns:
+            El valor guardado o recién calculado
+        """
+        faltante = object()
+        valor = self.obtener(clave, faltante)
+        if valor is faltante:
+            valor = calcular()
+            self.guardar(clave, valor)
+        return valor
+
+    def invalidar(self, predicado=None):
+        """
+        Elimina entradas de la caché.
+
+        Args:
+            predicado (function, optional): Función clave -> bool; si se indica, solo
+                se eliminan las entradas para las que devuelve True
+
+        Returns:
+            int: Número de entradas eliminadas
+        """
+        with self._candado:
+            if predicado is None:
+                eliminadas = len(self._entradas)
+                self._entradas.clear()
+                return eliminadas
+            claves = [clave for clave in self._entradas if predicado(clave)]
+            for clave in claves:
+                del self._entradas[clave]
+            return len(claves)
+
+    def reasignar(self, funcion):
+        """
+        Cambia la clave de las entradas que siguen siendo válidas y elimina las demás.
+
+        Args:
+            funcion (function): Función (clave, valor) -> nueva clave, o None para
+                eliminar la entrada
+
+        Returns:
+            int: Número de entradas eliminadas
+        """
+        with self._candado:
+            entradas = OrderedDict()
+            for clave, (instante, valor) in self._entradas.items():
+                nueva = funcion(clave, valor)
+                if nueva is not None:
+                    entradas[nueva] = (instante, valor)
+            eliminadas = len(self._entradas) - len(entradas)
+            self._entradas = entradas
+            return eliminadas
+
+    def estadisticas(self):
+        """
+        Obtiene los contadores de uso de la caché.
+
+        Returns:
+            dict: Tamaño, capacidad, ttl, aciertos, fallos, desalojos, expirados y tasa de aciertos
+        """
+        with self._candado:
+            consultas = self.aciertos + self.fallos
+            return {
+                "tamano": len(self._entradas),
+                "capacidad": self.capacidad,
+                "ttl": self.ttl,
+                "aciertos": self.aciertos,
+                "fallos": self.fallos,
+                "desalojos": self.desalojos,
+                "expirados": self.expirados,
+                "tasa_aciertos": self.aciertos / consultas if consultas else 0.0
+            }
+
+
+def clave_k_rutas(grafo, origen, destino, K=2, banda=None):
+    """
+    Construye la clave de caché de una consulta de K rutas.
+
+    Args:
+        grafo (Grafo | GrafoCompilado): Grafo que representa la red de transporte
+        origen (str): ID de la estación de origen
+        destino (str): ID de la estación de destino
+        K (int): Número máximo de rutas
+        banda (str, optional): Banda de congestión. Si es None, usa la vigente.
+
+    Returns:
+        tuple: (origen, destino, K, banda, versión del grafo compilado)
+    """
+    compilado = grafo.compilar()
+    return (origen, destino, K, compilado.resolver_banda(banda), compilado.version)
+
+
+def k_rutas_en_cache(cache, grafo, origen, destino, K=2, banda=None, ruta_inicial=None):
+    """
+    Consulta las K rutas más cortas pasando por una caché de resultados.
+
+    La clave incluye la banda de congestión y la versión del grafo, de modo que
+    cualquier modificación de la red deja obsoletas las entradas anteriores.
+    Los resultados se comparten entre consultas y no deben modificarse.
+
+    Args:
+        cache (CacheLRU): Caché de resultados
+        grafo (Grafo | GrafoCompilado): Grafo que representa la red de transporte
+        origen (str): ID de la estación de origen
+        destino (str): ID de la estación de destino
+        K (int): Número máximo de rutas
+        banda (str, optional): Banda de congestión. Si es None, usa la vigente.
+        ruta_inicial (tuple, optional): Ruta más corta ya conocida, como en k_rutas_mas_cortas
+
+    Returns:
+        tuple: (distancias, caminos) como en k_rutas_mas_cortas
+    """
+    compilado = grafo.compilar()
+    banda = compilado.resolver_banda(banda)
+    clave = clave_k_rutas(compilado, origen, destino, K, banda)
+    return cache.obtener_o_calcular(
+        clave, lambda: k_rutas_mas_cortas(compilado, origen, destino, K, banda, ruta_inicial)
+    )
+
+
+def actualizar_cache_rutas(cache, cambio):
+    """
+    Ajusta la caché de K rutas tras un cambio incremental del grafo.
+
+    Si ningún tiempo disminuyó, las K rutas guardadas que no pasan por ninguna
+    ruta modificada en su banda siguen siendo las K más cortas: el resto de
+    caminos solo puede empeorar. Esas entradas pasan a la nueva versión y las
+    demás se eliminan. En otro caso se eliminan todas las de la versión anterior.
+
+    Args:
+        cache (CacheLRU): Caché usada con k_rutas_en_cache
+        cambio (CambioRed): Cambio enviado por Grafo.suscribir
+
+    Returns:
+        int: Número de entradas eliminadas
+    """
+    if cambio.compilado is None or not cambio.aumenta:
+        return cache.invalidar(lambda clave: clave[-1] == cambio.version_anterior)
+
+    compilado = cambio.compilado
+    modificadas = {}  # banda -> pares (origen, destino) cuyo tiempo cambió
+    for banda, anteriores in cambio.anteriores.items():
+        pesos = compilado.pesos[banda]
+        modificadas[banda] = {
+            (compilado.ids[compilado.origenes[e]], compilado.ids[compilado.destinos[e]])
+            for e, anterior in zip(cambio.aristas, anteriores)
+            if pesos[e] != anterior
+        }
+
+    def reasignar(clave, valor):
+        if clave[-1] != cambio.version_anterior:
+            return None
+        pares = modificadas.get(clave[3], ())
+        for camino in valor[1]:
+            if any((a, b) in pares for a, b in zip(camino, camino[1:])):
+                return None
+        return clave[:-1] + (cambio.version,)
+
+    return cache.reasignar(reasignar)
+
+
+def clave_isocrona(grafo, origen, minutos, banda=None):
+    """
+    Construye la clave de caché de una isocrona.
+
+    El tiempo máximo se redondea hacia arriba a un múltiplo de CUBETA_ISOCRONA,
+    de modo que consultas con tiempos parecidos comparten la misma entrada.
+
+    Args:
+        grafo (Grafo | GrafoCompilado): Grafo que representa la red de transporte
+        origen (str): ID de la estación de origen
+        minutos (float): Tiempo máximo de viaje
+        banda (str, optional): Banda de congestión. Si es None, usa la vigente.
+
+    Returns:
+        tuple: (origen, tiempo máximo de la cubeta, banda, versión del grafo compilado)
+    """
+    compilado = grafo.compilar()
+    techo = math.ceil(minutos / CUBETA_ISOCRONA) * CUBETA_ISOCRONA
+    return (origen, techo, compilado.resolver_banda(banda), compilado.version)
+
+
+def isocronas_en_cache(cache, grafo, origenes, minutos, banda=None):
+    """
+    Calcula isocronas de varios orígenes pasando por una caché de resultados.
+
+    Cada entrada guarda la isocrona del tiempo máximo de su cubeta; la consulta
+    se responde filtrándola. Los orígenes que faltan se calculan juntos con
+    isocronas. Los resultados se comparten entre consultas y no deben modificarse.
+
+    Args:
+        cache (CacheLRU): Caché de resultados
+        grafo (Grafo | GrafoCompilado): Grafo que representa la red de transporte
+        origenes (list): IDs de las estaciones de origen
+        minutos (float): Tiempo máximo de viaje
+        banda (str, optional): Banda de congestión. Si es None, usa la vigente.
+
+    Returns:
+        dict: Origen -> isocrona como en isocrona, en el orden de origenes
+    """
+    compilado = grafo.compilar()
+    banda = compilado.resolver_banda(banda)
+    claves = {origen: clave_isocrona(compilado, origen, minutos, banda) for origen in origenes}
+    faltante = object()
+    completas = {origen: cache.obtener(clave, faltante) for origen, clave in claves.items()}
+    pendientes = [origen for origen, isocrona in completas.items() if isocrona is faltante]
+    if pendientes:
+        techo = claves[pendientes[0]][1]
+        for origen, isocrona in isocronas(compilado, pendientes, techo, banda):
+            cache.guardar(claves[origen], isocrona)
+            completas[origen] = isocrona
+    return {
+        origen: {id: tiempo for id, tiempo in isocrona.items() if tiempo <= minutos}
+        for origen, isocrona in completas.items()
+    }
+
+
+def actualizar_cache_isocronas(cache, cambio):
+    """
+    Ajusta la caché de isocronas tras un cambio incremental del grafo.
+
+    Una isocrona solo depende de las rutas que salen de sus estaciones: una ruta
+    modificada que sale de una estación fuera de ella no puede cambiar ningún
+    tiempo por debajo del máximo, aumente o disminuya. Esas entradas pasan a la
+    nueva versión y las demás de la versión anterior se eliminan.
+
+    Args:
+        cache (CacheLRU): Caché usada con isocronas_en_cache
+        cambio (CambioRed): Cambio enviado por Grafo.suscribir
+
+    Returns:
+        int: Número de entradas eliminadas
+    """
+    if cambio.compilado is None:
+        return cache.invalidar(lambda clave: clave[-1] == cambio.version_anterior)
+
+    compilado = cambio.compilado
+    modificadas = {}  # banda -> estaciones de origen de las rutas cuyo tiempo cambió
+    for banda, anteriores in cambio.anteriores.items():
+        pesos = compilado.pesos[banda]
+        modificadas[banda] = {
+            compilado.ids[compilado.origenes[e]]
+            for e, anterior in zip(cambio.aristas, anteriores)
+            if pesos[e] != anterior
+        }
+
+    def reasignar(clave, valor):
+        if clave[-1] != cambio.version_anterior:
+            return None
+        if any(estacion in valor for estacion in modificadas.get(clave[2], ())):
+            return None
+        return clave[:-1] + (cambio.version,)
+
+    return cache.reasignar(reasignar)
@@ -0,0 +1,246 @@
+import json
+import logging
+import time
+
+from src.graph import Estacion, Ruta
+
+
+logger = logging.getLogger(__name__)
+
+# Separador entre el espacio de nombres de un archivo y el ID local de una estación
+SEPARADOR_ESPACIO = ":"
+
+
+class ErrorCargaRed(ValueError):
+    """Se lanza cuando un archivo de red no se puede leer o no supera la validación."""
+
+
+class MetricasCarga:
+    """
+    Resumen de una carga de la red.
+
+    Attributes:
+        archivos (list): Archivos leídos, en orden
+        estaciones (int): Estaciones del grafo tras la carga
+        rutas (int): Rutas del grafo tras la carga
+        duplicadas (int): Definiciones repetidas idénticas a una anterior
+        conflictos (list): Descripción de cada definición que reemplazó a otra distinta
+        colgantes (list): Rutas (origen, destino) descartadas por referirse a estaciones inexistentes
+        segundos_lectura (float): Tiempo de lectura de los archivos
+        segundos_construccion (float): Tiempo de validación y construcción del grafo
+    """
+    def __init__(self):
+        self.archivos = []
+        self.estaciones = 0
+        self.rutas = 0
+        self.duplicadas = 0
+        self.conflictos = []
+        self.colgantes = []
+        self.segundos_lectura = 0.0
+        self.segundos_construccion = 0.0
+
+    def resumen(self):
+        """
+        Obtiene las métricas en forma de diccionario.
+
+        Returns:
+            dict: Contadores y tiempos de la carga
+        """
+        return {
+            "archivos": list(self.archivos),
+            "estaciones": self.estaciones,
+            "rutas": self.rutas,
+            "duplicadas": self.duplicadas,
+            "conflictos": len(self.conflictos),
+            "colgantes": len(self.colgantes),
+            "segundos_lectura": self.segundos_lectura,
+            "segundos_construccion": self.segundos_construccion
+        }
+
+
+def _leer(archivo):
+    try:
+        with open(archivo, 'r', encoding='utf-8') as f:
+            datos = json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        raise ErrorCargaRed(f"No se pudo leer {archivo}: {e}") from e
+    if not isinstance(datos, dict) or not isinstance(datos.get("vertices"), dict) or not isinstance(datos.get("rutas"), list):
+        raise ErrorCargaRed(f"{archivo} debe tener un objeto 'vertices' y una lista 'rutas'")
+    return datos
+
+
+def _fuentes(archivos):
+    """Normaliza la lista de archivos a pares (archivo, espacio de nombres)."""
+    fuentes = []
+    for fuente in archivos:
+        if isinstance(fuente, (tuple, list)):
+            archivo, espacio = fuente
+        else:
+            archivo, espacio = fuente, None
+        fuentes.append((archivo, espacio))
+    return fuentes
+
+
+def _combinar_horarios(horarios, nuevos, archivo):
+    """
+    Combina el bloque "horarios" de un archivo: ventanas por banda y frecuencias por modo.
+
+    Los horarios valen para toda la red, así que un archivo no puede cambiar
+    en silencio los de otro: una ventana o una frecuencia definida de nuevo
+    con otro valor es un error.
+    """
+    for clave, valor in nuevos.items():
+        if clave == "frecuencias":
+            frecuencias = horarios.setdefault("frecuencias", {})
+            for modo, frecuencia in valor.items():
+                if modo in frecuencias and frecuencias[modo] != frecuencia:
+                    raise ErrorCargaRed(
+                        f"{archivo}: la frecuencia de '{modo}' ({frecuencia}) no coincide con la ya definida ({frecuencias[modo]})"
+                    )
+                frecuencias[modo] = frecuencia
+            continue
+        if clave in horarios and horarios[clave] != valor:
+            raise ErrorCargaRed(f"{archivo}: la ventana '{clave}' ({valor}) no coincide con la ya definida ({horarios[clave]})")
+        horarios[clave] = valor
+
+
+def poblar_grafo(grafo, estaciones, rutas, horarios):
+    """
+    Construye las estaciones y rutas ya validadas directamente sobre el grafo.
+
+    Todos los objetos se crean antes de modificar el grafo, de modo que un dato
+    mal formado no lo deja a medias, y la versión aumenta una sola vez.
+
+    Args:
+        grafo (Grafo): Grafo a completar
+        estaciones (dict): ID -> datos de la estación, como en Grafo.agregar_estacion
+        rutas (iterable): Pares ((origen, destino), datos de la ruta)
+        horarios (dict): Bloque "horarios" resultante
+
+    Raises:
+        ErrorCargaRed: Si a una estación o ruta le falta algún campo
+    """
+    try:
+        nuevas_estaciones = [
+            Estacion(
+                id=id,
+                nombre=datos_estacion["nombre"],
+                tipo=datos_estacion["tipo"],
+                linea=datos_estacion["linea"],
+                conexiones=datos_estacion["conexiones"],
+                coordenadas=datos_estacion.get("coordenadas"),
+                es_transbordo=datos_estacion.get("es_transbordo", False)
+            )
+            for id, datos_estacion in estaciones.items()
+        ]
+        nuevas_rutas = [
+            Ruta(origen, destino, datos_ruta["tipo"], datos_ruta["tiempo"], datos_ruta["congestion_tipica"])
+            for (origen, destino), datos_ruta in rutas
+        ]
+    except (KeyError, TypeError) as e:
+        raise ErrorCargaRed(f"Estación o ruta mal formada, falta el campo {e}") from e
+
+    grafo.agregar_lote(nuevas_estaciones, nuevas_rutas, horarios)
+
+
+def cargar_red(grafo, archivos, estricto=False):
+    """
+    Carga la red de transporte desde uno o varios archivos JSON en una sola pasada.
+
+    Cada archivo tiene el formato de red.json ("vertices", "rutas" y,
+    opcionalmente, "horarios"). Los archivos se aplican en orden, como capas:
+    si una estación o una ruta se define de nuevo con datos distintos
+    prevalece la última definición y se anota el conflicto; las repeticiones
+    idénticas solo se cuentan. Las ventanas y frecuencias de "horarios" son
+    comunes a toda la red y deben coincidir entre archivos. Un archivo
+    puede indicarse como (archivo, espacio) para anteponer "espacio:" a los IDs
+    de las estaciones que define; sus rutas pueden referirse a estaciones de
+    otros archivos por su ID completo.
+
+    Todos los archivos se validan antes de tocar el grafo, y las estaciones y
+    rutas se construyen directamente sobre sus diccionarios, con un único
+    cambio de versión. Las rutas con un extremo inexistente se descartan.
+
+    Args:
+        grafo (Grafo): Grafo a completar; sus estaciones y rutas actuales se
+            conservan salvo que los archivos las redefinan
+        archivos (list): Rutas de los archivos o pares (archivo, espacio)
+        estricto (bool): Si es True, cualquier conflicto o ruta colgante es un error
+
+    Returns:
+        MetricasCarga: Resumen de la carga
+
+    Raises:
+        ErrorCargaRed: Si un archivo no se puede leer o le faltan datos, si dos
+            archivos definen horarios distintos, o si estricto es True y hay
+            conflictos o rutas colgantes
+    """
+    metricas = MetricasCarga()
+    inicio = time.perf_counter()
+    leidos = []
+    for archivo, espacio in _fuentes(archivos):
+        leidos.append((archivo, espacio, _leer(archivo)))
+        metricas.archivos.append(archivo)
+    metricas.segundos_lectura = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    estaciones = {}  # id -> datos
+    rutas = {}  # (origen, destino) -> datos
+    horarios = dict(grafo.horarios)
+    if "frecuencias" in horarios:
+        horarios["frecuencias"] = dict(horarios["frecuencias"])
+    for archivo, espacio, datos in leidos:
+        _combinar_horarios(horarios, datos.get("horarios") or {}, archivo)
+
+        locales = {}
+        for id, datos_estacion in datos["vertices"].items():
+            completo = f"{espacio}{SEPARADOR_ESPACIO}{id}" if espacio else id
+            locales[id] = completo
+            anterior = estaciones.get(completo)
+            if anterior is not None:
+                if anterior == datos_estacion:
+                    metricas.duplicadas += 1
+                else:
+                    metricas.conflictos.append(f"{archivo}: estación '{completo}' redefinida")
+            estaciones[completo] = datos_estacion
+
+        for ruta in datos["rutas"]:
+            try:
+                clave = (locales.get(ruta["origen"], ruta["origen"]), locales.get(ruta["destino"], ruta["destino"]))
+            except (KeyError, TypeError) as e:
+                raise ErrorCargaRed(f"{archivo}: ruta sin origen o destino: {ruta}") from e
+            anterior = rutas.get(clave)
+            if anterior is not None:
+                if anterior == ruta:
+                    metricas.duplicadas += 1
+                else:
+                    metricas.conflictos.append(f"{archivo}: ruta {clave[0]} -> {clave[1]} redefinida")
+            rutas[clave] = ruta
+
+    for (origen, destino) in rutas:
+        if (origen not in estaciones and origen not in grafo.vertices) or \
+                (destino not in estaciones and destino not in grafo.vertices):
+            metricas.colgantes.append((origen, destino))
+    if estricto and (metricas.conflictos or metricas.colgantes):
+        problemas = metricas.conflictos + [f"ruta colgante {o} -> {d}" for o, d in metricas.colgantes]
+        raise ErrorCargaRed("; ".join(problemas))
+
+    colgantes = set(metricas.colgantes)
+    poblar_grafo(grafo, estaciones, (
+        (clave, datos_ruta) for clave, datos_ruta in rutas.items() if clave not in colgantes
+    ), horarios)
+
+    metricas.estaciones = len(grafo.vertices)
+    metricas.rutas = sum(len(destinos) for destinos in grafo.rutas.values())
+    metricas.segundos_construccion = time.perf_counter() - inicio
+
+    for conflicto in metricas.conflictos:
+        logger.warning(f"Conflicto al cargar la red: {conflicto}")
+    for origen, destino in metricas.colgantes:
+        logger.warning(f"Ruta descartada, estación inexistente: {origen} -> {destino}")
+    logger.info(
+        f"Red cargada de {len(metricas.archivos)} archivo(s): {metricas.estaciones} estaciones, "
+        f"{metricas.rutas} rutas, {metricas.duplicadas} duplicadas, {len(metricas.conflictos)} conflictos, "
+        f"{len(metricas.colgantes)} colgantes en {metricas.segundos_lectura + metricas.segundos_construccion:.3f} s"
+    )
+    return metricas
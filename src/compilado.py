@@ -0,0 +1,402 @@
+import hashlib
+from array import array
+
+from src.horarios import banda_horaria, bandas_definidas, BANDA_NORMAL
+from src.geo import calibrar_velocidades
+
+
+BANDAS = ("hora_pico_manana", "hora_pico_tarde", "normal")
+INF = float('inf')
+
+
+class GrafoCompilado:
+    """
+    Representación compacta de un Grafo en formato CSR.
+
+    Las estaciones se identifican por índices enteros y las aristas de la
+    estación i ocupan el rango [offsets[i], offsets[i + 1]) de los arreglos
+    de aristas. Los tiempos se precalculan una sola vez por banda horaria de
+    congestión, de modo que cada consulta fija su banda al comenzar y no
+    vuelve a consultar el reloj. La topología no cambia; los cierres de
+    estaciones y los cambios de tiempos se aplican sobre los pesos con
+    actualizar_aristas (una ruta fuera de servicio pesa float('inf')).
+
+    Attributes:
+        ids (list): ID de la estación en cada índice
+        indices (dict): Mapeo de ID de estación a su índice
+        estaciones (list): Objetos Estacion en cada índice
+        offsets (array): Desplazamientos CSR de las aristas de cada estación
+        destinos (array): Índice de la estación destino de cada arista
+        origenes (array): Índice de la estación origen de cada arista
+        offsets_inv (array): Desplazamientos CSR de las aristas que llegan a cada estación
+        aristas_inv (array): Índices de las aristas agrupadas por estación destino
+        tiempos_base (array): Tiempo base de cada arista en minutos
+        tipos (list): Tipo de cada arista
+        pesos (dict): Tiempos por arista para cada banda (banda -> array)
+        horarios (dict): Bloque "horarios" con las ventanas de cada banda
+        landmarks (TablasLandmarks): Tablas ALT asociadas, o None si no se han calculado
+        jerarquia (JerarquiaContraccion): Jerarquía de contracción asociada, o None si no se ha construido
+        perfiles (PerfilesTiempo): Perfiles dependientes del tiempo, o None si no se han compilado
+        expandido (GrafoLineas): Grafo expandido por línea, o None si no se ha compilado
+        raptor (RedRaptor): Patrones por línea para RAPTOR, o None si no se han compilado
+        espacial (IndiceEspacial): Índice de las coordenadas de las estaciones, o None si no se ha construido
+        matrices (dict): Matrices de tiempos precargadas, banda -> (distancias, siguiente)
+        version (int): Versión del Grafo a partir del cual se compiló
+    """
+    def __init__(self, grafo):
+        self._iniciar(grafo)
+
+        bandas = list(BANDAS)
+        for banda in bandas_definidas(self.horarios):
+            if banda not in bandas:
+                bandas.append(banda)
+        rutas = []
+        for id in self.ids:
+            # Las rutas hacia estaciones inexistentes no se pueden recorrer
+            salientes = [ruta for destino, ruta in grafo.rutas.get(id, {}).items() if destino in self.indices]
+            rutas.append(salientes)
+            for ruta in salientes:
+                for banda in ruta.congestion_tipica:
+                    if banda not in bandas:
+                        bandas.append(banda)
+
+        self.offsets = array('l', [0])
+        self.destinos = array('l')
+        self.origenes = array('l')
+        self.tiempos_base = array('d')
+        self.tipos = []
+        self.pesos = {banda: array('d') for banda in bandas}
+        cerradas = getattr(grafo, "cerradas", ())
+        for i, salientes in enumerate(rutas):
+            for ruta in salientes:
+                self.destinos.append(self.indices[ruta.destino])
+                self.origenes.append(i)
+                self.tipos.append(ruta.tipo)
+                if ruta.origen in cerradas or ruta.destino in cerradas:
+                    self.tiempos_base.append(INF)
+                    for pesos in self.pesos.values():
+                        pesos.append(INF)
+                    continue
+                self.tiempos_base.append(ruta.tiempo_base)
+                for banda, pesos in self.pesos.items():
+                    pesos.append(ruta.tiempo_en_banda(banda))
+            self.offsets.append(len(self.destinos))
+
+        # Adyacencia inversa: aristas entrantes agrupadas por destino (ordenamiento por conteo)
+        n = len(self.ids)
+        conteo = [0] * (n + 1)
+        for destino in self.destinos:
+            conteo[destino + 1] += 1
+        for i in range(n):
+            conteo[i + 1] += conteo[i]
+        self.offsets_inv = array('l', conteo)
+        posiciones = conteo[:n]
+        self.aristas_inv = array('l', [0] * len(self.destinos))
+        for e, destino in enumerate(self.destinos):
+            self.aristas_inv[posiciones[destino]] = e
+            posiciones[destino] += 1
+
+    def _iniciar(self, grafo):
+        self.ids = list(grafo.vertices)
+        self.indices = {id: i for i, id in enumerate(self.ids)}
+        self.estaciones = [grafo.vertices[id] for id in self.ids]
+        self.version = getattr(grafo, "version", 0)
+        self.horarios = getattr(grafo, "horarios", {})
+        self._velocidades = {}
+        self._huella = None
+        self.landmarks = None
+        self.jerarquia = None
+        self.perfiles = None
+        self.expandido = None
+        self.raptor = None
+        self.espacial = None
+        self.matrices = {}
+
+    @classmethod
+    def ensamblar(cls, grafo, arreglos, tipos, pesos, huella=None):
+        """
+        Construye el grafo compilado a partir de arreglos CSR ya calculados.
+
+        Los arreglos pueden ser array o memoryview (por ejemplo, vistas de un
+        snapshot mapeado en memoria); deben corresponder a las estaciones del
+        grafo en el orden de grafo.vertices.
+
+        Args:
+            grafo (Grafo): Grafo con las estaciones y rutas
+            arreglos (dict): "offsets", "destinos", "origenes", "offsets_inv",
+                "aristas_inv" y "tiempos_base"
+            tipos (list): Tipo de cada arista
+            pesos (dict): banda -> tiempo de cada arista
+            huella (str, optional): Huella ya conocida de estos arreglos
+
+        Returns:
+            GrafoCompilado: Grafo compilado de la versión actual del grafo
+        """
+        compilado = cls.__new__(cls)
+        compilado._iniciar(grafo)
+        compilado.offsets = arreglos["offsets"]
+        compilado.destinos = arreglos["destinos"]
+        compilado.origenes = arreglos["origenes"]
+        compilado.offsets_inv = arreglos["offsets_inv"]
+        compilado.aristas_inv = arreglos["aristas_inv"]
+        compilado.tiempos_base = arreglos["tiempos_base"]
+        compilado.tipos = tipos
+        compilado.pesos = pesos
+        compilado._huella = huella
+        return compilado
+
+    def __getstate__(self):
+        # Para enviarlo a otros procesos: las vistas de memoria se copian a arreglos
+        # y los datos derivados (landmarks, jerarquía, perfiles, grafos por línea, índice espacial, matrices) se recalculan allí
+        estado = dict(self.__dict__)
+        for nombre, valor in estado.items():
+            if isinstance(valor, memoryview):
+                estado[nombre] = array(valor.format, valor)
+        estado["pesos"] = {
+            banda: array(pesos.format, pesos) if isinstance(pesos, memoryview) else pesos
+            for banda, pesos in self.pesos.items()
+        }
+        estado["landmarks"] = None
+        estado["jerarquia"] = None
+        estado["perfiles"] = None
+        estado["expandido"] = None
+        estado["raptor"] = None
+        estado["espacial"] = None
+        estado["matrices"] = {}
+        return estado
+
+    def __len__(self):
+        return len(self.ids)
+
+    def actualizar_aristas(self, grafo, rutas):
+        """
+        Copia en los pesos compilados el estado actual de algunas rutas del grafo.
+
+        Las rutas con un extremo cerrado pasan a pesar float('inf'). Los arreglos
+        que son vistas de un snapshot (de solo lectura) se copian la primera vez.
+        El grafo expandido por línea recibe los mismos tiempos. La huella, la
+        jerarquía de contracción, los perfiles dependientes del tiempo y las
+        matrices precargadas se descartan; si algún tiempo disminuye también
+        las velocidades calibradas y los landmarks, porque dejarían de ser
+        cotas inferiores.
+
+        Args:
+            grafo (Grafo): Grafo del que se compiló, ya modificado
+            rutas (list): Pares (origen, destino) de las rutas a actualizar
+
+        Returns:
+            tuple: (aristas actualizadas, {banda: tiempos anteriores de esas aristas},
+                True si ningún tiempo disminuyó)
+        """
+        if isinstance(self.tiempos_base, memoryview):
+            self.tiempos_base = array('d', self.tiempos_base)
+        for banda, pesos in list(self.pesos.items()):
+            if isinstance(pesos, memoryview):
+                self.pesos[banda] = array('d', pesos)
+
+        aristas = []
+        anteriores = {banda: [] for banda in self.pesos}
+        aumenta = True
+        cerradas = grafo.cerradas
+        for origen, destino in rutas:
+            i, j = self.indices.get(origen), self.indices.get(destino)
+            e = self.arista(i, j) if i is not None and j is not None else None
+            if e is None:
+                continue
+            ruta = grafo.rutas[origen][destino]
+            fuera = origen in cerradas or destino in cerradas
+            aristas.append(e)
+            self.tiempos_base[e] = INF if fuera else ruta.tiempo_base
+            for banda, pesos in self.pesos.items():
+                nuevo = INF if fuera else ruta.tiempo_en_banda(banda)
+                anteriores[banda].append(pesos[e])
+                if nuevo < pesos[e]:
+                    aumenta = False
+                pesos[e] = nuevo
+
+        self._huella = None
+        self.jerarquia = None
+        self.perfiles = None
+        self.matrices = {}
+        if self.expandido is not None:
+            self.expandido.actualizar(aristas)
+        if not aumenta:
+            self._velocidades = {}
+            self.landmarks = None
+        return aristas, anteriores, aumenta
+
+    @property
+    def num_aristas(self):
+        """int: Número total de aristas compiladas."""
+        return len(self.destinos)
+
+    def compilar(self):
+        """
+        Devuelve el propio grafo compilado, para que las funciones de búsqueda
+        acepten indistintamente un Grafo o un GrafoCompilado.
+        """
+        return self
+
+    def huella(self):
+        """
+        Calcula una huella de la topología y los pesos del grafo compilado.
+
+        Sirve para invalidar datos precalculados que se guardan en disco cuando
+        la red cambia.
+
+        Returns:
+            str: Resumen SHA-256 en hexadecimal
+        """
+        if self._huella is None:
+            resumen = hashlib.sha256()
+            resumen.update("\n".join(self.ids).encode("utf-8"))
+            resumen.update(self.offsets.tobytes())
+            resumen.update(self.destinos.tobytes())
+            for banda in sorted(self.pesos):
+                resumen.update(banda.encode("utf-8"))
+                resumen.update(self.pesos[banda].tobytes())
+            self._huella = resumen.hexdigest()
+        return self._huella
+
+    def banda_actual(self, momento=None):
+        """
+        Determina la banda de congestión vigente según los horarios de la red.
+
+        Args:
+            momento (int | str | datetime, optional): Hora a consultar. Si es None, usa la hora actual.
+
+        Returns:
+            str: Nombre de la banda de congestión
+        """
+        return banda_horaria(momento, self.horarios)
+
+    def resolver_banda(self, banda=None):
+        """
+        Obtiene el nombre de la banda cuyos pesos se usarán en una consulta.
+
+        Args:
+            banda (str, optional): Banda de congestión. Si es None, usa la banda actual.
+
+        Returns:
+            str: La banda indicada, o 'normal' si el grafo no tiene pesos para ella
+        """
+        if banda is None:
+            banda = self.banda_actual()
+        return banda if banda in self.pesos else BANDA_NORMAL
+
+    def pesos_de(self, banda=None):
+        """
+        Fija la banda de una consulta y obtiene sus tiempos precalculados.
+
+        Args:
+            banda (str, optional): Banda de congestión. Si es None, usa la banda actual.
+
+        Returns:
+            array: Tiempo de cada arista en la banda; las bandas desconocidas usan la normal
+        """
+        return self.pesos[self.resolver_banda(banda)]
+
+    def velocidad_maxima(self, banda=None):
+        """
+        Obtiene la velocidad del modo más rápido de la red en una banda.
+
+        La calibración se hace a partir de los tiempos de las rutas y se
+        reutiliza en las consultas siguientes.
+
+        Args:
+            banda (str, optional): Banda de congestión. Si es None, usa la banda actual.
+
+        Returns:
+            float: Velocidad máxima en km/min (0 si no hay rutas con coordenadas)
+        """
+        banda = self.resolver_banda(banda)
+        if banda not in self._velocidades:
+            self._velocidades[banda] = max(calibrar_velocidades(self, banda).values(), default=0.0)
+        return self._velocidades[banda]
+
+    def indice(self, estacion):
+        """
+        Obtiene el índice entero de una estación.
+
+        Args:
+            estacion (str): ID de la estación
+
+        Returns:
+            int: Índice de la estación o None si no existe
+        """
+        return self.indices.get(estacion)
+
+    def arista(self, origen, destino):
+        """
+        Busca la arista que une dos estaciones.
+
+        Args:
+            origen (int): Índice de la estación de origen
+            destino (int): Índice de la estación de destino
+
+        Returns:
+            int: Índice de la arista, o None si no existe
+        """
+        for e in range(self.offsets[origen], self.offsets[origen + 1]):
+            if self.destinos[e] == destino:
+                return e
+        return None
+
+    def sucesores(self, estacion):
+        """
+        Obtiene los IDs de las estaciones alcanzables con una sola ruta.
+
+        Args:
+            estacion (str): ID de la estación
+
+        Returns:
+            list: IDs de las estaciones adyacentes
+        """
+        i = self.indices.get(estacion)
+        if i is None:
+            return []
+        return [
+            self.ids[self.destinos[e]]
+            for e in range(self.offsets[i], self.offsets[i + 1])
+            if self.tiempos_base[e] != INF
+        ]
+
+    def predecesores(self, estacion):
+        """
+        Obtiene los IDs de las estaciones desde las que se llega con una sola ruta.
+
+        Args:
+            estacion (str): ID de la estación
+
+        Returns:
+            list: IDs de las estaciones con rutas hacia la estación indicada
+        """
+        i = self.indices.get(estacion)
+        if i is None:
+            return []
+        return [
+            self.ids[self.origenes[self.aristas_inv[k]]]
+            for k in range(self.offsets_inv[i], self.offsets_inv[i + 1])
+            if self.tiempos_base[self.aristas_inv[k]] != INF
+        ]
+
+    def obtener_adyacentes(self, estacion, banda=None):
+        """
+        Obtiene las estaciones adyacentes y sus tiempos para una banda horaria.
+
+        Args:
+            estacion (str): ID de la estación
+            banda (str, optional): Banda horaria de congestión. Si es None, usa la banda actual.
+
+        Returns:
+            dict: Diccionario {destino: tiempo} para cada estación adyacente
+        """
+        i = self.indices.get(estacion)
+        if i is None:
+            return {}
+        pesos = self.pesos_de(banda)
+        return {
+            self.ids[self.destinos[e]]: pesos[e]
+            for e in range(self.offsets[i], self.offsets[i + 1])
+            if pesos[e] != INF
+        }
@@ -0,0 +1,260 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+
+class EjecutorSaturado(RuntimeError):
+    """Se lanza cuando el ejecutor de rutas tiene su cola llena."""
+
+
+class EjecutorRutas:
+    """
+    Ejecutor acotado para las búsquedas de rutas.
+
+    Las búsquedas se ejecutan en un grupo de hilos propio, separado del que
+    usa el servidor para el resto de peticiones, y con un límite de trabajos
+    pendientes (en ejecución o en espera). Cuando se alcanza el límite la
+    petición se rechaza de inmediato con EjecutorSaturado en lugar de
+    esperar, de modo que las respuestas baratas no se quedan detrás de las
+    búsquedas.
+
+    También excluye las búsquedas de las modificaciones de la red, que
+    cambian en su lugar los pesos del grafo compilado: una modificación
+    lanzada con modificar espera a que terminen las búsquedas en ejecución y
+    las nuevas esperan a que termine ella.
+
+    Attributes:
+        hilos (int): Número de hilos de trabajo
+        max_pendientes (int): Trabajos admitidos a la vez
+        completadas (int): Trabajos terminados
+        rechazadas (int): Trabajos rechazados por saturación
+    """
+    def __init__(self, hilos=4, max_pendientes=64):
+        self.hilos = hilos
+        self.max_pendientes = max_pendientes
+        self._pool = ThreadPoolExecutor(max_workers=hilos, thread_name_prefix="rutas")
+        self._candado = threading.Lock()
+        self._condicion = threading.Condition(self._candado)
+        self._pendientes = 0
+        self._en_curso = 0  # búsquedas ejecutándose en los hilos
+        self._modificaciones = 0  # modificaciones esperando o en curso
+        self._modificando = False
+        self.completadas = 0
+        self.rechazadas = 0
+
+    def _admitir(self):
+        with self._candado:
+            if self._pendientes >= self.max_pendientes:
+                self.rechazadas += 1
+                raise EjecutorSaturado(f"Hay {self._pendientes} búsquedas pendientes")
+            self._pendientes += 1
+
+    def _liberar(self):
+        with self._candado:
+            self._pendientes -= 1
+            self.completadas += 1
+
+    def _buscar(self, funcion, *args):
+        with self._condicion:
+            while self._modificaciones:
+                self._condicion.wait()
+            self._en_curso += 1
+        try:
+            return funcion(*args)
+        finally:
+            self._terminar_busqueda()
+
+    def _terminar_busqueda(self):
+        with self._condicion:
+            self._en_curso -= 1
+            self._condicion.notify_all()
+
+    def _modificar(self, funcion):
+        with self._condicion:
+            while self._en_curso or self._modificando:
+                self._condicion.wait()
+            self._modificando = True
+        try:
+            return funcion()
+        finally:
+            with self._condicion:
+                self._modificando = False
+                self._modificaciones -= 1
+                self._condicion.notify_all()
+
+    async def modificar(self, funcion, *args, **kwargs):
+        """
+        Aplica una modificación de la red sin ninguna búsqueda en ejecución.
+
+        Espera a que terminen las búsquedas en curso; las que llegan mientras
+        tanto esperan a que termine la modificación. Tanto la espera como la
+        función (y los suscriptores a los que avisa, que pueden recalcular
+        filas de la matriz) se ejecutan fuera del bucle de eventos. Si la
+        petición se cancela, la modificación ya empezada termina igualmente.
+
+        Args:
+            funcion (function): Función que modifica la red
+            *args, **kwargs: Argumentos de la función
+
+        Returns:
+            El resultado de la función
+        """
+        with self._condicion:
+            self._modificaciones += 1
+        bucle = asyncio.get_running_loop()
+        # No puede usar los hilos de búsqueda: podrían estar todos esperándola
+        trabajo = bucle.run_in_executor(None, self._modificar, partial(funcion, *args, **kwargs))
+        return await asyncio.shield(trabajo)
+
+    def consultar(self, funcion, *args, defecto=None):
+        """
+        Ejecuta una consulta barata en el hilo que llama, como una búsqueda más.
+
+        Sirve para lecturas que no bloquean el bucle de eventos, como las de la
+        matriz de tiempos ya calculada. Para no esperar, si hay una modificación
+        pendiente no ejecuta la función y devuelve el valor por defecto.
+
+        Args:
+            funcion (function): Función a ejecutar
+            *args: Argumentos de la función
+            defecto: Valor devuelto si hay una modificación pendiente
+
+        Returns:
+            El resultado de la función o el valor por defecto
+        """
+        with self._condicion:
+            if self._modificaciones:
+                return defecto
+            self._en_curso += 1
+        try:
+            return funcion(*args)
+        finally:
+            self._terminar_busqueda()
+
+    async def ejecutar(self, funcion, *args, **kwargs):
+        """
+        Ejecuta una función en el grupo de hilos sin bloquear el bucle de eventos.
+
+        Args:
+            funcion (function): Función a ejecutar
+            *args, **kwargs: Argumentos de la función
+
+        Returns:
+            El resultado de la función
+
+        Raises:
+            EjecutorSaturado: Si ya hay max_pendientes trabajos admitidos
+        """
+        self._admitir()
+        try:
+            bucle = asyncio.get_running_loop()
+            return await bucle.run_in_executor(self._pool, self._buscar, partial(funcion, *args, **kwargs))
+        finally:
+            self._liberar()
+
+    def admitir_iterador(self, iterable):
+        """
+        Admite un trabajo que produce resultados parciales, como una respuesta enviada por partes.
+
+        La admisión se decide al llamar a este método y ocupa un solo puesto
+        mientras dure el recorrido; cada elemento se calcula en el grupo de hilos
+        como una búsqueda, de modo que las modificaciones pueden aplicarse entre
+        un elemento y el siguiente, pero no durante el cálculo de uno.
+        El puesto se libera al terminar el recorrido, si falla, al cerrarlo con
+        aclose o al descartarlo sin haberlo empezado (por ejemplo, si el cliente
+        se desconecta antes de que empiece la respuesta).
+
+        Args:
+            iterable (iterable): Iterable síncrono cuyos elementos son costosos de calcular
+
+        Returns:
+            RecorridoAdmitido: Iterador asíncrono con los mismos elementos
+
+        Raises:
+            EjecutorSaturado: Si ya hay max_pendientes trabajos admitidos
+        """
+        iterador = iter(iterable)
+        self._admitir()
+        return RecorridoAdmitido(self, iterador)
+
+    def estadisticas(self):
+        """
+        Obtiene el estado del ejecutor.
+
+        Returns:
+            dict: Hilos, límite, pendientes, en curso, completadas y rechazadas
+        """
+        with self._candado:
+            return {
+                "hilos": self.hilos,
+                "max_pendientes": self.max_pendientes,
+                "pendientes": self._pendientes,
+                "en_curso": self._en_curso,
+                "completadas": self.completadas,
+                "rechazadas": self.rechazadas
+            }
+
+    def cerrar(self):
+        """Detiene los hilos de trabajo."""
+        self._pool.shutdown(wait=False)
+
+
+class RecorridoAdmitido:
+    """
+    Iterador asíncrono de un trabajo admitido con EjecutorRutas.admitir_iterador.
+
+    Libera su puesto en el ejecutor una sola vez: al agotarse, al fallar, al
+    cerrarse o, si nadie lo cierra, cuando se descarta. Al liberarlo cierra
+    también el iterable síncrono, para que suelte sus recursos.
+
+    Attributes:
+        ejecutor (EjecutorRutas): Ejecutor que lo admitió
+        liberado (bool): True si ya devolvió su puesto
+    """
+    _FIN = object()
+
+    def __init__(self, ejecutor, iterador):
+        self.ejecutor = ejecutor
+        self.liberado = False
+        self._iterador = iterador
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self.liberado:
+            raise StopAsyncIteration
+        try:
+            bucle = asyncio.get_running_loop()
+            elemento = await bucle.run_in_executor(
+                self.ejecutor._pool, self.ejecutor._buscar, next, self._iterador, self._FIN
+            )
+        except BaseException:
+            self._liberar()
+            raise
+        if elemento is self._FIN:
+            self._liberar()
+            raise StopAsyncIteration
+        return elemento
+
+    async def aclose(self):
+        """Termina el recorrido antes de tiempo y libera su puesto."""
+        self._liberar()
+
+    def _liberar(self):
+        if self.liberado:
+            return
+        self.liberado = True
+        cerrar = getattr(self._iterador, "close", None)
+        if cerrar is not None:
+            try:
+                cerrar()
+            except ValueError:
+                # Un hilo sigue calculando el elemento pedido antes de la cancelación;
+                # el generador se cerrará cuando se descarte
+                pass
+        self.ejecutor._liberar()
+
+    def __del__(self):
+        self._liberar()
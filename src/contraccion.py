@@ -0,0 +1,434 @@
+import heapq
+import json
+import logging
+import os
+import random
+import time
+from array import array
+
+from src.compilado import INF
+from src.horarios import BANDA_NORMAL
+
+logger = logging.getLogger(__name__)
+
+
+# Estaciones que puede fijar cada búsqueda de caminos testigo al contraer un nodo
+LIMITE_TESTIGOS = 64
+
+
+def ruta_jerarquia(archivo_red):
+    """
+    Obtiene la ruta del archivo de la jerarquía de contracción asociado a un archivo de red.
+
+    Args:
+        archivo_red (str): Ruta al archivo JSON de la red (por ejemplo 'src/data/red.json')
+
+    Returns:
+        str: Ruta del archivo de la jerarquía, junto al de la red
+    """
+    base, _ = os.path.splitext(archivo_red)
+    return f"{base}.ch.json"
+
+
+def _atajos_necesarios(v, salientes, entrantes):
+    """
+    Calcula los atajos que exige contraer v: para cada par u -> v -> w se
+    busca un camino testigo de u a w que no pase por v y no sea más largo; si
+    no se encuentra (o la búsqueda llega a su límite), hace falta el atajo.
+
+    Returns:
+        list: Tripletas (u, w, tiempo) de los atajos
+    """
+    atajos = []
+    for u, peso_entrada in entrantes[v].items():
+        objetivos = {w: peso_entrada + peso_salida for w, peso_salida in salientes[v].items() if w != u}
+        if not objetivos:
+            continue
+        limite = max(objetivos.values())
+        distancias = {u: 0}
+        cola = [(0, u)]
+        fijados = 0
+        while cola and fijados < LIMITE_TESTIGOS:
+            actual_dist, actual = heapq.heappop(cola)
+            if actual_dist > distancias[actual]:
+                continue
+            if actual_dist > limite:
+                break
+            fijados += 1
+            for vecino, peso in salientes[actual].items():
+                if vecino == v:
+                    continue
+                nueva_dist = actual_dist + peso
+                if nueva_dist < distancias.get(vecino, INF):
+                    distancias[vecino] = nueva_dist
+                    heapq.heappush(cola, (nueva_dist, vecino))
+        for w, tiempo in objetivos.items():
+            if distancias.get(w, INF) > tiempo:
+                atajos.append((u, w, tiempo))
+    return atajos
+
+
+def _contraer(compilado, pesos, orden=None):
+    """
+    Contrae las estaciones una a una, en el orden indicado o, si no se indica,
+    eligiendo cada vez la de menor prioridad: atajos añadidos menos aristas
+    eliminadas, más los vecinos ya contraídos (con actualización perezosa).
+
+    Returns:
+        tuple: (orden de contracción, {(u, w): (tiempo, estación intermedia)} de los atajos)
+    """
+    n = len(compilado)
+    salientes = [{} for _ in range(n)]
+    entrantes = [{} for _ in range(n)]
+    for e in range(compilado.num_aristas):
+        if pesos[e] != INF:
+            u, w = compilado.origenes[e], compilado.destinos[e]
+            salientes[u][w] = pesos[e]
+            entrantes[w][u] = pesos[e]
+    vecinos_contraidos = [0] * n
+    atajos = {}
+
+    def prioridad(v):
+        necesarios = _atajos_necesarios(v, salientes, entrantes)
+        return len(necesarios) - len(salientes[v]) - len(entrantes[v]) + vecinos_contraidos[v]
+
+    if orden is None:
+        cola = [(prioridad(v), v) for v in range(n)]
+        heapq.heapify(cola)
+        pendientes = []
+        contraidos = bytearray(n)
+        while cola:
+            _, v = heapq.heappop(cola)
+            if contraidos[v]:
+                continue
+            actual = prioridad(v)
+            if cola and actual > cola[0][0]:
+                heapq.heappush(cola, (actual, v))
+                continue
+            contraidos[v] = 1
+            pendientes.append(v)
+            _eliminar(v, salientes, entrantes, atajos, vecinos_contraidos)
+        return pendientes, atajos
+
+    for v in orden:
+        _eliminar(v, salientes, entrantes, atajos, vecinos_contraidos)
+    return list(orden), atajos
+
+
+def _eliminar(v, salientes, entrantes, atajos, vecinos_contraidos):
+    """Añade los atajos que exige v y lo quita del grafo que queda por contraer."""
+    for u, w, tiempo in _atajos_necesarios(v, salientes, entrantes):
+        if tiempo < salientes[u].get(w, INF):
+            salientes[u][w] = tiempo
+            entrantes[w][u] = tiempo
+            atajos[(u, w)] = (tiempo, v)
+    for w in salientes[v]:
+        del entrantes[w][v]
+        vecinos_contraidos[w] += 1
+    for u in entrantes[v]:
+        del salientes[u][v]
+        vecinos_contraidos[u] += 1
+    salientes[v] = {}
+    entrantes[v] = {}
+
+
+class JerarquiaContraccion:
+    """
+    Jerarquía de contracción (CH) de la red para consultas punto a punto.
+
+    Las estaciones se contraen en un orden fijo (calculado una vez con los
+    tiempos de la banda normal) y cada banda de congestión tiene sus propios
+    atajos. Una consulta es un Dijkstra bidireccional que solo sube de rango:
+    hacia adelante desde el origen por las aristas hacia estaciones de mayor
+    rango y hacia atrás desde el destino por las aristas que llegan desde
+    estaciones de mayor rango. Los atajos guardan su estación intermedia
+    para desempaquetar el camino.
+
+    Attributes:
+        huella (str): Huella del grafo compilado para el que se construyó
+        rango (array): Posición de cada estación en el orden de contracción
+        atajos (dict): banda -> {(u, w): (tiempo, estación intermedia)}
+        subida (dict): banda -> (offsets, destinos, tiempos) de las aristas hacia mayor rango
+        bajada (dict): banda -> (offsets, origenes, tiempos) de las aristas que llegan desde mayor rango
+    """
+    def __init__(self, compilado, orden, atajos, huella):
+        self.huella = huella
+        n = len(compilado)
+        self.rango = array('l', [0] * n)
+        for posicion, v in enumerate(orden):
+            self.rango[v] = posicion
+        self.atajos = atajos
+        self.subida = {}
+        self.bajada = {}
+        for banda, pesos in compilado.pesos.items():
+            aristas = {}
+            for e in range(compilado.num_aristas):
+                if pesos[e] != INF:
+                    aristas[(compilado.origenes[e], compilado.destinos[e])] = pesos[e]
+            for arista, (tiempo, _) in atajos.get(banda, {}).items():
+                aristas[arista] = tiempo
+            arriba = [[] for _ in range(n)]
+            abajo = [[] for _ in range(n)]
+            for (u, w), tiempo in aristas.items():
+                if self.rango[w] > self.rango[u]:
+                    arriba[u].append((w, tiempo))
+                else:
+                    abajo[w].append((u, tiempo))
+            self.subida[banda] = self._csr(arriba)
+            self.bajada[banda] = self._csr(abajo)
+
+    @staticmethod
+    def _csr(listas):
+        offsets = array('l', [0])
+        vecinos = array('l')
+        tiempos = array('d')
+        for lista in listas:
+            for vecino, tiempo in lista:
+                vecinos.append(vecino)
+                tiempos.append(tiempo)
+            offsets.append(len(vecinos))
+        return offsets, vecinos, tiempos
+
+    @classmethod
+    def construir(cls, compilado):
+        """
+        Construye la jerarquía para todas las bandas del grafo compilado.
+
+        Args:
+            compilado (GrafoCompilado): Grafo compilado
+
+        Returns:
+            JerarquiaContraccion: Jerarquía construida
+        """
+        banda_orden = BANDA_NORMAL if BANDA_NORMAL in compilado.pesos else next(iter(compilado.pesos))
+        orden, atajos_orden = _contraer(compilado, compilado.pesos[banda_orden])
+        atajos = {banda_orden: atajos_orden}
+        for banda, pesos in compilado.pesos.items():
+            if banda != banda_orden:
+                atajos[banda] = _contraer(compilado, pesos, orden)[1]
+        return cls(compilado, orden, atajos, compilado.huella())
+
+    @property
+    def num_atajos(self):
+        """int: Número total de atajos, sumando todas las bandas."""
+        return sum(len(atajos) for atajos in self.atajos.values())
+
+    def _desempaquetar(self, atajos, u, w):
+        """Sustituye recursivamente la arista u -> w por el camino que resume."""
+        camino = [u]
+        pila = [(u, w)]
+        while pila:
+            u, w = pila.pop()
+            if (u, w) in atajos:
+                v = atajos[(u, w)][1]
+                pila.append((v, w))
+                pila.append((u, v))
+            else:
+                camino.append(w)
+        return camino
+
+    def ruta(self, compilado, origen, destino, banda=None):
+        """
+        Calcula el camino más corto entre dos estaciones con la jerarquía.
+
+        Args:
+            compilado (GrafoCompilado): Grafo compilado para el que se construyó
+            origen (str): ID de la estación de origen
+            destino (str): ID de la estación de destino
+            banda (str, optional): Banda de congestión. Si es None, usa la vigente.
+
+        Returns:
+            tuple: (tiempo, camino) con el tiempo mínimo y la lista de IDs de estación;
+                (float('inf'), []) si no existe ruta
+        """
+        banda = compilado.resolver_banda(banda)
+        s, t = compilado.indice(origen), compilado.indice(destino)
+        if s is None or t is None:
+            return INF, []
+        if s == t:
+            return 0, [origen]
+
+        busquedas = (self.subida[banda], self.bajada[banda])
+        distancias = ({s: 0}, {t: 0})
+        previos = ({s: -1}, {t: -1})
+        colas = ([(0, s)], [(0, t)])
+        mejor, encuentro = INF, -1
+        lado = 0
+        while colas[0] or colas[1]:
+            # Se alterna entre las dos búsquedas; cada una para cuando ya no puede mejorar
+            if not colas[lado]:
+                lado = 1 - lado
+            actual_dist, actual = heapq.heappop(colas[lado])
+            propias, otras = distancias[lado], distancias[1 - lado]
+            if actual_dist > propias[actual]:
+                lado = 1 - lado
+                continue
+            if actual_dist >= mejor:
+                colas[lado].clear()
+                lado = 1 - lado
+                continue
+            if actual in otras and actual_dist + otras[actual] < mejor:
+                mejor, encuentro = actual_dist + otras[actual], actual
+            offsets, vecinos, tiempos = busquedas[lado]
+            for k in range(offsets[actual], offsets[actual + 1]):
+                vecino = vecinos[k]
+                nueva_dist = actual_dist + tiempos[k]
+                if nueva_dist < propias.get(vecino, INF):
+                    propias[vecino] = nueva_dist
+                    previos[lado][vecino] = actual
+                    heapq.heappush(colas[lado], (nueva_dist, vecino))
+            lado = 1 - lado
+        if encuentro == -1:
+            return INF, []
+
+        # Aristas del camino en la jerarquía: origen -> encuentro -> destino
+        subida = []
+        nodo = encuentro
+        while previos[0][nodo] != -1:
+            subida.append((previos[0][nodo], nodo))
+            nodo = previos[0][nodo]
+        subida.reverse()
+        nodo = encuentro
+        while previos[1][nodo] != -1:
+            subida.append((nodo, previos[1][nodo]))
+            nodo = previos[1][nodo]
+
+        atajos = self.atajos.get(banda, {})
+        camino = [s]
+        for u, w in subida:
+            camino.extend(self._desempaquetar(atajos, u, w)[1:])
+        return mejor, [compilado.ids[nodo] for nodo in camino]
+
+    def guardar(self, archivo):
+        """
+        Guarda el orden de contracción y los atajos en un archivo JSON.
+
+        Args:
+            archivo (str): Ruta del archivo de destino
+        """
+        orden = sorted(range(len(self.rango)), key=self.rango.__getitem__)
+        with open(archivo, 'w', encoding='utf-8') as f:
+            json.dump({
+                "huella": self.huella,
+                "orden": orden,
+                "atajos": {
+                    banda: [[u, w, tiempo, v] for (u, w), (tiempo, v) in atajos.items()]
+                    for banda, atajos in self.atajos.items()
+                }
+            }, f)
+
+    @classmethod
+    def cargar(cls, archivo, compilado):
+        """
+        Carga una jerarquía guardada si corresponde al grafo compilado.
+
+        Args:
+            archivo (str): Ruta del archivo de la jerarquía
+            compilado (GrafoCompilado): Grafo compilado actual
+
+        Returns:
+            JerarquiaContraccion: Jerarquía cargada, o None si no existe o está desactualizada
+        """
+        if not os.path.exists(archivo):
+            return None
+        try:
+            with open(archivo, 'r', encoding='utf-8') as f:
+                datos = json.load(f)
+        except (OSError, ValueError):
+            logger.warning(f"No se pudo leer la jerarquía de contracción en {archivo}")
+            return None
+        if datos.get("huella") != compilado.huella():
+            return None
+        atajos = {
+            banda: {(u, w): (tiempo, v) for u, w, tiempo, v in lista}
+            for banda, lista in datos["atajos"].items()
+        }
+        return cls(compilado, datos["orden"], atajos, datos["huella"])
+
+
+def obtener_jerarquia(grafo, archivo=None):
+    """
+    Asocia una jerarquía de contracción al grafo compilado, reutilizando la que
+    ya tenga o la guardada en disco si sigue siendo válida, o construyéndola
+    (y guardándola, si se indica archivo) en caso contrario.
+
+    Args:
+        grafo (Grafo | GrafoCompilado): Grafo de la red
+        archivo (str, optional): Ruta del archivo de la jerarquía
+
+    Returns:
+        JerarquiaContraccion: Jerarquía asociada al grafo compilado
+    """
+    compilado = grafo.compilar()
+    jerarquia = compilado.jerarquia
+    if jerarquia is None and archivo is not None:
+        jerarquia = JerarquiaContraccion.cargar(archivo, compilado)
+    if jerarquia is None:
+        jerarquia = JerarquiaContraccion.construir(compilado)
+        if archivo is not None:
+            try:
+                jerarquia.guardar(archivo)
+            except OSError:
+                logger.warning(f"No se pudo guardar la jerarquía de contracción en {archivo}")
+    compilado.jerarquia = jerarquia
+    return jerarquia
+
+
+def ruta_contraccion(grafo, origen, destino, banda=None):
+    """
+    Calcula el camino más corto con la jerarquía de contracción del grafo,
+    construyéndola si el grafo compilado todavía no la tiene.
+
+    Args:
+        grafo (Grafo | GrafoCompilado): Grafo que representa la red de transporte
+        origen (str): ID de la estación de origen
+        destino (str): ID de la estación de destino
+        banda (str, optional): Banda de congestión de la consulta. Si es None, usa la vigente.
+
+    Returns:
+        tuple: (tiempo, camino) como en ruta_mas_corta
+    """
+    compilado = grafo.compilar()
+    return obtener_jerarquia(compilado).ruta(compilado, origen, destino, banda)
+
+
+def comparar_rendimiento(grafo, consultas=1000, banda=BANDA_NORMAL, semilla=0):
+    """
+    Mide la construcción de la jerarquía y compara sus consultas con el
+    Dijkstra bidireccional sobre pares de estaciones al azar.
+
+    Args:
+        grafo (Grafo | GrafoCompilado): Grafo de la red
+        consultas (int): Número de pares origen-destino
+        banda (str): Banda de congestión de las consultas
+        semilla (int): Semilla de los pares al azar
+
+    Returns:
+        dict: Tiempos en milisegundos de la construcción y de una consulta media
+            con cada método, aceleración y número de atajos
+    """
+    from src.dijkstra import ruta_mas_corta_bidireccional  # dijkstra importa este módulo para METODOS_RUTA
+
+    compilado = grafo.compilar()
+    inicio = time.perf_counter()
+    jerarquia = JerarquiaContraccion.construir(compilado)
+    construccion = time.perf_counter() - inicio
+
+    generador = random.Random(semilla)
+    pares = [(generador.choice(compilado.ids), generador.choice(compilado.ids)) for _ in range(consultas)]
+    inicio = time.perf_counter()
+    for origen, destino in pares:
+        jerarquia.ruta(compilado, origen, destino, banda)
+    con_jerarquia = (time.perf_counter() - inicio) / consultas
+    inicio = time.perf_counter()
+    for origen, destino in pares:
+        ruta_mas_corta_bidireccional(compilado, origen, destino, banda)
+    bidireccional = (time.perf_counter() - inicio) / consultas
+    return {
+        "estaciones": len(compilado),
+        "atajos": jerarquia.num_atajos,
+        "construccion_ms": construccion * 1000,
+        "consulta_ms": con_jerarquia * 1000,
+        "bidireccional_ms": bidireccional * 1000,
+        "aceleracion": bidireccional / con_jerarquia if con_jerarquia else INF
+    }
@@ -0,0 +1,595 @@
+import heapq
+from array import array
+from bisect import bisect_right
+from datetime import datetime, time
+
+from src.dijkstra import INF
+from src.horarios import a_minutos, banda_horaria, ventanas_de_bandas, BANDA_NORMAL
+
+
+MINUTOS_DIA = 1440
+
+# Tipos de ruta que, si no tienen frecuencia propia, usan la de otro modo
+MODOS_FRECUENCIA = {"alimentadora": "bus"}
+
+# Tipos de ruta que se recorren a pie, sin esperar ningún vehículo
+TIPOS_SIN_ESPERA = {"transbordo"}
+
+
+def minutos_del_dia(momento=None):
+    """
+    Convierte un instante de salida a minutos desde la medianoche.
+
+    Args:
+        momento (str | datetime | time | float, optional): Hora 'HH:MM', datetime,
+            time o número de minutos desde la medianoche. Si es None, usa la hora actual.
+
+    Returns:
+        float: Minutos desde la medianoche
+    """
+    if momento is None:
+        momento = datetime.now()
+    if isinstance(momento, (datetime, time)):
+        return momento.hour * 60 + momento.minute + momento.second / 60
+    if isinstance(momento, str):
+        return float(a_minutos(momento))
+    return float(momento)
+
+
+def espera_media(horarios, modo, banda):
+    """
+    Espera media para subir a un vehículo: la mitad del intervalo entre vehículos.
+
+    Args:
+        horarios (dict): Bloque "horarios" de la red, con las "frecuencias" por modo
+        modo (str): Tipo de ruta (por ejemplo 'metro' o 'alimentadora')
+        banda (str): Banda de congestión; fuera de la normal se usa la frecuencia de hora pico
+
+    Returns:
+        float: Minutos de espera (0 si el modo no tiene frecuencia)
+    """
+    frecuencias = horarios.get("frecuencias", {}) if horarios else {}
+    frecuencia = frecuencias.get(modo) or frecuencias.get(MODOS_FRECUENCIA.get(modo), {})
+    return frecuencia.get("normal" if banda == BANDA_NORMAL else "hora_pico", 0) / 2
+
+
+class PerfilesTiempo:
+    """
+    Perfiles de tiempo de viaje y de espera dependientes de la hora de salida.
+
+    El día se divide en intervalos según las ventanas de "horarios"; dentro
+    de cada intervalo el tiempo de una arista es constante (el de la banda
+    vigente). Para respetar la propiedad FIFO (salir más tarde nunca hace
+    llegar antes) se guarda, por arista e intervalo, la mejor llegada posible
+    esperando en la estación hasta un intervalo posterior; la llegada efectiva
+    es el mínimo entre salir ya y esa llegada. Lo mismo se hace con la espera
+    media al subir a un vehículo, la mitad de la frecuencia del modo.
+
+    Los perfiles se compilan una vez por grafo compilado, de modo que evaluar
+    una arista es una búsqueda binaria entre unos pocos intervalos.
+
+    Attributes:
+        inicios (list): Minuto de inicio de cada intervalo del día
+        bandas (list): Banda de congestión de cada intervalo
+        modos (array): Modo de cada arista (índice en nombres_modos, -1 si es a pie)
+        nombres_modos (list): Nombre de cada modo de transporte
+    """
+    def __init__(self, compilado):
+        self.compilado = compilado
+        horarios = compilado.horarios
+        cortes = {0}
+        for _, inicio, fin in ventanas_de_bandas(horarios):
+            cortes.add(inicio % MINUTOS_DIA)
+            cortes.add(fin % MINUTOS_DIA)
+        self.inicios = sorted(cortes)
+        self.bandas = [
+            compilado.resolver_banda(banda_horaria(time(inicio // 60, inicio % 60), horarios))
+            for inicio in self.inicios
+        ]
+
+        # Tiempos de viaje por intervalo (los arreglos de pesos de cada banda)
+        self._tiempos = [compilado.pesos[banda] for banda in self.bandas]
+        self._sufijo_viaje = self._sufijos(self._tiempos, compilado.num_aristas)
+
+        # Modo de cada arista y espera media al subir, por modo e intervalo
+        self.nombres_modos = []
+        indices_modos = {}
+        self.modos = array('l')
+        for tipo in compilado.tipos:
+            if tipo in TIPOS_SIN_ESPERA:
+                self.modos.append(-1)
+                continue
+            if tipo not in indices_modos:
+                indices_modos[tipo] = len(self.nombres_modos)
+                self.nombres_modos.append(tipo)
+            self.modos.append(indices_modos[tipo])
+
+        esperas = [[espera_media(horarios, modo, banda) for banda in self.bandas] for modo in self.nombres_modos]
+        # Una "arista" por modo: el tiempo de espera por intervalo
+        self._esperas = [array('d', [esperas[m][k] for m in range(len(esperas))]) for k in range(len(self.bandas))]
+        self._sufijo_espera = self._sufijos(self._esperas, len(esperas))
+
+    def _sufijos(self, valores, cantidad):
+        """
+        Calcula, por intervalo k y elemento e, la mejor llegada esperando a un
+        intervalo posterior: min sobre j > k de (inicio_j + valores[j][e]),
+        incluidos los intervalos del día siguiente.
+        """
+        m = len(self.inicios)
+        dia_siguiente = array('d', [
+            min(MINUTOS_DIA + self.inicios[j] + valores[j][e] for j in range(m))
+            for e in range(cantidad)
+        ])
+        sufijos = [None] * m
+        sufijos[m - 1] = dia_siguiente
+        for k in range(m - 2, -1, -1):
+            siguiente, inicio = valores[k + 1], self.inicios[k + 1]
+            posterior = sufijos[k + 1]
+            sufijos[k] = array('d', [min(posterior[e], inicio + siguiente[e]) for e in range(cantidad)])
+        return sufijos
+
+    def _evaluar(self, valores, sufijos, e, t):
+        dia = (t // MINUTOS_DIA) * MINUTOS_DIA
+        minuto = t - dia
+        k = bisect_right(self.inicios, minuto) - 1
+        return dia + min(minuto + valores[k][e], sufijos[k][e])
+
+    def _tramos(self, valores, sufijos, e, desde, hasta):
+        """
+        Descompone la función de un perfil en tramos lineales entre dos instantes.
+
+        Dentro de cada intervalo la función vale t + valor mientras compensa salir
+        ya (pendiente 1) y después la llegada esperando a un intervalo posterior
+        (pendiente 0).
+
+        Returns:
+            list: Tuplas (inicio, fin, valor en inicio, pendiente)
+        """
+        m = len(self.inicios)
+        dia = (desde // MINUTOS_DIA) * MINUTOS_DIA
+        k = bisect_right(self.inicios, desde - dia) - 1
+        tramos = []
+        t = desde
+        while t < hasta:
+            siguiente = self.inicios[k + 1] if k + 1 < m else MINUTOS_DIA
+            fin_tramo = min(dia + siguiente, hasta)
+            valor = valores[k][e]
+            esperando = dia + sufijos[k][e]
+            # A partir de este instante conviene esperar a un intervalo posterior
+            corte = esperando - valor
+            if corte > t:
+                x = min(corte, fin_tramo)
+                tramos.append((t, x, t + valor, 1))
+                t = x
+            if t < fin_tramo:
+                tramos.append((t, fin_tramo, esperando, 0))
+                t = fin_tramo
+            k += 1
+            if k == m:
+                k = 0
+                dia += MINUTOS_DIA
+        return tramos
+
+    def tramos_llegada(self, e, desde, hasta):
+        """
+        Tramos lineales de la función de llegada de una arista.
+
+        Args:
+            e (int): Índice de la arista
+            desde (float): Primer instante de llegada al inicio de la arista
+            hasta (float): Último instante (excluido)
+
+        Returns:
+            list: Tuplas (inicio, fin, llegada en inicio, pendiente 0 o 1)
+        """
+        return self._tramos(self._tiempos, self._sufijo_viaje, e, desde, hasta)
+
+    def tramos_abordar(self, modo, desde, hasta):
+        """
+        Tramos lineales de la función de salida del vehículo de un modo.
+
+        Args:
+            modo (int): Índice del modo
+            desde (float): Primer instante de llegada al andén
+            hasta (float): Último instante (excluido)
+
+        Returns:
+            list: Tuplas (inicio, fin, salida en inicio, pendiente 0 o 1)
+        """
+        return self._tramos(self._esperas, self._sufijo_espera, modo, desde, hasta)
+
+    def intervalo(self, t):
+        """
+        Obtiene el intervalo del día que contiene un instante.
+
+        Args:
+            t (float): Minutos desde la medianoche del día de salida
+
+        Returns:
+            int: Índice del intervalo en inicios y bandas
+        """
+        return bisect_right(self.inicios, t % MINUTOS_DIA) - 1
+
+    def banda_en(self, t):
+        """
+        Obtiene la banda de congestión vigente en un instante.
+
+        Args:
+            t (float): Minutos desde la medianoche del día de salida
+
+        Returns:
+            str: Nombre de la banda
+        """
+        return self.bandas[self.intervalo(t)]
+
+    def llegada(self, e, t):
+        """
+        Calcula la hora de llegada al final de una arista saliendo en un instante.
+
+        Args:
+            e (int): Índice de la arista
+            t (float): Instante de llegada al inicio de la arista, en minutos
+
+        Returns:
+            float: Instante de llegada al final de la arista (no decreciente en t)
+        """
+        return self._evaluar(self._tiempos, self._sufijo_viaje, e, t)
+
+    def abordar(self, modo, t):
+        """
+        Calcula el instante en que sale el vehículo de un modo, contando la espera media.
+
+        Args:
+            modo (int): Índice del modo
+            t (float): Instante de llegada al andén, en minutos
+
+        Returns:
+            float: Instante de salida del vehículo (no decreciente en t)
+        """
+        return self._evaluar(self._esperas, self._sufijo_espera, modo, t)
+
+    def recorrer(self, e, t, modo_actual):
+        """
+        Recorre una arista llegando a su estación de inicio en el instante t.
+
+        Si la arista es de un modo distinto al del vehículo en que se viaja, se
+        añade la espera media de ese modo; las aristas a pie no tienen espera
+        y dejan al viajero fuera de cualquier vehículo.
+
+        Args:
+            e (int): Índice de la arista
+            t (float): Instante de llegada a la estación de inicio
+            modo_actual (int): Modo del vehículo actual (-1 si ninguno)
+
+        Returns:
+            tuple: (llegada, modo) con el instante de llegada y el modo tras recorrer la arista
+        """
+        modo = self.modos[e]
+        if modo >= 0 and modo != modo_actual:
+            t = self.abordar(modo, t)
+        return self.llegada(e, t), modo
+
+
+def obtener_perfiles(grafo):
+    """
+    Obtiene los perfiles dependientes del tiempo del grafo, compilándolos la primera vez.
+
+    Args:
+        grafo (Grafo | GrafoCompilado): Grafo de la red
+
+    Returns:
+        PerfilesTiempo: Perfiles asociados al grafo compilado
+    """
+    compilado = grafo.compilar()
+    if compilado.perfiles is None:
+        compilado.perfiles = PerfilesTiempo(compilado)
+    return compilado.perfiles
+
+
+def ruta_dependiente_tiempo(grafo, origen, destino, salida=None):
+    """
+    Ruta de llegada más temprana saliendo a una hora dada.
+
+    Cada arista se evalúa con la congestión vigente al llegar a ella y cada
+    cambio de modo suma la espera media del nuevo vehículo. El estado de la
+    búsqueda es (estación, modo), porque la espera depende del vehículo en que
+    se llega. Como los perfiles son FIFO, basta una búsqueda de Dijkstra sobre
+    los instantes de llegada.
+
+    Args:
+        grafo (Grafo | GrafoCompilado): Grafo que representa la red de transporte
+        origen (str): ID de la estación de origen
+        destino (str): ID de la estación de destino
+        salida (str | datetime | time | float, optional): Hora de salida, como en
+            minutos_del_dia. Si es None, usa la hora actual.
+
+    Returns:
+        tuple: (llegada, camino) con el instante de llegada en minutos desde la
+            medianoche del día de salida y la lista de IDs de estación;
+            (float('inf'), []) si no existe ruta
+    """
+    compilado = grafo.compilar()
+    perfiles = obtener_perfiles(compilado)
+    s = compilado.indice(origen)
+    t = compilado.indice(destino)
+    if s is None or t is None:
+        return INF, []
+    inicio = minutos_del_dia(salida)
+    if s == t:
+        return inicio, [origen]
+
+    offsets, destinos = compilado.offsets, compilado.destinos
+    # Estado (estación, modo) codificado como estacion * columnas + modo + 1
+    columnas = len(perfiles.nombres_modos) + 1
+    llegadas = {}
+    previo = {}
+    cerrados = set()
+    estado_inicial = s * columnas
+    llegadas[estado_inicial] = inicio
+    cola = [(inicio, estado_inicial)]
+    while cola:
+        actual_llegada, estado = heapq.heappop(cola)
+        if estado in cerrados:
+            continue
+        cerrados.add(estado)
+        nodo, modo = divmod(estado, columnas)
+        if nodo == t:
+            camino = [nodo]
+            while estado in previo:
+                estado = previo[estado]
+                camino.append(estado // columnas)
+            return actual_llegada, [compilado.ids[v] for v in reversed(camino)]
+        for e in range(offsets[nodo], offsets[nodo + 1]):
+            nueva_llegada, nuevo_modo = perfiles.recorrer(e, actual_llegada, modo - 1)
+            nuevo_estado = destinos[e] * columnas + nuevo_modo + 1
+            if nuevo_estado not in cerrados and nueva_llegada < llegadas.get(nuevo_estado, INF):
+                llegadas[nuevo_estado] = nueva_llegada
+                previo[nuevo_estado] = estado
+                heapq.heappush(cola, (nueva_llegada, nuevo_estado))
+    return INF, []
+
+
+# Tolerancia al comparar instantes de llegada calculados por caminos distintos
+EPSILON = 1e-9
+
+
+def _agregar_tramo(tramos, x, valor, pendiente):
+    """Añade un tramo (x, valor, pendiente), fusionándolo con el anterior si lo continúa."""
+    if tramos:
+        x_anterior, valor_anterior, pendiente_anterior = tramos[-1]
+        if x <= x_anterior:
+            tramos[-1] = (x_anterior, valor, pendiente)
+            return
+        if pendiente == pendiente_anterior and abs(valor_anterior + pendiente_anterior * (x - x_anterior) - valor) <= EPSILON:
+            return
+    tramos.append((x, valor, pendiente))
+
+
+class FuncionLlegada:
+    """
+    Instante de llegada en función del instante de salida dentro de una ventana.
+
+    La función es lineal a trozos y no decreciente: cada tramo empieza en
+    xs[i] y llega hasta el inicio del siguiente (el último, hasta fin), con
+    llegada valores[i] + pendientes[i] * (t - xs[i]). La pendiente es 1 cuando
+    salir más tarde retrasa la llegada en la misma medida y 0 cuando se espera
+    a un intervalo o vehículo posterior. Entre tramos puede haber saltos, por
+    ejemplo al entrar en una banda de hora pico.
+
+    Attributes:
+        xs (list): Instante de salida en que empieza cada tramo
+        valores (list): Llegada al inicio de cada tramo
+        pendientes (list): Pendiente de cada tramo (0 o 1)
+        fin (float): Final de la ventana de salida (excluido)
+    """
+    def __init__(self, tramos, fin):
+        self.xs = [x for x, _, _ in tramos]
+        self.valores = [valor for _, valor, _ in tramos]
+        self.pendientes = [pendiente for _, _, pendiente in tramos]
+        self.fin = fin
+
+    @classmethod
+    def identidad(cls, inicio, fin):
+        """Función de llegada del origen: se llega en el mismo instante en que se sale."""
+        return cls([(inicio, inicio, 1)], fin)
+
+    def __len__(self):
+        return len(self.xs)
+
+    def tramos(self):
+        """
+        Recorre los tramos de la función.
+
+        Yields:
+            tuple: (inicio, fin, llegada en inicio, pendiente)
+        """
+        for i in range(len(self.xs)):
+            siguiente = self.xs[i + 1] if i + 1 < len(self.xs) else self.fin
+            yield self.xs[i], siguiente, self.valores[i], self.pendientes[i]
+
+    def evaluar(self, t):
+        """
+        Evalúa la llegada saliendo en un instante de la ventana.
+
+        Args:
+            t (float): Instante de salida, entre xs[0] y fin
+
+        Returns:
+            float: Instante de llegada
+        """
+        i = max(bisect_right(self.xs, t) - 1, 0)
+        return self.valores[i] + self.pendientes[i] * (t - self.xs[i])
+
+    def minimo(self):
+        """Llegada más temprana de la ventana (la de la primera salida)."""
+        return self.valores[0]
+
+    def maximo(self):
+        """Llegada más tardía de la ventana (límite al final de la ventana)."""
+        return self.valores[-1] + self.pendientes[-1] * (self.fin - self.xs[-1])
+
+    def componer(self, evaluar, tramos_de):
+        """
+        Compone la función con la de una arista o una espera: t -> g(f(t)).
+
+        Args:
+            evaluar (function): Función g(t) de la arista o espera
+            tramos_de (function): (desde, hasta) -> tramos lineales de g, como PerfilesTiempo.tramos_llegada
+
+        Returns:
+            FuncionLlegada: Función compuesta sobre la misma ventana
+        """
+        resultado = []
+        for x0, x1, valor, pendiente in self.tramos():
+            if pendiente == 0:
+                _agregar_tramo(resultado, x0, evaluar(valor), 0)
+                continue
+            tramos_arista = tramos_de(valor, valor + (x1 - x0)) or [(valor, valor, evaluar(valor), 1)]
+            for inicio, _, llegada, pendiente_arista in tramos_arista:
+                _agregar_tramo(resultado, x0 + (inicio - valor), llegada, pendiente_arista)
+        return FuncionLlegada(resultado, self.fin)
+
+    def combinar(self, otra):
+        """
+        Calcula el mínimo punto a punto con otra función de la misma ventana.
+
+        Args:
+            otra (FuncionLlegada): Función candidata
+
+        Returns:
+            tuple: (mínimo, mejora) donde mejora indica si la candidata llega antes
+                que esta función en algún instante de la ventana
+        """
+        xs = sorted(set(self.xs) | set(otra.xs))
+        resultado = []
+        mejora = False
+        i = j = 0
+        for n, u in enumerate(xs):
+            v = xs[n + 1] if n + 1 < len(xs) else self.fin
+            while i + 1 < len(self.xs) and self.xs[i + 1] <= u:
+                i += 1
+            while j + 1 < len(otra.xs) and otra.xs[j + 1] <= u:
+                j += 1
+            pf, pg = self.pendientes[i], otra.pendientes[j]
+            fa = self.valores[i] + pf * (u - self.xs[i])
+            ga = otra.valores[j] + pg * (u - otra.xs[j])
+            fb, gb = fa + pf * (v - u), ga + pg * (v - u)
+            if fa <= ga + EPSILON and fb <= gb + EPSILON:
+                _agregar_tramo(resultado, u, fa, pf)
+                continue
+            mejora = True
+            if ga <= fa and gb <= fb:
+                _agregar_tramo(resultado, u, ga, pg)
+                continue
+            # Las rectas se cruzan dentro del tramo
+            cruce = u + (ga - fa) / (pf - pg)
+            if ga < fa:
+                _agregar_tramo(resultado, u, ga, pg)
+                _agregar_tramo(resultado, cruce, fa + pf * (cruce - u), pf)
+            else:
+                _agregar_tramo(resultado, u, fa, pf)
+                _agregar_tramo(resultado, cruce, ga + pg * (cruce - u), pg)
+        return FuncionLlegada(resultado, self.fin), mejora
+
+    def puntos(self):
+        """
+        Puntos (salida, llegada) para dibujar la función, dos por tramo.
+
+        Un salto entre tramos aparece como dos puntos con la misma salida.
+
+        Returns:
+            list: Pares (salida, llegada) ordenados por salida
+        """
+        puntos = []
+        for x0, x1, valor, pendiente in self.tramos():
+            puntos.append((x0, valor))
+            puntos.append((x1, valor + pendiente * (x1 - x0)))
+        return puntos
+
+
+def perfil_llegada(grafo, origen, destino, desde, hasta):
+    """
+    Función de llegada más temprana para todas las salidas de una ventana.
+
+    En lugar de repetir ruta_dependiente_tiempo para cada hora de salida, se
+    propaga una sola vez una FuncionLlegada por estado (estación, modo): cada
+    arista compone la función con su perfil (y con la espera al subir si cambia
+    de modo) y cada estado guarda el mínimo punto a punto de lo que le llega.
+    Un estado vuelve a la cola solo cuando su función mejora en algún instante;
+    los estados que no pueden mejorar la llegada más tardía ya conocida al
+    destino se descartan.
+
+    Args:
+        grafo (Grafo | GrafoCompilado): Grafo que representa la red de transporte
+        origen (str): ID de la estación de origen
+        destino (str): ID de la estación de destino
+        desde (str | datetime | time | float): Primera hora de salida, como en minutos_del_dia
+        hasta (str | datetime | time | float): Final de la ventana (excluido). Si es
+            anterior a desde, la ventana cruza la medianoche.
+
+    Returns:
+        FuncionLlegada: Llegada en minutos desde la medianoche del día de salida
+            para cada salida de la ventana, o None si no existe ruta
+    """
+    compilado = grafo.compilar()
+    perfiles = obtener_perfiles(compilado)
+    s = compilado.indice(origen)
+    t = compilado.indice(destino)
+    if s is None or t is None:
+        return None
+    inicio = minutos_del_dia(desde)
+    fin = minutos_del_dia(hasta)
+    if fin <= inicio:
+        fin += MINUTOS_DIA
+    if s == t:
+        return FuncionLlegada.identidad(inicio, fin)
+
+    offsets, destinos, tiempos_base = compilado.offsets, compilado.destinos, compilado.tiempos_base
+    columnas = len(perfiles.nombres_modos) + 1
+    estado_inicial = s * columnas
+    funciones = {estado_inicial: FuncionLlegada.identidad(inicio, fin)}
+    cola = [(inicio, estado_inicial)]
+    en_cola = {estado_inicial}
+    cota = INF  # Llegada más tardía al destino con las funciones ya encontradas
+    while cola:
+        _, estado = heapq.heappop(cola)
+        en_cola.discard(estado)
+        funcion = funciones[estado]
+        nodo, modo = divmod(estado, columnas)
+        if nodo == t or funcion.minimo() >= cota:
+            continue
+        for e in range(offsets[nodo], offsets[nodo + 1]):
+            if tiempos_base[e] == INF:
+                continue  # Ruta fuera de servicio
+            nuevo_modo = perfiles.modos[e]
+            candidata = funcion
+            if nuevo_modo >= 0 and nuevo_modo != modo - 1:
+                candidata = candidata.componer(
+                    lambda x, m=nuevo_modo: perfiles.abordar(m, x),
+                    lambda a, b, m=nuevo_modo: perfiles.tramos_abordar(m, a, b)
+                )
+            candidata = candidata.componer(
+                lambda x, e=e: perfiles.llegada(e, x),
+                lambda a, b, e=e: perfiles.tramos_llegada(e, a, b)
+            )
+            nuevo_estado = destinos[e] * columnas + nuevo_modo + 1
+            anterior = funciones.get(nuevo_estado)
+            if anterior is None:
+                combinada, mejora = candidata, True
+            else:
+                combinada, mejora = anterior.combinar(candidata)
+            if not mejora:
+                continue
+            funciones[nuevo_estado] = combinada
+            if destinos[e] == t:
+                cota = min(cota, combinada.maximo())
+            elif nuevo_estado not in en_cola:
+                en_cola.add(nuevo_estado)
+                heapq.heappush(cola, (combinada.minimo(), nuevo_estado))
+
+    resultado = None
+    for modo in range(columnas):
+        funcion = funciones.get(t * columnas + modo)
+        if funcion is not None:
+            resultado = funcion if resultado is None else resultado.combinar(funcion)[0]
+    return resultado
@@ -1,73 +1,757 @@
 import heapq
+from bisect import bisect_left
 
+from src.contraccion import ruta_contraccion
+from src.geo import haversine_km
 
-def dijkstra_k_rutas(grafo, inicio, K=2):
+
+INF = float('inf')
+
+
+def _dijkstra(compilado, pesos, origen, destino=None, nodos_bloqueados=None, aristas_bloqueadas=None, orden=None):
+    """
+    Núcleo de Dijkstra sobre el grafo compilado usando punteros al padre.
+
+    Args:
+        compilado (GrafoCompilado): Grafo compilado
+        pesos (array): Tiempo de cada arista en la banda de la consulta
+        origen (int): Índice de la estación inicial
+        destino (int, optional): Índice de la estación destino. Si se indica, la
+            búsqueda termina en cuanto su distancia queda fijada.
+        nodos_bloqueados (iterable, optional): Índices de estaciones que no se pueden visitar
+        aristas_bloqueadas (set, optional): Índices de aristas que no se pueden recorrer
+        orden (list, optional): Si se indica, se le añade cada estación al fijar su
+            distancia; cada una aparece después de la estación de su arista previa,
+            también con aristas de tiempo cero
+
+    Returns:
+        tuple: (distancias, arista_previa) indexadas por estación; arista_previa
+            guarda la arista por la que se llegó a cada estación (-1 si ninguna)
+    """
+    n = len(compilado)
+    offsets, destinos = compilado.offsets, compilado.destinos
+    distancias = [INF] * n
+    arista_previa = [-1] * n
+    cerrados = bytearray(n)
+    if nodos_bloqueados:
+        for nodo in nodos_bloqueados:
+            cerrados[nodo] = 1
+
+    distancias[origen] = 0
+    cola = [(0, origen)]
+    while cola:
+        actual_dist, actual = heapq.heappop(cola)
+        if cerrados[actual]:
+            continue
+        cerrados[actual] = 1
+        if orden is not None:
+            orden.append(actual)
+        if actual == destino:
+            break
+        for e in range(offsets[actual], offsets[actual + 1]):
+            if aristas_bloqueadas and e in aristas_bloqueadas:
+                continue
+            vecino = destinos[e]
+            if cerrados[vecino]:
+                continue
+            nueva_dist = actual_dist + pesos[e]
+            if nueva_dist < distancias[vecino]:
+                distancias[vecino] = nueva_dist
+                arista_previa[vecino] = e
+                heapq.heappush(cola, (nueva_dist, vecino))
+
+    return distancias, arista_previa
+
+
+def arbol_caminos_minimos(compilado, origen, pesos):
+    """
+    Árbol de caminos mínimos desde una estación.
+
+    Args:
+        compilado (GrafoCompilado): Grafo compilado
+        origen (int): Índice de la estación de origen
+        pesos (array): Tiempo de cada arista
+
+    Returns:
+        tuple: (distancias, arista_previa, orden); distancias y arista_previa están
+            indexadas por estación y arista_previa guarda la arista por la que se
+            llega a cada estación (-1 si ninguna); orden son las estaciones
+            alcanzables en el orden en que se fijaron, cada una después de su padre
+    """
+    orden = []
+    distancias, arista_previa = _dijkstra(compilado, pesos, origen, orden=orden)
+    return distancias, arista_previa, orden
+
+
+def distancias_desde(compilado, origen, pesos):
+    """
+    Distancias mínimas desde una estación a todas las demás.
+
+    Args:
+        compilado (GrafoCompilado): Grafo compilado
+        origen (int): Índice de la estación de origen
+        pesos (array): Tiempo de cada arista
+
+    Returns:
+        list: Distancia a cada estación por índice (float('inf') si es inalcanzable)
+    """
+    return _dijkstra(compilado, pesos, origen)[0]
+
+
+def distancias_hacia(compilado, destino, pesos):
+    """
+    Distancias mínimas desde todas las estaciones hasta una estación,
+    recorriendo la adyacencia inversa del grafo compilado.
+
+    Args:
+        compilado (GrafoCompilado): Grafo compilado
+        destino (int): Índice de la estación de destino
+        pesos (array): Tiempo de cada arista
+
+    Returns:
+        list: Distancia desde cada estación por índice (float('inf') si no llega)
+    """
+    offsets_inv, aristas_inv, origenes = compilado.offsets_inv, compilado.aristas_inv, compilado.origenes
+    distancias = [INF] * len(compilado)
+    distancias[destino] = 0
+    cola = [(0, destino)]
+    while cola:
+        actual_dist, actual = heapq.heappop(cola)
+        if actual_dist > distancias[actual]:
+            continue
+        for k in range(offsets_inv[actual], offsets_inv[actual + 1]):
+            e = aristas_inv[k]
+            vecino = origenes[e]
+            nueva_dist = actual_dist + pesos[e]
+            if nueva_dist < distancias[vecino]:
+                distancias[vecino] = nueva_dist
+                heapq.heappush(cola, (nueva_dist, vecino))
+    return distancias
+
+
+def _reconstruir_aristas(compilado, arista_previa, origen, destino):
+    """
+    Reconstruye la secuencia de aristas desde el origen hasta el destino
+    siguiendo los punteros al padre.
+
+    Returns:
+        list: Índices de las aristas del camino en orden
+    """
+    aristas = []
+    actual = destino
+    while actual != origen:
+        e = arista_previa[actual]
+        aristas.append(e)
+        actual = compilado.origenes[e]
+    aristas.reverse()
+    return aristas
+
+
+def _nodos_de_aristas(compilado, origen, aristas):
+    """Convierte una secuencia de aristas en la lista de estaciones recorridas."""
+    return [origen] + [compilado.destinos[e] for e in aristas]
+
+
+def dijkstra(grafo, inicio, banda=None):
+    """
+    Dijkstra clásico desde un nodo inicial a todos los demás nodos del grafo.
+
+    Args:
+        grafo (Grafo | GrafoCompilado): Grafo que representa la red de transporte
+        inicio (str): ID del nodo inicial
+        banda (str, optional): Banda de congestión de la consulta. Si es None, usa la vigente.
+
+    Returns:
+        tuple: (distancias, caminos) donde:
+            - distancias (dict): Distancia mínima a cada nodo (float('inf') si es inalcanzable)
+            - caminos (dict): Camino mínimo a cada nodo ([] si es inalcanzable)
+    """
+    compilado = grafo.compilar()
+    ids = compilado.ids
+    origen = compilado.indice(inicio)
+    if origen is None:
+        return {id: INF for id in ids}, {id: [] for id in ids}
+
+    distancias, arista_previa, orden = arbol_caminos_minimos(compilado, origen, compilado.pesos_de(banda))
+
+    # Los caminos se construyen en el orden en que se fijaron, extendiendo el del
+    # padre; con aristas de tiempo cero el orden por distancia no lo garantiza
+    caminos = [None] * len(compilado)
+    caminos[origen] = [inicio]
+    for nodo in orden[1:]:
+        caminos[nodo] = caminos[compilado.origenes[arista_previa[nodo]]] + [ids[nodo]]
+
+    return (
+        {ids[i]: distancias[i] for i in range(len(compilado))},
+        {ids[i]: caminos[i] or [] for i in range(len(compilado))}
+    )
+
+
+def ruta_mas_corta(grafo, origen, destino, banda=None):
+    """
+    Camino más corto entre dos estaciones con terminación anticipada: la
+    búsqueda se detiene en cuanto la distancia al destino queda fijada.
+
+    Args:
+        grafo (Grafo | GrafoCompilado): Grafo que representa la red de transporte
+        origen (str): ID de la estación de origen
+        destino (str): ID de la estación de destino
+        banda (str, optional): Banda de congestión de la consulta. Si es None, usa la vigente.
+
+    Returns:
+        tuple: (tiempo, camino) con el tiempo mínimo y la lista de IDs de estación;
+            (float('inf'), []) si no existe ruta
+    """
+    compilado = grafo.compilar()
+    s = compilado.indice(origen)
+    t = compilado.indice(destino)
+    if s is None or t is None:
+        return INF, []
+
+    distancias, arista_previa = _dijkstra(compilado, compilado.pesos_de(banda), s, t)
+    if distancias[t] == INF:
+        return INF, []
+    aristas = _reconstruir_aristas(compilado, arista_previa, s, t)
+    return distancias[t], [compilado.ids[nodo] for nodo in _nodos_de_aristas(compilado, s, aristas)]
+
+
+def ruta_mas_corta_bidireccional(grafo, origen, destino, banda=None):
+    """
+    Dijkstra bidireccional entre dos estaciones.
+
+    Alterna una búsqueda hacia adelante desde el origen y otra hacia atrás desde
+    el destino sobre la adyacencia inversa del grafo compilado, y se detiene
+    cuando la suma de los mínimos de ambas colas no puede mejorar el mejor
+    encuentro conocido.
+
+    Args:
+        grafo (Grafo | GrafoCompilado): Grafo que representa la red de transporte
+        origen (str): ID de la estación de origen
+        destino (str): ID de la estación de destino
+        banda (str, optional): Banda de congestión de la consulta. Si es None, usa la vigente.
+
+    Returns:
+        tuple: (tiempo, camino) con el tiempo mínimo y la lista de IDs de estación;
+            (float('inf'), []) si no existe ruta
+    """
+    compilado = grafo.compilar()
+    s = compilado.indice(origen)
+    t = compilado.indice(destino)
+    if s is None or t is None:
+        return INF, []
+    if s == t:
+        return 0, [origen]
+
+    pesos = compilado.pesos_de(banda)
+    offsets, destinos = compilado.offsets, compilado.destinos
+    offsets_inv, aristas_inv, origenes = compilado.offsets_inv, compilado.aristas_inv, compilado.origenes
+    n = len(compilado)
+
+    dist_adelante, dist_atras = [INF] * n, [INF] * n
+    arista_adelante, arista_atras = [-1] * n, [-1] * n
+    cerrados_adelante, cerrados_atras = bytearray(n), bytearray(n)
+    dist_adelante[s] = 0
+    dist_atras[t] = 0
+    cola_adelante, cola_atras = [(0, s)], [(0, t)]
+    mejor, encuentro = INF, -1
+
+    while cola_adelante and cola_atras:
+        if cola_adelante[0][0] + cola_atras[0][0] >= mejor:
+            break
+
+        if cola_adelante[0][0] <= cola_atras[0][0]:
+            actual_dist, actual = heapq.heappop(cola_adelante)
+            if cerrados_adelante[actual]:
+                continue
+            cerrados_adelante[actual] = 1
+            for e in range(offsets[actual], offsets[actual + 1]):
+                vecino = destinos[e]
+                nueva_dist = actual_dist + pesos[e]
+                if nueva_dist < dist_adelante[vecino]:
+                    dist_adelante[vecino] = nueva_dist
+                    arista_adelante[vecino] = e
+                    heapq.heappush(cola_adelante, (nueva_dist, vecino))
+                    if nueva_dist + dist_atras[vecino] < mejor:
+                        mejor, encuentro = nueva_dist + dist_atras[vecino], vecino
+        else:
+            actual_dist, actual = heapq.heappop(cola_atras)
+            if cerrados_atras[actual]:
+                continue
+            cerrados_atras[actual] = 1
+            for k in range(offsets_inv[actual], offsets_inv[actual + 1]):
+                e = aristas_inv[k]
+                vecino = origenes[e]
+                nueva_dist = actual_dist + pesos[e]
+                if nueva_dist < dist_atras[vecino]:
+                    dist_atras[vecino] = nueva_dist
+                    arista_atras[vecino] = e
+                    heapq.heappush(cola_atras, (nueva_dist, vecino))
+                    if nueva_dist + dist_adelante[vecino] < mejor:
+                        mejor, encuentro = nueva_dist + dist_adelante[vecino], vecino
+
+    if encuentro == -1:
+        return INF, []
+
+    # Mitad hacia adelante (origen -> encuentro) y mitad hacia atrás (encuentro -> destino)
+    nodos = _nodos_de_aristas(compilado, s, _reconstruir_aristas(compilado, arista_adelante, s, encuentro))
+    actual = encuentro
+    while actual != t:
+        actual = destinos[arista_atras[actual]]
+        nodos.append(actual)
+    return mejor, [compilado.ids[nodo] for nodo in nodos]
+
+
+def ruta_a_estrella(grafo, origen, destino, banda=None):
+    """
+    Búsqueda A* entre dos estaciones guiada por la distancia geográfica.
+
+    La heurística es la distancia haversine hasta el destino dividida por la
+    velocidad del modo más rápido de la red, calibrada con los tiempos de las
+    rutas de cada tipo. Nunca sobreestima el tiempo restante, por lo que el
+    resultado coincide con el de Dijkstra. Las estaciones sin coordenadas
+    usan una cota de cero; los caminos que pasan por ellas entran en la
+    calibración (ver calibrar_velocidades), así que la cota de las demás sigue
+    siendo válida.
+
+    Si el grafo compilado tiene tablas de landmarks asociadas (ALT), se usa
+    además su cota y se toma la mayor de las dos.
+
+    Args:
+        grafo (Grafo | GrafoCompilado): Grafo que representa la red de transporte
+        origen (str): ID de la estación de origen
+        destino (str): ID de la estación de destino
+        banda (str, optional): Banda de congestión de la consulta. Si es None, usa la vigente.
+
+    Returns:
+        tuple: (tiempo, camino) con el tiempo mínimo y la lista de IDs de estación;
+            (float('inf'), []) si no existe ruta
+    """
+    compilado = grafo.compilar()
+    s = compilado.indice(origen)
+    t = compilado.indice(destino)
+    if s is None or t is None:
+        return INF, []
+
+    banda = compilado.resolver_banda(banda)
+    pesos = compilado.pesos_de(banda)
+    velocidad = compilado.velocidad_maxima(banda)
+    coordenadas_destino = compilado.estaciones[t].coordenadas
+    cota_landmarks = compilado.landmarks.cota_hacia(banda, t) if compilado.landmarks else None
+    offsets, destinos = compilado.offsets, compilado.destinos
+    n = len(compilado)
+
+    cotas = [None] * n
+
+    def cota(nodo):
+        if cotas[nodo] is None:
+            coordenadas = compilado.estaciones[nodo].coordenadas
+            if not coordenadas or not coordenadas_destino or velocidad in (0, INF):
+                cotas[nodo] = 0.0
+            else:
+                cotas[nodo] = haversine_km(coordenadas, coordenadas_destino) / velocidad
+            if cota_landmarks is not None:
+                cotas[nodo] = max(cotas[nodo], cota_landmarks(nodo))
+        return cotas[nodo]
+
+    distancias = [INF] * n
+    arista_previa = [-1] * n
+    distancias[s] = 0
+    cola = [(cota(s), 0, s)]
+    while cola:
+        _, actual_dist, actual = heapq.heappop(cola)
+        if actual_dist > distancias[actual]:
+            continue
+        if actual == t:
+            break
+        for e in range(offsets[actual], offsets[actual + 1]):
+            vecino = destinos[e]
+            nueva_dist = actual_dist + pesos[e]
+            if nueva_dist < distancias[vecino]:
+                estimado = nueva_dist + cota(vecino)
+                if estimado == INF:
+                    # Según las tablas ALT el vecino no puede llegar al destino
+                    continue
+                distancias[vecino] = nueva_dist
+                arista_previa[vecino] = e
+                heapq.heappush(cola, (estimado, nueva_dist, vecino))
+
+    if distancias[t] == INF:
+        return INF, []
+    aristas = _reconstruir_aristas(compilado, arista_previa, s, t)
+    return distancias[t], [compilado.ids[nodo] for nodo in _nodos_de_aristas(compilado, s, aristas)]
+
+
+METODOS_RUTA = {
+    "dijkstra": ruta_mas_corta,
+    "bidireccional": ruta_mas_corta_bidireccional,
+    "a_estrella": ruta_a_estrella,
+    "contraccion": ruta_contraccion
+}
+
+
+def calcular_ruta_mas_corta(grafo, origen, destino, banda=None, metodo="bidireccional"):
+    """
+    Calcula el camino más corto entre dos estaciones con el método indicado.
+
+    Args:
+        grafo (Grafo | GrafoCompilado): Grafo que representa la red de transporte
+        origen (str): ID de la estación de origen
+        destino (str): ID de la estación de destino
+        banda (str, optional): Banda de congestión de la consulta. Si es None, usa la vigente.
+        metodo (str): Uno de los métodos de METODOS_RUTA
+
+    Returns:
+        tuple: (tiempo, camino) como en ruta_mas_corta
+
+    Raises:
+        ValueError: Si el método no existe
+    """
+    if metodo not in METODOS_RUTA:
+        raise ValueError(f"Método de ruta desconocido: {metodo}")
+    return METODOS_RUTA[metodo](grafo, origen, destino, banda)
+
+
+def distancias_a_objetivos(compilado, origen, pesos, objetivos):
+    """
+    Distancias mínimas desde una estación, deteniendo la búsqueda en cuanto
+    quedan fijadas las de todas las estaciones objetivo.
+
+    Args:
+        compilado (GrafoCompilado): Grafo compilado
+        origen (int): Índice de la estación de origen
+        pesos (array): Tiempo de cada arista
+        objetivos (set): Índices de las estaciones cuyas distancias interesan
+
+    Returns:
+        list: Distancia a cada estación por índice; solo las de los objetivos son
+            definitivas (float('inf') si el objetivo es inalcanzable)
+    """
+    n = len(compilado)
+    offsets, destinos = compilado.offsets, compilado.destinos
+    distancias = [INF] * n
+    cerrados = bytearray(n)
+    pendientes = len(objetivos)
+    distancias[origen] = 0
+    cola = [(0, origen)]
+    while cola and pendientes:
+        actual_dist, actual = heapq.heappop(cola)
+        if cerrados[actual]:
+            continue
+        cerrados[actual] = 1
+        if actual in objetivos:
+            pendientes -= 1
+        for e in range(offsets[actual], offsets[actual + 1]):
+            vecino = destinos[e]
+            nueva_dist = actual_dist + pesos[e]
+            if nueva_dist < distancias[vecino]:
+                distancias[vecino] = nueva_dist
+                heapq.heappush(cola, (nueva_dist, vecino))
+    return distancias
+
+
+def matriz_od(grafo, origenes, destinos, banda=None):
+    """
+    Calcula los tiempos mínimos entre listas de orígenes y destinos.
+
+    El trabajo se agrupa por origen: cada origen distinto ejecuta una sola
+    búsqueda que termina al fijar todos los destinos pedidos. Las filas se
+    generan a medida que se calculan, para poder enviarlas sin esperar a la
+    matriz completa. La banda se fija una vez para toda la matriz.
+
+    Args:
+        grafo (Grafo | GrafoCompilado): Grafo que representa la red de transporte
+        origenes (list): IDs de las estaciones de origen
+        destinos (list): IDs de las estaciones de destino
+        banda (str, optional): Banda de congestión. Si es None, usa la vigente.
+
+    Yields:
+        tuple: (origen, tiempos) por cada origen distinto, en el orden en que
+            aparecen; tiempos está alineado con destinos (float('inf') si no hay
+            ruta o la estación no existe)
+    """
+    compilado = grafo.compilar()
+    pesos = compilado.pesos_de(banda)
+    indices_destino = [compilado.indice(destino) for destino in destinos]
+    objetivos = {t for t in indices_destino if t is not None}
+    vistos = set()
+    for origen in origenes:
+        if origen in vistos:
+            continue
+        vistos.add(origen)
+        s = compilado.indice(origen)
+        if s is None:
+            yield origen, [INF] * len(destinos)
+            continue
+        distancias = distancias_a_objetivos(compilado, s, pesos, objetivos)
+        yield origen, [INF if t is None else distancias[t] for t in indices_destino]
+
+
+def alcanzables(compilado, origen, pesos, limite):
+    """
+    Dijkstra acotado: fija las estaciones alcanzables en un tiempo máximo y se
+    detiene al superarlo. Solo guarda las distancias de las estaciones
+    visitadas, sin caminos ni arreglos del tamaño de la red.
+
+    Args:
+        compilado (GrafoCompilado): Grafo compilado
+        origen (int): Índice de la estación de origen
+        pesos (array): Tiempo de cada arista
+        limite (float): Tiempo máximo
+
+    Returns:
+        dict: Índice de estación -> tiempo mínimo, en orden de tiempo creciente
+    """
+    offsets, destinos = compilado.offsets, compilado.destinos
+    distancias = {origen: 0}
+    fijadas = {}
+    cola = [(0, origen)]
+    while cola:
+        actual_dist, actual = heapq.heappop(cola)
+        if actual in fijadas:
+            continue
+        if actual_dist > limite:
+            break
+        fijadas[actual] = actual_dist
+        for e in range(offsets[actual], offsets[actual + 1]):
+            vecino = destinos[e]
+            nueva_dist = actual_dist + pesos[e]
+            if nueva_dist <= limite and nueva_dist < distancias.get(vecino, INF):
+                distancias[vecino] = nueva_dist
+                heapq.heappush(cola, (nueva_dist, vecino))
+    return fijadas
+
+
+def isocrona(grafo, origen, minutos, banda=None):
+    """
+    Calcula las estaciones alcanzables desde un origen en un tiempo máximo.
+
+    Args:
+        grafo (Grafo | GrafoCompilado): Grafo que representa la red de transporte
+        origen (str): ID de la estación de origen
+        minutos (float): Tiempo máximo de viaje
+        banda (str, optional): Banda de congestión. Si es None, usa la vigente.
+
+    Returns:
+        dict: ID de estación -> tiempo mínimo, en orden de tiempo creciente
+            (vacío si el origen no existe)
+    """
+    return next(isocronas(grafo, [origen], minutos, banda))[1]
+
+
+def isocronas(grafo, origenes, minutos, banda=None):
+    """
+    Calcula las isocronas de varios orígenes con la misma banda y tiempo máximo.
+
+    Args:
+        grafo (Grafo | GrafoCompilado): Grafo que representa la red de transporte
+        origenes (list): IDs de las estaciones de origen
+        minutos (float): Tiempo máximo de viaje
+        banda (str, optional): Banda de congestión. Si es None, usa la vigente.
+
+    Yields:
+        tuple: (origen, isocrona) por cada origen distinto, en el orden en que
+            aparecen, con la isocrona como en isocrona
+    """
+    compilado = grafo.compilar()
+    pesos = compilado.pesos_de(banda)
+    for origen in dict.fromkeys(origenes):
+        s = compilado.indice(origen)
+        if s is None:
+            yield origen, {}
+            continue
+        yield origen, {compilado.ids[v]: tiempo for v, tiempo in alcanzables(compilado, s, pesos, minutos).items()}
+
+
+def k_rutas_mas_cortas(grafo, origen, destino, K=2, banda=None, ruta_inicial=None):
+    """
+    Algoritmo de Yen para las K rutas más cortas sin ciclos entre dos estaciones.
+
+    Cada ruta nueva se obtiene desviándose de la anterior en uno de sus nodos
+    (nodo espuela) con una búsqueda de Dijkstra punto a punto que termina al
+    alcanzar el destino. Los caminos se almacenan como punteros al padre y
+    secuencias de aristas, sin copiar listas en cada relajación.
+
+    Args:
+        grafo (Grafo | GrafoCompilado): Grafo que representa la red de transporte
+        origen (str): ID de la estación de origen
+        destino (str): ID de la estación de destino
+        K (int): Número máximo de rutas a encontrar
+        banda (str, optional): Banda de congestión de la consulta. Si es None, usa la vigente.
+        ruta_inicial (tuple, optional): (tiempo, camino) de la ruta más corta si ya
+            se conoce (por ejemplo, de la matriz de tiempos); evita la primera búsqueda.
+
+    Returns:
+        tuple: (distancias, caminos) donde:
+            - distancias (list): Tiempos de las rutas en orden ascendente
+            - caminos (list): Rutas correspondientes como listas de IDs de estación
+    """
+    compilado = grafo.compilar()
+    pesos = compilado.pesos_de(banda)
+    s = compilado.indice(origen)
+    t = compilado.indice(destino)
+    if s is None or t is None or K < 1:
+        return [], []
+    if s == t:
+        return [0], [[origen]]
+
+    if ruta_inicial is not None:
+        tiempo, camino = ruta_inicial
+        if not camino:
+            return [], []
+        nodos = [compilado.indice(id) for id in camino]
+        aristas = [compilado.arista(nodos[i], nodos[i + 1]) for i in range(len(nodos) - 1)]
+    else:
+        distancias, arista_previa = _dijkstra(compilado, pesos, s, t)
+        if distancias[t] == INF:
+            return [], []
+        tiempo = distancias[t]
+        aristas = _reconstruir_aristas(compilado, arista_previa, s, t)
+
+    # Rutas aceptadas como (tiempo, aristas, nodos)
+    aceptadas = [(tiempo, aristas, _nodos_de_aristas(compilado, s, aristas))]
+    candidatas = []
+    vistas = {tuple(aristas)}
+
+    while len(aceptadas) < K:
+        _, aristas_previas, nodos_previos = aceptadas[-1]
+        costo_raiz = 0
+        for i in range(len(aristas_previas)):
+            espuela = nodos_previos[i]
+            raiz = aristas_previas[:i]
+
+            # Se bloquean las aristas que siguen a esta raíz en las rutas ya aceptadas
+            aristas_bloqueadas = {
+                aristas[i] for _, aristas, _ in aceptadas
+                if len(aristas) > i and aristas[:i] == raiz
+            }
+            # Los nodos de la raíz no pueden repetirse (rutas sin ciclos)
+            distancias, arista_previa = _dijkstra(
+                compilado, pesos, espuela, t, nodos_previos[:i], aristas_bloqueadas
+            )
+            if distancias[t] != INF:
+                aristas = raiz + _reconstruir_aristas(compilado, arista_previa, espuela, t)
+                clave = tuple(aristas)
+                if clave not in vistas:
+                    vistas.add(clave)
+                    heapq.heappush(candidatas, (costo_raiz + distancias[t], clave))
+            costo_raiz += pesos[aristas_previas[i]]
+
+        if not candidatas:
+            break
+        tiempo, clave = heapq.heappop(candidatas)
+        aristas = list(clave)
+        aceptadas.append((tiempo, aristas, _nodos_de_aristas(compilado, s, aristas)))
+
+    ids = compilado.ids
+    return (
+        [tiempo for tiempo, _, _ in aceptadas],
+        [[ids[nodo] for nodo in nodos] for _, _, nodos in aceptadas]
+    )
+
+
+def dijkstra_k_rutas(grafo, inicio, K=2, banda=None):
     """
     Dijkstra para encontrar las K rutas más cortas
     desde un nodo inicial a todos los demás nodos en el grafo.
-    
+
+    Las rutas pueden repetir estaciones. Para consultas entre dos estaciones
+    concretas es preferible k_rutas_mas_cortas, que devuelve rutas sin ciclos.
+
     Args:
-        grafo (Grafo): Grafo que representa la red de transporte
+        grafo (Grafo | GrafoCompilado): Grafo que representa la red de transporte
         inicio (str): ID del nodo inicial
         K (int): Número de rutas más cortas a encontrar para cada nodo
-        
+        banda (str, optional): Banda de congestión de la consulta. Si es None, se fija
+            la banda vigente al inicio y se mantiene durante toda la búsqueda.
+
     Returns:
         tuple: (distancias, caminos) donde:
             - distancias (dict): Diccionario con listas de las K distancias mínimas desde el inicio a cada nodo
             - caminos (dict): Diccionario con listas de las K rutas mínimas desde el inicio a cada nodo
     """
-    # Inicializamos distancias y caminos como listas de K elementos
-    distancias = {v: [] for v in grafo.vertices}
-    caminos = {v: [] for v in grafo.vertices}
-    
-    # La distancia/camino inicial tiene 1 entrada (ruta trivial: [inicio] con distancia 0)
-    distancias[inicio] = [0]
-    caminos[inicio] = [[inicio]]
-    
-    # La cola prioritaria almacena tuplas (distancia, nodo, ruta)
-    cola = [(0, inicio, [inicio])]
-    
-    while cola:
-        actual_dist, actual_vert, actual_camino = heapq.heappop(cola)
-        
-        # Si ya tenemos K rutas para este nodo y la actual es peor que la K-ésima, la ignoramos
-        if len(distancias[actual_vert]) >= K and actual_dist > distancias[actual_vert][-1]:
-            continue
-            
-        for vecino, peso in grafo.obtener_adyacentes(actual_vert).items():
-            nueva_dist = actual_dist + peso
-            nuevo_camino = actual_camino + [vecino]
-            
-            # Si el vecino no tiene K rutas aún, o la nueva es mejor que la peor de sus K rutas
-            if len(distancias[vecino]) < K or nueva_dist < distancias[vecino][-1]:
-                # Insertamos la nueva ruta de manera ordenada
-                insertar_ordenado(distancias[vecino], caminos[vecino], nueva_dist, nuevo_camino, K)
-                heapq.heappush(cola, (nueva_dist, vecino, nuevo_camino))
-    
-    return distancias, caminos
+    compilado = grafo.compilar()
+    pesos = compilado.pesos_de(banda)
+    offsets, destinos = compilado.offsets, compilado.destinos
+    n = len(compilado)
+
+    # Cada etiqueta representa un camino como (nodo, etiqueta padre); así
+    # la cola no guarda copias de la ruta completa
+    etiqueta_nodo = []
+    etiqueta_padre = []
+
+    # Inicializamos distancias y etiquetas como listas de hasta K elementos por índice de estación
+    distancias = [[] for _ in range(n)]
+    etiquetas = [[] for _ in range(n)]
+
+    origen = compilado.indice(inicio)
+    if origen is not None:
+        # La distancia/camino inicial tiene 1 entrada (ruta trivial: [inicio] con distancia 0)
+        etiqueta_nodo.append(origen)
+        etiqueta_padre.append(-1)
+        distancias[origen] = [0]
+        etiquetas[origen] = [0]
+
+        # La cola prioritaria almacena tuplas (distancia, etiqueta)
+        cola = [(0, 0)]
+
+        while cola:
+            actual_dist, actual_etiqueta = heapq.heappop(cola)
+            actual_vert = etiqueta_nodo[actual_etiqueta]
+
+            # Si ya tenemos K rutas para este nodo y la actual es peor que la K-ésima, la ignoramos
+            if len(distancias[actual_vert]) >= K and actual_dist > distancias[actual_vert][-1]:
+                continue
+
+            for e in range(offsets[actual_vert], offsets[actual_vert + 1]):
+                vecino = destinos[e]
+                nueva_dist = actual_dist + pesos[e]
+
+                # Si el vecino no tiene K rutas aún, o la nueva es mejor que la peor de sus K rutas
+                if len(distancias[vecino]) < K or nueva_dist < distancias[vecino][-1]:
+                    nueva_etiqueta = len(etiqueta_nodo)
+                    etiqueta_nodo.append(vecino)
+                    etiqueta_padre.append(actual_etiqueta)
+                    # Insertamos la nueva ruta de manera ordenada
+                    insertar_ordenado(distancias[vecino], etiquetas[vecino], nueva_dist, nueva_etiqueta, K)
+                    heapq.heappush(cola, (nueva_dist, nueva_etiqueta))
+
+    def camino_de(etiqueta):
+        camino = []
+        while etiqueta != -1:
+            camino.append(compilado.ids[etiqueta_nodo[etiqueta]])
+            etiqueta = etiqueta_padre[etiqueta]
+        camino.reverse()
+        return camino
+
+    # Traducimos los índices enteros de vuelta a IDs de estación
+    ids = compilado.ids
+    resultado_distancias = {ids[i]: distancias[i] for i in range(n)}
+    resultado_caminos = {ids[i]: [camino_de(etiqueta) for etiqueta in etiquetas[i]] for i in range(n)}
+    if origen is None:
+        resultado_distancias[inicio] = [0]
+        resultado_caminos[inicio] = [[inicio]]
+    return resultado_distancias, resultado_caminos
 
 def insertar_ordenado(lista_distancias, lista_caminos, nueva_dist, nuevo_camino, K):
     """
     Inserta una nueva distancia y camino en las listas manteniendo el orden ascendente
     y limitando el tamaño a K elementos.
-    
+
     Args:
         lista_distancias (list): Lista de distancias ordenadas
         lista_caminos (list): Lista de caminos correspondientes a las distancias
         nueva_dist (float): Nueva distancia a insertar
-        nuevo_camino (list): Nuevo camino a insertar
+        nuevo_camino (list | int): Nuevo camino (o etiqueta de camino) a insertar
         K (int): Número máximo de elementos a mantener
     """
-    # Encuentra la posición donde insertar la nueva distancia (manteniendo orden ascendente)
-    i = 0
-    while i < len(lista_distancias) and lista_distancias[i] < nueva_dist:
-        i += 1
-    
+    # Búsqueda binaria de la posición (manteniendo orden ascendente)
+    i = bisect_left(lista_distancias, nueva_dist)
+
     # Insertamos en la posición correcta
     lista_distancias.insert(i, nueva_dist)
     lista_caminos.insert(i, nuevo_camino)
-    
+
     # Truncamos a K elementos si es necesario
     if len(lista_distancias) > K:
         lista_distancias.pop()
-        lista_caminos.pop()
\ No newline at end of file
+        lista_caminos.pop()
@@ -0,0 +1,156 @@
+import heapq
+import math
+from array import array
+
+from src.geo import RADIO_TIERRA_KM, haversine_km
+
+
+def _a_esfera(coordenadas):
+    """Convierte [lon, lat] en grados a un punto (x, y, z) de la esfera unidad."""
+    lon, lat = math.radians(coordenadas[0]), math.radians(coordenadas[1])
+    return (math.cos(lat) * math.cos(lon), math.cos(lat) * math.sin(lon), math.sin(lat))
+
+
+def _cuerda(distancia_km):
+    """Longitud de la cuerda de la esfera unidad que subtiende un arco de distancia_km."""
+    return 2 * math.sin(min(distancia_km / (2 * RADIO_TIERRA_KM), math.pi / 2))
+
+
+class IndiceEspacial:
+    """
+    Árbol KD sobre las coordenadas de las estaciones.
+
+    Cada estación se representa como un punto de la esfera unidad en tres
+    dimensiones: la distancia en línea recta entre dos puntos crece con la
+    distancia de círculo máximo, de modo que el árbol encuentra los vecinos
+    exactos por haversine. El árbol está implícito en el orden de los
+    arreglos: el nodo de un rango [inicio, fin) es su punto medio, que divide
+    el rango por el eje guardado en ejes. Las consultas son logarítmicas en el
+    número de estaciones.
+
+    Attributes:
+        ids (list): ID de la estación de cada punto, en el orden del árbol
+        coordenadas (list): Coordenadas [lon, lat] de cada punto
+        puntos (array): x, y, z de cada punto, uno tras otro
+        ejes (array): Eje (0, 1 o 2) por el que divide cada nodo
+    """
+    def __init__(self, estaciones):
+        elementos = [
+            (estacion.id, estacion.coordenadas, _a_esfera(estacion.coordenadas))
+            for estacion in estaciones
+            if estacion.coordenadas
+        ]
+        self.ids = [None] * len(elementos)
+        self.coordenadas = [None] * len(elementos)
+        self.puntos = array('d', [0.0] * (3 * len(elementos)))
+        self.ejes = array('b', [0] * len(elementos))
+
+        pendientes = [(0, len(elementos), elementos)]
+        while pendientes:
+            inicio, fin, grupo = pendientes.pop()
+            if not grupo:
+                continue
+            # Se divide por el eje de mayor extensión del grupo
+            eje = max(range(3), key=lambda k: max(p[2][k] for p in grupo) - min(p[2][k] for p in grupo))
+            grupo.sort(key=lambda p: p[2][eje])
+            medio = len(grupo) // 2
+            nodo = inicio + medio
+            self.ids[nodo], self.coordenadas[nodo], punto = grupo[medio]
+            self.puntos[3 * nodo:3 * nodo + 3] = array('d', punto)
+            self.ejes[nodo] = eje
+            pendientes.append((inicio, nodo, grupo[:medio]))
+            pendientes.append((nodo + 1, fin, grupo[medio + 1:]))
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _recorrer(self, punto, visitar, limite):
+        """
+        Recorre el árbol desde la raíz, primero por el lado del punto, sin entrar
+        en los rangos que están a más de limite. visitar(nodo, cuerda) recibe
+        cada nodo y devuelve la cuerda máxima que aún interesa.
+        """
+        pila = [(0, len(self.ids), 0.0)]
+        while pila:
+            inicio, fin, cota = pila.pop()
+            if inicio >= fin or cota > limite:
+                continue
+            nodo = (inicio + fin) // 2
+            x, y, z = self.puntos[3 * nodo:3 * nodo + 3]
+            cuerda = math.sqrt((x - punto[0]) ** 2 + (y - punto[1]) ** 2 + (z - punto[2]) ** 2)
+            limite = visitar(nodo, cuerda)
+            diferencia = punto[self.ejes[nodo]] - self.puntos[3 * nodo + self.ejes[nodo]]
+            cerca, lejos = ((nodo + 1, fin), (inicio, nodo)) if diferencia > 0 else ((inicio, nodo), (nodo + 1, fin))
+            # El lado lejano se apila primero para visitar antes el cercano
+            pila.append((lejos[0], lejos[1], max(cota, abs(diferencia))))
+            pila.append((cerca[0], cerca[1], cota))
+
+    def _resultado(self, coordenadas, nodos):
+        return [(self.ids[nodo], haversine_km(coordenadas, self.coordenadas[nodo])) for nodo in nodos]
+
+    def cercanas(self, coordenadas, k=1, excluir=None):
+        """
+        Busca las k estaciones más cercanas a un punto.
+
+        Args:
+            coordenadas (list | tuple): Coordenadas [lon, lat] en grados
+            k (int): Número de estaciones a devolver
+            excluir (set, optional): IDs de estaciones que no se consideran
+
+        Returns:
+            list: Pares (ID, distancia en km) ordenados por distancia
+        """
+        punto = _a_esfera(coordenadas)
+        mejores = []  # Montículo de máximos: (-cuerda, nodo)
+
+        def visitar(nodo, cuerda):
+            if excluir is None or self.ids[nodo] not in excluir:
+                if len(mejores) < k:
+                    heapq.heappush(mejores, (-cuerda, nodo))
+                elif cuerda < -mejores[0][0]:
+                    heapq.heapreplace(mejores, (-cuerda, nodo))
+            return -mejores[0][0] if len(mejores) >= k else math.inf
+
+        if k > 0:
+            self._recorrer(punto, visitar, math.inf)
+        return self._resultado(coordenadas, [nodo for _, nodo in sorted(mejores, reverse=True)])
+
+    def en_radio(self, coordenadas, radio_km, excluir=None):
+        """
+        Busca las estaciones a menos de una distancia de un punto.
+
+        Args:
+            coordenadas (list | tuple): Coordenadas [lon, lat] en grados
+            radio_km (float): Distancia máxima en kilómetros
+            excluir (set, optional): IDs de estaciones que no se consideran
+
+        Returns:
+            list: Pares (ID, distancia en km) ordenados por distancia
+        """
+        punto = _a_esfera(coordenadas)
+        limite = _cuerda(radio_km)
+        dentro = []
+
+        def visitar(nodo, cuerda):
+            if cuerda <= limite and (excluir is None or self.ids[nodo] not in excluir):
+                dentro.append((cuerda, nodo))
+            return limite
+
+        self._recorrer(punto, visitar, limite)
+        return self._resultado(coordenadas, [nodo for _, nodo in sorted(dentro)])
+
+
+def obtener_indice_espacial(grafo):
+    """
+    Obtiene el índice espacial de las estaciones del grafo, construyéndolo la primera vez.
+
+    Args:
+        grafo (Grafo | GrafoCompilado): Grafo de la red
+
+    Returns:
+        IndiceEspacial: Índice asociado al grafo compilado
+    """
+    compilado = grafo.compilar()
+    if compilado.espacial is None:
+        compilado.espacial = IndiceEspacial(compilado.estaciones)
+    return compilado.espacial
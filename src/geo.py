@@ -0,0 +1,83 @@
+import heapq
+import math
+
+
+RADIO_TIERRA_KM = 6371.0088
+
+
+def haversine_km(origen, destino):
+    """
+    Calcula la distancia de círculo máximo entre dos puntos.
+
+    Args:
+        origen (list | tuple): Coordenadas [lon, lat] en grados
+        destino (list | tuple): Coordenadas [lon, lat] en grados
+
+    Returns:
+        float: Distancia en kilómetros
+    """
+    lon1, lat1 = math.radians(origen[0]), math.radians(origen[1])
+    lon2, lat2 = math.radians(destino[0]), math.radians(destino[1])
+    a = (math.sin((lat2 - lat1) / 2) ** 2
+         + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2)
+    return 2 * RADIO_TIERRA_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def calibrar_velocidades(compilado, banda):
+    """
+    Calcula la velocidad máxima observada de cada tipo de ruta en una banda.
+
+    La velocidad de una arista es su distancia geográfica dividida por su
+    tiempo en la banda; el máximo por tipo acota la velocidad de ese modo.
+    Las estaciones sin coordenadas no tienen distancia propia, pero un camino
+    que las atraviesa une dos estaciones con coordenadas y también debe quedar
+    acotado: cada tramo de una estación con coordenadas a otra que solo pasa
+    por estaciones sin ellas cuenta como una arista con su tiempo mínimo,
+    del tipo de su primera ruta. Así la cota de A* nunca sobreestima.
+
+    Args:
+        compilado (GrafoCompilado): Grafo compilado
+        banda (str): Banda de congestión
+
+    Returns:
+        dict: Velocidad máxima en km/min por tipo de ruta (float('inf') si algún
+            tramo con distancia positiva tiene tiempo cero)
+    """
+    coordenadas = [estacion.coordenadas for estacion in compilado.estaciones]
+    pesos = compilado.pesos_de(banda)
+    offsets, destinos = compilado.offsets, compilado.destinos
+    velocidades = {}
+
+    def registrar(tipo, origen, destino, tiempo):
+        distancia = haversine_km(origen, destino)
+        if tiempo > 0:
+            velocidad = distancia / tiempo
+        else:
+            velocidad = float('inf') if distancia > 0 else 0.0
+        if velocidad > velocidades.get(tipo, 0.0):
+            velocidades[tipo] = velocidad
+
+    for e in range(compilado.num_aristas):
+        origen = coordenadas[compilado.origenes[e]]
+        if not origen:
+            continue
+        destino = coordenadas[compilado.destinos[e]]
+        if destino:
+            registrar(compilado.tipos[e], origen, destino, pesos[e])
+            continue
+        # Tramos que siguen por estaciones sin coordenadas hasta otra con ellas
+        tiempos = {compilado.destinos[e]: pesos[e]}
+        cola = [(pesos[e], compilado.destinos[e])]
+        while cola:
+            tiempo, actual = heapq.heappop(cola)
+            if tiempo > tiempos[actual]:
+                continue
+            if coordenadas[actual]:
+                registrar(compilado.tipos[e], origen, coordenadas[actual], tiempo)
+                continue
+            for f in range(offsets[actual], offsets[actual + 1]):
+                vecino = destinos[f]
+                if tiempo + pesos[f] < tiempos.get(vecino, float('inf')):
+                    tiempos[vecino] = tiempo + pesos[f]
+                    heapq.heappush(cola, (tiempo + pesos[f], vecino))
+    return velocidades
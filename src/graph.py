@@ -1,5 +1,8 @@
-import json
-from datetime import datetime
+import itertools
+import threading
+
+from src.compilado import INF, GrafoCompilado
+from src.horarios import banda_horaria, BANDA_NORMAL
 
 
 class Estacion:
@@ -12,16 +15,18 @@ class Estacion:
         tipo (str): Tipo de estación ('metro' o 'bus')
         linea (str): Línea a la que pertenece (ej: 'M1', 'M2', 'B1', 'B2')
         conexiones (list): Lista de conexiones con otras estaciones
+        es_transbordo (bool): Indica si la estación está marcada como punto de transbordo
         es_intercambiador (bool): Indica si la estación es un punto de intercambio entre líneas
         coordenadas (tuple, optional): Coordenadas geográficas de la estación
     """
-    def __init__(self, id, nombre, tipo, linea, conexiones, coordenadas=None):
+    def __init__(self, id, nombre, tipo, linea, conexiones, coordenadas=None, es_transbordo=False):
         self.id = id
         self.nombre = nombre
         self.tipo = tipo  
         self.linea = linea  
         self.conexiones = conexiones
-        self.es_intercambiador = '-' in linea  
+        self.es_transbordo = es_transbordo
+        self.es_intercambiador = '-' in linea or es_transbordo
         self.coordenadas = coordenadas
 
 class Ruta:
@@ -34,6 +39,7 @@ class Ruta:
         tipo (str): Tipo de ruta
         tiempo_base (float): Tiempo base de recorrido en minutos
         congestion_tipica (dict): Factores de congestión para diferentes horarios
+        tiempos (dict): Tiempo de recorrido precalculado para cada banda de congestión
     """
     def __init__(self, origen, destino, tipo, tiempo, congestion_tipica):
         self.origen = origen
@@ -41,28 +47,66 @@ class Ruta:
         self.tipo = tipo
         self.tiempo_base = tiempo
         self.congestion_tipica = congestion_tipica
+        self.tiempos = {banda: tiempo * factor for banda, factor in congestion_tipica.items()}
+
+    def tiempo_en_banda(self, banda):
+        """
+        Obtiene el tiempo de recorrido precalculado para una banda de congestión.
+        
+        Args:
+            banda (str): Banda de congestión
+            
+        Returns:
+            float: Tiempo de recorrido; si la ruta no define un factor para la banda,
+                se usa el de la banda normal
+        """
+        tiempo = self.tiempos.get(banda)
+        if tiempo is None:
+            tiempo = self.tiempos.get(BANDA_NORMAL, self.tiempo_base)
+        return tiempo
 
-    def calcular_tiempo_actual(self, hora=None):
+    def calcular_tiempo_actual(self, hora=None, horarios=None):
         """
         Calcula el tiempo actual de recorrido considerando la congestión.
         
         Args:
-            hora (int, optional): Hora del día (0-23). Si es None, usa la hora actual.
+            hora (int | str, optional): Hora del día (0-23 o 'HH:MM'). Si es None, usa la hora actual.
+            horarios (dict, optional): Bloque "horarios" con las ventanas de cada banda
             
         Returns:
             float: Tiempo de recorrido ajustado por la congestión
         """
-        if hora is None:
-            hora = datetime.now().hour
-        
-        if 7 <= hora < 9:
-            factor = self.congestion_tipica["hora_pico_manana"]
-        elif 17 <= hora < 19:
-            factor = self.congestion_tipica["hora_pico_tarde"]
-        else:
-            factor = self.congestion_tipica["normal"]
-        
-        return self.tiempo_base * factor
+        return self.tiempo_en_banda(banda_horaria(hora, horarios))
+
+
+class CambioRed:
+    """
+    Describe una modificación incremental del grafo; se envía a los suscriptores.
+
+    Attributes:
+        tipo (str): "cerrar_estacion", "reabrir_estacion", "eliminar_estacion",
+            "tiempo_ruta" o "congestion_ruta"
+        rutas (list): Pares (origen, destino) de las rutas afectadas
+        aristas (list): Índices de esas rutas en el grafo compilado
+        anteriores (dict): banda -> tiempos de esas aristas antes del cambio
+        aumenta (bool): True si ningún tiempo disminuyó, de modo que las distancias
+            solo pueden crecer y las cotas inferiores siguen siendo válidas
+        topologia (bool): True si cambió qué rutas están en servicio
+        version_anterior (int): Versión del grafo antes del cambio
+        version (int): Versión del grafo tras el cambio
+        compilado (GrafoCompilado): Grafo compilado actualizado en su lugar, o None
+            si no estaba compilado (los datos derivados deben descartarse enteros)
+    """
+    def __init__(self, tipo, rutas, aristas, anteriores, aumenta, topologia, version_anterior, version, compilado):
+        self.tipo = tipo
+        self.rutas = rutas
+        self.aristas = aristas
+        self.anteriores = anteriores
+        self.aumenta = aumenta
+        self.topologia = topologia
+        self.version_anterior = version_anterior
+        self.version = version
+        self.compilado = compilado
 
 
 class Grafo:
@@ -71,13 +115,71 @@ class Grafo:
     
     Attributes:
         vertices (dict): Diccionario de estaciones (id -> Estacion)
-        rutas (dict): Diccionario de rutas (origen -> {destino -> Ruta})
+        rutas (dict): Diccionario de rutas (origen -> {destino -> Ruta}); las rutas
+            diferidas con diferir_rutas se construyen al consultarlo por primera vez
+        rutas_entrantes (dict): Adyacencia inversa (destino -> {origen -> Ruta})
         nombres_a_ids (dict): Mapeo de nombres de estaciones a sus IDs
+        ids_por_nombre (dict): Índice inverso de nombres (nombre -> lista de IDs)
+        cerradas (set): IDs de las estaciones cerradas temporalmente
+        horarios (dict): Ventanas de congestión y frecuencias de la red
+        version (int): Contador que aumenta con cada modificación del grafo
     """
     def __init__(self):
         self.vertices = {}  # id -> Estacion
-        self.rutas = {}  # origen -> {destino -> Ruta}
+        self._rutas = {}  # origen -> {destino -> Ruta}
+        self._rutas_entrantes = {}  # destino -> {origen -> Ruta}
+        self._rutas_diferidas = None
+        self._candado_rutas = threading.Lock()
         self.nombres_a_ids = {}  # nombre -> id
+        self.ids_por_nombre = {}  # nombre -> [id, ...]
+        self.cerradas = set()
+        self.horarios = {}
+        self.version = 0
+        self._compilado = None
+        self._suscriptores = []
+
+    @property
+    def rutas(self):
+        if self._rutas_diferidas is not None:
+            self._materializar_rutas()
+        return self._rutas
+
+    @property
+    def rutas_entrantes(self):
+        if self._rutas_diferidas is not None:
+            self._materializar_rutas()
+        return self._rutas_entrantes
+
+    def _materializar_rutas(self):
+        with self._candado_rutas:
+            construir = self._rutas_diferidas
+            if construir is None:
+                return
+            for ruta in construir():
+                self._rutas.setdefault(ruta.origen, {})[ruta.destino] = ruta
+                self._rutas_entrantes.setdefault(ruta.destino, {})[ruta.origen] = ruta
+            self._rutas_diferidas = None
+
+    def _indexar_nombre(self, id, nombre):
+        anterior = self.vertices.get(id)
+        if anterior is not None and anterior.nombre != nombre:
+            self._quitar_nombre(id, anterior.nombre)
+        ids = self.ids_por_nombre.setdefault(nombre, [])
+        if id not in ids:
+            ids.append(id)
+        self.nombres_a_ids[nombre] = id
+
+    def _quitar_nombre(self, id, nombre):
+        ids = self.ids_por_nombre.get(nombre, [])
+        if id in ids:
+            ids.remove(id)
+        if not ids:
+            self.ids_por_nombre.pop(nombre, None)
+        if self.nombres_a_ids.get(nombre) == id:
+            if ids:
+                self.nombres_a_ids[nombre] = ids[-1]
+            else:
+                del self.nombres_a_ids[nombre]
 
     def agregar_estacion(self, id, datos):
         """
@@ -90,7 +192,8 @@ class Grafo:
                     "nombre": str,
                     "tipo": str,
                     "linea": str,
-                    "conexiones": list
+                    "conexiones": list,
+                    "es_transbordo": bool (opcional)
                 }
         """
         estacion = Estacion(
@@ -99,12 +202,14 @@ class Grafo:
             tipo=datos["tipo"],
             linea=datos["linea"],
             conexiones=datos["conexiones"],
-            coordenadas=datos.get("coordenadas")
+            coordenadas=datos.get("coordenadas"),
+            es_transbordo=datos.get("es_transbordo", False)
         )
+        self._indexar_nombre(id, datos["nombre"])
         self.vertices[id] = estacion
-        self.nombres_a_ids[datos["nombre"]] = id
         if id not in self.rutas:
             self.rutas[id] = {}
+        self.version += 1
 
     def agregar_ruta(self, origen, destino, datos):
         """
@@ -130,6 +235,49 @@ class Grafo:
         if origen not in self.rutas:
             self.rutas[origen] = {}
         self.rutas[origen][destino] = ruta_ida
+        self.rutas_entrantes.setdefault(destino, {})[origen] = ruta_ida
+        self.version += 1
+
+    def agregar_lote(self, estaciones, rutas, horarios=None):
+        """
+        Agrega de una vez estaciones y rutas ya construidas, con un único cambio de versión.
+        
+        Las estaciones y rutas existentes con el mismo ID o los mismos extremos se
+        reemplazan. Está pensado para cargas completas de la red.
+        
+        Args:
+            estaciones (iterable): Objetos Estacion
+            rutas (iterable): Objetos Ruta
+            horarios (dict, optional): Si se indica, reemplaza los horarios de la red
+        """
+        for estacion in estaciones:
+            self._indexar_nombre(estacion.id, estacion.nombre)
+            self.vertices[estacion.id] = estacion
+            self.rutas.setdefault(estacion.id, {})
+        for ruta in rutas:
+            self.rutas.setdefault(ruta.origen, {})[ruta.destino] = ruta
+            self.rutas_entrantes.setdefault(ruta.destino, {})[ruta.origen] = ruta
+        if horarios is not None:
+            self.horarios = horarios
+        self.version += 1
+
+    def diferir_rutas(self, construir):
+        """
+        Registra rutas que solo se construyen cuando se consultan por primera vez.
+        
+        Sirve para cargas en las que las búsquedas usan el grafo compilado y los
+        objetos Ruta rara vez hacen falta. Las rutas se añaden a las existentes
+        la primera vez que se accede a rutas o rutas_entrantes. La versión no cambia.
+        
+        Args:
+            construir (function): Función sin argumentos que devuelve un iterable de Ruta
+        """
+        with self._candado_rutas:
+            anterior = self._rutas_diferidas
+            if anterior is None:
+                self._rutas_diferidas = construir
+            else:
+                self._rutas_diferidas = lambda: itertools.chain(anterior(), construir())
 
     def obtener_tiempo(self, origen, destino):
         """
@@ -142,23 +290,83 @@ class Grafo:
         Returns:
             float: Tiempo de recorrido o float('inf') si no hay ruta
         """
+        if origen in self.cerradas or destino in self.cerradas:
+            return float('inf')
         if origen in self.rutas and destino in self.rutas[origen]:
-            return self.rutas[origen][destino].calcular_tiempo_actual()
+            return self.rutas[origen][destino].tiempo_en_banda(self.banda_actual())
         return float('inf')
 
-    def obtener_adyacentes(self, estacion):
+    def obtener_adyacentes(self, estacion, banda=None):
         """
         Obtiene las estaciones adyacentes y sus tiempos de recorrido.
         
         Args:
             estacion (str): ID de la estación
+            banda (str, optional): Banda de congestión. Si es None, usa la banda actual.
             
         Returns:
             dict: Diccionario {destino: tiempo} para cada estación adyacente
         """
-        if estacion not in self.rutas:
+        if estacion not in self.rutas or estacion in self.cerradas:
             return {}
-        return {destino: ruta.calcular_tiempo_actual() for destino, ruta in self.rutas[estacion].items()}
+        if banda is None:
+            banda = self.banda_actual()
+        return {
+            destino: ruta.tiempo_en_banda(banda)
+            for destino, ruta in self.rutas[estacion].items()
+            if destino not in self.cerradas
+        }
+
+    def banda_actual(self, momento=None):
+        """
+        Determina la banda de congestión vigente según los horarios de la red.
+        
+        Args:
+            momento (int | str | datetime, optional): Hora a consultar. Si es None, usa la hora actual.
+            
+        Returns:
+            str: Nombre de la banda de congestión
+        """
+        return banda_horaria(momento, self.horarios)
+
+    def sucesores(self, estacion):
+        """
+        Obtiene los IDs de las estaciones alcanzables con una sola ruta.
+        
+        Args:
+            estacion (str): ID de la estación
+            
+        Returns:
+            list: IDs de las estaciones adyacentes
+        """
+        if estacion in self.cerradas:
+            return []
+        return [destino for destino in self.rutas.get(estacion, {}) if destino not in self.cerradas]
+
+    def compilar(self):
+        """
+        Obtiene la representación compacta (CSR) del grafo para las búsquedas.
+        
+        La compilación se reutiliza mientras el grafo no se modifique.
+        
+        Returns:
+            GrafoCompilado: Grafo compilado correspondiente a la versión actual
+        """
+        if self._compilado is None or self._compilado.version != self.version:
+            self._compilado = GrafoCompilado(self)
+        return self._compilado
+
+    def usar_compilado(self, compilado):
+        """
+        Adopta un grafo compilado ya construido para la versión actual, por
+        ejemplo el leído de un snapshot, en lugar de compilarlo de nuevo.
+        
+        Args:
+            compilado (GrafoCompilado): Grafo compilado con la versión actual
+        """
+        if compilado.version != self.version:
+            raise ValueError("El grafo compilado no corresponde a la versión actual")
+        self._compilado = compilado
 
     def obtener_id_por_nombre(self, nombre):
         """
@@ -193,19 +401,12 @@ class Grafo:
         
         Args:
             archivo (str): Ruta al archivo JSON con los datos de la red
+            
+        Returns:
+            MetricasCarga: Resumen de la carga, como en cargador.cargar_red
         """
-        with open(archivo, 'r', encoding='utf-8') as f:
-            datos = json.load(f)
-        
-        # Cargar estaciones
-        for id, datos_estacion in datos["vertices"].items():
-            self.agregar_estacion(id, datos_estacion)
-        
-        # Cargar rutas
-        print(f"Total de rutas a cargar: {len(datos['rutas'])}")
-        for ruta in datos["rutas"]:
-            self.agregar_ruta(ruta["origen"], ruta["destino"], ruta)
-        print(f"Total de rutas cargadas: {sum(len(destinos) for destinos in self.rutas.values())}")
+        from src.cargador import cargar_red  # el cargador construye Estacion y Ruta de este módulo
+        return cargar_red(self, [archivo])
 
     def copia_sin_estacion(self, estacion_id):
         """
@@ -227,7 +428,8 @@ class Grafo:
                     "tipo": estacion.tipo,
                     "linea": estacion.linea,
                     "conexiones": estacion.conexiones.copy() if estacion.conexiones else [],
-                    "coordenadas": estacion.coordenadas
+                    "coordenadas": estacion.coordenadas,
+                    "es_transbordo": estacion.es_transbordo
                 }
                 nuevo_grafo.agregar_estacion(id, datos_estacion)
                 nuevo_grafo.nombres_a_ids[estacion.nombre] = id
@@ -244,30 +446,194 @@ class Grafo:
                         }
                         nuevo_grafo.agregar_ruta(origen, destino, datos_ruta)
         
+        nuevo_grafo.horarios = self.horarios
+        nuevo_grafo.cerradas = self.cerradas - {estacion_id}
         return nuevo_grafo
 
     def eliminar_estacion(self, estacion_id):
         """
         Elimina una estación y todas sus rutas asociadas del grafo.
         
+        Usa la adyacencia inversa y el índice de nombres, por lo que el coste es
+        proporcional al grado de la estación. Como cambia la numeración de las
+        estaciones, el grafo compilado se descarta y los suscriptores reciben un
+        cambio sin él. Para interrupciones temporales es preferible
+        cerrar_estacion, que no obliga a recompilar el grafo.
+        
         Args:
             estacion_id (str): ID de la estación a eliminar
+            
+        Returns:
+            CambioRed: El cambio aplicado
+            
+        Raises:
+            KeyError: Si la estación no existe
         """
-        # Eliminar la estación de los vértices
-        if estacion_id in self.vertices:
-            del self.vertices[estacion_id]
-        
-        # Eliminar la estación del mapeo de nombres a IDs
-        for nombre, id in list(self.nombres_a_ids.items()):
-            if id == estacion_id:
-                del self.nombres_a_ids[nombre]
+        if estacion_id not in self.vertices:
+            raise KeyError(f"No existe la estación {estacion_id}")
+        rutas = self._rutas_de_estacion(estacion_id)
+        # Eliminar la estación de los vértices y del mapeo de nombres a IDs
+        estacion = self.vertices.pop(estacion_id)
+        self._quitar_nombre(estacion_id, estacion.nombre)
+        self.cerradas.discard(estacion_id)
         
         # Eliminar todas las rutas que involucren la estación
-        if estacion_id in self.rutas:
-            del self.rutas[estacion_id]
-        
-        for origen in list(self.rutas.keys()):
-            if estacion_id in self.rutas[origen]:
-                del self.rutas[origen][estacion_id]
-            if not self.rutas[origen]:
-                del self.rutas[origen]
+        for destino in self.rutas.pop(estacion_id, {}):
+            self.rutas_entrantes.get(destino, {}).pop(estacion_id, None)
+        for origen in self.rutas_entrantes.pop(estacion_id, {}):
+            salientes = self.rutas.get(origen)
+            if salientes is not None:
+                salientes.pop(estacion_id, None)
+                if not salientes:
+                    del self.rutas[origen]
+        
+        self._compilado = None
+        return self._aplicar_cambio("eliminar_estacion", rutas, True)
+
+    def suscribir(self, funcion):
+        """
+        Registra una función que recibe un CambioRed tras cada modificación incremental.
+        
+        Args:
+            funcion (function): Función CambioRed -> None
+            
+        Returns:
+            function: La misma función, para poder cancelar la suscripción
+        """
+        self._suscriptores.append(funcion)
+        return funcion
+
+    def cancelar_suscripcion(self, funcion):
+        """
+        Deja de enviar cambios a una función registrada con suscribir.
+        
+        Args:
+            funcion (function): Función registrada
+        """
+        if funcion in self._suscriptores:
+            self._suscriptores.remove(funcion)
+
+    def _rutas_de_estacion(self, estacion_id):
+        salientes = [(estacion_id, destino) for destino in self.rutas.get(estacion_id, {})]
+        entrantes = [(origen, estacion_id) for origen in self.rutas_entrantes.get(estacion_id, {}) if origen != estacion_id]
+        return salientes + entrantes
+
+    def _ruta(self, origen, destino):
+        ruta = self.rutas.get(origen, {}).get(destino)
+        if ruta is None:
+            raise KeyError(f"No existe la ruta {origen} -> {destino}")
+        return ruta
+
+    def _aplicar_cambio(self, tipo, rutas, topologia):
+        """
+        Cierra una modificación incremental: actualiza en su lugar el grafo
+        compilado vigente (si lo hay), aumenta la versión y avisa a los suscriptores.
+        """
+        compilado = self._compilado
+        if compilado is not None and compilado.version != self.version:
+            compilado = None
+        version_anterior = self.version
+        self.version += 1
+        aristas, anteriores, aumenta = [], {}, False
+        if compilado is not None:
+            aristas, anteriores, aumenta = compilado.actualizar_aristas(self, rutas)
+            compilado.version = self.version
+        cambio = CambioRed(tipo, rutas, aristas, anteriores, aumenta, topologia, version_anterior, self.version, compilado)
+        for suscriptor in list(self._suscriptores):
+            suscriptor(cambio)
+        return cambio
+
+    def cerrar_estacion(self, estacion_id):
+        """
+        Cierra temporalmente una estación: sus rutas quedan fuera de servicio.
+        
+        Los datos de la estación y sus rutas se conservan para reabrirla. El coste
+        es proporcional a su grado; el grafo compilado se actualiza en su lugar.
+        
+        Args:
+            estacion_id (str): ID de la estación
+            
+        Returns:
+            CambioRed: El cambio aplicado, o None si ya estaba cerrada
+            
+        Raises:
+            KeyError: Si la estación no existe
+        """
+        if estacion_id not in self.vertices:
+            raise KeyError(f"No existe la estación {estacion_id}")
+        if estacion_id in self.cerradas:
+            return None
+        self.cerradas.add(estacion_id)
+        return self._aplicar_cambio("cerrar_estacion", self._rutas_de_estacion(estacion_id), True)
+
+    def reabrir_estacion(self, estacion_id):
+        """
+        Vuelve a poner en servicio una estación cerrada y sus rutas.
+        
+        Args:
+            estacion_id (str): ID de la estación
+            
+        Returns:
+            CambioRed: El cambio aplicado, o None si no estaba cerrada
+            
+        Raises:
+            KeyError: Si la estación no existe
+        """
+        if estacion_id not in self.vertices:
+            raise KeyError(f"No existe la estación {estacion_id}")
+        if estacion_id not in self.cerradas:
+            return None
+        self.cerradas.discard(estacion_id)
+        return self._aplicar_cambio("reabrir_estacion", self._rutas_de_estacion(estacion_id), True)
+
+    def cambiar_tiempo_ruta(self, origen, destino, tiempo):
+        """
+        Cambia el tiempo base de una ruta (por ejemplo, por obras o desvíos).
+        
+        Args:
+            origen (str): ID de la estación de origen
+            destino (str): ID de la estación de destino
+            tiempo (float): Nuevo tiempo base en minutos, positivo y finito
+            
+        Returns:
+            CambioRed: El cambio aplicado
+            
+        Raises:
+            KeyError: Si la ruta no existe
+            ValueError: Si el tiempo no es positivo y finito; para dejar una ruta
+                fuera de servicio debe cerrarse una de sus estaciones
+        """
+        if not 0 < tiempo < INF:
+            raise ValueError(f"Tiempo inválido: {tiempo}")
+        ruta = self._ruta(origen, destino)
+        ruta.tiempo_base = tiempo
+        ruta.tiempos = {banda: tiempo * factor for banda, factor in ruta.congestion_tipica.items()}
+        return self._aplicar_cambio("tiempo_ruta", [(origen, destino)], False)
+
+    def cambiar_congestion_ruta(self, origen, destino, banda, factor):
+        """
+        Cambia el factor de congestión de una ruta en una banda horaria.
+        
+        Args:
+            origen (str): ID de la estación de origen
+            destino (str): ID de la estación de destino
+            banda (str): Banda de congestión
+            factor (float): Nuevo factor sobre el tiempo base, positivo y finito
+            
+        Returns:
+            CambioRed: El cambio aplicado
+            
+        Raises:
+            KeyError: Si la ruta no existe
+            ValueError: Si el factor no es positivo y finito
+        """
+        if not 0 < factor < INF:
+            raise ValueError(f"Factor inválido: {factor}")
+        ruta = self._ruta(origen, destino)
+        ruta.congestion_tipica = dict(ruta.congestion_tipica, **{banda: factor})
+        ruta.tiempos = {b: ruta.tiempo_base * f for b, f in ruta.congestion_tipica.items()}
+        compilado = self._compilado
+        if compilado is not None and banda not in compilado.pesos:
+            # Banda nueva: el grafo compilado no tiene arreglo para ella y debe recompilarse
+            self._compilado = None
+        return self._aplicar_cambio("congestion_ruta", [(origen, destino)], False)
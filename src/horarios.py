@@ -0,0 +1,107 @@
+from datetime import datetime, time
+
+
+# Ventanas de hora pico usadas cuando la red no define su propio bloque "horarios"
+HORARIOS_POR_DEFECTO = {
+    "hora_pico_manana": {"inicio": "07:00", "fin": "09:00"},
+    "hora_pico_tarde": {"inicio": "17:00", "fin": "19:00"}
+}
+
+BANDA_NORMAL = "normal"
+
+
+def a_minutos(valor):
+    """
+    Convierte una hora del día a minutos desde la medianoche.
+
+    Args:
+        valor (str | int | datetime | time): Hora como 'HH:MM', hora entera (0-23),
+            datetime o time
+
+    Returns:
+        int: Minutos transcurridos desde la medianoche
+    """
+    if isinstance(valor, str):
+        horas, minutos = valor.split(":")
+        return int(horas) * 60 + int(minutos)
+    if isinstance(valor, (datetime, time)):
+        return valor.hour * 60 + valor.minute
+    return int(valor) * 60
+
+
+def ventanas_de_bandas(horarios=None):
+    """
+    Obtiene las ventanas horarias de congestión definidas en un bloque de horarios.
+
+    Solo se consideran bandas las entradas con "inicio" y "fin"; el resto
+    (por ejemplo "frecuencias") se ignora.
+
+    Args:
+        horarios (dict, optional): Bloque "horarios" de la red. Si es None o no
+            define ninguna ventana, se usan las ventanas por defecto.
+
+    Returns:
+        list: Tuplas (banda, inicio, fin) con inicio y fin en minutos
+    """
+    ventanas = [
+        (banda, a_minutos(datos["inicio"]), a_minutos(datos["fin"]))
+        for banda, datos in (horarios or {}).items()
+        if isinstance(datos, dict) and "inicio" in datos and "fin" in datos
+    ]
+    if not ventanas:
+        return ventanas_de_bandas(HORARIOS_POR_DEFECTO)
+    return ventanas
+
+
+def bandas_definidas(horarios=None):
+    """
+    Lista las bandas de congestión disponibles para un bloque de horarios.
+
+    Args:
+        horarios (dict, optional): Bloque "horarios" de la red
+
+    Returns:
+        list: Nombres de las bandas, terminando siempre en 'normal'
+    """
+    return [banda for banda, _, _ in ventanas_de_bandas(horarios)] + [BANDA_NORMAL]
+
+
+def banda_horaria(momento=None, horarios=None):
+    """
+    Determina la banda de congestión correspondiente a un momento del día.
+
+    Args:
+        momento (int | str | datetime | time, optional): Hora del día. Un entero se
+            interpreta como hora (0-23). Si es None, usa la hora actual.
+        horarios (dict, optional): Bloque "horarios" de la red con las ventanas de cada banda
+
+    Returns:
+        str: Nombre de la banda ('hora_pico_manana', 'hora_pico_tarde', 'normal', ...)
+    """
+    if momento is None:
+        momento = datetime.now()
+    minuto = a_minutos(momento) % 1440
+
+    for banda, inicio, fin in ventanas_de_bandas(horarios):
+        if inicio <= fin:
+            if inicio <= minuto < fin:
+                return banda
+        elif minuto >= inicio or minuto < fin:
+            # Ventana que cruza la medianoche
+            return banda
+    return BANDA_NORMAL
+
+
+def formatear_hora(minutos):
+    """
+    Convierte minutos desde la medianoche a una hora del día 'HH:MM'.
+
+    Args:
+        minutos (float): Minutos desde la medianoche; los valores de días
+            siguientes se reducen a la hora del día
+
+    Returns:
+        str: Hora en formato 'HH:MM'
+    """
+    minutos = int(minutos) % 1440
+    return f"{minutos // 60:02d}:{minutos % 60:02d}"
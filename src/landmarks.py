@@ -0,0 +1,234 @@
+import json
+import logging
+import os
+
+from src.dijkstra import INF, distancias_desde, distancias_hacia
+
+logger = logging.getLogger(__name__)
+
+
+def ruta_tablas(archivo_red):
+    """
+    Obtiene la ruta del archivo de tablas ALT asociado a un archivo de red.
+
+    Args:
+        archivo_red (str): Ruta al archivo JSON de la red (por ejemplo 'src/data/red.json')
+
+    Returns:
+        str: Ruta del archivo de tablas, junto al de la red
+    """
+    base, _ = os.path.splitext(archivo_red)
+    return f"{base}.landmarks.json"
+
+
+def seleccionar_landmarks(compilado, cantidad=4, banda="normal"):
+    """
+    Elige las estaciones que servirán como landmarks.
+
+    Se prefieren las estaciones terminales (con un único vecino) y entre ellas
+    se elige repetidamente la más alejada de los landmarks ya escogidos.
+
+    Args:
+        compilado (GrafoCompilado): Grafo compilado
+        cantidad (int): Número de landmarks deseado
+        banda (str): Banda cuyos tiempos se usan para medir la separación
+
+    Returns:
+        list: Índices de las estaciones elegidas
+    """
+    n = len(compilado)
+    if not n or cantidad < 1:
+        return []
+    pesos = compilado.pesos_de(banda)
+
+    vecinos = [set() for _ in range(n)]
+    for e in range(compilado.num_aristas):
+        vecinos[compilado.origenes[e]].add(compilado.destinos[e])
+        vecinos[compilado.destinos[e]].add(compilado.origenes[e])
+    terminales = [i for i in range(n) if len(vecinos[i]) <= 1]
+    candidatos = terminales if len(terminales) >= cantidad else list(range(n))
+
+    # El primer landmark es el candidato alcanzable más alejado de otro candidato
+    desde_inicio = distancias_desde(compilado, candidatos[0], pesos)
+    elegidos = [max(candidatos, key=lambda i: desde_inicio[i] if desde_inicio[i] != INF else -1)]
+
+    # La separación de cada estación es su menor distancia de ida y vuelta a un landmark
+    separacion = [INF] * n
+    while True:
+        ida = distancias_desde(compilado, elegidos[-1], pesos)
+        vuelta = distancias_hacia(compilado, elegidos[-1], pesos)
+        separacion = [min(separacion[i], ida[i] + vuelta[i]) for i in range(n)]
+        if len(elegidos) >= min(cantidad, len(candidatos)):
+            break
+        elegidos.append(max((i for i in candidatos if i not in elegidos), key=separacion.__getitem__))
+    return elegidos
+
+
+class TablasLandmarks:
+    """
+    Tablas de distancias desde y hacia un conjunto de landmarks para cada banda
+    de congestión, usadas como cotas inferiores en la búsqueda A* (ALT).
+
+    Por la desigualdad triangular, para cualquier landmark L:
+        d(v, t) >= d(L, t) - d(L, v)   y   d(v, t) >= d(v, L) - d(t, L)
+
+    Attributes:
+        landmarks (list): IDs de las estaciones landmark
+        huella (str): Huella del grafo compilado para el que se calcularon
+        adelante (dict): banda -> lista de tablas d(L, v) indexadas por estación
+        atras (dict): banda -> lista de tablas d(v, L) indexadas por estación
+    """
+    def __init__(self, landmarks, huella, adelante, atras):
+        self.landmarks = landmarks
+        self.huella = huella
+        self.adelante = adelante
+        self.atras = atras
+
+    @classmethod
+    def calcular(cls, compilado, cantidad=4, landmarks=None):
+        """
+        Calcula las tablas para todas las bandas del grafo compilado.
+
+        Args:
+            compilado (GrafoCompilado): Grafo compilado
+            cantidad (int): Número de landmarks a elegir si no se indican
+            landmarks (list, optional): IDs de los landmarks a usar
+
+        Returns:
+            TablasLandmarks: Tablas calculadas
+        """
+        if landmarks is None:
+            indices = seleccionar_landmarks(compilado, cantidad)
+        else:
+            indices = [compilado.indice(id) for id in landmarks if compilado.indice(id) is not None]
+
+        adelante, atras = {}, {}
+        for banda, pesos in compilado.pesos.items():
+            adelante[banda] = [distancias_desde(compilado, i, pesos) for i in indices]
+            atras[banda] = [distancias_hacia(compilado, i, pesos) for i in indices]
+        return cls([compilado.ids[i] for i in indices], compilado.huella(), adelante, atras)
+
+    def cota_hacia(self, banda, destino):
+        """
+        Construye la función de cota inferior hacia un destino.
+
+        Args:
+            banda (str): Banda de congestión de la consulta
+            destino (int): Índice de la estación de destino
+
+        Returns:
+            function: Función nodo -> cota inferior del tiempo hasta el destino
+                (float('inf') si el nodo no puede llegar), o None si no hay tablas para la banda
+        """
+        if banda not in self.adelante:
+            return None
+        pares = [
+            (ida, ida[destino], vuelta, vuelta[destino])
+            for ida, vuelta in zip(self.adelante[banda], self.atras[banda])
+        ]
+
+        def cota(nodo):
+            mejor = 0.0
+            for ida, ida_destino, vuelta, vuelta_destino in pares:
+                ida_nodo = ida[nodo]
+                if ida_destino != INF:
+                    if ida_nodo != INF and ida_destino - ida_nodo > mejor:
+                        mejor = ida_destino - ida_nodo
+                elif ida_nodo != INF:
+                    # El landmark llega al nodo pero no al destino: el nodo no llega al destino
+                    return INF
+                vuelta_nodo = vuelta[nodo]
+                if vuelta_nodo != INF:
+                    if vuelta_destino != INF and vuelta_nodo - vuelta_destino > mejor:
+                        mejor = vuelta_nodo - vuelta_destino
+                elif vuelta_destino != INF:
+                    # El destino llega al landmark pero el nodo no: el nodo no llega al destino
+                    return INF
+            return mejor
+
+        return cota
+
+    def guardar(self, archivo):
+        """
+        Guarda las tablas en un archivo JSON.
+
+        Args:
+            archivo (str): Ruta del archivo de destino
+        """
+        def serializar(tablas):
+            return {
+                banda: [[None if d == INF else d for d in tabla] for tabla in lista]
+                for banda, lista in tablas.items()
+            }
+
+        with open(archivo, 'w', encoding='utf-8') as f:
+            json.dump({
+                "huella": self.huella,
+                "landmarks": self.landmarks,
+                "adelante": serializar(self.adelante),
+                "atras": serializar(self.atras)
+            }, f)
+
+    @classmethod
+    def cargar(cls, archivo, compilado):
+        """
+        Carga tablas guardadas si corresponden al grafo compilado.
+
+        Args:
+            archivo (str): Ruta del archivo de tablas
+            compilado (GrafoCompilado): Grafo compilado actual
+
+        Returns:
+            TablasLandmarks: Tablas cargadas, o None si no existen o están desactualizadas
+        """
+        if not os.path.exists(archivo):
+            return None
+        try:
+            with open(archivo, 'r', encoding='utf-8') as f:
+                datos = json.load(f)
+        except (OSError, ValueError):
+            logger.warning(f"No se pudieron leer las tablas de landmarks en {archivo}")
+            return None
+        if datos.get("huella") != compilado.huella():
+            return None
+
+        def deserializar(tablas):
+            return {
+                banda: [[INF if d is None else d for d in tabla] for tabla in lista]
+                for banda, lista in tablas.items()
+            }
+
+        return cls(datos["landmarks"], datos["huella"], deserializar(datos["adelante"]), deserializar(datos["atras"]))
+
+
+def obtener_landmarks(grafo, archivo, cantidad=4, ejecutor=None):
+    """
+    Asocia tablas ALT al grafo compilado, reutilizando las que ya tenga (por
+    ejemplo, leídas de un snapshot) o las guardadas en disco si siguen siendo
+    válidas, o recalculándolas y guardándolas en caso contrario.
+
+    Args:
+        grafo (Grafo | GrafoCompilado): Grafo de la red
+        archivo (str): Ruta del archivo de tablas
+        cantidad (int): Número de landmarks a elegir si hay que recalcular
+        ejecutor (EjecutorParalelo, optional): Si se indica, las tablas se
+            recalculan repartidas entre sus procesos
+
+    Returns:
+        TablasLandmarks: Tablas asociadas al grafo compilado
+    """
+    compilado = grafo.compilar()
+    tablas = compilado.landmarks
+    if tablas is None or tablas.huella != compilado.huella():
+        tablas = TablasLandmarks.cargar(archivo, compilado)
+    if tablas is None:
+        if ejecutor is not None:
+            tablas = ejecutor.calcular_landmarks(cantidad)
+        else:
+            tablas = TablasLandmarks.calcular(compilado, cantidad)
+        try:
+            tablas.guardar(archivo)
+        except OSError:
+            logger.warning(f"No se pudieron guardar las tablas de landmarks en {archivo}")
+    compilado.landmarks = tablas
+    return tablas
@@ -0,0 +1,309 @@
+import heapq
+from array import array
+from collections import Counter
+
+from src.dependiente_tiempo import espera_media, TIPOS_SIN_ESPERA
+from src.dijkstra import INF
+
+
+# Minutos que se suman a cada cambio de línea, además de la espera del vehículo
+PENALIZACION_TRANSBORDO = 3.0
+
+# Tipos de arista del grafo expandido
+VIAJE, A_PIE, SUBIR, BAJAR = 0, 1, 2, 3
+
+
+def linea_de_ruta(origen, destino, tipo):
+    """
+    Determina la línea a la que pertenece una ruta entre dos estaciones.
+
+    Si las estaciones comparten línea, la ruta es de esa línea. Si no (por
+    ejemplo San Antonio -> Cisneros, el primer tramo de la línea B), la ruta
+    pertenece a la línea del extremo de su mismo modo que no es intercambiador;
+    si hay varios candidatos se elige la primera línea en orden alfabético,
+    de modo que la ida y la vuelta quedan en la misma línea.
+
+    Args:
+        origen (Estacion): Estación de origen
+        destino (Estacion): Estación de destino
+        tipo (str): Tipo de la ruta
+
+    Returns:
+        str: Nombre de la línea, o None si la ruta se recorre a pie
+    """
+    if tipo in TIPOS_SIN_ESPERA:
+        return None
+    lineas_origen = set(origen.linea.split('-'))
+    lineas_destino = set(destino.linea.split('-'))
+    comunes = lineas_origen & lineas_destino
+    if comunes:
+        return min(comunes)
+    extremos = [estacion for estacion in (origen, destino) if estacion.tipo == tipo] or [origen, destino]
+    propios = [estacion for estacion in extremos if not estacion.es_intercambiador] or extremos
+    return min(min(estacion.linea.split('-')) for estacion in propios)
+
+
+class GrafoLineas:
+    """
+    Grafo expandido por línea para calcular rutas con transbordos realistas.
+
+    Cada estación tiene un nodo de calle (con el mismo índice que en el grafo
+    compilado) y un nodo de andén por cada línea que pasa por ella. Los
+    viajes van de andén a andén de la misma línea; subir a una línea cuesta la
+    espera media de su modo en la banda más la penalización de transbordo, y
+    bajar no cuesta nada. Las rutas a pie (transbordos entre estaciones) unen
+    nodos de calle. Se compila una vez por grafo compilado y los cambios
+    incrementales de tiempos se copian con actualizar.
+
+    Attributes:
+        compilado (GrafoCompilado): Grafo compilado del que se expandió
+        penalizacion (float): Minutos añadidos a cada cambio de línea
+        lineas (list): Nombre de cada línea
+        modos (list): Modo (tipo de ruta) de cada línea
+        estacion_de (array): Índice de estación de cada nodo
+        linea_de (array): Índice de línea de cada nodo (-1 en los nodos de calle)
+        andenes (dict): (estación, línea) -> nodo de andén
+        offsets (array): Desplazamientos CSR de las aristas de cada nodo
+        destinos (array): Nodo destino de cada arista
+        origenes (array): Nodo origen de cada arista
+        clases (array): VIAJE, A_PIE, SUBIR o BAJAR para cada arista
+        originales (array): Arista del grafo compilado de cada viaje o ruta a pie (-1 si no tiene)
+        pesos (dict): Tiempos por arista para cada banda (banda -> array)
+    """
+    def __init__(self, compilado, penalizacion=PENALIZACION_TRANSBORDO):
+        self.compilado = compilado
+        self.penalizacion = penalizacion
+        n = len(compilado)
+        estaciones = compilado.estaciones
+
+        indices_lineas = {}
+        self.lineas = []
+        modos = []
+        linea_de_arista = array('l')
+        for e in range(compilado.num_aristas):
+            tipo = compilado.tipos[e]
+            linea = linea_de_ruta(estaciones[compilado.origenes[e]], estaciones[compilado.destinos[e]], tipo)
+            if linea is None:
+                linea_de_arista.append(-1)
+                continue
+            if linea not in indices_lineas:
+                indices_lineas[linea] = len(self.lineas)
+                self.lineas.append(linea)
+                modos.append(Counter())
+            linea_de_arista.append(indices_lineas[linea])
+            modos[indices_lineas[linea]][tipo] += 1
+        self.modos = [conteo.most_common(1)[0][0] for conteo in modos]
+
+        self.estacion_de = array('l', range(n))
+        self.linea_de = array('l', [-1] * n)
+        self.andenes = {}
+        for e in range(compilado.num_aristas):
+            linea = linea_de_arista[e]
+            if linea < 0:
+                continue
+            for estacion in (compilado.origenes[e], compilado.destinos[e]):
+                if (estacion, linea) not in self.andenes:
+                    self.andenes[(estacion, linea)] = len(self.estacion_de)
+                    self.estacion_de.append(estacion)
+                    self.linea_de.append(linea)
+
+        # Aristas agrupadas por nodo de origen: (destino, clase, arista original)
+        salientes = [[] for _ in range(len(self.estacion_de))]
+        for e in range(compilado.num_aristas):
+            origen, destino, linea = compilado.origenes[e], compilado.destinos[e], linea_de_arista[e]
+            if linea < 0:
+                salientes[origen].append((destino, A_PIE, e))
+            else:
+                salientes[self.andenes[(origen, linea)]].append((self.andenes[(destino, linea)], VIAJE, e))
+        for (estacion, _), anden in self.andenes.items():
+            salientes[estacion].append((anden, SUBIR, -1))
+            salientes[anden].append((estacion, BAJAR, -1))
+
+        self.offsets = array('l', [0])
+        self.destinos = array('l')
+        self.origenes = array('l')
+        self.clases = array('b')
+        self.originales = array('l')
+        for nodo, aristas in enumerate(salientes):
+            for destino, clase, original in aristas:
+                self.destinos.append(destino)
+                self.origenes.append(nodo)
+                self.clases.append(clase)
+                self.originales.append(original)
+            self.offsets.append(len(self.destinos))
+        # Arista expandida de cada arista compilada, para los cambios incrementales
+        self._expandidas = array('l', [-1] * compilado.num_aristas)
+        for e, original in enumerate(self.originales):
+            if original >= 0:
+                self._expandidas[original] = e
+
+        self.pesos = {banda: self._pesos_banda(banda) for banda in compilado.pesos}
+
+    def _pesos_banda(self, banda):
+        pesos_compilados = self.compilado.pesos[banda]
+        esperas = [espera_media(self.compilado.horarios, modo, banda) + self.penalizacion for modo in self.modos]
+        pesos = array('d')
+        for e, clase in enumerate(self.clases):
+            if clase == SUBIR:
+                pesos.append(esperas[self.linea_de[self.destinos[e]]])
+            elif clase == BAJAR:
+                pesos.append(0.0)
+            else:
+                pesos.append(pesos_compilados[self.originales[e]])
+        return pesos
+
+    def __len__(self):
+        return len(self.estacion_de)
+
+    @property
+    def num_aristas(self):
+        """int: Número total de aristas del grafo expandido."""
+        return len(self.destinos)
+
+    def actualizar(self, aristas):
+        """
+        Copia los tiempos actuales de algunas aristas del grafo compilado.
+
+        Args:
+            aristas (list): Índices de aristas del grafo compilado
+        """
+        for banda, pesos in self.pesos.items():
+            pesos_compilados = self.compilado.pesos[banda]
+            for e in aristas:
+                pesos[self._expandidas[e]] = pesos_compilados[e]
+
+    def _buscar(self, origen, destino, pesos, esperas):
+        """
+        Dijkstra desde la calle de la estación de origen: se parte de ella y de
+        cada andén de origen con solo la espera (el primer abordaje no es un
+        transbordo) y termina al fijar la calle de la estación de destino.
+        """
+        offsets, destinos = self.offsets, self.destinos
+        distancias = [INF] * len(self)
+        arista_previa = [-1] * len(self)
+        cerrados = bytearray(len(self))
+        distancias[origen] = 0
+        cola = [(0, origen)]
+        for e in range(offsets[origen], offsets[origen + 1]):
+            if self.clases[e] == SUBIR:
+                anden = destinos[e]
+                distancias[anden] = esperas[self.linea_de[anden]]
+                cola.append((distancias[anden], anden))
+        heapq.heapify(cola)
+
+        while cola:
+            actual_dist, actual = heapq.heappop(cola)
+            if cerrados[actual]:
+                continue
+            cerrados[actual] = 1
+            if actual == destino:
+                break
+            for e in range(offsets[actual], offsets[actual + 1]):
+                vecino = destinos[e]
+                if cerrados[vecino]:
+                    continue
+                nueva_dist = actual_dist + pesos[e]
+                if nueva_dist < distancias[vecino]:
+                    distancias[vecino] = nueva_dist
+                    arista_previa[vecino] = e
+                    heapq.heappush(cola, (nueva_dist, vecino))
+        return distancias, arista_previa
+
+    def ruta(self, origen, destino, banda=None):
+        """
+        Calcula la ruta más rápida contando esperas y penalizaciones de transbordo.
+
+        Args:
+            origen (str): ID de la estación de origen
+            destino (str): ID de la estación de destino
+            banda (str, optional): Banda de congestión. Si es None, usa la vigente.
+
+        Returns:
+            dict: {
+                "tiempo": float (float('inf') si no existe ruta),
+                "camino": list (IDs de las estaciones recorridas),
+                "tramos": list ({"linea", "modo", "estaciones"} por cada vehículo
+                    o {"linea": None, "modo": "transbordo", ...} por cada tramo a pie),
+                "transbordos": int (cambios de línea)
+            }
+        """
+        compilado = self.compilado
+        banda = compilado.resolver_banda(banda)
+        s, t = compilado.indice(origen), compilado.indice(destino)
+        if s is None or t is None:
+            return {"tiempo": INF, "camino": [], "tramos": [], "transbordos": 0}
+        if s == t:
+            return {"tiempo": 0, "camino": [origen], "tramos": [], "transbordos": 0}
+        esperas = [espera_media(compilado.horarios, modo, banda) for modo in self.modos]
+        distancias, arista_previa = self._buscar(s, t, self.pesos[banda], esperas)
+        if distancias[t] == INF:
+            return {"tiempo": INF, "camino": [], "tramos": [], "transbordos": 0}
+
+        aristas = []
+        nodo = t
+        while arista_previa[nodo] != -1:
+            aristas.append(arista_previa[nodo])
+            nodo = self.origenes[arista_previa[nodo]]
+        aristas.reverse()
+
+        camino = [compilado.ids[s]]
+        tramos = []
+        subio = True  # La búsqueda puede empezar ya en un andén del origen
+        for e in aristas:
+            clase = self.clases[e]
+            if clase == SUBIR:
+                subio = True
+                continue
+            if clase == BAJAR:
+                continue
+            siguiente = compilado.ids[self.estacion_de[self.destinos[e]]]
+            if clase == A_PIE:
+                tramos.append({"linea": None, "modo": compilado.tipos[self.originales[e]], "estaciones": [camino[-1]]})
+            elif subio:
+                linea = self.linea_de[self.destinos[e]]
+                tramos.append({"linea": self.lineas[linea], "modo": self.modos[linea], "estaciones": [camino[-1]]})
+                subio = False
+            tramos[-1]["estaciones"].append(siguiente)
+            camino.append(siguiente)
+        vehiculos = sum(1 for tramo in tramos if tramo["linea"] is not None)
+        return {
+            "tiempo": distancias[t],
+            "camino": camino,
+            "tramos": tramos,
+            "transbordos": max(0, vehiculos - 1)
+        }
+
+
+def obtener_grafo_lineas(grafo, penalizacion=PENALIZACION_TRANSBORDO):
+    """
+    Obtiene el grafo expandido por línea del grafo, compilándolo la primera vez.
+
+    Args:
+        grafo (Grafo | GrafoCompilado): Grafo de la red
+        penalizacion (float): Minutos añadidos a cada cambio de línea
+
+    Returns:
+        GrafoLineas: Grafo expandido asociado al grafo compilado
+    """
+    compilado = grafo.compilar()
+    if compilado.expandido is None or compilado.expandido.penalizacion != penalizacion:
+        compilado.expandido = GrafoLineas(compilado, penalizacion)
+    return compilado.expandido
+
+
+def ruta_con_transbordos(grafo, origen, destino, banda=None, penalizacion=PENALIZACION_TRANSBORDO):
+    """
+    Calcula la ruta más rápida teniendo en cuenta las esperas al subir a cada
+    línea y la penalización por cambiar de línea.
+
+    Args:
+        grafo (Grafo | GrafoCompilado): Grafo de la red
+        origen (str): ID de la estación de origen
+        destino (str): ID de la estación de destino
+        banda (str, optional): Banda de congestión. Si es None, usa la vigente.
+        penalizacion (float): Minutos añadidos a cada cambio de línea
+
+    Returns:
+        dict: Tiempo, camino, tramos y transbordos, como en GrafoLineas.ruta
+    """
+    return obtener_grafo_lineas(grafo, penalizacion).ruta(origen, destino, banda)
@@ -0,0 +1,204 @@
+from array import array
+
+from src.dijkstra import INF, arbol_caminos_minimos
+
+
+def fila_matriz(compilado, pesos, origen):
+    """
+    Calcula la fila de la matriz de tiempos y de siguiente salto de una estación.
+
+    Args:
+        compilado (GrafoCompilado): Grafo compilado
+        pesos (array): Tiempo de cada arista en la banda
+        origen (int): Índice de la estación de origen
+
+    Returns:
+        tuple: (distancias, siguiente) donde siguiente[v] es la estación que sigue
+            al origen en el camino mínimo hacia v (-1 si v es inalcanzable o es el origen)
+    """
+    distancias, arista_previa, orden = arbol_caminos_minimos(compilado, origen, pesos)
+    siguiente = [-1] * len(compilado)
+    # En el orden en que se fijaron, cada estación hereda el primer salto de su
+    # predecesora (el orden por distancia no basta con aristas de tiempo cero)
+    for nodo in orden[1:]:
+        padre = compilado.origenes[arista_previa[nodo]]
+        siguiente[nodo] = nodo if padre == origen else siguiente[padre]
+    return distancias, siguiente
+
+
+def calcular_matriz(compilado, banda=None):
+    """
+    Calcula las matrices de tiempos mínimos y de siguiente salto entre todos
+    los pares de estaciones, con una búsqueda de Dijkstra por origen.
+
+    Args:
+        compilado (GrafoCompilado): Grafo compilado
+        banda (str, optional): Banda de congestión. Si es None, usa la vigente.
+
+    Returns:
+        tuple: (distancias, siguiente) como arreglos planos de n*n elementos en
+            orden por filas (origen * n + destino)
+    """
+    pesos = compilado.pesos_de(banda)
+    distancias = array('d')
+    siguiente = array('l')
+    for origen in range(len(compilado)):
+        fila_distancias, fila_siguiente = fila_matriz(compilado, pesos, origen)
+        distancias.extend(fila_distancias)
+        siguiente.extend(fila_siguiente)
+    return distancias, siguiente
+
+
+class MatrizTiempos:
+    """
+    Caché de las matrices de tiempos entre todos los pares de estaciones.
+
+    Las matrices de cada banda se calculan la primera vez que se consultan y se
+    descartan cuando cambia la versión del grafo, de modo que las consultas
+    se responden con una búsqueda en tabla y la reconstrucción del camino.
+    Suscrita a los cambios incrementales del grafo (aplicar_cambio), solo
+    recalcula las filas de los orígenes afectados.
+
+    Attributes:
+        grafo (Grafo): Grafo de la red
+        ejecutor (EjecutorParalelo): Si no es None, las matrices se calculan
+            repartidas entre sus procesos
+    """
+    def __init__(self, grafo, ejecutor=None):
+        self.grafo = grafo
+        self.ejecutor = ejecutor
+        self._matrices = {}  # banda -> (compilado, version, distancias, siguiente)
+
+    def invalidar(self):
+        """Descarta todas las matrices calculadas."""
+        self._matrices.clear()
+
+    def calculada(self, banda=None):
+        """
+        Indica si las matrices de una banda ya están calculadas para la versión
+        actual del grafo, es decir, si una consulta se resuelve sin buscar.
+
+        Args:
+            banda (str, optional): Banda de congestión. Si es None, usa la vigente.
+
+        Returns:
+            bool: True si las matrices están disponibles
+        """
+        compilado = self.grafo.compilar()
+        guardadas = self._matrices.get(compilado.resolver_banda(banda))
+        return guardadas is not None and guardadas[0] is compilado and guardadas[1] == compilado.version
+
+    def matrices(self, banda=None):
+        """
+        Obtiene las matrices de una banda, calculándolas si hace falta.
+
+        Args:
+            banda (str, optional): Banda de congestión. Si es None, usa la vigente.
+
+        Returns:
+            tuple: (compilado, distancias, siguiente)
+        """
+        compilado = self.grafo.compilar()
+        banda = compilado.resolver_banda(banda)
+        guardadas = self._matrices.get(banda)
+        if guardadas is None or guardadas[0] is not compilado or guardadas[1] != compilado.version:
+            if guardadas is not None:
+                # El grafo cambió: ninguna matriz anterior es válida
+                self._matrices.clear()
+            if banda in compilado.matrices:
+                # Precargadas con el grafo compilado, por ejemplo desde un snapshot
+                guardadas = (compilado, compilado.version) + tuple(compilado.matrices[banda])
+            elif self.ejecutor is not None:
+                guardadas = (compilado, compilado.version) + self.ejecutor.calcular_matriz(banda)
+            else:
+                guardadas = (compilado, compilado.version) + calcular_matriz(compilado, banda)
+            self._matrices[banda] = guardadas
+        return guardadas[0], guardadas[2], guardadas[3]
+
+    def aplicar_cambio(self, cambio):
+        """
+        Actualiza las matrices calculadas tras un cambio incremental del grafo.
+
+        Si ningún tiempo disminuyó, una fila solo puede cambiar si alguna arista
+        modificada estaba en un camino mínimo desde su origen (es decir, si
+        distancia[s][u] + tiempo anterior == distancia[s][v]); solo esas filas se
+        recalculan. En otro caso, o si se ven afectados más de la mitad de los
+        orígenes, las matrices se descartan y se calculan en la siguiente consulta.
+
+        Args:
+            cambio (CambioRed): Cambio enviado por Grafo.suscribir
+        """
+        compilado = cambio.compilado
+        if compilado is None or not cambio.aumenta:
+            self.invalidar()
+            return
+        n = len(compilado)
+        aristas = [(compilado.origenes[e], compilado.destinos[e]) for e in cambio.aristas]
+        for banda, (guardado, version, distancias, siguiente) in list(self._matrices.items()):
+            if guardado is not compilado or version != cambio.version_anterior:
+                del self._matrices[banda]
+                continue
+            anteriores = cambio.anteriores[banda]
+            afectados = [
+                s for s in range(n)
+                if any(
+                    distancias[s * n + u] != INF and distancias[s * n + u] + peso == distancias[s * n + v]
+                    for (u, v), peso in zip(aristas, anteriores)
+                )
+            ]
+            if len(afectados) > n // 2:
+                del self._matrices[banda]
+                continue
+            if afectados:
+                # Las matrices leídas de un snapshot son de solo lectura
+                distancias = distancias if isinstance(distancias, array) else array('d', distancias)
+                siguiente = siguiente if isinstance(siguiente, array) else array('l', siguiente)
+                pesos = compilado.pesos[banda]
+                for s in afectados:
+                    fila_distancias, fila_siguiente = fila_matriz(compilado, pesos, s)
+                    distancias[s * n:(s + 1) * n] = array('d', fila_distancias)
+                    siguiente[s * n:(s + 1) * n] = array('l', fila_siguiente)
+            self._matrices[banda] = (compilado, cambio.version, distancias, siguiente)
+
+    def tiempo(self, origen, destino, banda=None):
+        """
+        Obtiene el tiempo mínimo entre dos estaciones.
+
+        Args:
+            origen (str): ID de la estación de origen
+            destino (str): ID de la estación de destino
+            banda (str, optional): Banda de congestión. Si es None, usa la vigente.
+
+        Returns:
+            float: Tiempo mínimo o float('inf') si no existe ruta
+        """
+        compilado, distancias, _ = self.matrices(banda)
+        s, t = compilado.indice(origen), compilado.indice(destino)
+        if s is None or t is None:
+            return INF
+        return distancias[s * len(compilado) + t]
+
+    def ruta(self, origen, destino, banda=None):
+        """
+        Obtiene el camino mínimo entre dos estaciones siguiendo la matriz de siguiente salto.
+
+        Args:
+            origen (str): ID de la estación de origen
+            destino (str): ID de la estación de destino
+            banda (str, optional): Banda de congestión. Si es None, usa la vigente.
+
+        Returns:
+            tuple: (tiempo, camino) como en ruta_mas_corta; (float('inf'), []) si no existe ruta
+        """
+        compilado, distancias, siguiente = self.matrices(banda)
+        s, t = compilado.indice(origen), compilado.indice(destino)
+        if s is None or t is None:
+            return INF, []
+        n = len(compilado)
+        tiempo = distancias[s * n + t]
+        if tiempo == INF:
+            return INF, []
+        camino = [s]
+        while camino[-1] != t and len(camino) <= n:
+            camino.append(siguiente[camino[-1] * n + t])
+        return tiempo, [compilado.ids[nodo] for nodo in camino]
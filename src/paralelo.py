@@ -0,0 +1,385 @@
+import itertools
+import multiprocessing
+import os
+import threading
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from multiprocessing import shared_memory
+
+from src.dijkstra import INF, distancias_a_objetivos, distancias_desde, distancias_hacia
+from src.landmarks import TablasLandmarks, seleccionar_landmarks
+from src.matriz import fila_matriz
+
+
+# Arreglos de la estructura del grafo compilado que usan los trabajadores
+_ESTRUCTURA = ("offsets", "destinos", "origenes", "offsets_inv", "aristas_inv")
+
+# Publicaciones que cada trabajador mantiene abiertas: la vigente y la de un cálculo aún en curso
+_PUBLICACIONES_ABIERTAS = 2
+
+# Bloques de memoria compartida abiertos en cada proceso trabajador y grafos construidos sobre ellos
+_bloques = {}
+_grafos = {}
+
+
+class _GrafoCompartido:
+    """
+    Vista de solo lectura, en un proceso trabajador, de un grafo compilado
+    publicado en memoria compartida. Expone lo que usan las búsquedas.
+
+    Attributes:
+        clave (int): Clave de la publicación
+        bloques (set): Nombres de los bloques de memoria compartida que usa
+        pesos (dict): banda -> tiempo de cada arista
+    """
+    def __init__(self, publicacion):
+        self.clave = publicacion["clave"]
+        self._n = publicacion["n"]
+        self._vistas = []
+        self.bloques = {publicacion["estructura"][0]}
+        for campo, vista in self._mapear(*publicacion["estructura"]).items():
+            setattr(self, campo, vista)
+        self.pesos = {}
+        for banda, (nombre, disposicion) in publicacion["pesos"].items():
+            self.bloques.add(nombre)
+            self.pesos[banda] = self._mapear(nombre, disposicion)["pesos"]
+
+    def _mapear(self, nombre, disposicion):
+        """Abre un bloque (si hace falta) y obtiene una vista tipada de cada arreglo."""
+        if nombre not in _bloques:
+            _bloques[nombre] = shared_memory.SharedMemory(name=nombre)
+        memoria = _bloques[nombre].buf
+        vistas = {}
+        for campo, (inicio, formato, cantidad) in disposicion.items():
+            bytes_ = memoria[inicio:inicio + cantidad * array(formato).itemsize]
+            vistas[campo] = bytes_.cast(formato)
+            self._vistas += [bytes_, vistas[campo]]
+        return vistas
+
+    def __len__(self):
+        return self._n
+
+    def liberar(self):
+        """Suelta las vistas para que los bloques se puedan cerrar."""
+        for vista in reversed(self._vistas):
+            vista.release()
+        self._vistas = []
+
+
+def _grafo(publicacion):
+    """
+    Obtiene el grafo de una publicación en el proceso trabajador. Al pasar a
+    una publicación nueva se cierran los bloques que ya no usa ninguna de las
+    que se mantienen abiertas.
+    """
+    grafo = _grafos.get(publicacion["clave"])
+    if grafo is None:
+        grafo = _grafos[publicacion["clave"]] = _GrafoCompartido(publicacion)
+        while len(_grafos) > _PUBLICACIONES_ABIERTAS:
+            _grafos.pop(min(_grafos)).liberar()
+        en_uso = set().union(*(abierto.bloques for abierto in _grafos.values()))
+        for nombre in [nombre for nombre in _bloques if nombre not in en_uso]:
+            _bloques.pop(nombre).close()
+    return grafo
+
+
+def _filas_matriz(publicacion, banda, origenes):
+    """Filas de las matrices de tiempos y de siguiente salto de un lote de orígenes."""
+    compilado = _grafo(publicacion)
+    pesos = compilado.pesos[banda]
+    distancias = array('d')
+    siguiente = array('l')
+    for origen in origenes:
+        fila_distancias, fila_siguiente = fila_matriz(compilado, pesos, origen)
+        distancias.extend(fila_distancias)
+        siguiente.extend(fila_siguiente)
+    return distancias, siguiente
+
+
+def _filas_od(publicacion, banda, origenes, indices_destino):
+    """Tiempos hacia los destinos pedidos de un lote de orígenes."""
+    compilado = _grafo(publicacion)
+    pesos = compilado.pesos[banda]
+    objetivos = {t for t in indices_destino if t is not None}
+    filas = []
+    for origen in origenes:
+        distancias = distancias_a_objetivos(compilado, origen, pesos, objetivos)
+        filas.append([INF if t is None else distancias[t] for t in indices_destino])
+    return filas
+
+
+def _tablas_landmark(publicacion, banda, landmark):
+    """Distancias desde y hacia un landmark en una banda."""
+    compilado = _grafo(publicacion)
+    pesos = compilado.pesos[banda]
+    return distancias_desde(compilado, landmark, pesos), distancias_hacia(compilado, landmark, pesos)
+
+
+def _contexto():
+    """
+    Usa forkserver cuando está disponible y si no spawn: el servidor web tiene
+    hilos en marcha y fork copiaría su estado (candados incluidos) a medias.
+    """
+    metodos = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in metodos else "spawn")
+
+
+class EjecutorParalelo:
+    """
+    Reparte los cálculos por lotes entre varios procesos.
+
+    Los arreglos del grafo compilado se publican en bloques de memoria
+    compartida: uno con la estructura CSR y otro por banda con los pesos. Los
+    trabajadores los mapean de solo lectura, así que la memoria no crece con
+    el número de procesos, y las tareas solo transportan los nombres de los
+    bloques e índices de estaciones. Los resultados se combinan en el orden de
+    envío, por lo que coinciden exactamente con los del cálculo secuencial.
+
+    Los procesos se mantienen mientras viva el ejecutor. Cuando cambian los
+    tiempos de la red solo se publican de nuevo los pesos de las bandas que
+    cambiaron, y cuando se recompila el grafo, todos sus arreglos; los bloques
+    de la publicación anterior se liberan cuando terminan los cálculos que la
+    estaban usando.
+
+    Attributes:
+        grafo (Grafo): Grafo de la red
+        procesos (int): Número de procesos trabajadores
+    """
+    def __init__(self, grafo, procesos=None):
+        self.grafo = grafo
+        self.procesos = procesos or os.cpu_count() or 1
+        self._candado = threading.Lock()
+        self._pool = None
+        self._compilado = None
+        self._version = None
+        self._publicacion = None
+        self._claves = itertools.count()
+        self._bloques = {}  # nombre -> [bloque, publicaciones que lo usan]
+        self._en_uso = {}  # clave de publicación -> cálculos en curso sobre ella
+        self._retiradas = {}  # clave -> publicación reemplazada que aún tiene cálculos en curso
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *excepcion):
+        self.cerrar()
+
+    def cerrar(self):
+        """
+        Detiene los procesos trabajadores. Los bloques en uso se liberan cuando
+        terminan los cálculos que los usan.
+        """
+        with self._candado:
+            pool, self._pool = self._pool, None
+            self._retirar()
+        if pool is not None:
+            pool.shutdown()
+
+    def _crear_bloque(self, arreglos):
+        """
+        Copia arreglos a un bloque nuevo de memoria compartida, alineados a 8 bytes.
+        Con el candado tomado.
+
+        Args:
+            arreglos (dict): campo -> array o memoryview
+
+        Returns:
+            tuple: (nombre del bloque, {campo: (inicio, formato, cantidad)})
+        """
+        disposicion = {}
+        tamano = 0
+        for campo, arreglo in arreglos.items():
+            disposicion[campo] = (tamano, arreglo.format if isinstance(arreglo, memoryview) else arreglo.typecode, len(arreglo))
+            tamano += -(-len(arreglo) * arreglo.itemsize // 8) * 8
+        bloque = shared_memory.SharedMemory(create=True, size=max(tamano, 1))
+        for campo, arreglo in arreglos.items():
+            inicio = disposicion[campo][0]
+            datos = memoryview(arreglo).cast('B')
+            bloque.buf[inicio:inicio + len(datos)] = datos
+        self._bloques[bloque.name] = [bloque, 0]
+        return bloque.name, disposicion
+
+    def _sin_cambios(self, publicado, pesos):
+        """Indica si un bloque de pesos publicado tiene los mismos tiempos que un arreglo."""
+        nombre, disposicion = publicado
+        inicio, _, cantidad = disposicion["pesos"]
+        if cantidad != len(pesos):
+            return False
+        nuevos = memoryview(pesos).cast('B')
+        with self._bloques[nombre][0].buf[inicio:inicio + len(nuevos)] as actuales:
+            return actuales == nuevos
+
+    def _referenciar(self, publicacion, cambio):
+        """
+        Suma o resta una publicación a los bloques que usa y libera los que
+        quedan sin ninguna. Con el candado tomado.
+        """
+        nombres = [publicacion["estructura"][0]] + [nombre for nombre, _ in publicacion["pesos"].values()]
+        for nombre in nombres:
+            registro = self._bloques[nombre]
+            registro[1] += cambio
+            if not registro[1]:
+                del self._bloques[nombre]
+                registro[0].close()
+                registro[0].unlink()
+
+    def _retirar(self):
+        """
+        Deja de usar la publicación actual; si hay cálculos en curso sobre ella
+        se libera cuando terminen. Con el candado tomado.
+        """
+        publicacion, self._publicacion, self._compilado = self._publicacion, None, None
+        if publicacion is None:
+            return
+        if self._en_uso.get(publicacion["clave"]):
+            self._retiradas[publicacion["clave"]] = publicacion
+        else:
+            self._en_uso.pop(publicacion["clave"], None)
+            self._referenciar(publicacion, -1)
+
+    def _publicar(self, compilado):
+        """
+        Publica la versión actual del grafo compilado si aún no lo está. Con el
+        candado tomado.
+
+        Los cambios incrementales modifican los pesos del grafo compilado en su
+        lugar: se copian a bloques nuevos solo los de las bandas que cambiaron,
+        para no alterar los que leen los cálculos en curso. La estructura solo
+        se copia de nuevo al recompilar el grafo.
+        """
+        actual = self._publicacion
+        if actual is not None and compilado is self._compilado:
+            if self._version == compilado.version:
+                return
+            self._version = compilado.version
+            pesos = {
+                banda: actual["pesos"][banda]
+                if banda in actual["pesos"] and self._sin_cambios(actual["pesos"][banda], valores)
+                else self._crear_bloque({"pesos": valores})
+                for banda, valores in compilado.pesos.items()
+            }
+            if pesos == actual["pesos"]:
+                return
+            estructura = actual["estructura"]
+        else:
+            estructura = self._crear_bloque({campo: getattr(compilado, campo) for campo in _ESTRUCTURA})
+            pesos = {banda: self._crear_bloque({"pesos": valores}) for banda, valores in compilado.pesos.items()}
+        publicacion = {"clave": next(self._claves), "n": len(compilado), "estructura": estructura, "pesos": pesos}
+        self._referenciar(publicacion, 1)
+        self._retirar()
+        self._publicacion = publicacion
+        self._compilado = compilado
+        self._version = compilado.version
+
+    @contextmanager
+    def _usar_pool(self):
+        """
+        Obtiene el pool y la publicación de la versión actual del grafo
+        mientras dura el bloque.
+
+        Yields:
+            tuple: (pool, compilado, publicacion)
+        """
+        with self._candado:
+            compilado = self.grafo.compilar()
+            self._publicar(compilado)
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.procesos, mp_context=_contexto())
+            pool, publicacion = self._pool, self._publicacion
+            clave = publicacion["clave"]
+            self._en_uso[clave] = self._en_uso.get(clave, 0) + 1
+        try:
+            yield pool, compilado, publicacion
+        finally:
+            with self._candado:
+                self._en_uso[clave] -= 1
+                if clave in self._retiradas and not self._en_uso[clave]:
+                    del self._en_uso[clave]
+                    self._referenciar(self._retiradas.pop(clave), -1)
+
+    def _lotes(self, elementos):
+        """Divide una lista en lotes contiguos, unos cuatro por proceso."""
+        tamano = max(1, -(-len(elementos) // (self.procesos * 4)))
+        return [elementos[i:i + tamano] for i in range(0, len(elementos), tamano)]
+
+    def calcular_matriz(self, banda=None):
+        """
+        Calcula en paralelo las matrices de tiempos y de siguiente salto.
+
+        Args:
+            banda (str, optional): Banda de congestión. Si es None, usa la vigente.
+
+        Returns:
+            tuple: (distancias, siguiente) como en matriz.calcular_matriz
+        """
+        with self._usar_pool() as (pool, compilado, publicacion):
+            banda = compilado.resolver_banda(banda)
+            lotes = self._lotes(list(range(len(compilado))))
+            distancias = array('d')
+            siguiente = array('l')
+            for lote_distancias, lote_siguiente in pool.map(
+                _filas_matriz, [publicacion] * len(lotes), [banda] * len(lotes), lotes
+            ):
+                distancias.extend(lote_distancias)
+                siguiente.extend(lote_siguiente)
+        return distancias, siguiente
+
+    def matriz_od(self, origenes, destinos, banda=None):
+        """
+        Calcula en paralelo los tiempos entre listas de orígenes y destinos.
+
+        Args:
+            origenes (list): IDs de las estaciones de origen
+            destinos (list): IDs de las estaciones de destino
+            banda (str, optional): Banda de congestión. Si es None, usa la vigente.
+
+        Yields:
+            tuple: (origen, tiempos) como en dijkstra.matriz_od, en el mismo orden
+        """
+        with self._usar_pool() as (pool, compilado, publicacion):
+            banda = compilado.resolver_banda(banda)
+            indices_destino = [compilado.indice(destino) for destino in destinos]
+            distintos = list(dict.fromkeys(origenes))
+            conocidos = [origen for origen in distintos if compilado.indice(origen) is not None]
+            lotes = self._lotes([compilado.indice(origen) for origen in conocidos])
+            filas = (
+                fila
+                for lote in pool.map(
+                    _filas_od, [publicacion] * len(lotes), [banda] * len(lotes), lotes, [indices_destino] * len(lotes)
+                )
+                for fila in lote
+            )
+            for origen in distintos:
+                if compilado.indice(origen) is None:
+                    yield origen, [INF] * len(destinos)
+                else:
+                    yield origen, next(filas)
+
+    def calcular_landmarks(self, cantidad=4, landmarks=None):
+        """
+        Calcula en paralelo las tablas ALT, con una tarea por banda y landmark.
+
+        Args:
+            cantidad (int): Número de landmarks a elegir si no se indican
+            landmarks (list, optional): IDs de los landmarks a usar
+
+        Returns:
+            TablasLandmarks: Las mismas tablas que TablasLandmarks.calcular
+        """
+        with self._usar_pool() as (pool, compilado, publicacion):
+            if landmarks is None:
+                indices = seleccionar_landmarks(compilado, cantidad)
+            else:
+                indices = [compilado.indice(id) for id in landmarks if compilado.indice(id) is not None]
+
+            tareas = [(banda, i) for banda in compilado.pesos for i in indices]
+            resultados = pool.map(
+                _tablas_landmark, [publicacion] * len(tareas), [banda for banda, _ in tareas], [i for _, i in tareas]
+            )
+            adelante = {banda: [] for banda in compilado.pesos}
+            atras = {banda: [] for banda in compilado.pesos}
+            for (banda, _), (ida, vuelta) in zip(tareas, resultados):
+                adelante[banda].append(ida)
+                atras[banda].append(vuelta)
+        return TablasLandmarks([compilado.ids[i] for i in indices], compilado.huella(), adelante, atras)
@@ -0,0 +1,351 @@
+from array import array
+from collections import Counter, defaultdict
+
+from src.dependiente_tiempo import espera_media
+from src.dijkstra import INF
+from src.lineas import linea_de_ruta
+
+
+# Número máximo de transbordos que explora una consulta por defecto
+MAX_TRANSBORDOS = 5
+
+
+def _secuencias(aristas):
+    """
+    Divide las aristas (u, v) de una línea en secuencias de paradas dirigidas
+    que se cortan en las ramificaciones y confluencias, como los patrones de
+    RAPTOR. Una parada es intermedia si, sin contar la vuelta por donde se
+    llegó, tiene una sola salida y una sola llegada; así una línea recorrida
+    en ambos sentidos da una secuencia por sentido. Cada arista queda en una
+    sola secuencia; RedRaptor enlaza las que siguen por la misma línea.
+    """
+    salidas = defaultdict(list)
+    entradas = defaultdict(list)
+    for u, v in aristas:
+        salidas[u].append(v)
+        entradas[v].append(u)
+
+    def continuacion(u, v):
+        # Parada siguiente a v viniendo de u, o None si v es un punto de corte
+        otras = [w for w in salidas[v] if w != u]
+        if len(otras) != 1 or [x for x in entradas[v] if x != otras[0]] != [u]:
+            return None
+        return otras[0]
+
+    usadas = set()
+
+    def recorrer(u, v):
+        secuencia = [u, v]
+        usadas.add((u, v))
+        w = continuacion(u, v)
+        while w is not None and (v, w) not in usadas:
+            usadas.add((v, w))
+            secuencia.append(w)
+            u, v = v, w
+            w = continuacion(u, v)
+        return tuple(secuencia)
+
+    secuencias = [
+        recorrer(u, v) for u, v in aristas
+        if not any(continuacion(x, u) == v for x in entradas[u])
+    ]
+    # Lo que queda son ciclos sin puntos de corte: se empiezan en cualquier parada
+    secuencias += [recorrer(u, v) for u, v in aristas if (u, v) not in usadas]
+    return sorted(secuencias)
+
+
+class RedRaptor:
+    """
+    Secuencias de paradas por línea para el algoritmo RAPTOR.
+
+    Cada línea (la de Estacion.linea, como en lineas.linea_de_ruta) se
+    descompone en patrones: secuencias de paradas que se recorren en orden
+    sin cambiar de vehículo, cortadas en las ramificaciones y confluencias
+    (véase _secuencias), de modo que hay a lo sumo un patrón por arista. Al
+    llegar al final de un patrón el vehículo puede seguir, en la misma ronda
+    y sin nueva espera, por los patrones de su línea que empiezan allí (sin
+    dar la vuelta). Los patrones se guardan en arreglos planos, junto
+    con la arista del grafo compilado por la que se llega a cada parada, de
+    modo que los tiempos se leen de los pesos vigentes y los cambios
+    incrementales no obligan a recompilar.
+
+    Attributes:
+        compilado (GrafoCompilado): Grafo compilado del que se construyó
+        inicios (array): Posición en paradas de la primera parada de cada patrón
+        paradas (array): Índices de estación de los patrones, uno tras otro
+        aristas (array): Arista por la que se llega a cada parada (-1 en la primera)
+        lineas (list): Línea de cada patrón
+        modos (list): Modo (tipo de ruta) de cada patrón
+        offsets_siguientes (array): Desplazamientos CSR de los patrones que continúan cada patrón
+        siguientes (array): Patrones de la misma línea que empiezan en la última parada
+            de cada patrón, salvo el que vuelve por donde se llegó
+        offsets_paradas (array): Desplazamientos CSR de los patrones de cada estación
+        patrones_parada (array): Patrón de cada aparición de una estación
+        posiciones_parada (array): Posición en paradas de esa aparición
+        offsets_pie (array): Desplazamientos CSR de las rutas a pie de cada estación
+        aristas_pie (array): Aristas del grafo compilado que se recorren a pie
+        esperas (dict): Espera media para subir a cada patrón en cada banda (banda -> array)
+    """
+    def __init__(self, compilado):
+        self.compilado = compilado
+        estaciones = compilado.estaciones
+        por_linea = defaultdict(list)
+        tipos_linea = defaultdict(Counter)
+        arista_de = {}
+        a_pie = [[] for _ in range(len(compilado))]
+        for e in range(compilado.num_aristas):
+            u, v = compilado.origenes[e], compilado.destinos[e]
+            linea = linea_de_ruta(estaciones[u], estaciones[v], compilado.tipos[e])
+            if linea is None:
+                a_pie[u].append(e)
+                continue
+            por_linea[linea].append((u, v))
+            tipos_linea[linea][compilado.tipos[e]] += 1
+            arista_de[(u, v)] = e
+
+        self.inicios = array('l', [0])
+        self.paradas = array('l')
+        self.aristas = array('l')
+        self.lineas = []
+        self.modos = []
+        for linea, aristas in por_linea.items():
+            modo = tipos_linea[linea].most_common(1)[0][0]
+            for secuencia in _secuencias(aristas):
+                self.paradas.extend(secuencia)
+                self.aristas.append(-1)
+                self.aristas.extend(arista_de[(u, v)] for u, v in zip(secuencia, secuencia[1:]))
+                self.inicios.append(len(self.paradas))
+                self.lineas.append(linea)
+                self.modos.append(modo)
+
+        primeros = defaultdict(list)  # (línea, parada) -> patrones que empiezan en ella
+        for patron in range(len(self.lineas)):
+            primeros[(self.lineas[patron], self.paradas[self.inicios[patron]])].append(patron)
+        self.offsets_siguientes = array('l', [0])
+        self.siguientes = array('l')
+        for patron in range(len(self.lineas)):
+            fin = self.inicios[patron + 1]
+            ultima, penultima = self.paradas[fin - 1], self.paradas[fin - 2]
+            self.siguientes.extend(
+                q for q in primeros[(self.lineas[patron], ultima)]
+                if self.paradas[self.inicios[q] + 1] != penultima
+            )
+            self.offsets_siguientes.append(len(self.siguientes))
+
+        apariciones = [[] for _ in range(len(compilado))]
+        for patron in range(len(self.lineas)):
+            for posicion in range(self.inicios[patron], self.inicios[patron + 1]):
+                apariciones[self.paradas[posicion]].append((patron, posicion))
+        self.offsets_paradas = array('l', [0])
+        self.patrones_parada = array('l')
+        self.posiciones_parada = array('l')
+        for lista in apariciones:
+            for patron, posicion in lista:
+                self.patrones_parada.append(patron)
+                self.posiciones_parada.append(posicion)
+            self.offsets_paradas.append(len(self.patrones_parada))
+        self.offsets_pie = array('l', [0])
+        self.aristas_pie = array('l')
+        for lista in a_pie:
+            self.aristas_pie.extend(lista)
+            self.offsets_pie.append(len(self.aristas_pie))
+        self.esperas = {
+            banda: array('d', [espera_media(compilado.horarios, modo, banda) for modo in self.modos])
+            for banda in compilado.pesos
+        }
+
+    @property
+    def num_patrones(self):
+        """int: Número de patrones (secuencias de paradas)."""
+        return len(self.lineas)
+
+    def _caminar(self, llegadas, mejor, etiquetas, marcadas, pesos, t):
+        """Relaja las rutas a pie desde las estaciones marcadas, encadenándolas."""
+        pendientes = list(marcadas)
+        while pendientes:
+            p = pendientes.pop()
+            for k in range(self.offsets_pie[p], self.offsets_pie[p + 1]):
+                e = self.aristas_pie[k]
+                q = self.compilado.destinos[e]
+                llegada = llegadas[p] + pesos[e]
+                if llegada < mejor[q] and llegada < mejor[t]:
+                    llegadas[q] = mejor[q] = llegada
+                    etiquetas[q] = ("pie", e)
+                    marcadas.add(q)
+                    pendientes.append(q)
+
+    def viajes(self, origen, destino, banda=None, max_transbordos=MAX_TRANSBORDOS):
+        """
+        Calcula en una sola pasada los viajes Pareto-óptimos en tiempo y transbordos.
+
+        En la ronda k se obtienen las mejores llegadas con k vehículos: cada
+        patrón que pasa por una estación mejorada en la ronda anterior se
+        recorre una vez en orden, subiendo donde la llegada previa más la
+        espera media del modo mejora al vehículo en curso; al final del patrón
+        el vehículo sigue por los patrones que lo continúan, que se recorren en
+        la misma ronda si así mejora su llegada al principio. Tras cada ronda se
+        relajan las rutas a pie. Solo se anota una estación si mejora la mejor
+        llegada conocida a ella y al destino.
+
+        Args:
+            origen (str): ID de la estación de origen
+            destino (str): ID de la estación de destino
+            banda (str, optional): Banda de congestión. Si es None, usa la vigente.
+            max_transbordos (int): Máximo de transbordos a considerar
+
+        Returns:
+            list: Viajes ordenados de menos a más transbordos (y de más a menos
+                tiempo), cada uno como en GrafoLineas.ruta: {"tiempo", "camino",
+                "tramos", "transbordos"}; lista vacía si no existe ruta
+        """
+        compilado = self.compilado
+        banda = compilado.resolver_banda(banda)
+        s, t = compilado.indice(origen), compilado.indice(destino)
+        if s is None or t is None:
+            return []
+        if s == t:
+            return [{"tiempo": 0, "camino": [origen], "tramos": [], "transbordos": 0}]
+        pesos = compilado.pesos[banda]
+        esperas = self.esperas[banda]
+        inicios, paradas, aristas = self.inicios, self.paradas, self.aristas
+        offsets_siguientes, siguientes = self.offsets_siguientes, self.siguientes
+        offsets_paradas, patrones_parada, posiciones_parada = \
+            self.offsets_paradas, self.patrones_parada, self.posiciones_parada
+
+        n = len(compilado)
+        llegadas = [INF] * n
+        mejor = [INF] * n
+        llegadas[s] = mejor[s] = 0
+        etiquetas = [{s: None}]
+        marcadas = {s}
+        self._caminar(llegadas, mejor, etiquetas[0], marcadas, pesos, t)
+        # Rondas en las que mejoró la llegada al destino y esa llegada
+        mejoras = [(0, llegadas[t])] if llegadas[t] < INF else []
+        desde = [INF] * self.num_patrones
+
+        for ronda in range(1, max_transbordos + 2):
+            # Patrones a recorrer, desde la primera parada marcada de cada uno
+            cola = []
+            for p in marcadas:
+                for k in range(offsets_paradas[p], offsets_paradas[p + 1]):
+                    patron, posicion = patrones_parada[k], posiciones_parada[k]
+                    if desde[patron] == INF:
+                        cola.append(patron)
+                        desde[patron] = posicion
+                    elif posicion < desde[patron]:
+                        desde[patron] = posicion
+            previas = llegadas
+            llegadas = list(previas)
+            nuevas = {}
+            etiquetas.append(nuevas)
+            marcadas = set()
+            # Patrón -> (llegada, tramo anterior) del vehículo que sigue por él
+            continuaciones = {}
+            k = 0
+            while k < len(cola):
+                patron = cola[k]
+                k += 1
+                espera = esperas[patron]
+                inicio, fin = inicios[patron], inicios[patron + 1]
+                viaje = INF
+                subida = -1
+                enlace = None
+                for i in range(desde[patron], fin):
+                    p = paradas[i]
+                    if subida >= 0:
+                        viaje += pesos[aristas[i]]
+                        if viaje < mejor[p] and viaje < mejor[t]:
+                            llegadas[p] = mejor[p] = viaje
+                            nuevas[p] = ("viaje", patron, subida, i, enlace)
+                            marcadas.add(p)
+                    if previas[p] + espera < viaje:
+                        viaje = previas[p] + espera
+                        subida = i
+                        enlace = None
+                    if i == inicio and patron in continuaciones and continuaciones[patron][0] < viaje:
+                        viaje, enlace = continuaciones[patron]
+                        subida = i
+                desde[patron] = INF
+                if 0 <= subida < fin - 1 and viaje < mejor[t]:
+                    tramo = ("viaje", patron, subida, fin - 1, enlace)
+                    for j in range(offsets_siguientes[patron], offsets_siguientes[patron + 1]):
+                        q = siguientes[j]
+                        if q not in continuaciones or viaje < continuaciones[q][0]:
+                            continuaciones[q] = (viaje, tramo)
+                            if desde[q] == INF:
+                                cola.append(q)
+                            desde[q] = inicios[q]
+            self._caminar(llegadas, mejor, nuevas, marcadas, pesos, t)
+            if t in nuevas:
+                mejoras.append((ronda, llegadas[t]))
+            if not marcadas:
+                break
+
+        return [dict(self._reconstruir(etiquetas, ronda, t), tiempo=tiempo) for ronda, tiempo in mejoras]
+
+    def _reconstruir(self, etiquetas, ronda, t):
+        """Recorre las etiquetas hacia atrás desde el destino en la ronda indicada."""
+        compilado = self.compilado
+        ids = compilado.ids
+        tramos = []
+        p = t
+        while True:
+            while p not in etiquetas[ronda]:
+                ronda -= 1
+            etiqueta = etiquetas[ronda][p]
+            if etiqueta is None:
+                break
+            if etiqueta[0] == "pie":
+                e = etiqueta[1]
+                anterior = compilado.origenes[e]
+                tramos.append({"linea": None, "modo": compilado.tipos[e], "estaciones": [ids[anterior], ids[p]]})
+                p = anterior
+            else:
+                _, patron, subida, bajada, enlace = etiqueta
+                estaciones = [ids[self.paradas[i]] for i in range(subida, bajada + 1)]
+                # Patrones anteriores de la misma línea recorridos sin bajar del vehículo
+                while enlace is not None:
+                    _, _, subida, bajada, enlace = enlace
+                    estaciones = [ids[self.paradas[i]] for i in range(subida, bajada)] + estaciones
+                tramos.append({"linea": self.lineas[patron], "modo": self.modos[patron], "estaciones": estaciones})
+                p = self.paradas[subida]
+                ronda -= 1
+        tramos.reverse()
+        camino = [ids[p]]
+        for tramo in tramos:
+            camino.extend(tramo["estaciones"][1:])
+        vehiculos = sum(1 for tramo in tramos if tramo["linea"] is not None)
+        return {"camino": camino, "tramos": tramos, "transbordos": max(0, vehiculos - 1)}
+
+
+def obtener_red_raptor(grafo):
+    """
+    Obtiene los patrones RAPTOR del grafo, compilándolos la primera vez.
+
+    Args:
+        grafo (Grafo | GrafoCompilado): Grafo de la red
+
+    Returns:
+        RedRaptor: Patrones asociados al grafo compilado
+    """
+    compilado = grafo.compilar()
+    if compilado.raptor is None:
+        compilado.raptor = RedRaptor(compilado)
+    return compilado.raptor
+
+
+def viajes_pareto(grafo, origen, destino, banda=None, max_transbordos=MAX_TRANSBORDOS):
+    """
+    Calcula los viajes que no son peores en tiempo y en transbordos a la vez.
+
+    Args:
+        grafo (Grafo | GrafoCompilado): Grafo de la red
+        origen (str): ID de la estación de origen
+        destino (str): ID de la estación de destino
+        banda (str, optional): Banda de congestión. Si es None, usa la vigente.
+        max_transbordos (int): Máximo de transbordos a considerar
+
+    Returns:
+        list: Viajes como en RedRaptor.viajes
+    """
+    return obtener_red_raptor(grafo).viajes(origen, destino, banda, max_transbordos)
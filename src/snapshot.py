@@ -0,0 +1,299 @@
+import functools
+import hashlib
+import json
+import logging
+import mmap
+import os
+import struct
+import sys
+import time
+from array import array
+
+from src.compilado import GrafoCompilado
+from src.graph import Estacion, Ruta
+from src.landmarks import TablasLandmarks
+
+
+logger = logging.getLogger(__name__)
+
+MAGIA = b"REDSNAP\0"
+# Aumenta cuando cambia el formato o el significado de los arreglos guardados
+VERSION_FORMATO = 4
+# Magia, versión del formato, reservado y longitud de los metadatos
+CABECERA = struct.Struct("<8sIIQ")
+ALINEACION = 8
+
+ARREGLOS_CSR = ("offsets", "destinos", "origenes", "offsets_inv", "aristas_inv", "tiempos_base")
+
+
+def ruta_snapshot(archivo_red):
+    """
+    Obtiene la ruta del snapshot asociado a un archivo de red.
+
+    Args:
+        archivo_red (str): Ruta al archivo JSON de la red (por ejemplo 'src/data/red.json')
+
+    Returns:
+        str: Ruta del snapshot, junto al de la red
+    """
+    base, _ = os.path.splitext(archivo_red)
+    return f"{base}.snapshot"
+
+
+def huella_fuentes(fuentes):
+    """
+    Calcula la huella de los archivos de origen de la red.
+
+    Args:
+        fuentes (list): Rutas de los archivos o pares (archivo, espacio), como en cargar_red
+
+    Returns:
+        list: Pares [archivo, espacio, SHA-256 del contenido]
+    """
+    huellas = []
+    for fuente in fuentes:
+        archivo, espacio = fuente if isinstance(fuente, (tuple, list)) else (fuente, None)
+        with open(archivo, 'rb') as f:
+            huellas.append([archivo, espacio, hashlib.sha256(f.read()).hexdigest()])
+    return huellas
+
+
+def _alinear(posicion):
+    return -(-posicion // ALINEACION) * ALINEACION
+
+
+def guardar_snapshot(archivo, grafo, fuentes, matriz=None, analisis=None):
+    """
+    Guarda un snapshot binario del grafo compilado y sus datos precalculados.
+
+    El archivo empieza con una cabecera fija (magia, versión del formato y
+    longitud de los metadatos), seguida de los metadatos en JSON (estaciones
+    por columnas, factores de congestión, horarios, huellas de las fuentes y
+    la posición de cada arreglo) y de los arreglos binarios alineados a 8
+    bytes: los del CSR, el tiempo y la congestión de la ruta de cada arista,
+    los pesos por banda, las tablas de landmarks y las matrices de tiempos. Se escribe en un
+    archivo temporal y se renombra, de modo que quien tenga mapeado el
+    snapshot anterior sigue leyéndolo sin cambios.
+
+    Args:
+        archivo (str): Ruta del snapshot
+        grafo (Grafo): Grafo de la red, cargado de las fuentes
+        fuentes (list): Archivos de los que se cargó el grafo, como en cargar_red
+        matriz (MatrizTiempos, optional): Si se indica, se guardan las matrices de todas las bandas
+        analisis (AnalisisRed, optional): Si se indica, se guardan sus propiedades
+    """
+    compilado = grafo.compilar()
+    arreglos = [(nombre, getattr(compilado, nombre)) for nombre in ARREGLOS_CSR]
+    arreglos += [(f"pesos/{banda}", pesos) for banda, pesos in compilado.pesos.items()]
+
+    # Las rutas del CSR se guardan por arista; los factores de congestión, sin repetir
+    congestiones = []
+    indice_congestion = {}
+    tiempos = array('d')
+    indices = array('l')
+    for e in range(compilado.num_aristas):
+        ruta = grafo.rutas[compilado.ids[compilado.origenes[e]]][compilado.ids[compilado.destinos[e]]]
+        clave = json.dumps(ruta.congestion_tipica, sort_keys=True)
+        if clave not in indice_congestion:
+            indice_congestion[clave] = len(congestiones)
+            congestiones.append(ruta.congestion_tipica)
+        tiempos.append(ruta.tiempo_base)
+        indices.append(indice_congestion[clave])
+    arreglos += [("rutas/tiempos", tiempos), ("rutas/congestion", indices)]
+    # Rutas hacia estaciones inexistentes: no están en el CSR
+    sueltas = [
+        [origen, destino, ruta.tipo, ruta.tiempo_base, ruta.congestion_tipica]
+        for origen, destinos in grafo.rutas.items()
+        for destino, ruta in destinos.items()
+        if origen not in compilado.indices or destino not in compilado.indices
+    ]
+
+    landmarks = None
+    if compilado.landmarks is not None and compilado.landmarks.huella == compilado.huella():
+        landmarks = {"ids": compilado.landmarks.landmarks, "bandas": list(compilado.landmarks.adelante)}
+        for sentido, tablas in (("adelante", compilado.landmarks.adelante), ("atras", compilado.landmarks.atras)):
+            for banda, lista in tablas.items():
+                arreglos += [(f"landmarks/{sentido}/{banda}/{i}", array('d', tabla)) for i, tabla in enumerate(lista)]
+
+    bandas_matriz = []
+    if matriz is not None:
+        for banda in compilado.pesos:
+            _, distancias, siguiente = matriz.matrices(banda)
+            arreglos += [(f"matriz/{banda}/distancias", distancias), (f"matriz/{banda}/siguiente", siguiente)]
+            bandas_matriz.append(banda)
+
+    posiciones = {}
+    posicion = 0
+    for nombre, datos in arreglos:
+        posicion = _alinear(posicion)
+        longitud = len(datos)
+        posiciones[nombre] = [posicion, datos.format if isinstance(datos, memoryview) else datos.typecode, longitud]
+        posicion += longitud * datos.itemsize
+
+    propiedades = None
+    if analisis is not None:
+        propiedades = dict(analisis.propiedades())
+        del propiedades["version"]
+
+    metadatos = json.dumps({
+        "orden": sys.byteorder,
+        "tamano_entero": array('l').itemsize,
+        "fuentes": huella_fuentes(fuentes),
+        "huella": compilado.huella(),
+        "estaciones": {
+            "ids": compilado.ids,
+            "nombres": [estacion.nombre for estacion in compilado.estaciones],
+            "tipos": [estacion.tipo for estacion in compilado.estaciones],
+            "lineas": [estacion.linea for estacion in compilado.estaciones],
+            "conexiones": [estacion.conexiones for estacion in compilado.estaciones],
+            "coordenadas": [estacion.coordenadas for estacion in compilado.estaciones],
+            "transbordos": [i for i, estacion in enumerate(compilado.estaciones) if estacion.es_transbordo]
+        },
+        "congestiones": congestiones,
+        "rutas_sueltas": sueltas,
+        "horarios": grafo.horarios,
+        "tipos": compilado.tipos,
+        "arreglos": posiciones,
+        "landmarks": landmarks,
+        "matrices": bandas_matriz,
+        "analitica": propiedades
+    }, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+    inicio_datos = _alinear(CABECERA.size + len(metadatos))
+    temporal = f"{archivo}.{os.getpid()}.tmp"
+    with open(temporal, 'wb') as f:
+        f.write(CABECERA.pack(MAGIA, VERSION_FORMATO, 0, len(metadatos)))
+        f.write(metadatos)
+        for nombre, datos in arreglos:
+            f.write(b"\0" * (inicio_datos + posiciones[nombre][0] - f.tell()))
+            f.write(datos.tobytes())
+    os.replace(temporal, archivo)
+
+
+def _leer_arreglos(mapa, archivo, fuentes, vistas):
+    magia, formato, _, longitud = CABECERA.unpack_from(mapa, 0)
+    if magia != MAGIA or formato != VERSION_FORMATO:
+        logger.info(f"Snapshot {archivo} con otro formato, se ignora")
+        return None, None
+    metadatos = json.loads(mapa[CABECERA.size:CABECERA.size + longitud].decode("utf-8"))
+    if metadatos["orden"] != sys.byteorder or metadatos["tamano_entero"] != array('l').itemsize:
+        logger.info(f"Snapshot {archivo} generado en otra plataforma, se ignora")
+        return None, None
+    if metadatos["fuentes"] != huella_fuentes(fuentes):
+        logger.info(f"Snapshot {archivo} desactualizado respecto a los archivos de la red")
+        return None, None
+
+    vista = memoryview(mapa)
+    vistas.append(vista)
+    inicio_datos = _alinear(CABECERA.size + longitud)
+    arreglos = {}
+    for nombre, (posicion, tipo, cantidad) in metadatos["arreglos"].items():
+        desde = inicio_datos + posicion
+        if desde + cantidad * array(tipo).itemsize > len(mapa):
+            raise ValueError(f"arreglo '{nombre}' truncado")
+        with vista[desde:desde + cantidad * array(tipo).itemsize] as tramo:
+            arreglos[nombre] = tramo.cast(tipo)
+        vistas.append(arreglos[nombre])
+    return metadatos, arreglos
+
+
+def _construir_rutas(ids, origenes, destinos, tipos, tiempos, indices, congestiones, sueltas):
+    # Rutas del snapshot, a partir de sus arreglos por arista y de las sueltas
+    for e, tipo in enumerate(tipos):
+        yield Ruta(ids[origenes[e]], ids[destinos[e]], tipo, tiempos[e], congestiones[indices[e]])
+    for origen, destino, tipo, tiempo, congestion in sueltas:
+        yield Ruta(origen, destino, tipo, tiempo, congestion)
+
+
+def cargar_snapshot(grafo, archivo, fuentes):
+    """
+    Carga la red desde un snapshot si existe y corresponde a las fuentes actuales.
+
+    Los arreglos no se copian: el grafo compilado, las tablas de landmarks y
+    las matrices son vistas de memoria sobre el archivo mapeado con mmap, de
+    modo que los procesos que cargan el mismo snapshot comparten sus páginas.
+    Las estaciones se construyen de los metadatos; las rutas se difieren con
+    Grafo.diferir_rutas, ya que las búsquedas usan el grafo compilado. El mapa
+    se cierra en cuanto el snapshot se descarta.
+
+    Args:
+        grafo (Grafo): Grafo vacío a completar
+        archivo (str): Ruta del snapshot
+        fuentes (list): Archivos de los que se cargaría la red, como en cargar_red
+
+    Returns:
+        dict: {"analitica": dict (propiedades guardadas, o None), "segundos": float},
+            o None si no hay snapshot, está desactualizado o no se puede leer; en ese
+            caso el grafo no se modifica
+    """
+    inicio = time.perf_counter()
+    if not os.path.exists(archivo):
+        return None
+    try:
+        with open(archivo, 'rb') as f:
+            mapa = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError) as e:
+        logger.warning(f"No se pudo leer el snapshot {archivo}: {e}")
+        return None
+
+    # Vistas creadas sobre el mapa: deben soltarse antes de cerrarlo
+    vistas = []
+    metadatos = None
+    try:
+        metadatos, arreglos = _leer_arreglos(mapa, archivo, fuentes, vistas)
+        if metadatos is not None:
+            columnas = metadatos["estaciones"]
+            transbordos = set(columnas["transbordos"])
+            estaciones = [
+                Estacion(id, nombre, tipo, linea, conexiones, coordenadas, i in transbordos)
+                for i, (id, nombre, tipo, linea, conexiones, coordenadas) in enumerate(zip(
+                    columnas["ids"], columnas["nombres"], columnas["tipos"],
+                    columnas["lineas"], columnas["conexiones"], columnas["coordenadas"]
+                ))
+            ]
+            rutas = functools.partial(
+                _construir_rutas, columnas["ids"], arreglos["origenes"], arreglos["destinos"],
+                metadatos["tipos"], arreglos["rutas/tiempos"], arreglos["rutas/congestion"],
+                metadatos["congestiones"], metadatos["rutas_sueltas"]
+            )
+    except (OSError, ValueError, KeyError, TypeError, struct.error) as e:
+        logger.warning(f"No se pudo leer el snapshot {archivo}: {e}")
+        metadatos = None
+    finally:
+        if metadatos is None:
+            for vista in reversed(vistas):
+                vista.release()
+            mapa.close()
+    if metadatos is None:
+        return None
+
+    grafo.agregar_lote(estaciones, (), metadatos["horarios"])
+    grafo.diferir_rutas(rutas)
+    bandas = [nombre[len("pesos/"):] for nombre in metadatos["arreglos"] if nombre.startswith("pesos/")]
+    compilado = GrafoCompilado.ensamblar(
+        grafo,
+        {nombre: arreglos[nombre] for nombre in ARREGLOS_CSR},
+        metadatos["tipos"],
+        {banda: arreglos[f"pesos/{banda}"] for banda in bandas},
+        metadatos["huella"]
+    )
+    grafo.usar_compilado(compilado)
+
+    landmarks = metadatos["landmarks"]
+    if landmarks is not None:
+        indices = range(len(landmarks["ids"]))
+        compilado.landmarks = TablasLandmarks(
+            landmarks["ids"],
+            metadatos["huella"],
+            {banda: [arreglos[f"landmarks/adelante/{banda}/{i}"] for i in indices] for banda in landmarks["bandas"]},
+            {banda: [arreglos[f"landmarks/atras/{banda}/{i}"] for i in indices] for banda in landmarks["bandas"]}
+        )
+    for banda in metadatos["matrices"]:
+        compilado.matrices[banda] = (arreglos[f"matriz/{banda}/distancias"], arreglos[f"matriz/{banda}/siguiente"])
+
+    segundos = time.perf_counter() - inicio
+    logger.info(
+        f"Red cargada del snapshot {archivo}: {len(compilado)} estaciones, "
+        f"{compilado.num_aristas} rutas en {segundos * 1000:.1f} ms"
+    )
+    return {"analitica": metadatos["analitica"], "segundos": segundos}
@@ -1,11 +1,16 @@
 from src.graph import Grafo
 
+INF = float('inf')
+
 def dfs_ciclos(grafo, nodo, visitados, stack):
     """
     Función auxiliar para detectar ciclos en el grafo usando DFS.
     
+    El recorrido usa una pila explícita, por lo que no está limitado por la
+    profundidad de recursión de Python.
+    
     Args:
-        grafo (Grafo): Grafo a analizar
+        grafo (Grafo | GrafoCompilado): Grafo a analizar
         nodo (str): Nodo actual en el recorrido
         visitados (set): Conjunto de nodos ya visitados
         stack (set): Conjunto de nodos en el camino actual
@@ -15,65 +20,240 @@ def dfs_ciclos(grafo, nodo, visitados, stack):
     """
     visitados.add(nodo)
     stack.add(nodo)
-    for vecino in grafo.rutas.get(nodo, {}):
-        if vecino not in visitados:
-            if dfs_ciclos(grafo, vecino, visitados, stack):
+    trabajo = [(nodo, iter(grafo.sucesores(nodo)))]
+    while trabajo:
+        actual, vecinos = trabajo[-1]
+        for vecino in vecinos:
+            if vecino not in visitados:
+                visitados.add(vecino)
+                stack.add(vecino)
+                trabajo.append((vecino, iter(grafo.sucesores(vecino))))
+                break
+            if vecino in stack:
                 return True
-        elif vecino in stack:
-            return True
-    stack.remove(nodo)
+        else:
+            trabajo.pop()
+            stack.remove(actual)
     return False
 
 def tiene_ciclos(grafo):
     """
-    Verifica si el grafo contiene ciclos.
+    Verifica si el grafo contiene ciclos, en tiempo lineal O(V + E).
     
     Args:
-        grafo (Grafo): Grafo a analizar
+        grafo (Grafo | GrafoCompilado): Grafo a analizar
         
     Returns:
         bool: True si el grafo contiene ciclos, False en caso contrario
     """
-    visitados = set()
-    for nodo in grafo.rutas:
-        if nodo not in visitados:
-            if dfs_ciclos(grafo, nodo, visitados, set()):
-                return True
+    compilado = grafo.compilar()
+    offsets, destinos, tiempos = compilado.offsets, compilado.destinos, compilado.tiempos_base
+    n = len(compilado)
+    # 0: sin visitar, 1: en el camino actual, 2: terminado
+    estado = bytearray(n)
+
+    for raiz in range(n):
+        if estado[raiz]:
+            continue
+        estado[raiz] = 1
+        trabajo = [(raiz, offsets[raiz])]
+        while trabajo:
+            nodo, e = trabajo[-1]
+            if e < offsets[nodo + 1]:
+                trabajo[-1] = (nodo, e + 1)
+                if tiempos[e] == INF:
+                    continue  # Ruta fuera de servicio
+                vecino = destinos[e]
+                if estado[vecino] == 1:
+                    return True
+                if not estado[vecino]:
+                    estado[vecino] = 1
+                    trabajo.append((vecino, offsets[vecino]))
+            else:
+                estado[nodo] = 2
+                trabajo.pop()
     return False
 
 
+def _tarjan(compilado):
+    """
+    Algoritmo de Tarjan iterativo sobre los índices del grafo compilado.
+    
+    Args:
+        compilado (GrafoCompilado): Grafo compilado
+        
+    Returns:
+        tuple: (componentes, componente_de) donde componentes son listas de
+            índices en orden topológico inverso y componente_de[v] es el número
+            de componente de la estación v
+    """
+    offsets, destinos, tiempos = compilado.offsets, compilado.destinos, compilado.tiempos_base
+    n = len(compilado)
+    indice = [-1] * n
+    bajo = [0] * n
+    en_pila = bytearray(n)
+    componente_de = [-1] * n
+    pila = []
+    componentes = []
+    contador = 0
+
+    for raiz in range(n):
+        if indice[raiz] != -1:
+            continue
+        indice[raiz] = bajo[raiz] = contador
+        contador += 1
+        pila.append(raiz)
+        en_pila[raiz] = 1
+        # Pila explícita de (nodo, siguiente arista a explorar)
+        trabajo = [(raiz, offsets[raiz])]
+        while trabajo:
+            nodo, e = trabajo[-1]
+            if e < offsets[nodo + 1]:
+                trabajo[-1] = (nodo, e + 1)
+                if tiempos[e] == INF:
+                    continue  # Ruta fuera de servicio
+                vecino = destinos[e]
+                if indice[vecino] == -1:
+                    indice[vecino] = bajo[vecino] = contador
+                    contador += 1
+                    pila.append(vecino)
+                    en_pila[vecino] = 1
+                    trabajo.append((vecino, offsets[vecino]))
+                elif en_pila[vecino] and indice[vecino] < bajo[nodo]:
+                    bajo[nodo] = indice[vecino]
+            else:
+                trabajo.pop()
+                if trabajo:
+                    padre = trabajo[-1][0]
+                    if bajo[nodo] < bajo[padre]:
+                        bajo[padre] = bajo[nodo]
+                if bajo[nodo] == indice[nodo]:
+                    numero = len(componentes)
+                    componente = []
+                    while True:
+                        vertice = pila.pop()
+                        en_pila[vertice] = 0
+                        componente_de[vertice] = numero
+                        componente.append(vertice)
+                        if vertice == nodo:
+                            break
+                    componentes.append(componente)
+
+    return componentes, componente_de
+
+
+def componentes_fuertemente_conexas(grafo):
+    """
+    Calcula las componentes fuertemente conexas del grafo con el algoritmo de
+    Tarjan, en tiempo lineal O(V + E).
+    
+    Args:
+        grafo (Grafo | GrafoCompilado): Grafo a analizar
+        
+    Returns:
+        list: Listas de IDs de estación, una por componente, en orden topológico
+            inverso (cada componente aparece antes que las que llegan a ella)
+    """
+    compilado = grafo.compilar()
+    componentes, _ = _tarjan(compilado)
+    return [[compilado.ids[v] for v in componente] for componente in componentes]
+
+
+def grafo_condensado(grafo):
+    """
+    Construye el grafo de condensación: un DAG con un nodo por componente
+    fuertemente conexa y una arista entre componentes si alguna ruta las une.
+    
+    Args:
+        grafo (Grafo | GrafoCompilado): Grafo a analizar
+        
+    Returns:
+        dict: {
+            "componentes": list (listas de IDs en orden topológico inverso),
+            "componente_de": dict (ID de estación -> número de componente),
+            "aristas": list (pares (origen, destino) de componentes, ordenados)
+        }
+    """
+    compilado = grafo.compilar()
+    componentes, componente_de = _tarjan(compilado)
+    aristas = set()
+    for e in range(compilado.num_aristas):
+        if compilado.tiempos_base[e] == INF:
+            continue
+        origen = componente_de[compilado.origenes[e]]
+        destino = componente_de[compilado.destinos[e]]
+        if origen != destino:
+            aristas.add((origen, destino))
+    return {
+        "componentes": [[compilado.ids[v] for v in componente] for componente in componentes],
+        "componente_de": {compilado.ids[v]: c for v, c in enumerate(componente_de)},
+        "aristas": sorted(aristas)
+    }
+
+
+def reporte_conectividad(grafo, condensado=None):
+    """
+    Resume qué partes de la red no se alcanzan entre sí.
+    
+    Toma como red principal la componente fuertemente conexa más grande y
+    recorre la condensación desde ella en ambos sentidos: las componentes a
+    las que no llega no se alcanzan desde la red principal, y las que no
+    llegan a ella no permiten volver a la red principal. La principal no
+    aparece en ninguna de las dos listas.
+    
+    Args:
+        grafo (Grafo | GrafoCompilado): Grafo a analizar
+        condensado (dict, optional): Resultado de grafo_condensado ya calculado
+        
+    Returns:
+        dict: {
+            "es_fuertemente_conexo": bool,
+            "num_componentes": int,
+            "principal": list (IDs de la componente más grande),
+            "sin_entrada": list (componentes que no se alcanzan desde la principal),
+            "sin_salida": list (componentes desde las que no se alcanza la principal)
+        }
+    """
+    if condensado is None:
+        condensado = grafo_condensado(grafo)
+    componentes = condensado["componentes"]
+    principal = max(range(len(componentes)), key=lambda c: len(componentes[c]), default=None)
+    sucesores = [[] for _ in componentes]
+    predecesores = [[] for _ in componentes]
+    for origen, destino in condensado["aristas"]:
+        sucesores[origen].append(destino)
+        predecesores[destino].append(origen)
+
+    def alcanzadas(adyacencia):
+        vistas = {principal}
+        pila = [principal]
+        while pila:
+            for siguiente in adyacencia[pila.pop()]:
+                if siguiente not in vistas:
+                    vistas.add(siguiente)
+                    pila.append(siguiente)
+        return vistas
+
+    desde_principal = alcanzadas(sucesores) if componentes else set()
+    hacia_principal = alcanzadas(predecesores) if componentes else set()
+    return {
+        "es_fuertemente_conexo": len(componentes) <= 1,
+        "num_componentes": len(componentes),
+        "principal": componentes[principal] if componentes else [],
+        "sin_entrada": [c for i, c in enumerate(componentes) if i not in desde_principal],
+        "sin_salida": [c for i, c in enumerate(componentes) if i not in hacia_principal]
+    }
+
+
 def es_fuertemente_conexo(grafo):
     """
     Verifica si el grafo es fuertemente conexo.
     Un grafo es fuertemente conexo si desde cualquier vértice se puede llegar a cualquier otro.
     
     Args:
-        grafo (Grafo): Grafo a analizar
+        grafo (Grafo | GrafoCompilado): Grafo a analizar
         
     Returns:
         bool: True si el grafo es fuertemente conexo, False en caso contrario
     """
-    vertices = list(grafo.vertices.keys())
-    if not vertices:
-        return True
-
-    def dfs(vertice, visitados):
-        """
-        Función auxiliar para realizar DFS desde un vértice.
-        
-        Args:
-            vertice (str): Vértice inicial
-            visitados (set): Conjunto de vértices visitados
-        """
-        visitados.add(vertice)
-        for destino in grafo.rutas.get(vertice, {}):
-            if destino not in visitados:
-                dfs(destino, visitados)
-
-    # Verificar desde cada vértice
-    for vertice in vertices:
-        visitados = set()
-        dfs(vertice, visitados)
-        if len(visitados) != len(vertices):
-            return False
-    return True
+    return len(componentes_fuertemente_conexas(grafo)) <= 1
@@ -0,0 +1,211 @@
+import gzip
+import hashlib
+import json
+import threading
+
+try:
+    import brotli
+except ImportError:  # La compresión brotli es opcional
+    brotli = None
+
+
+def nombre_completo_estacion(estacion):
+    """
+    Obtiene el nombre de una estación con su tipo y línea, como se muestra en los menús.
+
+    Args:
+        estacion (Estacion): Estación a describir
+
+    Returns:
+        str: Nombre en la forma "Nombre (Tipo Línea)"
+    """
+    tipo = estacion.tipo.capitalize()
+    linea = estacion.linea
+    return f"{estacion.nombre} ({tipo} {linea})"
+
+
+def agrupar_estaciones_por_tipo_y_linea(red):
+    """
+    Agrupa las estaciones para el menú de selección de origen y destino.
+
+    Args:
+        red (Grafo): Grafo de la red
+
+    Returns:
+        dict: Nombre del grupo -> lista de (ID, nombre completo)
+    """
+    grupos = {}
+    for est in red.vertices.values():
+        if est.tipo == "metro":
+            grupo = f"Metro Línea {est.linea}"
+        elif est.tipo == "cable":
+            grupo = f"Cable Línea {est.linea}"
+        elif est.tipo == "tranvia":
+            grupo = "Tranvía"
+        else:
+            grupo = est.tipo.capitalize()
+        if grupo not in grupos:
+            grupos[grupo] = []
+        grupos[grupo].append((est.id, nombre_completo_estacion(est)))
+    return grupos
+
+
+def serializar_red(version, estaciones, rutas):
+    """
+    Serializa la geometría de la red y la precomprime para el endpoint /api/red.
+
+    Args:
+        version (int): Versión del grafo
+        estaciones (list): Estaciones con sus datos
+        rutas (list): Rutas con su tipo y tiempo base
+
+    Returns:
+        dict: {
+            "etag": str (ETag fuerte derivado de la versión y del contenido),
+            "cuerpos": dict (codificación -> bytes: "identity", "gzip" y, si está
+                disponible, "br")
+        }
+    """
+    cuerpo = json.dumps(
+        {"version": version, "estaciones": estaciones, "rutas": rutas},
+        ensure_ascii=False, separators=(",", ":")
+    ).encode("utf-8")
+    resumen = hashlib.sha256(cuerpo).hexdigest()[:16]
+    cuerpos = {
+        "identity": cuerpo,
+        # mtime fijo para que el mismo contenido produzca siempre los mismos bytes
+        "gzip": gzip.compress(cuerpo, compresslevel=9, mtime=0)
+    }
+    if brotli is not None:
+        cuerpos["br"] = brotli.compress(cuerpo)
+    return {"etag": f'"{version}-{resumen}"', "cuerpos": cuerpos}
+
+
+def etag_coincide(if_none_match, etag):
+    """
+    Indica si la cabecera If-None-Match de una petición coincide con un ETag.
+
+    Args:
+        if_none_match (str): Valor de la cabecera, o None si no se envió
+        etag (str): ETag actual del recurso
+
+    Returns:
+        bool: True si el cliente ya tiene la versión actual
+    """
+    if not if_none_match:
+        return False
+    for candidato in if_none_match.split(","):
+        candidato = candidato.strip()
+        if candidato == "*":
+            return True
+        # If-None-Match usa comparación débil
+        if candidato.startswith("W/"):
+            candidato = candidato[2:]
+        if candidato == etag:
+            return True
+    return False
+
+
+def elegir_codificacion(accept_encoding, disponibles):
+    """
+    Elige la codificación de contenido a partir de la cabecera Accept-Encoding.
+
+    Args:
+        accept_encoding (str): Valor de la cabecera, o None si no se envió
+        disponibles (iterable): Codificaciones precalculadas
+
+    Returns:
+        str: "br", "gzip" o "identity"
+    """
+    aceptadas = {}
+    for parte in (accept_encoding or "").split(","):
+        nombre, _, parametros = parte.strip().partition(";")
+        nombre = nombre.strip().lower()
+        if not nombre:
+            continue
+        calidad = 1.0
+        parametros = parametros.strip()
+        if parametros.startswith("q="):
+            try:
+                calidad = float(parametros[2:])
+            except ValueError:
+                calidad = 0.0
+        aceptadas[nombre] = calidad
+    for codificacion in ("br", "gzip"):
+        calidad = aceptadas.get(codificacion, aceptadas.get("*", 0.0))
+        if codificacion in disponibles and calidad > 0:
+            return codificacion
+    return "identity"
+
+
+class VistasRed:
+    """
+    Datos de presentación de la red preparados una sola vez por versión del grafo.
+
+    Guarda la lista de estaciones, el menú agrupado y la lista de rutas, y la
+    geometría de la red ya serializada y comprimida para /api/red, de modo que
+    cada respuesta solo tiene que añadir los datos de su propia consulta.
+
+    Attributes:
+        grafo (Grafo): Grafo de la red
+    """
+    def __init__(self, grafo):
+        self.grafo = grafo
+        self._version = None
+        self._vista = None
+        self._candado = threading.Lock()
+
+    def vista(self):
+        """
+        Obtiene los datos de presentación de la versión actual del grafo.
+
+        Returns:
+            dict: {
+                "version": int,
+                "estaciones": list (todas las estaciones con sus datos),
+                "estaciones_mapa": list (estaciones con coordenadas),
+                "rutas": list (todas las rutas con su tipo y tiempo base),
+                "estaciones_agrupadas": dict (menú de estaciones por tipo y línea),
+                "nombres": dict (ID -> nombre completo),
+                "red": dict (resultado de serializar_red)
+            }
+        """
+        version = self.grafo.version
+        with self._candado:
+            if self._vista is None or self._version != version:
+                self._vista = self._construir(version)
+                self._version = version
+            return self._vista
+
+    def _construir(self, version):
+        estaciones = [
+            {
+                "id": id,
+                "nombre": estacion.nombre,
+                "tipo": estacion.tipo,
+                "linea": estacion.linea,
+                "coordenadas": estacion.coordenadas,
+                "cerrada": id in self.grafo.cerradas
+            }
+            for id, estacion in self.grafo.vertices.items()
+        ]
+        estaciones_mapa = [estacion for estacion in estaciones if estacion["coordenadas"]]
+        rutas = [
+            {
+                "origen": origen,
+                "destino": destino,
+                "tipo": ruta.tipo,
+                "tiempo": ruta.tiempo_base
+            }
+            for origen, rutas_destino in self.grafo.rutas.items()
+            for destino, ruta in rutas_destino.items()
+        ]
+        return {
+            "version": version,
+            "estaciones": estaciones,
+            "estaciones_mapa": estaciones_mapa,
+            "rutas": rutas,
+            "estaciones_agrupadas": agrupar_estaciones_por_tipo_y_linea(self.grafo),
+            "nombres": {id: nombre_completo_estacion(estacion) for id, estacion in self.grafo.vertices.items()},
+            "red": serializar_red(version, estaciones, rutas)
+        }
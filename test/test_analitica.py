@@ -0,0 +1,41 @@
+import unittest
+from src.graph import Grafo
+from src.analitica import AnalisisRed
+
+RUTA = {"tipo": "metro", "tiempo": 5, "congestion_tipica": {"normal": 1.0}}
+
+class TestAnalisisRed(unittest.TestCase):
+    def setUp(self):
+        self.grafo = Grafo()
+        for id in ("A", "B", "C"):
+            self.grafo.agregar_estacion(id, {"nombre": f"Estacion {id}", "tipo": "metro", "linea": "M1", "conexiones": []})
+        self.grafo.agregar_ruta("A", "B", RUTA)
+        self.grafo.agregar_ruta("B", "C", RUTA)
+        self.analisis = AnalisisRed(self.grafo)
+
+    def test_propiedades(self):
+        self.assertFalse(self.analisis.es_fuertemente_conexo)
+        self.assertFalse(self.analisis.tiene_ciclos)
+        self.assertEqual(len(self.analisis.componentes), 3)
+        self.assertEqual(self.analisis.reporte["sin_entrada"], [["B"], ["A"]])
+
+    def test_reutiliza_resultados_de_la_misma_version(self):
+        primeras = self.analisis.propiedades()
+        self.assertIs(self.analisis.propiedades(), primeras)
+
+    def test_recalcula_al_cambiar_la_version(self):
+        self.assertFalse(self.analisis.es_fuertemente_conexo)
+        self.grafo.agregar_ruta("C", "A", RUTA)
+        self.assertTrue(self.analisis.es_fuertemente_conexo)
+        self.assertTrue(self.analisis.tiene_ciclos)
+        self.assertEqual(self.analisis.propiedades()["version"], self.grafo.version)
+
+    def test_red_real(self):
+        grafo = Grafo()
+        grafo.cargar_desde_json("src/data/red.json")
+        componentes = AnalisisRed(grafo).componentes
+        self.assertEqual(sorted(id for c in componentes for id in c), sorted(grafo.vertices))
+
+
+if __name__ == '__main__':
+    unittest.main()
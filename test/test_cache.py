@@ -0,0 +1,75 @@
+import unittest
+from src.graph import Grafo
+from src.cache import CacheLRU, k_rutas_en_cache
+
+class RelojFalso:
+    def __init__(self):
+        self.ahora = 0.0
+
+    def __call__(self):
+        return self.ahora
+
+class TestCacheLRU(unittest.TestCase):
+    def test_aciertos_y_fallos(self):
+        cache = CacheLRU(capacidad=2)
+        self.assertIsNone(cache.obtener("a"))
+        cache.guardar("a", 1)
+        self.assertEqual(cache.obtener("a"), 1)
+        estadisticas = cache.estadisticas()
+        self.assertEqual((estadisticas["aciertos"], estadisticas["fallos"]), (1, 1))
+        self.assertEqual(estadisticas["tasa_aciertos"], 0.5)
+
+    def test_desalojo_lru(self):
+        cache = CacheLRU(capacidad=2)
+        cache.guardar("a", 1)
+        cache.guardar("b", 2)
+        cache.obtener("a")  # "b" pasa a ser la menos usada
+        cache.guardar("c", 3)
+        self.assertEqual(cache.obtener("b", "sin valor"), "sin valor")
+        self.assertEqual(cache.obtener("a"), 1)
+        self.assertEqual(cache.obtener("c"), 3)
+        self.assertEqual(cache.desalojos, 1)
+
+    def test_ttl(self):
+        reloj = RelojFalso()
+        cache = CacheLRU(capacidad=4, ttl=10, reloj=reloj)
+        cache.guardar("a", 1)
+        reloj.ahora = 5
+        self.assertEqual(cache.obtener("a"), 1)
+        reloj.ahora = 11
+        self.assertIsNone(cache.obtener("a"))
+        self.assertEqual(cache.expirados, 1)
+        self.assertEqual(len(cache), 0)
+
+    def test_obtener_o_calcular_e_invalidar(self):
+        cache = CacheLRU()
+        llamadas = []
+        calcular = lambda: llamadas.append(1) or "valor"
+        self.assertEqual(cache.obtener_o_calcular(("x", 1), calcular), "valor")
+        self.assertEqual(cache.obtener_o_calcular(("x", 1), calcular), "valor")
+        self.assertEqual(len(llamadas), 1)
+        cache.guardar(("y", 2), "otro")
+        self.assertEqual(cache.invalidar(lambda clave: clave[0] == "x"), 1)
+        self.assertEqual(len(cache), 1)
+
+    def test_k_rutas_en_cache_usa_version_del_grafo(self):
+        grafo = Grafo()
+        for id in ["A", "B", "C"]:
+            grafo.agregar_estacion(id, {"nombre": id, "tipo": "metro", "linea": "M1", "conexiones": []})
+        congestion = {"hora_pico_manana": 1.0, "hora_pico_tarde": 1.0, "normal": 1.0}
+        grafo.agregar_ruta("A", "B", {"tipo": "metro", "tiempo": 2, "congestion_tipica": congestion})
+        grafo.agregar_ruta("B", "C", {"tipo": "metro", "tiempo": 2, "congestion_tipica": congestion})
+
+        cache = CacheLRU()
+        self.assertEqual(k_rutas_en_cache(cache, grafo, "A", "C", 2, "normal"), ([4], [["A", "B", "C"]]))
+        k_rutas_en_cache(cache, grafo, "A", "C", 2, "normal")
+        self.assertEqual(cache.aciertos, 1)
+
+        # Agregar una ruta aumenta la versión del grafo y evita resultados obsoletos
+        version = grafo.version
+        grafo.agregar_ruta("A", "C", {"tipo": "metro", "tiempo": 1, "congestion_tipica": congestion})
+        self.assertGreater(grafo.version, version)
+        self.assertEqual(k_rutas_en_cache(cache, grafo, "A", "C", 2, "normal"), ([1, 4], [["A", "C"], ["A", "B", "C"]]))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,124 @@
+import json
+import os
+import tempfile
+import unittest
+from src.graph import Grafo
+from src.cargador import ErrorCargaRed, cargar_red
+
+CONGESTION = {"hora_pico_manana": 1.5, "hora_pico_tarde": 1.2, "normal": 1.0}
+
+
+def estacion(nombre, tipo="metro"):
+    return {"nombre": nombre, "tipo": tipo, "linea": "A", "conexiones": []}
+
+
+def ruta(origen, destino, tiempo=3, tipo="metro"):
+    return {"origen": origen, "destino": destino, "tipo": tipo, "tiempo": tiempo, "congestion_tipica": CONGESTION}
+
+
+class TestCargador(unittest.TestCase):
+    def setUp(self):
+        self.directorio = tempfile.TemporaryDirectory()
+        self.troncal = self.escribir("troncal.json", {
+            "vertices": {"A1": estacion("A1"), "A2": estacion("A2")},
+            "rutas": [ruta("A1", "A2"), ruta("A2", "A1"), ruta("A1", "A2")],
+            "horarios": {
+                "hora_pico_manana": {"inicio": "06:00", "fin": "08:00"},
+                "frecuencias": {"metro": {"hora_pico": 3, "normal": 5}}
+            }
+        })
+        self.alimentadora = self.escribir("alimentadora.json", {
+            "vertices": {"P1": estacion("P1", "alimentadora"), "A2": estacion("A2")},
+            "rutas": [ruta("A2", "P1", 4, "alimentadora"), ruta("P1", "A2", 4, "alimentadora")],
+            "horarios": {"frecuencias": {"alimentadora": {"hora_pico": 6, "normal": 10}}}
+        })
+
+    def tearDown(self):
+        self.directorio.cleanup()
+
+    def escribir(self, nombre, datos):
+        archivo = os.path.join(self.directorio.name, nombre)
+        with open(archivo, 'w', encoding='utf-8') as f:
+            json.dump(datos, f)
+        return archivo
+
+    def test_varios_archivos(self):
+        grafo = Grafo()
+        metricas = cargar_red(grafo, [self.troncal, self.alimentadora])
+        self.assertEqual(set(grafo.vertices), {"A1", "A2", "P1"})
+        self.assertEqual(grafo.rutas["A2"]["P1"].tiempo_base, 4)
+        self.assertEqual(set(grafo.horarios["frecuencias"]), {"metro", "alimentadora"})
+        self.assertEqual((metricas.estaciones, metricas.rutas), (3, 4))
+        # La ruta A1 -> A2 repetida y la estación A2 repetida son idénticas
+        self.assertEqual(metricas.duplicadas, 2)
+        self.assertEqual(metricas.conflictos, [])
+        self.assertEqual(grafo.compilar().num_aristas, 4)
+
+    def test_una_sola_version(self):
+        grafo = Grafo()
+        cargar_red(grafo, [self.troncal, self.alimentadora])
+        self.assertEqual(grafo.version, 1)
+
+    def test_espacio_de_nombres(self):
+        grafo = Grafo()
+        cargar_red(grafo, [self.troncal, (self.alimentadora, "ali")])
+        self.assertIn("ali:P1", grafo.vertices)
+        self.assertIn("ali:A2", grafo.vertices)
+        self.assertIn("ali:P1", grafo.rutas["ali:A2"])
+        self.assertNotIn("P1", grafo.rutas["A2"])
+
+    def test_conflictos_prevalece_el_ultimo(self):
+        otra = self.escribir("otra.json", {"vertices": {}, "rutas": [ruta("A1", "A2", 9)]})
+        grafo = Grafo()
+        metricas = cargar_red(grafo, [self.troncal, otra])
+        self.assertEqual(grafo.rutas["A1"]["A2"].tiempo_base, 9)
+        self.assertEqual(len(metricas.conflictos), 1)
+        with self.assertRaises(ErrorCargaRed):
+            cargar_red(Grafo(), [self.troncal, otra], estricto=True)
+
+    def test_rutas_colgantes(self):
+        rota = self.escribir("rota.json", {"vertices": {}, "rutas": [ruta("A1", "X9"), ruta("X8", "A1")]})
+        grafo = Grafo()
+        metricas = cargar_red(grafo, [self.troncal, rota])
+        self.assertEqual(metricas.colgantes, [("A1", "X9"), ("X8", "A1")])
+        self.assertNotIn("X9", grafo.rutas["A1"])
+        self.assertNotIn("X8", grafo.rutas)
+        with self.assertRaises(ErrorCargaRed):
+            cargar_red(Grafo(), [self.troncal, rota], estricto=True)
+
+    def test_archivos_invalidos(self):
+        grafo = Grafo()
+        sin_rutas = self.escribir("sin_rutas.json", {"vertices": {}})
+        incompleta = self.escribir("incompleta.json", {"vertices": {"Z": {"nombre": "Z"}}, "rutas": []})
+        for archivo in [sin_rutas, incompleta, os.path.join(self.directorio.name, "no_existe.json")]:
+            with self.assertRaises(ErrorCargaRed):
+                cargar_red(grafo, [self.troncal, archivo])
+        # Un error de validación no deja el grafo a medias
+        self.assertEqual(grafo.vertices, {})
+        self.assertEqual(grafo.version, 0)
+
+    def test_horarios_distintos(self):
+        # Una ventana o frecuencia que no coincide es un error aunque la carga no sea estricta
+        ventana = self.escribir("ventana.json", {
+            "vertices": {}, "rutas": [], "horarios": {"hora_pico_manana": {"inicio": "05:00", "fin": "08:30"}}
+        })
+        frecuencia = self.escribir("frecuencia.json", {
+            "vertices": {}, "rutas": [], "horarios": {"frecuencias": {"metro": {"hora_pico": 4, "normal": 5}}}
+        })
+        for archivo in [ventana, frecuencia]:
+            grafo = Grafo()
+            with self.assertRaises(ErrorCargaRed):
+                cargar_red(grafo, [self.troncal, archivo])
+            self.assertEqual(grafo.version, 0)
+
+    def test_red_con_alimentadoras(self):
+        grafo = Grafo()
+        metricas = cargar_red(grafo, ["src/data/rutas_alimentadoras.json", "src/data/red.json"], estricto=True)
+        self.assertEqual((metricas.conflictos, metricas.colgantes, metricas.duplicadas), ([], [], 0))
+        self.assertGreater(len(grafo.vertices), 72)
+        self.assertEqual(grafo.horarios["hora_pico_manana"], {"inicio": "06:00", "fin": "08:00"})
+        self.assertEqual(set(grafo.horarios["frecuencias"]), {"metro", "bus", "cable", "tranvia", "alimentadora"})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,60 @@
+import unittest
+from src.graph import Grafo
+from src.compilado import GrafoCompilado
+from src.dijkstra import dijkstra_k_rutas
+from src.utils import tiene_ciclos, es_fuertemente_conexo
+
+class TestGrafoCompilado(unittest.TestCase):
+    def setUp(self):
+        self.grafo = Grafo()
+        for id in ["A", "B", "C"]:
+            self.grafo.agregar_estacion(id, {"nombre": f"Estacion {id}", "tipo": "metro", "linea": "M1", "conexiones": []})
+
+        self.congestion = {
+            "hora_pico_manana": 1.5,
+            "hora_pico_tarde": 1.2,
+            "normal": 1.0
+        }
+        self.grafo.agregar_ruta("A", "B", {"tipo": "metro", "tiempo": 4, "congestion_tipica": self.congestion})
+        self.grafo.agregar_ruta("A", "C", {"tipo": "metro", "tiempo": 10, "congestion_tipica": self.congestion})
+        self.grafo.agregar_ruta("B", "C", {"tipo": "metro", "tiempo": 2, "congestion_tipica": self.congestion})
+
+    def test_estructura_csr(self):
+        compilado = GrafoCompilado(self.grafo)
+        self.assertEqual(len(compilado), 3)
+        self.assertEqual(compilado.num_aristas, 3)
+        self.assertEqual(list(compilado.offsets), [0, 2, 3, 3])
+
+        a = compilado.indice("A")
+        destinos = {compilado.ids[compilado.destinos[e]] for e in range(compilado.offsets[a], compilado.offsets[a + 1])}
+        self.assertEqual(destinos, {"B", "C"})
+
+    def test_pesos_por_banda(self):
+        compilado = GrafoCompilado(self.grafo)
+        self.assertEqual(compilado.obtener_adyacentes("A", "normal"), {"B": 4, "C": 10})
+        self.assertEqual(compilado.obtener_adyacentes("A", "hora_pico_manana"), {"B": 6, "C": 15})
+        self.assertEqual(compilado.obtener_adyacentes("C", "normal"), {})
+
+    def test_ignora_rutas_hacia_estaciones_inexistentes(self):
+        self.grafo.agregar_ruta("C", "Z", {"tipo": "metro", "tiempo": 1, "congestion_tipica": self.congestion})
+        compilado = GrafoCompilado(self.grafo)
+        self.assertEqual(compilado.num_aristas, 3)
+        self.assertEqual(compilado.sucesores("C"), [])
+
+    def test_compilar_reutiliza_hasta_modificar(self):
+        compilado = self.grafo.compilar()
+        self.assertIs(self.grafo.compilar(), compilado)
+
+        self.grafo.agregar_ruta("C", "A", {"tipo": "metro", "tiempo": 3, "congestion_tipica": self.congestion})
+        nuevo = self.grafo.compilar()
+        self.assertIsNot(nuevo, compilado)
+        self.assertEqual(nuevo.sucesores("C"), ["A"])
+
+    def test_busquedas_sobre_grafo_compilado(self):
+        compilado = self.grafo.compilar()
+        self.assertEqual(dijkstra_k_rutas(compilado, "A", K=1), dijkstra_k_rutas(self.grafo, "A", K=1))
+        self.assertFalse(tiene_ciclos(compilado))
+        self.assertFalse(es_fuertemente_conexo(compilado))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,158 @@
+import asyncio
+import gc
+import threading
+import unittest
+from src.concurrencia import EjecutorRutas, EjecutorSaturado
+
+class TestEjecutorRutas(unittest.TestCase):
+    def setUp(self):
+        self.ejecutor = EjecutorRutas(hilos=2, max_pendientes=2)
+
+    def tearDown(self):
+        self.ejecutor.cerrar()
+
+    def test_ejecuta_fuera_del_bucle(self):
+        async def consultar():
+            return await self.ejecutor.ejecutar(threading.current_thread)
+
+        hilo = asyncio.run(consultar())
+        self.assertIsNot(hilo, threading.main_thread())
+        self.assertEqual(self.ejecutor.estadisticas()["completadas"], 1)
+
+    def test_rechaza_cuando_esta_saturado(self):
+        liberar = threading.Event()
+
+        async def consultar():
+            pendientes = [asyncio.ensure_future(self.ejecutor.ejecutar(liberar.wait, 5)) for _ in range(2)]
+            await asyncio.sleep(0)
+            with self.assertRaises(EjecutorSaturado):
+                await self.ejecutor.ejecutar(sum, [1, 2])
+            liberar.set()
+            await asyncio.gather(*pendientes)
+            # Al terminar los trabajos vuelve a admitir
+            return await self.ejecutor.ejecutar(sum, [1, 2])
+
+        self.assertEqual(asyncio.run(consultar()), 3)
+        estadisticas = self.ejecutor.estadisticas()
+        self.assertEqual((estadisticas["rechazadas"], estadisticas["pendientes"]), (1, 0))
+
+    def test_modificar_espera_a_las_busquedas(self):
+        empezada = threading.Event()
+        liberar = threading.Event()
+        orden = []
+
+        def buscar():
+            empezada.set()
+            liberar.wait(5)
+            orden.append("busqueda")
+
+        async def consultar():
+            busqueda = asyncio.ensure_future(self.ejecutor.ejecutar(buscar))
+            await asyncio.get_running_loop().run_in_executor(None, empezada.wait, 5)
+            modificacion = asyncio.ensure_future(self.ejecutor.modificar(orden.append, "modificacion"))
+            await asyncio.sleep(0.05)
+            # La búsqueda nueva espera a la modificación, que espera a la primera
+            posterior = asyncio.ensure_future(self.ejecutor.ejecutar(orden.append, "posterior"))
+            await asyncio.sleep(0.05)
+            self.assertEqual(orden, [])
+            liberar.set()
+            await asyncio.gather(busqueda, modificacion, posterior)
+
+        asyncio.run(consultar())
+        self.assertEqual(orden, ["busqueda", "modificacion", "posterior"])
+        self.assertEqual(self.ejecutor.estadisticas()["en_curso"], 0)
+
+    def test_modificar_fuera_del_bucle(self):
+        async def modificar():
+            return await self.ejecutor.modificar(threading.current_thread)
+
+        hilo = asyncio.run(modificar())
+        self.assertIsNot(hilo, threading.main_thread())
+
+    def test_modificar_cancelada_termina_y_libera(self):
+        liberar = threading.Event()
+        aplicadas = []
+
+        def aplicar():
+            liberar.wait(5)
+            aplicadas.append(True)
+
+        async def cancelar():
+            modificacion = asyncio.ensure_future(self.ejecutor.modificar(aplicar))
+            await asyncio.sleep(0.05)
+            modificacion.cancel()
+            liberar.set()
+            # La modificación empezada termina y las búsquedas vuelven a ejecutarse
+            return await self.ejecutor.ejecutar(sum, [1, 2])
+
+        self.assertEqual(asyncio.run(cancelar()), 3)
+        self.assertEqual(aplicadas, [True])
+
+    def test_consultar(self):
+        self.assertIs(self.ejecutor.consultar(threading.current_thread), threading.main_thread())
+        empezada = threading.Event()
+        liberar = threading.Event()
+
+        def aplicar():
+            empezada.set()
+            liberar.wait(5)
+
+        async def consultar_durante_modificacion():
+            modificacion = asyncio.ensure_future(self.ejecutor.modificar(aplicar))
+            await asyncio.get_running_loop().run_in_executor(None, empezada.wait, 5)
+            # Con una modificación pendiente no espera: devuelve el valor por defecto
+            resultado = self.ejecutor.consultar(sum, [1, 2], defecto="ocupado")
+            liberar.set()
+            await modificacion
+            return resultado, self.ejecutor.consultar(sum, [1, 2], defecto="ocupado")
+
+        self.assertEqual(asyncio.run(consultar_durante_modificacion()), ("ocupado", 3))
+        self.assertEqual(self.ejecutor.estadisticas()["en_curso"], 0)
+
+    def test_admitir_iterador(self):
+        async def recorrer():
+            return [x async for x in self.ejecutor.admitir_iterador(iter(range(4)))]
+
+        self.assertEqual(asyncio.run(recorrer()), [0, 1, 2, 3])
+        self.assertEqual(self.ejecutor.estadisticas()["pendientes"], 0)
+
+    def test_admitir_iterador_libera_si_no_se_recorre(self):
+        cerrados = []
+
+        def generar():
+            try:
+                yield from range(4)
+            finally:
+                cerrados.append(True)
+
+        # Descartado sin empezar, como una respuesta cuyo cliente se desconecta antes
+        recorrido = self.ejecutor.admitir_iterador(generar())
+        self.assertEqual(self.ejecutor.estadisticas()["pendientes"], 1)
+        del recorrido
+        gc.collect()
+        self.assertEqual(self.ejecutor.estadisticas()["pendientes"], 0)
+
+        async def cerrar_a_medias():
+            recorrido = self.ejecutor.admitir_iterador(generar())
+            self.assertEqual(await recorrido.__anext__(), 0)
+            await recorrido.aclose()
+
+        asyncio.run(cerrar_a_medias())
+        self.assertEqual(self.ejecutor.estadisticas()["pendientes"], 0)
+        self.assertEqual(cerrados, [True])
+
+    def test_admitir_iterador_libera_si_falla(self):
+        def fallar():
+            yield 1
+            raise RuntimeError("fallo")
+
+        async def recorrer():
+            return [x async for x in self.ejecutor.admitir_iterador(fallar())]
+
+        with self.assertRaises(RuntimeError):
+            asyncio.run(recorrer())
+        self.assertEqual(self.ejecutor.estadisticas()["pendientes"], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,105 @@
+import unittest
+import os
+import tempfile
+from src.graph import Grafo
+from src.cargador import cargar_red
+from src.dijkstra import calcular_ruta_mas_corta, ruta_mas_corta
+from src.contraccion import (
+    JerarquiaContraccion, comparar_rendimiento, obtener_jerarquia, ruta_contraccion, ruta_jerarquia
+)
+
+CONGESTION = {"hora_pico_manana": 1.5, "hora_pico_tarde": 1.2, "normal": 1.0}
+
+
+class TestContraccion(unittest.TestCase):
+    def setUp(self):
+        # Línea A1-A2-A3-A4 en ambos sentidos, ramal A2 -> B1 -> B2 -> A4 y un
+        # atajo A1 -> A3 que solo compensa en hora pico (congestión propia menor)
+        self.grafo = Grafo()
+        for id in ["A1", "A2", "A3", "A4", "B1", "B2"]:
+            self.grafo.agregar_estacion(id, {"nombre": id, "tipo": "metro", "linea": id[0], "conexiones": []})
+        for origen, destino, tiempo in [("A1", "A2", 3), ("A2", "A3", 4), ("A3", "A4", 2), ("A2", "B1", 5), ("B1", "B2", 1), ("B2", "A4", 1)]:
+            self.grafo.agregar_ruta(origen, destino, {"tipo": "metro", "tiempo": tiempo, "congestion_tipica": CONGESTION})
+            if origen[0] == destino[0] == "A":
+                self.grafo.agregar_ruta(destino, origen, {"tipo": "metro", "tiempo": tiempo, "congestion_tipica": CONGESTION})
+        self.grafo.agregar_ruta("A1", "A3", {"tipo": "bus", "tiempo": 8, "congestion_tipica": {"hora_pico_manana": 1.0, "normal": 1.0}})
+
+    def comprobar_todos_los_pares(self, grafo, bandas):
+        compilado = grafo.compilar()
+        jerarquia = obtener_jerarquia(grafo)
+        for banda in bandas:
+            for origen in compilado.ids:
+                for destino in compilado.ids:
+                    tiempo, camino = jerarquia.ruta(compilado, origen, destino, banda)
+                    esperado = ruta_mas_corta(grafo, origen, destino, banda)[0]
+                    self.assertAlmostEqual(tiempo, esperado, msg=(origen, destino, banda))
+                    if camino:
+                        self.assertEqual((camino[0], camino[-1]), (origen, destino))
+                        recorrido = sum(grafo.obtener_adyacentes(u, banda)[v] for u, v in zip(camino, camino[1:]))
+                        self.assertAlmostEqual(recorrido, tiempo)
+
+    def test_ruta_jerarquia(self):
+        self.assertEqual(ruta_jerarquia(os.path.join("src", "data", "red.json")), os.path.join("src", "data", "red.ch.json"))
+
+    def test_rutas_exactas_por_banda(self):
+        self.comprobar_todos_los_pares(self.grafo, ["normal", "hora_pico_manana", "hora_pico_tarde"])
+        # El atajo A1 -> A3 solo se usa en hora pico: 8 frente a 7 * 1.5
+        self.assertEqual(ruta_contraccion(self.grafo, "A1", "A4", "normal"), (9, ["A1", "A2", "A3", "A4"]))
+        self.assertEqual(ruta_contraccion(self.grafo, "A1", "A4", "hora_pico_manana"), (11, ["A1", "A3", "A4"]))
+        self.assertEqual(ruta_contraccion(self.grafo, "B2", "A1", "normal"), (10, ["B2", "A4", "A3", "A2", "A1"]))
+        self.assertEqual(ruta_contraccion(self.grafo, "A1", "B1", "normal"), (8, ["A1", "A2", "B1"]))
+
+    def test_sin_ruta(self):
+        self.grafo.agregar_estacion("C1", {"nombre": "C1", "tipo": "metro", "linea": "C", "conexiones": []})
+        self.assertEqual(ruta_contraccion(self.grafo, "A1", "C1", "normal"), (float('inf'), []))
+        self.assertEqual(ruta_contraccion(self.grafo, "A1", "Z9", "normal"), (float('inf'), []))
+        self.assertEqual(ruta_contraccion(self.grafo, "A1", "A1", "normal"), (0, ["A1"]))
+
+    def test_metodo_de_ruta(self):
+        self.assertEqual(
+            calcular_ruta_mas_corta(self.grafo, "A1", "B2", "normal", "contraccion"),
+            ruta_mas_corta(self.grafo, "A1", "B2", "normal")
+        )
+
+    def test_persistencia_e_invalidacion(self):
+        with tempfile.TemporaryDirectory() as directorio:
+            archivo = os.path.join(directorio, "red.ch.json")
+            jerarquia = obtener_jerarquia(self.grafo, archivo)
+            self.assertTrue(os.path.exists(archivo))
+            self.assertIs(self.grafo.compilar().jerarquia, jerarquia)
+
+            cargada = JerarquiaContraccion.cargar(archivo, self.grafo.compilar())
+            self.assertEqual(list(cargada.rango), list(jerarquia.rango))
+            self.assertEqual(cargada.atajos, jerarquia.atajos)
+            compilado = self.grafo.compilar()
+            self.assertEqual(cargada.ruta(compilado, "B2", "A1", "normal"), jerarquia.ruta(compilado, "B2", "A1", "normal"))
+
+            # Un cambio de tiempos descarta la jerarquía y la guardada deja de valer
+            self.grafo.cambiar_tiempo_ruta("A2", "A3", 1)
+            self.assertIsNone(self.grafo.compilar().jerarquia)
+            self.assertIsNone(JerarquiaContraccion.cargar(archivo, self.grafo.compilar()))
+            self.assertEqual(ruta_contraccion(self.grafo, "A1", "A4", "normal"), (6, ["A1", "A2", "A3", "A4"]))
+
+            with open(archivo, 'w', encoding='utf-8') as f:
+                f.write("{")
+            self.assertIsNone(JerarquiaContraccion.cargar(archivo, self.grafo.compilar()))
+            self.assertIsNone(JerarquiaContraccion.cargar(os.path.join(directorio, "no_existe.json"), self.grafo.compilar()))
+
+    def test_estacion_cerrada(self):
+        self.grafo.compilar()
+        self.grafo.cerrar_estacion("A3")
+        self.comprobar_todos_los_pares(self.grafo, ["normal"])
+        self.assertEqual(ruta_contraccion(self.grafo, "A1", "A4", "normal"), (10, ["A1", "A2", "B1", "B2", "A4"]))
+
+    def test_red_real(self):
+        grafo = Grafo()
+        cargar_red(grafo, ["src/data/rutas_alimentadoras.json", "src/data/red.json"])
+        self.comprobar_todos_los_pares(grafo, ["normal"])
+        medidas = comparar_rendimiento(grafo, consultas=50)
+        self.assertEqual(medidas["estaciones"], len(grafo.vertices))
+        self.assertEqual(medidas["atajos"], grafo.compilar().jerarquia.num_atajos)
+        self.assertGreater(medidas["aceleracion"], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,111 @@
+import random
+import unittest
+from src.graph import Grafo
+from src.dijkstra import ruta_mas_corta
+from src.dependiente_tiempo import obtener_perfiles, ruta_dependiente_tiempo, perfil_llegada, minutos_del_dia
+
+CONGESTION = {"hora_pico_manana": 2.0, "hora_pico_tarde": 1.5, "normal": 1.0}
+
+class TestDependienteTiempo(unittest.TestCase):
+    def setUp(self):
+        self.grafo = Grafo()
+        for id, tipo in [("A", "metro"), ("B", "metro"), ("C", "bus"), ("D", "bus")]:
+            self.grafo.agregar_estacion(id, {"nombre": id, "tipo": tipo, "linea": "1", "conexiones": []})
+        self.grafo.agregar_ruta("A", "B", {"tipo": "metro", "tiempo": 10, "congestion_tipica": CONGESTION})
+        self.grafo.agregar_ruta("B", "C", {"tipo": "transbordo", "tiempo": 2, "congestion_tipica": {"normal": 1.0}})
+        self.grafo.agregar_ruta("C", "D", {"tipo": "alimentadora", "tiempo": 6, "congestion_tipica": CONGESTION})
+        self.grafo.horarios = {
+            "hora_pico_manana": {"inicio": "06:00", "fin": "08:00"},
+            "hora_pico_tarde": {"inicio": "17:00", "fin": "19:00"},
+            "frecuencias": {"metro": {"hora_pico": 4, "normal": 6}, "bus": {"hora_pico": 10, "normal": 12}}
+        }
+
+    def test_perfiles(self):
+        perfiles = obtener_perfiles(self.grafo)
+        self.assertEqual(perfiles.inicios, [0, 360, 480, 1020, 1140])
+        self.assertEqual(perfiles.bandas, ["normal", "hora_pico_manana", "normal", "hora_pico_tarde", "normal"])
+        self.assertIs(obtener_perfiles(self.grafo), perfiles)
+
+    def test_esperas_por_cambio_de_modo(self):
+        # 12:00: espera metro 3 + viaje 10, transbordo 2, espera bus 6 + viaje 6
+        llegada, camino = ruta_dependiente_tiempo(self.grafo, "A", "D", "12:00")
+        self.assertEqual(camino, ["A", "B", "C", "D"])
+        self.assertEqual(llegada, 720 + 3 + 10 + 2 + 6 + 6)
+
+    def test_congestion_al_llegar_a_cada_tramo(self):
+        # Sale a las 05:40 en hora normal y llega a la alimentadora ya en hora pico
+        llegada, _ = ruta_dependiente_tiempo(self.grafo, "A", "D", "05:40")
+        # 340 + 3 + 10 = 353, +2 = 355, espera normal 6 -> 361 (hora pico), viaje 12
+        self.assertEqual(llegada, 373)
+
+    def test_fifo_espera_al_fin_de_la_hora_pico(self):
+        # Subir al metro a las 07:58 costaría 20 minutos; esperar a las 08:00 cuesta 10
+        perfiles = obtener_perfiles(self.grafo)
+        self.assertEqual(perfiles.llegada(0, 478), 490)
+        self.assertEqual(perfiles.llegada(0, 470), 490)
+        self.assertEqual(perfiles.llegada(0, 450), 470)
+
+    def test_fifo_en_la_red(self):
+        grafo = Grafo()
+        grafo.cargar_desde_json("src/data/red.json")
+        ids = list(grafo.vertices)
+        aleatorio = random.Random(7)
+        for _ in range(50):
+            origen, destino = aleatorio.sample(ids, 2)
+            salida = aleatorio.uniform(0, 1440)
+            antes, _ = ruta_dependiente_tiempo(grafo, origen, destino, salida)
+            despues, _ = ruta_dependiente_tiempo(grafo, origen, destino, salida + aleatorio.uniform(0, 30))
+            self.assertLessEqual(antes, despues + 1e-9)
+
+    def test_sin_frecuencias_coincide_con_dijkstra(self):
+        self.grafo.horarios = {"hora_pico_manana": {"inicio": "06:00", "fin": "08:00"}}
+        llegada, camino = ruta_dependiente_tiempo(self.grafo, "A", "D", "12:00")
+        tiempo, camino_estatico = ruta_mas_corta(self.grafo, "A", "D", "normal")
+        self.assertEqual((llegada - 720, camino), (tiempo, camino_estatico))
+
+    def test_sin_ruta(self):
+        self.assertEqual(ruta_dependiente_tiempo(self.grafo, "D", "A", "12:00"), (float('inf'), []))
+        self.assertEqual(ruta_dependiente_tiempo(self.grafo, "A", "X", "12:00"), (float('inf'), []))
+
+    def test_perfil_salto_al_entrar_en_hora_pico(self):
+        # Antes de las 05:57 se sube al metro en hora normal (espera 3 + viaje 10);
+        # después el viaje ya es en hora pico (20), con un salto en la llegada
+        perfil = perfil_llegada(self.grafo, "A", "B", "05:50", "06:10")
+        self.assertEqual(perfil.evaluar(350), 363)
+        self.assertEqual(perfil.evaluar(356), 369)
+        self.assertEqual(perfil.evaluar(358), 381)
+        self.assertEqual(perfil.evaluar(359.5), 382)
+        self.assertEqual(perfil.evaluar(365), 387)
+        self.assertIn((357, 370), perfil.puntos())
+        self.assertIn((357, 380), perfil.puntos())
+
+    def test_perfil_coincide_con_consultas_puntuales(self):
+        grafo = Grafo()
+        grafo.cargar_desde_json("src/data/red.json")
+        ids = list(grafo.vertices)
+        aleatorio = random.Random(11)
+        for _ in range(20):
+            origen, destino = aleatorio.sample(ids, 2)
+            perfil = perfil_llegada(grafo, origen, destino, "06:30", "09:30")
+            for _ in range(15):
+                salida = aleatorio.uniform(390, 570)
+                llegada, _ = ruta_dependiente_tiempo(grafo, origen, destino, salida)
+                self.assertAlmostEqual(perfil.evaluar(salida), llegada, places=6)
+
+    def test_perfil_cruza_la_medianoche(self):
+        perfil = perfil_llegada(self.grafo, "A", "D", "23:50", "00:10")
+        self.assertEqual((perfil.xs[0], perfil.fin), (1430, 1450))
+        for salida in (1430, 1439, 1445):
+            self.assertEqual(perfil.evaluar(salida), ruta_dependiente_tiempo(self.grafo, "A", "D", salida)[0])
+
+    def test_perfil_sin_ruta(self):
+        self.assertIsNone(perfil_llegada(self.grafo, "D", "A", "06:00", "07:00"))
+        self.assertIsNone(perfil_llegada(self.grafo, "A", "X", "06:00", "07:00"))
+
+    def test_minutos_del_dia(self):
+        self.assertEqual(minutos_del_dia("06:30"), 390)
+        self.assertEqual(minutos_del_dia(390.5), 390.5)
+
+
+if __name__ == '__main__':
+    unittest.main()
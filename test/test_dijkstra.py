@@ -1,5 +1,9 @@
 import unittest
-from src.dijkstra import dijkstra
+from src.dijkstra import (
+    dijkstra, dijkstra_k_rutas, k_rutas_mas_cortas,
+    ruta_mas_corta, ruta_mas_corta_bidireccional,
+    ruta_a_estrella, calcular_ruta_mas_corta, matriz_od
+)
 from src.graph import Grafo
 
 class TestDijkstra(unittest.TestCase):
@@ -98,5 +102,110 @@ class TestDijkstra(unittest.TestCase):
             self.assertEqual(distancias[nodo], float('inf'))
             self.assertEqual(caminos[nodo], [])
 
+    def test_k_rutas_mas_cortas(self):
+        distancias, caminos = k_rutas_mas_cortas(self.grafo, "A", "D", K=3)
+        
+        # Solo existen dos rutas sin ciclos entre A y D
+        self.assertEqual(distancias, [12, 14])
+        self.assertEqual(caminos, [["A", "B", "C", "D"], ["A", "C", "D"]])
+
+    def test_k_rutas_mas_cortas_sin_ciclos(self):
+        # Con un ciclo B <-> C, las rutas aceptadas no repiten estaciones
+        self.grafo.agregar_ruta("C", "B", {
+            "tipo": "metro",
+            "tiempo": 1,
+            "congestion_tipica": {
+                "hora_pico_manana": 1.0,
+                "hora_pico_tarde": 1.0,
+                "normal": 1.0
+            }
+        })
+        distancias, caminos = k_rutas_mas_cortas(self.grafo, "A", "C", K=5)
+        self.assertEqual(distancias, [8, 10])
+        for camino in caminos:
+            self.assertEqual(len(camino), len(set(camino)))
+
+    def test_k_rutas_mas_cortas_sin_ruta(self):
+        self.assertEqual(k_rutas_mas_cortas(self.grafo, "D", "A", K=2), ([], []))
+        self.assertEqual(k_rutas_mas_cortas(self.grafo, "A", "Z", K=2), ([], []))
+
+    def test_dijkstra_k_rutas(self):
+        distancias, caminos = dijkstra_k_rutas(self.grafo, "A", K=2)
+        self.assertEqual(distancias["D"], [12, 14])
+        self.assertEqual(caminos["D"], [["A", "B", "C", "D"], ["A", "C", "D"]])
+        self.assertEqual(distancias["A"], [0])
+
+    def test_ruta_mas_corta(self):
+        self.assertEqual(ruta_mas_corta(self.grafo, "A", "D"), (12, ["A", "B", "C", "D"]))
+        self.assertEqual(ruta_mas_corta(self.grafo, "A", "A"), (0, ["A"]))
+        self.assertEqual(ruta_mas_corta(self.grafo, "D", "A"), (float('inf'), []))
+
+    def test_ruta_mas_corta_bidireccional(self):
+        self.assertEqual(ruta_mas_corta_bidireccional(self.grafo, "A", "D"), (12, ["A", "B", "C", "D"]))
+        self.assertEqual(ruta_mas_corta_bidireccional(self.grafo, "B", "D"), (7, ["B", "C", "D"]))
+        self.assertEqual(ruta_mas_corta_bidireccional(self.grafo, "D", "A"), (float('inf'), []))
+        
+        # Debe coincidir con Dijkstra desde cada origen
+        for origen in ["A", "B", "C", "D"]:
+            distancias, _ = dijkstra(self.grafo, origen)
+            for destino in ["A", "B", "C", "D"]:
+                tiempo, _ = ruta_mas_corta_bidireccional(self.grafo, origen, destino)
+                self.assertEqual(tiempo, distancias[destino])
+
+    def test_ruta_a_estrella_coincide_con_dijkstra(self):
+        # Estaciones con coordenadas y una ruta rápida que calibra la velocidad máxima
+        coordenadas = {"A": [-75.60, 6.20], "B": [-75.58, 6.21], "C": [-75.57, 6.22], "D": [-75.55, 6.25]}
+        for id, coord in coordenadas.items():
+            self.grafo.vertices[id].coordenadas = coord
+        self.grafo.agregar_ruta("A", "D", {
+            "tipo": "cable",
+            "tiempo": 20,
+            "congestion_tipica": {
+                "hora_pico_manana": 1.0,
+                "hora_pico_tarde": 1.0,
+                "normal": 1.0
+            }
+        })
+        
+        for origen in coordenadas:
+            distancias, _ = dijkstra(self.grafo, origen)
+            for destino in coordenadas:
+                tiempo, camino = ruta_a_estrella(self.grafo, origen, destino)
+                self.assertEqual(tiempo, distancias[destino])
+                if camino:
+                    self.assertEqual((camino[0], camino[-1]), (origen, destino))
+        
+        self.assertEqual(ruta_a_estrella(self.grafo, "A", "D"), (12, ["A", "B", "C", "D"]))
+
+    def test_ruta_a_estrella_por_estacion_sin_coordenadas(self):
+        # B -> C calibra una velocidad baja; X está lejos de D pero llega a él en 2
+        # minutos pasando por E, que no tiene coordenadas
+        coordenadas = {"B": [-75.60, 6.20], "C": [-75.59, 6.20], "D": [-75.50, 6.20], "X": [-75.80, 6.20]}
+        self.grafo.agregar_estacion("X", {"nombre": "Estacion X", "tipo": "bus", "linea": "1", "conexiones": []})
+        self.grafo.agregar_estacion("E", {"nombre": "Estacion E", "tipo": "bus", "linea": "1", "conexiones": []})
+        for id, coord in coordenadas.items():
+            self.grafo.vertices[id].coordenadas = coord
+        congestion = {"hora_pico_manana": 1.0, "hora_pico_tarde": 1.0, "normal": 1.0}
+        for origen, destino in [("A", "X"), ("X", "E"), ("E", "D")]:
+            self.grafo.agregar_ruta(origen, destino, {"tipo": "bus", "tiempo": 1, "congestion_tipica": congestion})
+        self.assertEqual(ruta_a_estrella(self.grafo, "A", "D", "normal"), (3, ["A", "X", "E", "D"]))
+
+    def test_calcular_ruta_mas_corta_por_metodo(self):
+        for metodo in ["dijkstra", "bidireccional", "a_estrella"]:
+            self.assertEqual(calcular_ruta_mas_corta(self.grafo, "A", "D", metodo=metodo), (12, ["A", "B", "C", "D"]))
+        with self.assertRaises(ValueError):
+            calcular_ruta_mas_corta(self.grafo, "A", "D", metodo="desconocido")
+
+    def test_matriz_od(self):
+        origenes = ["A", "B", "A", "X"]
+        destinos = ["D", "A", "C", "Y"]
+        filas = list(matriz_od(self.grafo, origenes, destinos, "normal"))
+        # Un resultado por origen distinto, en el orden de la petición
+        self.assertEqual([origen for origen, _ in filas], ["A", "B", "X"])
+        for origen, tiempos in filas:
+            distancias, _ = dijkstra(self.grafo, origen, "normal")
+            esperados = [distancias.get(destino, float('inf')) for destino in destinos]
+            self.assertEqual(tiempos, esperados)
+
 if __name__ == '__main__':
     unittest.main() 
\ No newline at end of file
@@ -0,0 +1,66 @@
+import random
+import unittest
+from src.cargador import cargar_red
+from src.espacial import IndiceEspacial, obtener_indice_espacial
+from src.geo import haversine_km
+from src.graph import Estacion, Grafo
+
+
+class TestEspacial(unittest.TestCase):
+    def setUp(self):
+        generador = random.Random(7)
+        self.estaciones = [
+            Estacion(f"E{i}", f"Estación {i}", "bus", "1", [], [-75.7 + generador.random() * 0.3, 6.1 + generador.random() * 0.3])
+            for i in range(500)
+        ]
+        # Las estaciones sin coordenadas no entran en el índice
+        self.estaciones.append(Estacion("S", "Sin coordenadas", "bus", "1", []))
+        self.indice = IndiceEspacial(self.estaciones)
+        self.puntos = [[-75.8 + generador.random() * 0.5, 6.0 + generador.random() * 0.5] for _ in range(50)]
+
+    def lineal(self, punto):
+        return sorted((haversine_km(punto, e.coordenadas), e.id) for e in self.estaciones if e.coordenadas)
+
+    def test_tamano(self):
+        self.assertEqual(len(self.indice), 500)
+        self.assertNotIn("S", self.indice.ids)
+
+    def test_cercanas_como_busqueda_lineal(self):
+        for punto in self.puntos:
+            esperado = self.lineal(punto)[:5]
+            obtenido = self.indice.cercanas(punto, 5)
+            self.assertEqual([id for id, _ in obtenido], [id for _, id in esperado])
+            for (_, distancia), (esperada, _) in zip(obtenido, esperado):
+                self.assertAlmostEqual(distancia, esperada)
+
+    def test_en_radio_como_busqueda_lineal(self):
+        for punto in self.puntos:
+            obtenido = self.indice.en_radio(punto, 1.5)
+            self.assertEqual([id for id, _ in obtenido], [id for d, id in self.lineal(punto) if d <= 1.5])
+        self.assertEqual(self.indice.en_radio(self.puntos[0], 0), [])
+
+    def test_excluir(self):
+        punto = self.puntos[0]
+        primera, segunda = [id for _, id in self.lineal(punto)[:2]]
+        self.assertEqual(self.indice.cercanas(punto, 1, excluir={primera})[0][0], segunda)
+        self.assertNotIn(primera, [id for id, _ in self.indice.en_radio(punto, 50, excluir={primera})])
+
+    def test_casos_limite(self):
+        self.assertEqual(self.indice.cercanas(self.puntos[0], 0), [])
+        self.assertEqual(len(self.indice.cercanas(self.puntos[0], 1000)), 500)
+        self.assertEqual(IndiceEspacial([]).cercanas(self.puntos[0], 3), [])
+        estacion = self.estaciones[10]
+        self.assertEqual(self.indice.cercanas(estacion.coordenadas, 1), [(estacion.id, 0.0)])
+
+    def test_red_real(self):
+        grafo = Grafo()
+        cargar_red(grafo, ["src/data/rutas_alimentadoras.json", "src/data/red.json"])
+        indice = obtener_indice_espacial(grafo)
+        self.assertIs(obtener_indice_espacial(grafo), indice)
+        niquia = grafo.vertices["A_Niquia"].coordenadas
+        self.assertEqual(indice.cercanas(niquia, 1)[0][0], "A_Niquia")
+        self.assertEqual(indice.cercanas([niquia[0] + 0.001, niquia[1]], 1)[0][0], "A_Niquia")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,49 @@
+import unittest
+from src.geo import haversine_km, calibrar_velocidades
+from src.graph import Grafo
+
+class TestGeo(unittest.TestCase):
+    def test_haversine_km(self):
+        self.assertEqual(haversine_km([-75.56, 6.25], [-75.56, 6.25]), 0)
+        # Un grado de latitud son unos 111 km
+        self.assertAlmostEqual(haversine_km([-75.56, 6.0], [-75.56, 7.0]), 111.2, delta=0.2)
+        self.assertAlmostEqual(
+            haversine_km([-75.54, 6.33], [-75.60, 6.19]),
+            haversine_km([-75.60, 6.19], [-75.54, 6.33])
+        )
+
+    def test_calibrar_velocidades(self):
+        grafo = Grafo()
+        grafo.agregar_estacion("A", {"nombre": "A", "tipo": "metro", "linea": "A", "conexiones": [], "coordenadas": [-75.56, 6.0]})
+        grafo.agregar_estacion("B", {"nombre": "B", "tipo": "metro", "linea": "A", "conexiones": [], "coordenadas": [-75.56, 6.1]})
+        grafo.agregar_estacion("C", {"nombre": "C", "tipo": "metro", "linea": "A", "conexiones": []})
+        congestion = {"hora_pico_manana": 2.0, "hora_pico_tarde": 1.0, "normal": 1.0}
+        grafo.agregar_ruta("A", "B", {"tipo": "metro", "tiempo": 10, "congestion_tipica": congestion})
+        grafo.agregar_ruta("B", "C", {"tipo": "bus", "tiempo": 1, "congestion_tipica": congestion})
+
+        compilado = grafo.compilar()
+        distancia = haversine_km([-75.56, 6.0], [-75.56, 6.1])
+        velocidades = calibrar_velocidades(compilado, "normal")
+        # Las rutas hacia estaciones sin coordenadas que no llevan a otra con ellas no participan
+        self.assertEqual(set(velocidades), {"metro"})
+        self.assertAlmostEqual(velocidades["metro"], distancia / 10)
+        self.assertAlmostEqual(compilado.velocidad_maxima("hora_pico_manana"), distancia / 20)
+
+    def test_calibrar_tramos_sin_coordenadas(self):
+        # A -> C -> B pasa por una estación sin coordenadas y es más rápido que A -> B
+        grafo = Grafo()
+        grafo.agregar_estacion("A", {"nombre": "A", "tipo": "metro", "linea": "A", "conexiones": [], "coordenadas": [-75.56, 6.0]})
+        grafo.agregar_estacion("B", {"nombre": "B", "tipo": "metro", "linea": "A", "conexiones": [], "coordenadas": [-75.56, 6.1]})
+        grafo.agregar_estacion("C", {"nombre": "C", "tipo": "bus", "linea": "1", "conexiones": []})
+        congestion = {"normal": 1.0}
+        grafo.agregar_ruta("A", "B", {"tipo": "metro", "tiempo": 10, "congestion_tipica": congestion})
+        grafo.agregar_ruta("A", "C", {"tipo": "bus", "tiempo": 1, "congestion_tipica": congestion})
+        grafo.agregar_ruta("C", "B", {"tipo": "bus", "tiempo": 1, "congestion_tipica": congestion})
+
+        distancia = haversine_km([-75.56, 6.0], [-75.56, 6.1])
+        velocidades = calibrar_velocidades(grafo.compilar(), "normal")
+        self.assertAlmostEqual(velocidades["bus"], distancia / 2)
+        self.assertAlmostEqual(grafo.compilar().velocidad_maxima("normal"), distancia / 2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -50,6 +50,36 @@ class TestGrafo(unittest.TestCase):
         self.assertEqual(self.grafo.rutas["A"]["B"].tiempo_base, 5)
         self.assertEqual(self.grafo.rutas["A"]["B"].tipo, "metro")
 
+    def test_agregar_lote(self):
+        self.grafo.agregar_estacion("A", self.datos_estacion)
+        version = self.grafo.version
+        estaciones = [Estacion("A", "Estacion A2", "metro", "M1", []), Estacion("B", "Estacion B", "metro", "M1", [])]
+        rutas = [Ruta("A", "B", "metro", 5, self.datos_ruta["congestion_tipica"])]
+        self.grafo.agregar_lote(estaciones, rutas, {"frecuencias": {}})
+        self.assertEqual(self.grafo.version, version + 1)
+        self.assertEqual(self.grafo.obtener_id_por_nombre("Estacion A2"), "A")
+        self.assertNotIn("Estacion Test", self.grafo.nombres_a_ids)
+        self.assertIs(self.grafo.rutas_entrantes["B"]["A"], rutas[0])
+        self.assertEqual(self.grafo.horarios, {"frecuencias": {}})
+
+    def test_diferir_rutas(self):
+        self.grafo.agregar_lote([Estacion("A", "A", "metro", "M1", []), Estacion("B", "B", "metro", "M1", [])], [])
+        version = self.grafo.version
+        llamadas = []
+
+        def construir():
+            llamadas.append(1)
+            return [Ruta("A", "B", "metro", 5, self.datos_ruta["congestion_tipica"])]
+
+        self.grafo.diferir_rutas(construir)
+        self.grafo.diferir_rutas(lambda: [Ruta("B", "A", "metro", 4, {})])
+        self.assertEqual(llamadas, [])
+        self.assertEqual(self.grafo.version, version)
+        self.assertEqual(set(self.grafo.rutas_entrantes), {"A", "B"})
+        self.assertEqual(self.grafo.rutas["A"]["B"].tiempo_base, 5)
+        self.assertEqual(self.grafo.rutas["B"]["A"].tiempo_base, 4)
+        self.assertEqual(llamadas, [1])
+
     def test_obtener_tiempo(self):
         # Configurar grafo con una ruta
         self.grafo.agregar_estacion("A", self.datos_estacion)
@@ -182,5 +212,16 @@ class TestGrafo(unittest.TestCase):
         self.assertIn("COORD1", self.grafo.vertices)
         self.assertEqual(self.grafo.vertices["COORD1"].coordenadas, [-75.5, 6.2])
 
+    def test_version_aumenta_con_modificaciones(self):
+        versiones = [self.grafo.version]
+        self.grafo.agregar_estacion("A", self.datos_estacion)
+        versiones.append(self.grafo.version)
+        self.grafo.agregar_estacion("B", self.datos_estacion)
+        self.grafo.agregar_ruta("A", "B", self.datos_ruta)
+        versiones.append(self.grafo.version)
+        self.grafo.eliminar_estacion("B")
+        versiones.append(self.grafo.version)
+        self.assertEqual(versiones, sorted(set(versiones)))
+
 if __name__ == '__main__':
     unittest.main() 
\ No newline at end of file
@@ -0,0 +1,61 @@
+import unittest
+from datetime import datetime
+from src.horarios import a_minutos, banda_horaria, bandas_definidas, formatear_hora
+from src.graph import Grafo
+
+class TestHorarios(unittest.TestCase):
+    def setUp(self):
+        self.horarios = {
+            "hora_pico_manana": {"inicio": "06:00", "fin": "08:00"},
+            "hora_pico_tarde": {"inicio": "17:00", "fin": "19:00"},
+            "nocturno": {"inicio": "22:00", "fin": "04:00"},
+            "frecuencias": {"metro": {"hora_pico": 3, "normal": 5}}
+        }
+
+    def test_a_minutos(self):
+        self.assertEqual(a_minutos("06:30"), 390)
+        self.assertEqual(a_minutos(7), 420)
+        self.assertEqual(a_minutos(datetime(2024, 1, 1, 17, 45)), 1065)
+
+    def test_formatear_hora(self):
+        self.assertEqual(formatear_hora(390), "06:30")
+        self.assertEqual(formatear_hora(1445.7), "00:05")
+
+    def test_banda_horaria_por_defecto(self):
+        self.assertEqual(banda_horaria(7), "hora_pico_manana")
+        self.assertEqual(banda_horaria(18), "hora_pico_tarde")
+        self.assertEqual(banda_horaria(12), "normal")
+
+    def test_banda_horaria_con_horarios(self):
+        self.assertEqual(banda_horaria("06:15", self.horarios), "hora_pico_manana")
+        self.assertEqual(banda_horaria("08:00", self.horarios), "normal")
+        self.assertEqual(banda_horaria("23:30", self.horarios), "nocturno")
+        self.assertEqual(banda_horaria("03:59", self.horarios), "nocturno")
+
+    def test_bandas_definidas(self):
+        self.assertEqual(
+            bandas_definidas(self.horarios),
+            ["hora_pico_manana", "hora_pico_tarde", "nocturno", "normal"]
+        )
+
+    def test_pesos_precalculados_por_banda(self):
+        grafo = Grafo()
+        grafo.horarios = self.horarios
+        for id in ["A", "B"]:
+            grafo.agregar_estacion(id, {"nombre": id, "tipo": "metro", "linea": "M1", "conexiones": []})
+        grafo.agregar_ruta("A", "B", {
+            "tipo": "metro",
+            "tiempo": 4,
+            "congestion_tipica": {"hora_pico_manana": 1.5, "hora_pico_tarde": 1.25, "normal": 1.0}
+        })
+
+        compilado = grafo.compilar()
+        self.assertEqual(list(compilado.pesos_de("hora_pico_manana")), [6.0])
+        self.assertEqual(list(compilado.pesos_de("hora_pico_tarde")), [5.0])
+        # Una banda sin factor propio en la ruta usa el factor normal
+        self.assertEqual(list(compilado.pesos_de("nocturno")), [4.0])
+        self.assertEqual(grafo.obtener_adyacentes("A", "hora_pico_manana"), {"B": 6.0})
+        self.assertEqual(grafo.rutas["A"]["B"].calcular_tiempo_actual("06:30", self.horarios), 6.0)
+
+if __name__ == '__main__':
+    unittest.main()
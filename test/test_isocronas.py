@@ -0,0 +1,68 @@
+import unittest
+from src.graph import Grafo
+from src.cargador import cargar_red
+from src.cache import CacheLRU, actualizar_cache_isocronas, clave_isocrona, isocronas_en_cache
+from src.dijkstra import isocrona, isocronas, ruta_mas_corta
+
+CONGESTION = {"hora_pico_manana": 2.0, "normal": 1.0}
+
+
+class TestIsocronas(unittest.TestCase):
+    def setUp(self):
+        # Línea A1 -> A2 -> A3 -> A4 y un ramal aislado B1 -> B2
+        self.grafo = Grafo()
+        for id in ["A1", "A2", "A3", "A4", "B1", "B2"]:
+            self.grafo.agregar_estacion(id, {"nombre": id, "tipo": "metro", "linea": id[0], "conexiones": []})
+        for origen, destino, tiempo in [("A1", "A2", 3), ("A2", "A3", 4), ("A3", "A4", 2), ("B1", "B2", 1)]:
+            self.grafo.agregar_ruta(origen, destino, {"tipo": "metro", "tiempo": tiempo, "congestion_tipica": CONGESTION})
+        self.cache = CacheLRU()
+        self.grafo.suscribir(lambda cambio: actualizar_cache_isocronas(self.cache, cambio))
+
+    def test_isocrona(self):
+        self.assertEqual(isocrona(self.grafo, "A1", 7, "normal"), {"A1": 0, "A2": 3, "A3": 7})
+        self.assertEqual(list(isocrona(self.grafo, "A1", 100, "normal")), ["A1", "A2", "A3", "A4"])
+        self.assertEqual(isocrona(self.grafo, "A1", 7, "hora_pico_manana"), {"A1": 0, "A2": 6})
+        self.assertEqual(isocrona(self.grafo, "A1", 0, "normal"), {"A1": 0})
+        self.assertEqual(isocrona(self.grafo, "Z9", 7, "normal"), {})
+
+    def test_isocronas_por_lotes(self):
+        resultado = list(isocronas(self.grafo, ["B1", "A3", "B1", "Z9"], 5, "normal"))
+        self.assertEqual(resultado, [("B1", {"B1": 0, "B2": 1}), ("A3", {"A3": 0, "A4": 2}), ("Z9", {})])
+
+    def test_cache_por_cubetas(self):
+        self.assertEqual(clave_isocrona(self.grafo, "A1", 7, "normal")[:3], ("A1", 10, "normal"))
+        self.assertEqual(clave_isocrona(self.grafo, "A1", 10, "normal")[:3], ("A1", 10, "normal"))
+        self.assertEqual(isocronas_en_cache(self.cache, self.grafo, ["A1"], 7, "normal"), {"A1": {"A1": 0, "A2": 3, "A3": 7}})
+        # Un tiempo de la misma cubeta se filtra de la entrada guardada
+        self.assertEqual(isocronas_en_cache(self.cache, self.grafo, ["A1"], 6, "normal"), {"A1": {"A1": 0, "A2": 3}})
+        self.assertEqual((self.cache.aciertos, self.cache.fallos, len(self.cache)), (1, 1, 1))
+
+    def test_invalidacion_selectiva(self):
+        isocronas_en_cache(self.cache, self.grafo, ["A1", "B1"], 5, "normal")
+        # A3 -> A4 sale de una estación fuera de ambas isocronas: ninguna cambia
+        self.grafo.cambiar_tiempo_ruta("A3", "A4", 1)
+        self.assertEqual(len(self.cache), 2)
+        # A2 -> A3 sale de la isocrona de A1, que se descarta; la de B1 se conserva
+        self.grafo.cambiar_tiempo_ruta("A2", "A3", 1)
+        self.assertEqual([clave[0] for clave in self.cache._entradas], ["B1"])
+        self.assertEqual(isocronas_en_cache(self.cache, self.grafo, ["A1"], 5, "normal")["A1"], {"A1": 0, "A2": 3, "A3": 4, "A4": 5})
+        self.grafo.cerrar_estacion("B2")
+        self.assertEqual(isocronas_en_cache(self.cache, self.grafo, ["B1"], 5, "normal")["B1"], {"B1": 0})
+
+    def test_red_real(self):
+        grafo = Grafo()
+        cargar_red(grafo, ["src/data/rutas_alimentadoras.json", "src/data/red.json"])
+        for origen in ["A_Niquia", "H_LasTorres"]:
+            resultado = isocrona(grafo, origen, 25, "hora_pico_manana")
+            esperado = {}
+            for destino in grafo.vertices:
+                tiempo = ruta_mas_corta(grafo, origen, destino, "hora_pico_manana")[0]
+                if tiempo <= 25:
+                    esperado[destino] = tiempo
+            self.assertEqual(resultado.keys(), esperado.keys())
+            for destino, tiempo in esperado.items():
+                self.assertAlmostEqual(resultado[destino], tiempo)
+
+
+if __name__ == '__main__':
+    unittest.main()
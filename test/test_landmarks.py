@@ -0,0 +1,67 @@
+import unittest
+import os
+import tempfile
+from src.graph import Grafo
+from src.dijkstra import dijkstra, ruta_a_estrella
+from src.landmarks import TablasLandmarks, obtener_landmarks, ruta_tablas, seleccionar_landmarks
+
+class TestLandmarks(unittest.TestCase):
+    def setUp(self):
+        # Una línea A1-A2-A3-A4 en ambos sentidos y un ramal A2 -> B1 -> B2
+        self.grafo = Grafo()
+        for id in ["A1", "A2", "A3", "A4", "B1", "B2"]:
+            self.grafo.agregar_estacion(id, {"nombre": id, "tipo": "metro", "linea": id[0], "conexiones": []})
+        congestion = {"hora_pico_manana": 1.5, "hora_pico_tarde": 1.2, "normal": 1.0}
+        for origen, destino, tiempo in [("A1", "A2", 3), ("A2", "A3", 4), ("A3", "A4", 2), ("A2", "B1", 5), ("B1", "B2", 1)]:
+            self.grafo.agregar_ruta(origen, destino, {"tipo": "metro", "tiempo": tiempo, "congestion_tipica": congestion})
+            if origen[0] == "A":
+                self.grafo.agregar_ruta(destino, origen, {"tipo": "metro", "tiempo": tiempo, "congestion_tipica": congestion})
+
+    def test_ruta_tablas(self):
+        self.assertEqual(ruta_tablas(os.path.join("src", "data", "red.json")), os.path.join("src", "data", "red.landmarks.json"))
+
+    def test_seleccionar_landmarks_prefiere_terminales(self):
+        compilado = self.grafo.compilar()
+        elegidos = [compilado.ids[i] for i in seleccionar_landmarks(compilado, 2)]
+        self.assertEqual(len(elegidos), 2)
+        for id in elegidos:
+            self.assertIn(id, ["A1", "A4", "B2"])
+
+    def test_cotas_admisibles(self):
+        compilado = self.grafo.compilar()
+        tablas = TablasLandmarks.calcular(compilado, landmarks=["A1", "B2"])
+        for banda in ["normal", "hora_pico_manana"]:
+            for destino in self.grafo.vertices:
+                cota = tablas.cota_hacia(banda, compilado.indice(destino))
+                for origen in self.grafo.vertices:
+                    distancias, _ = dijkstra(self.grafo, origen, banda)
+                    self.assertLessEqual(cota(compilado.indice(origen)), distancias[destino])
+
+    def test_a_estrella_con_landmarks(self):
+        esperado = {
+            origen: dijkstra(self.grafo, origen, "normal")[0]
+            for origen in self.grafo.vertices
+        }
+        self.grafo.compilar().landmarks = TablasLandmarks.calcular(self.grafo.compilar(), 2)
+        for origen in self.grafo.vertices:
+            for destino in self.grafo.vertices:
+                tiempo, _ = ruta_a_estrella(self.grafo, origen, destino, "normal")
+                self.assertEqual(tiempo, esperado[origen][destino])
+
+    def test_persistencia_e_invalidacion(self):
+        with tempfile.TemporaryDirectory() as directorio:
+            archivo = os.path.join(directorio, "red.landmarks.json")
+            tablas = obtener_landmarks(self.grafo, archivo, 2)
+            self.assertTrue(os.path.exists(archivo))
+            self.assertIs(self.grafo.compilar().landmarks, tablas)
+
+            cargadas = TablasLandmarks.cargar(archivo, self.grafo.compilar())
+            self.assertEqual(cargadas.landmarks, tablas.landmarks)
+            self.assertEqual(cargadas.adelante, tablas.adelante)
+
+            # Al modificar la red, las tablas guardadas dejan de ser válidas
+            self.grafo.agregar_ruta("B2", "A1", {"tipo": "metro", "tiempo": 1, "congestion_tipica": {"normal": 1.0}})
+            self.assertIsNone(TablasLandmarks.cargar(archivo, self.grafo.compilar()))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+import unittest
+from src.graph import Grafo
+from src.cargador import cargar_red
+from src.dijkstra import ruta_mas_corta
+from src.lineas import GrafoLineas, linea_de_ruta, obtener_grafo_lineas, ruta_con_transbordos
+
+CONGESTION = {"normal": 1.0}
+HORARIOS = {"frecuencias": {"metro": {"hora_pico": 4, "normal": 6}, "bus": {"hora_pico": 8, "normal": 10}}}
+
+
+class TestLineas(unittest.TestCase):
+    def setUp(self):
+        # Línea A: A1 - A2 - A3; línea B sale de A2 hacia B1 - B2.
+        # Entre A1 y B2 hay también un bus directo (línea 1), más lento en viaje.
+        self.grafo = Grafo()
+        estaciones = [
+            ("A1", "metro", "A", False), ("A2", "metro", "A", True), ("A3", "metro", "A", False),
+            ("B1", "metro", "B", False), ("B2", "metro", "B", False),
+            ("R1", "alimentadora", "1", False)
+        ]
+        for id, tipo, linea, transbordo in estaciones:
+            self.grafo.agregar_estacion(id, {
+                "nombre": id, "tipo": tipo, "linea": linea, "conexiones": [tipo], "es_transbordo": transbordo
+            })
+        for origen, destino, tipo, tiempo in [
+            ("A1", "A2", "metro", 2), ("A2", "A3", "metro", 2), ("A2", "B1", "metro", 2), ("B1", "B2", "metro", 2),
+            ("A1", "R1", "alimentadora", 4), ("R1", "B2", "alimentadora", 4)
+        ]:
+            self.grafo.agregar_ruta(origen, destino, {"tipo": tipo, "tiempo": tiempo, "congestion_tipica": CONGESTION})
+        self.grafo.horarios = HORARIOS
+
+    def test_linea_de_ruta(self):
+        vertices = self.grafo.vertices
+        self.assertEqual(linea_de_ruta(vertices["A1"], vertices["A2"], "metro"), "A")
+        # A2 es de transbordo: el tramo A2 -> B1 pertenece a la línea B
+        self.assertEqual(linea_de_ruta(vertices["A2"], vertices["B1"], "metro"), "B")
+        self.assertEqual(linea_de_ruta(vertices["A1"], vertices["R1"], "alimentadora"), "1")
+        self.assertIsNone(linea_de_ruta(vertices["A3"], vertices["B2"], "transbordo"))
+        self.assertEqual(linea_de_ruta(vertices["B1"], vertices["A2"], "metro"), "B")
+        self.assertTrue(vertices["A2"].es_intercambiador)
+
+    def test_estructura(self):
+        expandido = GrafoLineas(self.grafo.compilar(), penalizacion=2)
+        self.assertEqual(sorted(expandido.lineas), ["1", "A", "B"])
+        self.assertEqual(expandido.modos[expandido.lineas.index("1")], "alimentadora")
+        # Seis calles y un andén por estación y línea: A1, A2, A3 (A), A2, B1, B2 (B), A1, R1, B2 (1)
+        self.assertEqual(len(expandido), 6 + 9)
+
+    def test_transbordo_penalizado(self):
+        # Sin transbordos, metro por A2: 6 min. Con esperas: metro 3 + 2 de viaje,
+        # cambio a B: 3 + 2 de penalización + 4 de viaje = 14; bus directo: 5 + 8 = 13
+        self.assertEqual(ruta_mas_corta(self.grafo, "A1", "B2", "normal"), (6, ["A1", "A2", "B1", "B2"]))
+        ruta = ruta_con_transbordos(self.grafo, "A1", "B2", "normal", penalizacion=2)
+        self.assertEqual(ruta["tiempo"], 13)
+        self.assertEqual(ruta["camino"], ["A1", "R1", "B2"])
+        self.assertEqual(ruta["transbordos"], 0)
+        self.assertEqual(ruta["tramos"], [{"linea": "1", "modo": "alimentadora", "estaciones": ["A1", "R1", "B2"]}])
+
+        ruta = ruta_con_transbordos(self.grafo, "A1", "B2", "normal", penalizacion=0)
+        self.assertEqual(ruta["tiempo"], 12)
+        self.assertEqual(ruta["transbordos"], 1)
+        self.assertEqual([tramo["linea"] for tramo in ruta["tramos"]], ["A", "B"])
+
+    def test_tramo_a_pie(self):
+        self.grafo.agregar_ruta("A3", "B2", {"tipo": "transbordo", "tiempo": 1, "congestion_tipica": CONGESTION})
+        ruta = ruta_con_transbordos(self.grafo, "A1", "B2", "normal", penalizacion=2)
+        # Metro A hasta A3 (3 + 4) y a pie hasta B2 (1) frente al bus (13)
+        self.assertEqual(ruta["tiempo"], 8)
+        self.assertEqual(ruta["tramos"][-1], {"linea": None, "modo": "transbordo", "estaciones": ["A3", "B2"]})
+
+    def test_compilado_una_vez(self):
+        expandido = obtener_grafo_lineas(self.grafo)
+        self.assertIs(obtener_grafo_lineas(self.grafo), expandido)
+        self.grafo.compilar()
+        self.grafo.cambiar_tiempo_ruta("R1", "B2", 10)
+        self.assertIs(obtener_grafo_lineas(self.grafo), expandido)
+        self.assertEqual(ruta_con_transbordos(self.grafo, "A1", "R1", "normal")["tiempo"], 9)
+        self.assertGreater(ruta_con_transbordos(self.grafo, "A1", "B2", "normal")["tiempo"], 13)
+
+    def test_sin_ruta(self):
+        ruta = ruta_con_transbordos(self.grafo, "B2", "A1", "normal")
+        self.assertEqual((ruta["tiempo"], ruta["camino"]), (float('inf'), []))
+        self.assertEqual(ruta_con_transbordos(self.grafo, "A1", "A1")["camino"], ["A1"])
+
+    def test_red_real(self):
+        grafo = Grafo()
+        cargar_red(grafo, ["src/data/rutas_alimentadoras.json", "src/data/red.json"])
+        ruta = ruta_con_transbordos(grafo, "A_Niquia", "J_JuanXXIII", "normal")
+        self.assertEqual([tramo["linea"] for tramo in ruta["tramos"]], ["A", "B", "J"])
+        self.assertEqual(ruta["transbordos"], 2)
+        self.assertGreater(ruta["tiempo"], ruta_mas_corta(grafo, "A_Niquia", "J_JuanXXIII", "normal")[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,3 +1,5 @@
+import json
+import struct
 import unittest
 from fastapi.testclient import TestClient
 from datetime import datetime
@@ -106,5 +108,263 @@ class TestMain(unittest.TestCase):
             self.assertIn("Estación A", response.text)
             self.assertIn("Estación B", response.text)
 
+    def test_api_red_etag(self):
+        """Test /api/red returns the network with an ETag and honours If-None-Match"""
+        response = self.client.get("/api/red")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("estaciones", response.json())
+        self.assertIn("rutas", response.json())
+        etag = response.headers["etag"]
+
+        response = self.client.get("/api/red", headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.headers["etag"], etag)
+
+    def test_api_red_gzip(self):
+        """Test /api/red serves the pre-compressed gzip body when accepted"""
+        response = self.client.get("/api/red", headers={"Accept-Encoding": "gzip"})
+        self.assertEqual(response.headers.get("content-encoding"), "gzip")
+        response = self.client.get("/api/red", headers={"Accept-Encoding": "identity"})
+        self.assertIsNone(response.headers.get("content-encoding"))
+
+    def test_api_matriz_jsonl(self):
+        """Test /api/matriz streams one JSON line per distinct origin"""
+        response = self.client.post("/api/matriz", json={
+            "origenes": ["A_Niquia", "A_Bello", "A_Niquia"],
+            "destinos": ["A_Bello", "NoExiste"],
+            "banda": "normal"
+        })
+        self.assertEqual(response.status_code, 200)
+        lineas = [json.loads(linea) for linea in response.text.splitlines()]
+        self.assertEqual([linea["origen"] for linea in lineas], ["A_Niquia", "A_Bello"])
+        self.assertEqual(lineas[1]["tiempos"], [0, None])
+
+    def test_api_matriz_binario(self):
+        """Test /api/matriz returns a row-major float64 array"""
+        response = self.client.post("/api/matriz", json={
+            "origenes": ["A_Niquia", "A_Bello"],
+            "destinos": ["A_Niquia", "A_Bello"],
+            "formato": "binario"
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers["x-matriz-forma"], "2,2")
+        tiempos = struct.unpack("<4d", response.content)
+        self.assertEqual((tiempos[0], tiempos[3]), (0, 0))
+
+    def test_api_matriz_formato_invalido(self):
+        response = self.client.post("/api/matriz", json={"origenes": ["A_Niquia"], "destinos": ["A_Bello"], "formato": "xml"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_api_ruta_corta_saturada(self):
+        """Test searches are rejected with 503 when the routing executor is full"""
+        import main
+        limite = main.ejecutor_rutas.max_pendientes
+        main.ejecutor_rutas.max_pendientes = 0
+        try:
+            response = self.client.post("/api/ruta-corta", json={
+                "origen": "A_Niquia", "destino": "A_Bello", "metodo": "dijkstra"
+            })
+        finally:
+            main.ejecutor_rutas.max_pendientes = limite
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.headers["retry-after"], "1")
+
+    def test_api_ruta_corta_sin_matriz_usa_el_ejecutor(self):
+        """Test only matrix lookups are served on the event loop; hierarchy searches go to the executor"""
+        import main
+        main.matriz.matrices(main.red.banda_actual())
+        limite = main.ejecutor_rutas.max_pendientes
+        main.ejecutor_rutas.max_pendientes = 0
+        try:
+            response = self.client.post("/api/ruta-corta", json={"origen": "A_Niquia", "destino": "A_Bello"})
+            self.assertEqual(response.status_code, 200)
+            main.matriz.invalidar()
+            response = self.client.post("/api/ruta-corta", json={"origen": "A_Niquia", "destino": "A_Bello"})
+            self.assertEqual(response.status_code, 503)
+        finally:
+            main.ejecutor_rutas.max_pendientes = limite
+        response = self.client.post("/api/ruta-corta", json={"origen": "A_Niquia", "destino": "A_Bello"})
+        self.assertEqual(response.json()["camino"], ["A_Niquia", "A_Bello"])
+
+    def test_api_ruta_corta_con_salida(self):
+        """Test time-dependent routing returns departure and arrival times"""
+        response = self.client.post("/api/ruta-corta", json={
+            "origen": "A_Niquia", "destino": "A_Bello", "salida": "12:00"
+        })
+        self.assertEqual(response.status_code, 200)
+        datos = response.json()
+        self.assertEqual(datos["camino"], ["A_Niquia", "A_Bello"])
+        self.assertEqual(datos["salida"], "12:00")
+        self.assertGreater(datos["tiempo"], 0)
+
+        response = self.client.post("/api/ruta-corta", json={
+            "origen": "A_Niquia", "destino": "A_Bello", "salida": "mediodia"
+        })
+        self.assertEqual(response.status_code, 400)
+
+    def test_api_perfil(self):
+        """Test the departure-window profile returns chartable points"""
+        response = self.client.post("/api/perfil", json={
+            "origen": "A_Niquia", "destino": "A_Bello", "desde": "06:30", "hasta": "09:30"
+        })
+        self.assertEqual(response.status_code, 200)
+        datos = response.json()
+        self.assertEqual(datos["desde"], "06:30")
+        self.assertEqual(datos["puntos"][0][0], 390)
+        self.assertEqual(datos["puntos"][-1][0], 570)
+        llegadas = [llegada for _, llegada in datos["puntos"]]
+        self.assertEqual(llegadas, sorted(llegadas))
+
+        response = self.client.post("/api/perfil", json={
+            "origen": "A_Niquia", "destino": "A_Bello", "desde": "temprano", "hasta": "09:30"
+        })
+        self.assertEqual(response.status_code, 400)
+
+    def test_api_ruta_corta_contraccion(self):
+        """Test the contraction hierarchy answers like Dijkstra"""
+        cuerpo = {"origen": "A_Niquia", "destino": "J_JuanXXIII"}
+        response = self.client.post("/api/ruta-corta", json=dict(cuerpo, metodo="contraccion"))
+        self.assertEqual(response.status_code, 200)
+        esperado = self.client.post("/api/ruta-corta", json=dict(cuerpo, metodo="dijkstra")).json()
+        self.assertAlmostEqual(response.json()["tiempo"], esperado["tiempo"])
+        self.assertEqual(response.json()["camino"], esperado["camino"])
+
+    def test_api_cercanas(self):
+        """Test the nearest stations to a point come sorted by distance"""
+        import main
+        lon, lat = main.red.vertices["A_Niquia"].coordenadas
+        response = self.client.get("/api/cercanas", params={"lat": lat, "lon": lon, "k": 3})
+        self.assertEqual(response.status_code, 200)
+        estaciones = response.json()["estaciones"]
+        self.assertEqual(len(estaciones), 3)
+        self.assertEqual(estaciones[0]["id"], "A_Niquia")
+        distancias = [estacion["distancia_km"] for estacion in estaciones]
+        self.assertEqual(distancias, sorted(distancias))
+
+        response = self.client.get("/api/cercanas", params={"lat": lat, "lon": lon, "radio": 0.01})
+        self.assertEqual([estacion["id"] for estacion in response.json()["estaciones"]], ["A_Niquia"])
+        response = self.client.get("/api/cercanas", params={"lat": 95, "lon": lon})
+        self.assertEqual(response.status_code, 400)
+
+    def test_api_ruta_corta_coordenadas(self):
+        """Test routing endpoints accept coordinates as origin and destination"""
+        import main
+        lon, lat = main.red.vertices["A_Niquia"].coordenadas
+        response = self.client.post("/api/ruta-corta", json={
+            "origen": {"lat": lat, "lon": lon + 0.001}, "destino": "A_Bello"
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["camino"][0], "A_Niquia")
+        # Lejos de cualquier estación
+        response = self.client.post("/api/viajes", json={"origen": {"lat": 0, "lon": 0}, "destino": "A_Bello"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_api_ruta_corta_transbordos(self):
+        """Test the line-aware route reports its legs and transfers"""
+        response = self.client.post("/api/ruta-corta", json={
+            "origen": "A_Niquia", "destino": "J_JuanXXIII", "transbordos": True
+        })
+        self.assertEqual(response.status_code, 200)
+        datos = response.json()
+        self.assertEqual([tramo["linea"] for tramo in datos["tramos"]], ["A", "B", "J"])
+        self.assertEqual(datos["transbordos"], 2)
+        self.assertEqual(datos["camino"][0], "A_Niquia")
+
+        response = self.client.post("/api/ruta-corta", json={
+            "origen": "A_Niquia", "destino": "J_JuanXXIII", "transbordos": True, "metodo": "dijkstra"
+        })
+        self.assertEqual(response.status_code, 400)
+
+    def test_api_viajes(self):
+        """Test the Pareto journeys go from fewest transfers to fastest"""
+        response = self.client.post("/api/viajes", json={"origen": "A_Niquia", "destino": "RI2_LaPlaya"})
+        self.assertEqual(response.status_code, 200)
+        viajes = response.json()["viajes"]
+        self.assertGreaterEqual(len(viajes), 2)
+        self.assertEqual([viaje["transbordos"] for viaje in viajes], sorted(viaje["transbordos"] for viaje in viajes))
+        self.assertGreater(viajes[0]["tiempo"], viajes[-1]["tiempo"])
+
+        response = self.client.post("/api/viajes", json={"origen": "A_Niquia", "destino": "RI2_LaPlaya", "max_transbordos": -1})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post("/api/viajes", json={"origen": "A_Niquia", "destino": "Z_Nada"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_api_isocrona(self):
+        """Test the isochrone lists the stations reachable in time order and is cached"""
+        response = self.client.post("/api/isocrona", json={"origen": "A_Niquia", "minutos": 20, "salida": "12:00"})
+        self.assertEqual(response.status_code, 200)
+        datos = response.json()
+        self.assertEqual(datos["banda"], "normal")
+        self.assertEqual(datos["estaciones"][0], {"id": "A_Niquia", "tiempo": 0})
+        tiempos = [estacion["tiempo"] for estacion in datos["estaciones"]]
+        self.assertEqual(tiempos, sorted(tiempos))
+        self.assertLessEqual(tiempos[-1], 20)
+
+        # Un tiempo de la misma cubeta se responde desde la caché
+        aciertos = self.client.get("/api/cache").json()["isocronas"]["aciertos"]
+        response = self.client.post("/api/isocrona", json={"origen": "A_Niquia", "minutos": 18, "salida": "12:00"})
+        self.assertEqual(response.json()["estaciones"], [e for e in datos["estaciones"] if e["tiempo"] <= 18])
+        self.assertEqual(self.client.get("/api/cache").json()["isocronas"]["aciertos"], aciertos + 1)
+
+        response = self.client.post("/api/isocrona", json={"origen": "A_Niquia", "minutos": 20, "salida": "25:99"})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post("/api/isocrona", json={"origen": "A_Niquia", "minutos": -1})
+        self.assertEqual(response.status_code, 400)
+        # JSON admite Infinity y NaN: no deben llegar a la búsqueda ni a la caché
+        for minutos in ["Infinity", "NaN", "100000"]:
+            response = self.client.post(
+                "/api/isocrona", content=f'{{"origen": "A_Niquia", "minutos": {minutos}}}',
+                headers={"Content-Type": "application/json"}
+            )
+            self.assertEqual(response.status_code, 400)
+        response = self.client.post("/api/isocrona", json={"origen": "Z_Nada", "minutos": 20})
+        self.assertEqual(response.status_code, 400)
+
+    def test_api_isocronas(self):
+        """Test the batched isochrones return one entry per distinct origin"""
+        response = self.client.post("/api/isocronas", json={
+            "origenes": ["A_Niquia", "Z_Nada", "A_Niquia", "H_LasTorres"], "minutos": 10, "salida": "07:30"
+        })
+        self.assertEqual(response.status_code, 200)
+        datos = response.json()
+        self.assertEqual(datos["banda"], "hora_pico_manana")
+        self.assertEqual([isocrona["origen"] for isocrona in datos["isocronas"]], ["A_Niquia", "Z_Nada", "H_LasTorres"])
+        self.assertEqual(datos["isocronas"][1]["estaciones"], [])
+        self.assertEqual(datos["isocronas"][2]["estaciones"][0]["id"], "H_LasTorres")
+
+        response = self.client.post("/api/isocronas", json={"origenes": [], "minutos": 10})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post(
+            "/api/isocronas", content='{"origenes": ["A_Niquia"], "minutos": Infinity}',
+            headers={"Content-Type": "application/json"}
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_api_operaciones(self):
+        """Test closing and reopening a station requires the operations token"""
+        response = self.client.post("/api/estacion/cerrar", json={"estacion": "A_Bello"})
+        self.assertEqual(response.status_code, 403)
+        cabeceras = {"X-Token-Operacion": "secreto"}
+        with patch('main.TOKEN_OPERACION', "secreto"):
+            response = self.client.post("/api/estacion/cerrar", json={"estacion": "A_Bello"}, headers=cabeceras)
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(response.json()["cambio"])
+            try:
+                response = self.client.post("/api/ruta-corta", json={"origen": "A_Niquia", "destino": "A_Bello"})
+                self.assertEqual(response.status_code, 404)
+            finally:
+                response = self.client.post("/api/estacion/reabrir", json={"estacion": "A_Bello"}, headers=cabeceras)
+            self.assertEqual(response.status_code, 200)
+            response = self.client.post("/api/estacion/cerrar", json={"estacion": "Z_Nada"}, headers=cabeceras)
+            self.assertEqual(response.status_code, 404)
+            response = self.client.post("/api/ruta/tiempo", json={"origen": "A_Niquia", "destino": "A_Bello", "tiempo": -1}, headers=cabeceras)
+            self.assertEqual(response.status_code, 400)
+            response = self.client.post("/api/ruta/tiempo", json={"origen": "A_Niquia", "destino": "A_Bello", "tiempo": 0}, headers=cabeceras)
+            self.assertEqual(response.status_code, 400)
+            response = self.client.post("/api/ruta/congestion", json={
+                "origen": "A_Niquia", "destino": "A_Bello", "banda": "normal", "factor": 0
+            }, headers=cabeceras)
+            self.assertEqual(response.status_code, 400)
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,60 @@
+import unittest
+from src.graph import Grafo
+from src.dijkstra import dijkstra
+from src.matriz import MatrizTiempos, calcular_matriz
+
+class TestMatriz(unittest.TestCase):
+    def setUp(self):
+        self.grafo = Grafo()
+        for id in ["A", "B", "C", "D"]:
+            self.grafo.agregar_estacion(id, {"nombre": f"Estacion {id}", "tipo": "metro", "linea": "M1", "conexiones": []})
+        self.congestion = {
+            "hora_pico_manana": 2.0,
+            "hora_pico_tarde": 1.0,
+            "normal": 1.0
+        }
+        for origen, destino, tiempo in [("A", "B", 5), ("B", "C", 3), ("A", "C", 10), ("C", "D", 4), ("D", "A", 1)]:
+            self.grafo.agregar_ruta(origen, destino, {"tipo": "metro", "tiempo": tiempo, "congestion_tipica": self.congestion})
+        self.matriz = MatrizTiempos(self.grafo)
+
+    def test_calcular_matriz(self):
+        compilado = self.grafo.compilar()
+        distancias, siguiente = calcular_matriz(compilado, "normal")
+        n = len(compilado)
+        a, b, d = compilado.indice("A"), compilado.indice("B"), compilado.indice("D")
+        self.assertEqual(len(distancias), n * n)
+        self.assertEqual(distancias[a * n + d], 12)
+        self.assertEqual(siguiente[a * n + d], b)
+        self.assertEqual(siguiente[a * n + a], -1)
+
+    def test_coincide_con_dijkstra(self):
+        for banda in ["normal", "hora_pico_manana"]:
+            for origen in self.grafo.vertices:
+                distancias, caminos = dijkstra(self.grafo, origen, banda)
+                for destino in self.grafo.vertices:
+                    self.assertEqual(self.matriz.tiempo(origen, destino, banda), distancias[destino])
+                    self.assertEqual(self.matriz.ruta(origen, destino, banda), (distancias[destino], caminos[destino]))
+
+    def test_aristas_de_tiempo_cero(self):
+        # Con todo a distancia cero el orden por distancia pondría Z antes que Y,
+        # su padre; el siguiente salto debe seguir el orden en que se fijaron
+        grafo = Grafo()
+        for id in ["Z", "Y", "X"]:
+            grafo.agregar_estacion(id, {"nombre": id, "tipo": "metro", "linea": "M1", "conexiones": []})
+        for origen, destino in [("X", "Y"), ("Y", "Z")]:
+            grafo.agregar_ruta(origen, destino, {"tipo": "transbordo", "tiempo": 0, "congestion_tipica": {"normal": 1.0}})
+        self.assertEqual(dijkstra(grafo, "X", "normal")[1]["Z"], ["X", "Y", "Z"])
+        self.assertEqual(MatrizTiempos(grafo).ruta("X", "Z", "normal"), (0, ["X", "Y", "Z"]))
+
+    def test_sin_ruta_y_estacion_inexistente(self):
+        self.grafo.agregar_estacion("E", {"nombre": "Estacion E", "tipo": "metro", "linea": "M1", "conexiones": []})
+        self.assertEqual(self.matriz.ruta("A", "E", "normal"), (float('inf'), []))
+        self.assertEqual(self.matriz.ruta("A", "Z", "normal"), (float('inf'), []))
+
+    def test_invalidacion_al_modificar_grafo(self):
+        self.assertEqual(self.matriz.tiempo("A", "D", "normal"), 12)
+        self.grafo.agregar_ruta("A", "D", {"tipo": "metro", "tiempo": 2, "congestion_tipica": self.congestion})
+        self.assertEqual(self.matriz.ruta("A", "D", "normal"), (2, ["A", "D"]))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,164 @@
+import unittest
+from src.graph import Grafo
+from src.analitica import AnalisisRed
+from src.cache import CacheLRU, actualizar_cache_rutas, k_rutas_en_cache
+from src.cargador import cargar_red
+from src.dijkstra import ruta_a_estrella
+from src.landmarks import TablasLandmarks
+from src.matriz import MatrizTiempos, calcular_matriz
+from src.utils import componentes_fuertemente_conexas
+
+CONGESTION = {"hora_pico_manana": 1.5, "hora_pico_tarde": 1.2, "normal": 1.0}
+
+
+class TestMutaciones(unittest.TestCase):
+    def setUp(self):
+        # Anillo A -> B -> C -> D -> A con atajo A -> C y regreso B -> A
+        self.grafo = Grafo()
+        for id in ["A", "B", "C", "D"]:
+            self.grafo.agregar_estacion(id, {"nombre": f"Estación {id}", "tipo": "metro", "linea": "A", "conexiones": []})
+        for origen, destino, tiempo in [("A", "B", 2), ("B", "C", 2), ("C", "D", 2), ("D", "A", 2), ("A", "C", 5), ("B", "A", 2)]:
+            self.grafo.agregar_ruta(origen, destino, {"tipo": "metro", "tiempo": tiempo, "congestion_tipica": CONGESTION})
+        self.cambios = []
+        self.grafo.suscribir(self.cambios.append)
+
+    def matriz_completa(self, banda="normal"):
+        return list(calcular_matriz(self.grafo.compilar(), banda)[0])
+
+    def test_indices_inversos(self):
+        self.assertEqual(set(self.grafo.rutas_entrantes["A"]), {"D", "B"})
+        self.grafo.eliminar_estacion("B")
+        self.assertNotIn("B", self.grafo.rutas_entrantes["A"])
+        self.assertNotIn("B", self.grafo.rutas["A"])
+        self.assertNotIn("Estación B", self.grafo.ids_por_nombre)
+        self.assertIsNone(self.grafo.obtener_id_por_nombre("Estación B"))
+
+    def test_eliminar_estacion_avisa(self):
+        self.grafo.compilar()
+        version = self.grafo.version
+        cambio = self.grafo.eliminar_estacion("B")
+        self.assertIs(self.cambios[-1], cambio)
+        self.assertEqual(cambio.tipo, "eliminar_estacion")
+        self.assertEqual(set(cambio.rutas), {("B", "C"), ("B", "A"), ("A", "B")})
+        self.assertTrue(cambio.topologia)
+        self.assertIsNone(cambio.compilado)
+        self.assertEqual((cambio.version_anterior, cambio.version), (version, self.grafo.version))
+        self.assertEqual(ruta_a_estrella(self.grafo, "A", "C", "normal"), (5, ["A", "C"]))
+
+    def test_eliminar_estacion_inexistente(self):
+        compilado = self.grafo.compilar()
+        version = self.grafo.version
+        with self.assertRaises(KeyError):
+            self.grafo.eliminar_estacion("Z")
+        self.assertIs(self.grafo.compilar(), compilado)
+        self.assertEqual((self.grafo.version, self.cambios), (version, []))
+
+    def test_cerrar_y_reabrir_estacion(self):
+        compilado = self.grafo.compilar()
+        cambio = self.grafo.cerrar_estacion("B")
+        self.assertIs(self.grafo.compilar(), compilado)
+        self.assertEqual(set(cambio.rutas), {("B", "C"), ("B", "A"), ("A", "B")})
+        self.assertTrue(cambio.aumenta and cambio.topologia)
+        self.assertEqual(self.grafo.sucesores("A"), ["C"])
+        self.assertEqual(self.grafo.obtener_tiempo("A", "B"), float('inf'))
+        self.assertEqual(ruta_a_estrella(self.grafo, "A", "C", "normal"), (5, ["A", "C"]))
+        self.assertEqual(ruta_a_estrella(self.grafo, "A", "B", "normal")[0], float('inf'))
+        self.assertEqual(sorted(map(sorted, componentes_fuertemente_conexas(self.grafo))), [["A", "C", "D"], ["B"]])
+        # Repetir el cierre no es un cambio
+        self.assertIsNone(self.grafo.cerrar_estacion("B"))
+
+        self.grafo.reabrir_estacion("B")
+        self.assertFalse(self.cambios[-1].aumenta)
+        self.assertEqual(ruta_a_estrella(self.grafo, "A", "C", "normal"), (4, ["A", "B", "C"]))
+        with self.assertRaises(KeyError):
+            self.grafo.cerrar_estacion("Z")
+
+    def test_cambios_de_tiempo(self):
+        self.grafo.compilar()
+        cambio = self.grafo.cambiar_tiempo_ruta("A", "B", 4)
+        self.assertTrue(cambio.aumenta)
+        self.assertEqual(cambio.anteriores["hora_pico_manana"], [3])
+        self.assertEqual(self.grafo.compilar().pesos["hora_pico_manana"][cambio.aristas[0]], 6)
+        self.grafo.cambiar_congestion_ruta("A", "C", "normal", 0.5)
+        self.assertFalse(self.cambios[-1].aumenta)
+        self.assertEqual(self.grafo.obtener_adyacentes("A", "normal"), {"B": 4, "C": 2.5})
+        self.assertEqual(self.grafo.compilar().obtener_adyacentes("A", "hora_pico_manana"), {"B": 6, "C": 7.5})
+        with self.assertRaises(KeyError):
+            self.grafo.cambiar_tiempo_ruta("A", "D", 1)
+
+    def test_valores_no_finitos(self):
+        version = self.grafo.version
+        for tiempo in [float('inf'), float('nan'), 0, -1]:
+            with self.assertRaises(ValueError):
+                self.grafo.cambiar_tiempo_ruta("A", "B", tiempo)
+        with self.assertRaises(ValueError):
+            self.grafo.cambiar_congestion_ruta("A", "B", "normal", float('inf'))
+        self.assertEqual(self.grafo.rutas["A"]["B"].tiempo_base, 2)
+        self.assertEqual((self.grafo.version, self.cambios), (version, []))
+
+    def test_sin_compilar(self):
+        cambio = self.grafo.cerrar_estacion("C")
+        self.assertIsNone(cambio.compilado)
+        compilado = self.grafo.compilar()
+        self.assertEqual(compilado.sucesores("B"), ["A"])
+
+    def test_matriz_incremental(self):
+        matriz = MatrizTiempos(self.grafo)
+        self.grafo.suscribir(matriz.aplicar_cambio)
+        matriz.matrices("normal")
+        # El atajo A -> C no está en ningún camino mínimo: ninguna fila cambia
+        self.grafo.cambiar_tiempo_ruta("A", "C", 6)
+        self.assertTrue(matriz.calculada("normal"))
+        self.grafo.cambiar_tiempo_ruta("C", "D", 3)
+        self.assertEqual(list(matriz.matrices("normal")[1]), self.matriz_completa())
+        self.assertEqual(matriz.ruta("B", "D", "normal"), (5, ["B", "C", "D"]))
+
+        self.grafo.cerrar_estacion("C")
+        self.assertEqual(list(matriz.matrices("normal")[1]), self.matriz_completa())
+        self.grafo.reabrir_estacion("C")
+        self.assertFalse(matriz.calculada("normal"))
+        self.assertEqual(list(matriz.matrices("normal")[1]), self.matriz_completa())
+
+    def test_cache_de_rutas(self):
+        cache = CacheLRU()
+        self.grafo.compilar()
+        k_rutas_en_cache(cache, self.grafo, "C", "A", 2, "normal")
+        k_rutas_en_cache(cache, self.grafo, "A", "C", 2, "normal")
+        eliminadas = actualizar_cache_rutas(cache, self.grafo.cambiar_tiempo_ruta("B", "C", 3))
+        # Solo la consulta A -> C pasaba por B -> C
+        self.assertEqual(eliminadas, 1)
+        self.assertEqual(len(cache), 1)
+        k_rutas_en_cache(cache, self.grafo, "C", "A", 2, "normal")
+        self.assertEqual(cache.aciertos, 1)
+        self.assertEqual(actualizar_cache_rutas(cache, self.grafo.cambiar_tiempo_ruta("B", "C", 1)), 1)
+
+    def test_landmarks_y_analitica(self):
+        compilado = self.grafo.compilar()
+        compilado.landmarks = TablasLandmarks.calcular(compilado, 2)
+        analisis = AnalisisRed(self.grafo)
+        self.grafo.suscribir(analisis.aplicar_cambio)
+        propiedades = analisis.propiedades()
+        self.grafo.cambiar_tiempo_ruta("D", "A", 7)
+        # Los tiempos solo aumentaron: las cotas siguen siendo válidas
+        self.assertIsNotNone(compilado.landmarks)
+        self.assertIs(analisis.propiedades()["componentes"], propiedades["componentes"])
+        self.assertEqual(ruta_a_estrella(self.grafo, "C", "B", "normal"), (11, ["C", "D", "A", "B"]))
+        self.grafo.cambiar_tiempo_ruta("D", "A", 1)
+        self.assertIsNone(compilado.landmarks)
+        self.grafo.cerrar_estacion("D")
+        self.assertFalse(analisis.es_fuertemente_conexo)
+
+    def test_red_real(self):
+        grafo = Grafo()
+        cargar_red(grafo, ["src/data/rutas_alimentadoras.json", "src/data/red.json"])
+        matriz = MatrizTiempos(grafo)
+        grafo.suscribir(matriz.aplicar_cambio)
+        matriz.matrices("normal")
+        grafo.cerrar_estacion("A_SanAntonio")
+        self.assertEqual(list(matriz.matrices("normal")[1]), list(calcular_matriz(grafo.compilar(), "normal")[0]))
+        self.assertTrue(grafo.rutas_entrantes["A_SanAntonio"])
+        self.assertEqual(grafo.compilar().predecesores("A_SanAntonio"), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
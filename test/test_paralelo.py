@@ -0,0 +1,112 @@
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing import shared_memory
+from src.graph import Grafo
+from src.dijkstra import matriz_od
+from src.landmarks import TablasLandmarks
+from src.matriz import MatrizTiempos, calcular_matriz
+from src.paralelo import EjecutorParalelo
+
+class TestEjecutorParalelo(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.grafo = Grafo()
+        cls.grafo.cargar_desde_json("src/data/red.json")
+        cls.ejecutor = EjecutorParalelo(cls.grafo, procesos=2)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.ejecutor.cerrar()
+
+    def test_matriz_igual_a_la_secuencial(self):
+        compilado = self.grafo.compilar()
+        for banda in ("normal", "hora_pico_manana"):
+            self.assertEqual(self.ejecutor.calcular_matriz(banda), calcular_matriz(compilado, banda))
+
+    def test_matriz_od_igual_a_la_secuencial(self):
+        ids = list(self.grafo.vertices)
+        origenes = ids[::3] + [ids[0], "NoExiste"]
+        destinos = ids[::5] + ["NoExiste"]
+        self.assertEqual(
+            list(self.ejecutor.matriz_od(origenes, destinos, "normal")),
+            list(matriz_od(self.grafo, origenes, destinos, "normal"))
+        )
+
+    def test_landmarks_iguales_a_los_secuenciales(self):
+        compilado = self.grafo.compilar()
+        paralelas = self.ejecutor.calcular_landmarks(3)
+        secuenciales = TablasLandmarks.calcular(compilado, 3)
+        self.assertEqual(paralelas.landmarks, secuenciales.landmarks)
+        self.assertEqual(paralelas.huella, secuenciales.huella)
+        self.assertEqual(paralelas.adelante, secuenciales.adelante)
+        self.assertEqual(paralelas.atras, secuenciales.atras)
+
+    def test_matriz_tiempos_con_ejecutor(self):
+        matriz = MatrizTiempos(self.grafo, self.ejecutor)
+        secuencial = MatrizTiempos(self.grafo)
+        self.assertEqual(matriz.ruta("A_Niquia", "A_Bello", "normal"), secuencial.ruta("A_Niquia", "A_Bello", "normal"))
+
+    def test_cambio_de_tiempos_con_calculo_en_curso(self):
+        grafo = Grafo()
+        grafo.cargar_desde_json("src/data/red.json")
+        ids = list(grafo.vertices)
+        with EjecutorParalelo(grafo, procesos=2) as ejecutor:
+            esperado = list(matriz_od(grafo, ids[:6], ids, "normal"))
+            filas = ejecutor.matriz_od(ids[:6], ids, "normal")
+            primera = next(filas)
+            pool, anterior = ejecutor._pool, ejecutor._publicacion
+
+            # Un cambio de tiempos conserva los procesos y la estructura; la consulta en curso sigue con los pesos anteriores
+            grafo.cambiar_tiempo_ruta("A_Niquia", "A_Bello", 30)
+            self.assertEqual(ejecutor.calcular_matriz("normal"), calcular_matriz(grafo.compilar(), "normal"))
+            actual = ejecutor._publicacion
+            self.assertIs(ejecutor._pool, pool)
+            self.assertEqual(actual["estructura"], anterior["estructura"])
+            self.assertNotEqual(actual["pesos"]["normal"], anterior["pesos"]["normal"])
+            self.assertIn(anterior["clave"], ejecutor._retiradas)
+            self.assertEqual([primera] + list(filas), esperado)
+
+            # Al terminar la consulta se liberan los pesos anteriores
+            self.assertEqual((ejecutor._retiradas, list(ejecutor._en_uso)), ({}, [actual["clave"]]))
+            with self.assertRaises(FileNotFoundError):
+                shared_memory.SharedMemory(name=anterior["pesos"]["normal"][0])
+
+    def test_cambio_de_congestion_publica_solo_su_banda(self):
+        grafo = Grafo()
+        grafo.cargar_desde_json("src/data/red.json")
+        with EjecutorParalelo(grafo, procesos=2) as ejecutor:
+            ejecutor.calcular_matriz("normal")
+            anterior = ejecutor._publicacion
+            grafo.cambiar_congestion_ruta("A_Niquia", "A_Bello", "hora_pico_manana", 3)
+            self.assertEqual(
+                ejecutor.calcular_matriz("hora_pico_manana"),
+                calcular_matriz(grafo.compilar(), "hora_pico_manana")
+            )
+            actual = ejecutor._publicacion
+            cambiadas = {banda for banda in actual["pesos"] if actual["pesos"][banda] != anterior["pesos"][banda]}
+            self.assertEqual(cambiadas, {"hora_pico_manana"})
+
+    def test_recompilacion_conserva_los_procesos(self):
+        grafo = Grafo()
+        grafo.cargar_desde_json("src/data/red.json")
+        with EjecutorParalelo(grafo, procesos=2) as ejecutor:
+            ejecutor.calcular_matriz("normal")
+            pool, anterior = ejecutor._pool, ejecutor._publicacion
+            grafo.eliminar_estacion("A_Bello")
+            self.assertEqual(ejecutor.calcular_matriz("normal"), calcular_matriz(grafo.compilar(), "normal"))
+            self.assertIs(ejecutor._pool, pool)
+            self.assertNotEqual(ejecutor._publicacion["estructura"], anterior["estructura"])
+            with self.assertRaises(FileNotFoundError):
+                shared_memory.SharedMemory(name=anterior["estructura"][0])
+
+    def test_hilos_concurrentes_comparten_el_pool(self):
+        compilado = self.grafo.compilar()
+        esperado = calcular_matriz(compilado, "normal")
+        with ThreadPoolExecutor(max_workers=4) as hilos:
+            resultados = list(hilos.map(lambda _: self.ejecutor.calcular_matriz("normal"), range(8)))
+        self.assertTrue(all(resultado == esperado for resultado in resultados))
+        self.assertEqual(self.ejecutor._en_uso, {self.ejecutor._publicacion["clave"]: 0})
+
+
+if __name__ == '__main__':
+    unittest.main()
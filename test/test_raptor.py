@@ -0,0 +1,141 @@
+import unittest
+from src.graph import Grafo
+from src.cargador import cargar_red
+from src.lineas import ruta_con_transbordos
+from src.raptor import RedRaptor, _secuencias, obtener_red_raptor, viajes_pareto
+
+CONGESTION = {"normal": 1.0}
+HORARIOS = {"frecuencias": {"metro": {"hora_pico": 4, "normal": 6}, "bus": {"hora_pico": 8, "normal": 10}}}
+
+
+class TestRaptor(unittest.TestCase):
+    def setUp(self):
+        # Línea A: A1 - A2 - A3; línea B sale de A2 hacia B1 - B2.
+        # Entre A1 y B2 hay también un bus directo (línea 1), más lento en viaje.
+        self.grafo = Grafo()
+        estaciones = [
+            ("A1", "metro", "A", False), ("A2", "metro", "A", True), ("A3", "metro", "A", False),
+            ("B1", "metro", "B", False), ("B2", "metro", "B", False),
+            ("R1", "alimentadora", "1", False)
+        ]
+        for id, tipo, linea, transbordo in estaciones:
+            self.grafo.agregar_estacion(id, {
+                "nombre": id, "tipo": tipo, "linea": linea, "conexiones": [tipo], "es_transbordo": transbordo
+            })
+        for origen, destino, tipo, tiempo in [
+            ("A1", "A2", "metro", 2), ("A2", "A3", "metro", 2), ("A2", "B1", "metro", 2), ("B1", "B2", "metro", 2),
+            ("A1", "R1", "alimentadora", 4), ("R1", "B2", "alimentadora", 4)
+        ]:
+            self.grafo.agregar_ruta(origen, destino, {"tipo": tipo, "tiempo": tiempo, "congestion_tipica": CONGESTION})
+        self.grafo.horarios = HORARIOS
+
+    def resumen(self, viajes):
+        return [(viaje["tiempo"], viaje["transbordos"]) for viaje in viajes]
+
+    def test_secuencias(self):
+        # Una línea en ambos sentidos da una secuencia por sentido
+        self.assertEqual(_secuencias([(1, 2), (2, 3), (3, 2), (2, 1)]), [(1, 2, 3), (3, 2, 1)])
+        # Una ramificación en Y se corta en la parada común
+        aristas = [(1, 2), (2, 1), (2, 3), (3, 2), (2, 4), (4, 2)]
+        self.assertEqual(_secuencias(aristas), [(1, 2), (2, 1), (2, 3), (2, 4), (3, 2), (4, 2)])
+        # Un ciclo sin ramificaciones se empieza en cualquier parada
+        self.assertEqual(_secuencias([(1, 2), (2, 3), (3, 1)]), [(1, 2, 3, 1)])
+
+    def test_patrones_de_una_malla(self):
+        # Una malla de 5 x 5 en ambos sentidos: enumerar caminos daría cientos de miles
+        # de patrones; cortando en los cruces hay uno por arista
+        aristas = []
+        for f in range(5):
+            for c in range(5):
+                for df, dc in [(0, 1), (1, 0)]:
+                    if f + df < 5 and c + dc < 5:
+                        aristas += [(f * 5 + c, (f + df) * 5 + c + dc), ((f + df) * 5 + c + dc, f * 5 + c)]
+        secuencias = _secuencias(aristas)
+        self.assertLessEqual(len(secuencias), len(aristas))
+        self.assertEqual(sorted(par for s in secuencias for par in zip(s, s[1:])), sorted(aristas))
+
+    def test_patrones_de_una_linea_ramificada(self):
+        # Línea C: tronco C0 - C1 - C2 y tres ramales de tres paradas desde C2, en ambos sentidos
+        grafo = Grafo()
+        pares = [("C0", "C1"), ("C1", "C2")]
+        for ramal in range(3):
+            paradas = ["C2"] + [f"C{ramal}{i}" for i in range(3)]
+            pares += list(zip(paradas, paradas[1:]))
+        for id in {id for par in pares for id in par}:
+            grafo.agregar_estacion(id, {"nombre": id, "tipo": "metro", "linea": "C", "conexiones": ["metro"]})
+        for origen, destino in pares:
+            for a, b in [(origen, destino), (destino, origen)]:
+                grafo.agregar_ruta(a, b, {"tipo": "metro", "tiempo": 2, "congestion_tipica": CONGESTION})
+        grafo.horarios = HORARIOS
+
+        raptor = obtener_red_raptor(grafo)
+        self.assertEqual(raptor.num_patrones, 8)
+        # El vehículo sigue por el ramal sin transbordo ni nueva espera: 3 + 5 * 2
+        viajes = viajes_pareto(grafo, "C0", "C12", "normal")
+        self.assertEqual(self.resumen(viajes), [(13, 0)])
+        self.assertEqual(viajes[0]["tramos"], [
+            {"linea": "C", "modo": "metro", "estaciones": ["C0", "C1", "C2", "C10", "C11", "C12"]}
+        ])
+        # De un ramal a otro también se sigue sin bajar: 3 + 6 * 2
+        self.assertEqual(self.resumen(viajes_pareto(grafo, "C02", "C12", "normal")), [(15, 0)])
+
+    def test_patrones(self):
+        raptor = RedRaptor(self.grafo.compilar())
+        self.assertEqual(sorted(raptor.lineas), ["1", "A", "B"])
+        ids = raptor.compilado.ids
+        patrones = {
+            raptor.lineas[patron]: [ids[p] for p in raptor.paradas[raptor.inicios[patron]:raptor.inicios[patron + 1]]]
+            for patron in range(raptor.num_patrones)
+        }
+        self.assertEqual(patrones, {"A": ["A1", "A2", "A3"], "B": ["A2", "B1", "B2"], "1": ["A1", "R1", "B2"]})
+        self.assertEqual(list(raptor.esperas["normal"]), [3 if raptor.modos[p] == "metro" else 5 for p in range(3)])
+
+    def test_frente_de_pareto(self):
+        # Bus directo: 5 de espera + 8 = 13 sin transbordos; metro A y B: 3 + 2 + 3 + 4 = 12 con uno
+        viajes = viajes_pareto(self.grafo, "A1", "B2", "normal")
+        self.assertEqual(self.resumen(viajes), [(13, 0), (12, 1)])
+        self.assertEqual(viajes[0]["tramos"], [{"linea": "1", "modo": "alimentadora", "estaciones": ["A1", "R1", "B2"]}])
+        self.assertEqual(viajes[1]["camino"], ["A1", "A2", "B1", "B2"])
+        self.assertEqual([tramo["linea"] for tramo in viajes[1]["tramos"]], ["A", "B"])
+        self.assertEqual(self.resumen(viajes_pareto(self.grafo, "A1", "B2", "normal", max_transbordos=0)), [(13, 0)])
+
+    def test_tramo_a_pie(self):
+        self.grafo.agregar_ruta("A3", "B2", {"tipo": "transbordo", "tiempo": 1, "congestion_tipica": CONGESTION})
+        # Metro A hasta A3 (3 + 4) y a pie hasta B2 (1) domina a los otros dos viajes
+        viajes = viajes_pareto(self.grafo, "A1", "B2", "normal")
+        self.assertEqual(self.resumen(viajes), [(8, 0)])
+        self.assertEqual(viajes[0]["tramos"][-1], {"linea": None, "modo": "transbordo", "estaciones": ["A3", "B2"]})
+
+    def test_cambios_incrementales(self):
+        raptor = obtener_red_raptor(self.grafo)
+        self.assertIs(obtener_red_raptor(self.grafo), raptor)
+        self.grafo.cambiar_tiempo_ruta("R1", "B2", 10)
+        self.assertIs(obtener_red_raptor(self.grafo), raptor)
+        self.assertEqual(self.resumen(viajes_pareto(self.grafo, "A1", "B2", "normal")), [(19, 0), (12, 1)])
+        self.grafo.cerrar_estacion("B1")
+        self.assertEqual(self.resumen(viajes_pareto(self.grafo, "A1", "B2", "normal")), [(19, 0)])
+
+    def test_sin_ruta(self):
+        self.assertEqual(viajes_pareto(self.grafo, "B2", "A1", "normal"), [])
+        self.assertEqual(viajes_pareto(self.grafo, "A1", "Z9", "normal"), [])
+        self.assertEqual(viajes_pareto(self.grafo, "A1", "A1")[0]["camino"], ["A1"])
+
+    def test_red_real(self):
+        grafo = Grafo()
+        cargar_red(grafo, ["src/data/rutas_alimentadoras.json", "src/data/red.json"])
+        viajes = viajes_pareto(grafo, "A_Niquia", "RI2_LaPlaya", "normal")
+        self.assertEqual(self.resumen(viajes), [(57.5, 1), (40.5, 2)])
+        self.assertEqual([tramo["linea"] for tramo in viajes[1]["tramos"]], ["A", "T", "2"])
+        # La línea 2 se ramifica entre Industriales y La Playa: el viaje la recorre sin bajar
+        self.assertEqual(viajes[0]["tramos"][1]["estaciones"][0], "A_Industriales")
+        self.assertEqual(viajes[0]["tramos"][1]["estaciones"][-1], "RI2_LaPlaya")
+        # El viaje más rápido coincide con el del grafo por líneas sin penalización
+        for destino in ["J_JuanXXIII", "RI1_Rosales", "RI2_CatedralMetropolitana"]:
+            self.assertEqual(
+                viajes_pareto(grafo, "H_LasTorres", destino, "hora_pico_manana")[-1]["tiempo"],
+                ruta_con_transbordos(grafo, "H_LasTorres", destino, "hora_pico_manana", penalizacion=0)["tiempo"]
+            )
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,162 @@
+import json
+import mmap
+import os
+import pickle
+import tempfile
+import unittest
+from unittest import mock
+from src.graph import Grafo, Ruta
+from src.cargador import cargar_red
+from src.analitica import AnalisisRed
+from src.landmarks import TablasLandmarks
+from src.matriz import MatrizTiempos
+from src.dijkstra import ruta_a_estrella
+from src.snapshot import cargar_snapshot, guardar_snapshot, ruta_snapshot
+
+CONGESTION = {"hora_pico_manana": 1.5, "hora_pico_tarde": 1.2, "normal": 1.0}
+
+
+class TestSnapshot(unittest.TestCase):
+    def setUp(self):
+        self.directorio = tempfile.TemporaryDirectory()
+        self.fuente = os.path.join(self.directorio.name, "red.json")
+        datos = {
+            "vertices": {
+                id: {"nombre": id, "tipo": "metro", "linea": "A", "conexiones": [], "coordenadas": [-75.5, 6.2 + i / 100], "es_transbordo": id == "A1"}
+                for i, id in enumerate(["A1", "A2", "A3", "A4"])
+            },
+            "rutas": [
+                {"origen": o, "destino": d, "tipo": "metro", "tiempo": t, "congestion_tipica": CONGESTION}
+                for o, d, t in [("A1", "A2", 3), ("A2", "A3", 4), ("A3", "A4", 2), ("A4", "A1", 5), ("A2", "A1", 3)]
+            ],
+            "horarios": {"hora_pico_manana": {"inicio": "06:00", "fin": "08:00"}}
+        }
+        with open(self.fuente, 'w', encoding='utf-8') as f:
+            json.dump(datos, f)
+        self.archivo = ruta_snapshot(self.fuente)
+
+        self.grafo = Grafo()
+        cargar_red(self.grafo, [self.fuente])
+        compilado = self.grafo.compilar()
+        compilado.landmarks = TablasLandmarks.calcular(compilado, 2)
+        self.matriz = MatrizTiempos(self.grafo)
+        self.analisis = AnalisisRed(self.grafo)
+        guardar_snapshot(self.archivo, self.grafo, [self.fuente], self.matriz, self.analisis)
+
+    def tearDown(self):
+        self.directorio.cleanup()
+
+    def test_ruta_snapshot(self):
+        self.assertEqual(ruta_snapshot(os.path.join("src", "data", "red.json")), os.path.join("src", "data", "red.snapshot"))
+
+    def test_ida_y_vuelta(self):
+        grafo = Grafo()
+        resultado = cargar_snapshot(grafo, self.archivo, [self.fuente])
+        self.assertIsNotNone(resultado)
+        original, cargado = self.grafo.compilar(), grafo.compilar()
+        self.assertIsInstance(cargado.destinos, memoryview)
+        self.assertEqual(cargado.ids, original.ids)
+        self.assertEqual(list(cargado.offsets), list(original.offsets))
+        self.assertEqual(list(cargado.aristas_inv), list(original.aristas_inv))
+        self.assertEqual({b: list(p) for b, p in cargado.pesos.items()}, {b: list(p) for b, p in original.pesos.items()})
+        self.assertEqual(cargado.huella(), original.huella())
+        self.assertEqual(grafo.horarios, self.grafo.horarios)
+        self.assertEqual(grafo.vertices["A1"].coordenadas, [-75.5, 6.2])
+        self.assertTrue(grafo.vertices["A1"].es_intercambiador)
+        self.assertEqual(grafo.rutas["A2"]["A3"].tiempo_en_banda("hora_pico_manana"), 6)
+
+    def test_datos_precalculados(self):
+        grafo = Grafo()
+        resultado = cargar_snapshot(grafo, self.archivo, [self.fuente])
+        compilado = grafo.compilar()
+        self.assertEqual(compilado.landmarks.landmarks, self.grafo.compilar().landmarks.landmarks)
+        self.assertEqual(set(compilado.matrices), set(compilado.pesos))
+
+        matriz = MatrizTiempos(grafo)
+        for origen in grafo.vertices:
+            for destino in grafo.vertices:
+                self.assertEqual(matriz.ruta(origen, destino, "normal"), self.matriz.ruta(origen, destino, "normal"))
+                self.assertEqual(
+                    ruta_a_estrella(grafo, origen, destino, "normal")[0],
+                    ruta_a_estrella(self.grafo, origen, destino, "normal")[0]
+                )
+
+        analisis = AnalisisRed(grafo, resultado["analitica"])
+        self.assertEqual(analisis.reporte, self.analisis.reporte)
+        self.assertEqual(analisis.propiedades()["version"], grafo.version)
+
+    def test_fuente_modificada(self):
+        with open(self.fuente, 'a', encoding='utf-8') as f:
+            f.write("\n")
+        grafo = Grafo()
+        self.assertIsNone(cargar_snapshot(grafo, self.archivo, [self.fuente]))
+        self.assertEqual(grafo.vertices, {})
+
+    def test_archivo_invalido(self):
+        grafo = Grafo()
+        self.assertIsNone(cargar_snapshot(grafo, os.path.join(self.directorio.name, "no_existe.snapshot"), [self.fuente]))
+        with open(self.archivo, 'rb') as f:
+            contenido = f.read()
+        with open(self.archivo, 'wb') as f:
+            f.write(contenido[:len(contenido) - 64])
+        self.assertIsNone(cargar_snapshot(grafo, self.archivo, [self.fuente]))
+        with open(self.archivo, 'wb') as f:
+            f.write(b"no es un snapshot")
+        self.assertIsNone(cargar_snapshot(grafo, self.archivo, [self.fuente]))
+        self.assertEqual(grafo.vertices, {})
+
+    def test_rutas_diferidas(self):
+        grafo = Grafo()
+        with mock.patch("src.snapshot.Ruta", wraps=Ruta) as construir:
+            cargar_snapshot(grafo, self.archivo, [self.fuente])
+            self.assertEqual(construir.call_count, 0)
+            rutas = {
+                (o, d): (r.tipo, r.tiempo_base, r.congestion_tipica)
+                for o, destinos in grafo.rutas.items() for d, r in destinos.items()
+            }
+            self.assertEqual(construir.call_count, 5)
+        originales = {
+            (o, d): (r.tipo, r.tiempo_base, r.congestion_tipica)
+            for o, destinos in self.grafo.rutas.items() for d, r in destinos.items()
+        }
+        self.assertEqual(rutas, originales)
+        self.assertEqual(set(grafo.rutas_entrantes["A1"]), {"A2", "A4"})
+
+        grafo.cambiar_tiempo_ruta("A1", "A2", 6)
+        self.assertEqual(ruta_a_estrella(grafo, "A1", "A2", "normal")[0], 6)
+
+    def test_mapa_cerrado_al_descartar(self):
+        mapas = []
+        original = mmap.mmap
+
+        def mapear(*args, **kwargs):
+            mapas.append(original(*args, **kwargs))
+            return mapas[-1]
+
+        with open(self.archivo, 'rb') as f:
+            contenido = f.read()
+        with open(self.fuente, 'a', encoding='utf-8') as f:
+            f.write("\n")
+        with mock.patch("src.snapshot.mmap.mmap", side_effect=mapear):
+            self.assertIsNone(cargar_snapshot(Grafo(), self.archivo, [self.fuente]))
+            with open(self.archivo, 'wb') as f:
+                f.write(b"X" + contenido[1:])
+            self.assertIsNone(cargar_snapshot(Grafo(), self.archivo, [self.fuente]))
+            guardar_snapshot(self.archivo, self.grafo, [self.fuente])
+            with open(self.archivo, 'r+b') as f:
+                f.truncate(os.path.getsize(self.archivo) - 64)
+            self.assertIsNone(cargar_snapshot(Grafo(), self.archivo, [self.fuente]))
+        self.assertEqual(len(mapas), 3)
+        self.assertTrue(all(mapa.closed for mapa in mapas))
+
+    def test_envio_a_otros_procesos(self):
+        grafo = Grafo()
+        cargar_snapshot(grafo, self.archivo, [self.fuente])
+        copia = pickle.loads(pickle.dumps(grafo.compilar()))
+        self.assertEqual(list(copia.destinos), list(self.grafo.compilar().destinos))
+        self.assertEqual(copia.huella(), self.grafo.compilar().huella())
+        self.assertIsNone(copia.landmarks)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,5 +1,8 @@
 import unittest
-from src.utils import dfs_ciclos, tiene_ciclos, es_fuertemente_conexo
+from src.utils import (
+    dfs_ciclos, tiene_ciclos, es_fuertemente_conexo, componentes_fuertemente_conexas,
+    grafo_condensado, reporte_conectividad
+)
 from src.graph import Grafo
 
 class TestUtils(unittest.TestCase):
@@ -88,6 +91,73 @@ class TestUtils(unittest.TestCase):
         })
         self.assertTrue(es_fuertemente_conexo(self.grafo))
 
+    def test_componentes_fuertemente_conexas(self):
+        # Sin ciclos cada estación es su propia componente, en orden topológico inverso
+        self.assertEqual(componentes_fuertemente_conexas(self.grafo), [["C"], ["B"], ["A"]])
+
+        self.grafo.agregar_estacion("D", {"nombre": "Estacion D", "tipo": "metro", "linea": "M1", "conexiones": []})
+        self.grafo.agregar_ruta("C", "B", {"tipo": "metro", "tiempo": 5, "congestion_tipica": {"normal": 1.0}})
+        self.grafo.agregar_ruta("C", "D", {"tipo": "metro", "tiempo": 5, "congestion_tipica": {"normal": 1.0}})
+        componentes = componentes_fuertemente_conexas(self.grafo)
+        self.assertEqual([sorted(c) for c in componentes], [["D"], ["B", "C"], ["A"]])
+
+    def test_grafo_condensado(self):
+        self.grafo.agregar_ruta("C", "B", {"tipo": "metro", "tiempo": 5, "congestion_tipica": {"normal": 1.0}})
+        condensado = grafo_condensado(self.grafo)
+        self.assertEqual(len(condensado["componentes"]), 2)
+        a, b = condensado["componente_de"]["A"], condensado["componente_de"]["B"]
+        self.assertEqual(condensado["componente_de"]["C"], b)
+        self.assertEqual(condensado["aristas"], [(a, b)])
+
+    def test_reporte_conectividad(self):
+        # En la cadena A -> B -> C todas las componentes miden uno; la principal es C
+        reporte = reporte_conectividad(self.grafo)
+        self.assertFalse(reporte["es_fuertemente_conexo"])
+        self.assertEqual(reporte["num_componentes"], 3)
+        self.assertEqual(reporte["principal"], ["C"])
+        self.assertEqual(reporte["sin_entrada"], [["B"], ["A"]])
+        self.assertEqual(reporte["sin_salida"], [])
+
+        self.grafo.agregar_ruta("C", "A", {"tipo": "metro", "tiempo": 5, "congestion_tipica": {"normal": 1.0}})
+        reporte = reporte_conectividad(self.grafo)
+        self.assertTrue(reporte["es_fuertemente_conexo"])
+        self.assertEqual((reporte["sin_entrada"], reporte["sin_salida"]), ([], []))
+        self.assertEqual(sorted(reporte["principal"]), ["A", "B", "C"])
+
+    def test_reporte_satelites_de_la_principal(self):
+        # Un anillo de cinco estaciones con un satélite que solo entra (F) y otro que solo sale (S)
+        grafo = Grafo()
+        anillo = [f"R{i}" for i in range(5)]
+        for id in anillo + ["F", "S"]:
+            grafo.agregar_estacion(id, {"nombre": id, "tipo": "metro", "linea": "M1", "conexiones": []})
+        ruta = {"tipo": "metro", "tiempo": 1, "congestion_tipica": {"normal": 1.0}}
+        for origen, destino in zip(anillo, anillo[1:] + anillo[:1]):
+            grafo.agregar_ruta(origen, destino, ruta)
+        grafo.agregar_ruta("F", "R0", ruta)
+        grafo.agregar_ruta("R3", "S", ruta)
+
+        reporte = reporte_conectividad(grafo)
+        self.assertEqual(sorted(reporte["principal"]), anillo)
+        self.assertEqual(reporte["sin_entrada"], [["F"]])
+        self.assertEqual(reporte["sin_salida"], [["S"]])
+
+    def test_cadena_larga_sin_recursion(self):
+        # Una cadena más profunda que el límite de recursión de Python
+        grafo = Grafo()
+        n = 5000
+        for i in range(n):
+            grafo.agregar_estacion(f"E{i}", {"nombre": f"E{i}", "tipo": "bus", "linea": "X", "conexiones": []})
+        for i in range(n - 1):
+            grafo.agregar_ruta(f"E{i}", f"E{i + 1}", {"tipo": "bus", "tiempo": 1, "congestion_tipica": {"normal": 1.0}})
+        self.assertFalse(tiene_ciclos(grafo))
+        self.assertFalse(dfs_ciclos(grafo, "E0", set(), set()))
+        self.assertEqual(len(componentes_fuertemente_conexas(grafo)), n)
+
+        grafo.agregar_ruta(f"E{n - 1}", "E0", {"tipo": "bus", "tiempo": 1, "congestion_tipica": {"normal": 1.0}})
+        self.assertTrue(tiene_ciclos(grafo))
+        self.assertTrue(dfs_ciclos(grafo, "E0", set(), set()))
+        self.assertTrue(es_fuertemente_conexo(grafo))
+
 
 if __name__ == '__main__':
     unittest.main() 
\ No newline at end of file
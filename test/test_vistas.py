@@ -0,0 +1,62 @@
+import gzip
+import json
+import unittest
+from src.graph import Grafo
+from src.vistas import VistasRed, elegir_codificacion, etag_coincide, nombre_completo_estacion
+
+class TestVistasRed(unittest.TestCase):
+    def setUp(self):
+        self.grafo = Grafo()
+        self.grafo.agregar_estacion("A", {"nombre": "Estacion A", "tipo": "metro", "linea": "A", "conexiones": [], "coordenadas": [-75.5, 6.2]})
+        self.grafo.agregar_estacion("B", {"nombre": "Estacion B", "tipo": "cable", "linea": "K", "conexiones": []})
+        self.grafo.agregar_ruta("A", "B", {"tipo": "transbordo", "tiempo": 4, "congestion_tipica": {"normal": 1.0}})
+        self.vistas = VistasRed(self.grafo)
+
+    def test_contenido(self):
+        vista = self.vistas.vista()
+        self.assertEqual([e["id"] for e in vista["estaciones"]], ["A", "B"])
+        self.assertEqual([e["id"] for e in vista["estaciones_mapa"]], ["A"])
+        self.assertEqual(vista["rutas"], [{"origen": "A", "destino": "B", "tipo": "transbordo", "tiempo": 4}])
+        self.assertEqual(vista["estaciones_agrupadas"], {
+            "Metro Línea A": [("A", "Estacion A (Metro A)")],
+            "Cable Línea K": [("B", "Estacion B (Cable K)")]
+        })
+        self.assertEqual(vista["nombres"]["B"], nombre_completo_estacion(self.grafo.vertices["B"]))
+
+    def test_red_serializada(self):
+        red = self.vistas.vista()["red"]
+        datos = json.loads(red["cuerpos"]["identity"])
+        self.assertEqual([e["id"] for e in datos["estaciones"]], ["A", "B"])
+        self.assertEqual(len(datos["rutas"]), 1)
+        self.assertEqual(gzip.decompress(red["cuerpos"]["gzip"]), red["cuerpos"]["identity"])
+        self.assertTrue(red["etag"].startswith(f'"{self.grafo.version}-'))
+
+    def test_etag_cambia_con_la_version(self):
+        etag = self.vistas.vista()["red"]["etag"]
+        self.grafo.agregar_ruta("B", "A", {"tipo": "transbordo", "tiempo": 4, "congestion_tipica": {"normal": 1.0}})
+        self.assertNotEqual(self.vistas.vista()["red"]["etag"], etag)
+
+    def test_se_reutiliza_hasta_que_cambia_la_version(self):
+        vista = self.vistas.vista()
+        self.assertIs(self.vistas.vista(), vista)
+        self.grafo.agregar_ruta("B", "A", {"tipo": "transbordo", "tiempo": 4, "congestion_tipica": {"normal": 1.0}})
+        self.assertIsNot(self.vistas.vista(), vista)
+        self.assertEqual(len(self.vistas.vista()["rutas"]), 2)
+
+    def test_etag_coincide(self):
+        self.assertTrue(etag_coincide('"1-abc"', '"1-abc"'))
+        self.assertTrue(etag_coincide('"0-x", W/"1-abc"', '"1-abc"'))
+        self.assertTrue(etag_coincide('*', '"1-abc"'))
+        self.assertFalse(etag_coincide('"0-abc"', '"1-abc"'))
+        self.assertFalse(etag_coincide(None, '"1-abc"'))
+
+    def test_elegir_codificacion(self):
+        disponibles = {"identity", "gzip"}
+        self.assertEqual(elegir_codificacion("gzip, deflate, br", disponibles), "gzip")
+        self.assertEqual(elegir_codificacion("br", {"identity", "gzip", "br"}), "br")
+        self.assertEqual(elegir_codificacion("gzip;q=0, br", disponibles), "identity")
+        self.assertEqual(elegir_codificacion("*", disponibles), "gzip")
+        self.assertEqual(elegir_codificacion(None, disponibles), "identity")
+
+if __name__ == '__main__':
+    unittest.main()